@@ -11,6 +11,8 @@ import src.document_generator.utils.utils_json as utils_json
 
 parser = argparse.ArgumentParser()
 parser.add_argument("requiredRatio", nargs="?", type=float)
+parser.add_argument("--num_workers", type=int, default=None,
+                    help="Number of processes reading granule headers (default: number of CPUs)")
 args = parser.parse_args()
 
 required_ratio = 0 
@@ -25,7 +27,7 @@ with open(config_file, 'r') as stream:
 
 
 def main() -> None:
-    utils_json.check_for_attributes(base_dir, config_dictionary, required_ratio)
+    utils_json.check_for_attributes(base_dir, config_dictionary, required_ratio, args.num_workers)
 
 
 if __name__ == "__main__":
@@ -765,8 +765,11 @@ def data_products(
     1. Opens the matched NetCDF granule.
     2. Writes an overview field table (coordinates + variables).
     3. For each variable, writes a detailed CDL attribute table.
-    4. Generates (or reuses) a thumbnail plot figure.
-    5. Embeds the figure with a caption and label.
+    4. Embeds the variable's plot figure with a caption and label.
+
+    Plot figures (and thumbnails) are then rendered together across a process
+    pool, skipping figures whose content is unchanged (see
+    :func:`cdf_plotter.render_figures`).
 
     All output is accumulated and written to a single ``.tex`` file per granule
     type / grid type combination, as specified in the config.
@@ -775,14 +778,17 @@ def data_products(
     :type base_dir: str
     :param config_dictionary: Configuration mapping. Must contain keys for JSON
         groupings file paths, granule directories, image directories, output
-        ``.tex`` file paths, and section title strings.
+        ``.tex`` file paths, and section title strings. Optional keys
+        ``'num_figure_workers'`` (int, figure rendering processes; default:
+        number of CPUs) and ``'native_figure_decimation'`` (int, see
+        :func:`cdf_plotter.plot_native`).
     :type config_dictionary: dict
     :param granule_directory: Absolute path to the directory containing the
         NetCDF granules to document. The last two path components are used to
         infer granule type and grid type.
     :type granule_directory: str
-    :param overwrite_switch: If ``True``, regenerate plot images even if they
-        already exist on disk.
+    :param overwrite_switch: If ``True``, regenerate plot images that are
+        missing or out of date.
     :type overwrite_switch: bool
     :returns: None
     """
@@ -822,6 +828,8 @@ def data_products(
 
         #print(all_grid_granule_paths_megastring)
 
+    figure_jobs = []
+
     # Each entry in the JSON groupings file corresponds to one document subsection
     for json_dictionary in list_of_json_dictionaries:
         granule_filename_truncated_stem = json_dictionary["filename"]
@@ -896,10 +904,11 @@ def data_products(
             #print('data_var_plot call in cdf_extract')
             #print(variable_name)
 
-            # Generate (or retrieve cached) plot and embed as a figure
-            dataVarPlot = cdf_plotter.data_var_plot(
-                config_dictionary, dataset, dataset[variable_name], image_directory, overwrite_switch
-            )
+            # Embed the plot as a figure; plots are rendered (or, if unchanged,
+            # retained) together once all sections have been written
+            figure_path = cdf_plotter.get_figure_path(dataset, dataset[variable_name], image_directory)
+            figure_jobs.append((dataset.encoding['source'], variable_name, figure_path))
+            dataVarPlot = cdf_plotter.figure_include_command(figure_path)
             latex_lines.append(r'\begin{figure}[H]')
             latex_lines.append(r'\centering')
             latex_lines.append(dataVarPlot)
@@ -914,6 +923,9 @@ def data_products(
         )
         utils_general.write_latex_lines_to_file(latex_lines, granule_latex_output_file)
 
+    if overwrite_switch:
+        cdf_plotter.render_figures(config_dictionary, figure_jobs, config_dictionary.get('num_figure_workers'))
+
 
 def get_word_width(word):
     
@@ -0,0 +1,166 @@
+"""
+Header-only NetCDF scanning, with a persistent per-file index.
+
+Granule headers (global and variable attribute names, dimensions and their
+sizes, and variable dimensions) are read with :mod:`netCDF4` directly; no
+variable data is read, and no xarray/CF decoding is done. Headers of many
+files are read in parallel across a process pool, and cached in a local JSON
+index keyed by file path and validated by file size and modification time, so
+that repeated scans of a release's granules only re-read files that have
+changed.
+"""
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import netCDF4
+
+
+HEADER_INDEX_VERSION = 1
+HEADER_INDEX_FILENAME = '.nc_header_index.json'
+
+# Attribute values (in addition to names) retained in header records:
+HEADER_ATTRIBUTE_VALUES = ('product_name', 'coordinates', 'units')
+
+
+def read_header(nc_file: str) -> dict:
+    """
+    Read the header of a NetCDF file, without reading any variable data.
+
+    :param nc_file: Path to the NetCDF file.
+    :type nc_file: str
+    :returns: Header record with keys ``'attrs'`` (global attribute names),
+        ``'dimensions'`` (dimension name to size mapping) and ``'variables'``
+        (variable name to ``{'dims': [...], 'attrs': [...]}`` mapping). Global
+        and variable records also carry the string values of any attributes
+        listed in :data:`HEADER_ATTRIBUTE_VALUES`.
+    :rtype: dict
+    """
+    with netCDF4.Dataset(nc_file, 'r') as dataset:
+        header = _attributes_record(dataset)
+        header['dimensions'] = {name: len(dim) for name, dim in dataset.dimensions.items()}
+        header['variables'] = {}
+        for name, variable in dataset.variables.items():
+            header['variables'][name] = _attributes_record(variable)
+            header['variables'][name]['dims'] = list(variable.dimensions)
+    return header
+
+
+def _attributes_record(obj) -> dict:
+    """Attribute names, and selected attribute values, of a netCDF4 Dataset or
+    Variable."""
+    names = obj.ncattrs()
+    record = {'attrs': names}
+    for name in HEADER_ATTRIBUTE_VALUES:
+        if name in names:
+            record[name] = str(obj.getncattr(name))
+    return record
+
+
+def _read_header_or_error(nc_file: str) -> tuple:
+    """(header, None), or (None, error message) if the header cannot be read;
+    errors are returned rather than raised so that one unreadable file does not
+    abort a pooled scan."""
+    try:
+        return read_header(nc_file), None
+    except Exception as e:
+        return None, f"{type(e).__name__}: {e}"
+
+
+def load_header_index(index_file: str) -> dict:
+    """
+    Load a header index file.
+
+    :param index_file: Path to the index file.
+    :type index_file: str
+    :returns: Mapping of absolute file path to ``{'stat': [size, mtime_ns],
+        'header': {...}}``. Empty if the index file does not exist, cannot be
+        parsed, or was written by an incompatible version.
+    :rtype: dict
+    """
+    try:
+        with open(index_file, 'r') as f:
+            index = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    if index.get('version') != HEADER_INDEX_VERSION:
+        return {}
+    return index.get('files', {})
+
+
+def save_header_index(index: dict, index_file: str) -> None:
+    """
+    Write a header index file (atomically, so that an interrupted write does
+    not corrupt an existing index).
+
+    :param index: Mapping as returned by :func:`load_header_index`.
+    :type index: dict
+    :param index_file: Path to the index file. Parent directories are created
+        if they do not exist.
+    :type index_file: str
+    :returns: None
+    """
+    os.makedirs(os.path.dirname(os.path.abspath(index_file)), exist_ok=True)
+    tmp_file = f"{index_file}.{os.getpid()}.tmp"
+    with open(tmp_file, 'w') as f:
+        json.dump({'version': HEADER_INDEX_VERSION, 'files': index}, f)
+    os.replace(tmp_file, index_file)
+
+
+def scan_headers(nc_files: list, index_file: str = None, max_workers: int = None) -> dict:
+    """
+    Return the headers of a collection of NetCDF files.
+
+    Headers cached in the index whose file size and modification time are
+    unchanged are reused; all others are read in parallel (see
+    :func:`read_header`), and the index is updated. Files whose headers cannot
+    be read are reported and omitted from the result.
+
+    :param nc_files: Paths to the NetCDF files.
+    :type nc_files: list[str]
+    :param index_file: Optional path to the header index file (created if
+        necessary). If not provided, no headers are cached.
+    :type index_file: str
+    :param max_workers: Maximum number of worker processes. Defaults to the
+        number of CPUs; ``1`` reads headers serially, in-process.
+    :type max_workers: int
+    :returns: Mapping of each (readable) file path, as given, to its header
+        record.
+    :rtype: dict
+    """
+    index = load_header_index(index_file) if index_file else {}
+    headers = {}
+    to_read = []
+    for nc_file in nc_files:
+        path = os.path.abspath(nc_file)
+        stat = os.stat(path)
+        key = [stat.st_size, stat.st_mtime_ns]
+        entry = index.get(path)
+        if entry is not None and entry['stat'] == key:
+            headers[nc_file] = entry['header']
+        else:
+            to_read.append((nc_file, path, key))
+
+    if not to_read:
+        return headers
+
+    max_workers = min(max_workers or os.cpu_count() or 1, len(to_read))
+    paths = [path for _, path, _ in to_read]
+    if max_workers > 1:
+        with ProcessPoolExecutor(max_workers=max_workers) as executor:
+            results = list(executor.map(
+                _read_header_or_error, paths,
+                chunksize=max(1, len(paths) // (4 * max_workers))))
+    else:
+        results = [_read_header_or_error(path) for path in paths]
+
+    for (nc_file, path, key), (header, error) in zip(to_read, results):
+        if error:
+            print(f"unable to read header of {nc_file}: {error}")
+            continue
+        headers[nc_file] = header
+        index[path] = {'stat': key, 'header': header}
+
+    if index_file:
+        save_header_index(index, index_file)
+    return headers
@@ -13,6 +13,9 @@ import os
 import copy
 import cmocean
 import argparse
+import hashlib
+import json
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
 from PIL import Image
 import pdb
@@ -26,6 +29,12 @@ import src.document_generator.utils.cdf_extract as cdf_extract
 sys.path.append('/Users/brucel/ECCOv4-py')
 import ecco_v4_py as ecco
 
+# Increment to invalidate all previously rendered figures (e.g., after changing
+# the plotting code itself); see figure_content_hash.
+FIGURE_RENDER_VERSION = 1
+# Suffix of the sidecar file recording the content hash of a rendered figure
+FIGURE_HASH_SUFFIX = '.sha256'
+
 
 # ---------------------------------------------------------------------------
 # ----------------------------- Plotting Functions --------------------------
@@ -43,9 +52,11 @@ def data_var_plot(
 
     Dispatches to the appropriate plotting function (native tile, lat-lon, or
     1-D) based on the ``product_name`` attribute of the dataset. If
-    ``overwrite_switch`` is ``True``, the image is always regenerated;
-    otherwise the existing file is reused. A thumbnail copy is also created
-    at the size specified in the config.
+    ``overwrite_switch`` is ``True``, the image is regenerated unless it was
+    rendered from identical content (see :func:`plot_if_changed`); otherwise
+    the existing file is reused. A thumbnail copy is also created at the size
+    specified in the config. To render many figures in parallel, see
+    :func:`render_figures`.
 
     :param config_dictionary: Configuration mapping. Expected keys include
         ``'thumbnail_path_modifier_string'`` (str, suffix inserted before the
@@ -59,51 +70,289 @@ def data_var_plot(
     :type data_array: xr.DataArray
     :param image_directory: Directory where the output PNG should be saved.
     :type image_directory: str
-    :param overwrite_switch: If ``True``, regenerate the image even if it
-        already exists on disk.
+    :param overwrite_switch: If ``True``, regenerate the image if it is
+        missing or out of date.
     :type overwrite_switch: bool
     :returns: A LaTeX ``\\includegraphics`` command referencing the saved figure.
     :rtype: str
     """
+    figure_path = get_figure_path(dataset, data_array, image_directory)
+    if overwrite_switch:
+        plot_if_changed(config_dictionary, dataset, data_array, figure_path)
+    return figure_include_command(figure_path)
+
+
+def get_figure_path(dataset: xr.Dataset, data_array: xr.DataArray, image_directory: str) -> str:
+    """
+    Return the output path of a data variable's plot image.
+
+    :param dataset: The dataset containing ``data_array``; its title
+        determines the image subdirectory.
+    :type dataset: xr.Dataset
+    :param data_array: The variable to plot.
+    :type data_array: xr.DataArray
+    :param image_directory: Root directory for plot images.
+    :type image_directory: str
+    :returns: Path to the PNG file.
+    :rtype: str
+    """
     # Construct the output path from the dataset title and variable name
-    figure_path = os.path.join(
+    return os.path.join(
         image_directory,
         utils_general.get_ds_title(dataset).replace(',', ''),
         str(data_array.name).replace(' ', '_') + '.png'
     )
-    figure_path_Path_object = Path(figure_path)
 
-    if overwrite_switch:
-        figure_path_Path_object.parent.mkdir(parents=True, exist_ok=True)
-
-        # Dispatch to the correct plot function based on product type
-        if 'native' in dataset.attrs['product_name']:
-            plot_native(dataset, data_array, figure_path)
-        elif 'latlon' in dataset.attrs['product_name']:
-            plot_latlon(dataset, data_array, figure_path)
-        elif '1D' in dataset.attrs['product_name']:
-            plot_oneD(dataset, data_array, figure_path)
-
-        # Build the thumbnail path by inserting the modifier before the extension
-        thumbnail_output_path = (
-            f"{'.' .join(figure_path.split('.')[:-1])}"
-            f"{config_dictionary['thumbnail_path_modifier_string']}"
-            f".{figure_path.split('.')[-1]}"
-        )
-        thumbnail_size_tuple = (config_dictionary["thumbnail_size"], config_dictionary["thumbnail_size"])
 
-        try:
-            with Image.open(figure_path) as image:
-                # BOX resampling is fast and suitable for downscaling to thumbnail size
-                image.thumbnail(thumbnail_size_tuple, resample=Image.Resampling.BOX)
-                image.save(thumbnail_output_path, format='PNG')
-        except IOError as e:
-            print(f"Error generating thumbnail: {e}")
+def get_thumbnail_path(config_dictionary: dict, figure_path: str) -> str:
+    """
+    Return the path of a figure's thumbnail, formed by inserting
+    ``config_dictionary['thumbnail_path_modifier_string']`` before the file
+    extension.
 
+    :param config_dictionary: Configuration mapping.
+    :type config_dictionary: dict
+    :param figure_path: Path to the full-size figure.
+    :type figure_path: str
+    :returns: Path to the thumbnail.
+    :rtype: str
+    """
+    return (
+        f"{'.' .join(figure_path.split('.')[:-1])}"
+        f"{config_dictionary['thumbnail_path_modifier_string']}"
+        f".{figure_path.split('.')[-1]}"
+    )
+
+
+def figure_include_command(figure_path: str) -> str:
+    """
+    Return the LaTeX ``\\includegraphics`` command for a figure.
+
+    :param figure_path: Path to the figure.
+    :type figure_path: str
+    :returns: LaTeX command string.
+    :rtype: str
+    """
     return r'\includegraphics[scale=0.55]{' + f'{figure_path}' + r'}'
 
 
-def plot_native(dataset: xr.Dataset, field: xr.DataArray, figure_path: str) -> None:
+def plot_if_changed(
+    config_dictionary: dict,
+    dataset: xr.Dataset,
+    data_array: xr.DataArray,
+    figure_path: str
+) -> bool:
+    """
+    Render a data variable's plot image and thumbnail, unless both already
+    exist and were rendered from identical content.
+
+    The content hash (see :func:`figure_content_hash`) of each rendered figure
+    is recorded in a sidecar file (``figure_path`` + :data:`FIGURE_HASH_SUFFIX`),
+    so that unchanged figures (e.g., after a metadata-only granule update) are
+    not re-rendered.
+
+    :param config_dictionary: Configuration mapping (see :func:`data_var_plot`).
+    :type config_dictionary: dict
+    :param dataset: The dataset containing ``data_array``.
+    :type dataset: xr.Dataset
+    :param data_array: The variable to plot.
+    :type data_array: xr.DataArray
+    :param figure_path: Path to the output PNG file.
+    :type figure_path: str
+    :returns: ``True`` if the figure was rendered, ``False`` if it was
+        unchanged.
+    :rtype: bool
+    """
+    content_hash = figure_content_hash(config_dictionary, dataset, data_array)
+    hash_path = figure_path + FIGURE_HASH_SUFFIX
+    thumbnail_output_path = get_thumbnail_path(config_dictionary, figure_path)
+    if os.path.isfile(figure_path) and os.path.isfile(thumbnail_output_path) and os.path.isfile(hash_path):
+        with open(hash_path, 'r') as f:
+            if f.read().strip() == content_hash:
+                return False
+
+    Path(figure_path).parent.mkdir(parents=True, exist_ok=True)
+    # (remove any stale hash first, so that an interrupted render is redone)
+    if os.path.isfile(hash_path):
+        os.remove(hash_path)
+
+    # Dispatch to the correct plot function based on product type
+    if 'native' in dataset.attrs['product_name']:
+        plot_native(dataset, data_array, figure_path, config_dictionary.get('native_figure_decimation', 1))
+    elif 'latlon' in dataset.attrs['product_name']:
+        plot_latlon(dataset, data_array, figure_path)
+    elif '1D' in dataset.attrs['product_name']:
+        plot_oneD(dataset, data_array, figure_path)
+
+    thumbnail_size_tuple = (config_dictionary["thumbnail_size"], config_dictionary["thumbnail_size"])
+
+    try:
+        with Image.open(figure_path) as image:
+            # BOX resampling is fast and suitable for downscaling to thumbnail size
+            image.thumbnail(thumbnail_size_tuple, resample=Image.Resampling.BOX)
+            image.save(thumbnail_output_path, format='PNG')
+    except IOError as e:
+        print(f"Error generating thumbnail: {e}")
+        return True
+
+    with open(hash_path, 'w') as f:
+        f.write(content_hash)
+    return True
+
+
+def figure_content_hash(config_dictionary: dict, dataset: xr.Dataset, field: xr.DataArray) -> str:
+    """
+    Compute a hash of everything a data variable's figure is rendered from:
+    the plotted data slice and its coordinates, the text drawn on the figure,
+    and the rendering parameters.
+
+    Only the plotted slice (see :func:`plot_slice`) is loaded, not the full
+    field, except for 1-D products and ``drF``, which are plotted in full.
+
+    :param config_dictionary: Configuration mapping.
+    :type config_dictionary: dict
+    :param dataset: The dataset containing ``field``.
+    :type dataset: xr.Dataset
+    :param field: The variable to plot.
+    :type field: xr.DataArray
+    :returns: Hexadecimal SHA-256 digest.
+    :rtype: str
+    """
+    product_name = dataset.attrs['product_name']
+    params = {
+        'version': FIGURE_RENDER_VERSION,
+        'name': str(field.name),
+        'dims': list(field.dims),
+        'product_name': product_name,
+        'long_name': field.attrs.get('long_name'),
+        'units': field.attrs.get('units'),
+        'thumbnail_size': config_dictionary.get('thumbnail_size'),
+        'native_figure_decimation': config_dictionary.get('native_figure_decimation', 1),
+    }
+    content_hash = hashlib.sha256(json.dumps(params, sort_keys=True, default=str).encode())
+
+    data = field if ('1D' in product_name or field.name == 'drF') else plot_slice(field)[0]
+    for name, values in [(None, data.values)] + [(name, data[name].values) for name in sorted(data.coords)]:
+        content_hash.update(str(name).encode())
+        values = np.asarray(values)
+        if values.dtype.kind == 'O':
+            content_hash.update(str(values.tolist()).encode())
+        else:
+            content_hash.update(np.ascontiguousarray(values).tobytes())
+    return content_hash.hexdigest()
+
+
+def plot_slice(field: xr.DataArray) -> tuple:
+    """
+    Select the horizontal slice of a variable that is plotted.
+
+    The first time step is selected if the variable has a time dimension. The
+    surface layer (``k``, ``k_l`` or ``Z`` index 0) is selected by default,
+    except for ``WVEL`` and ``DRHODR``, where layer 1 is used because layer 0
+    is identically zero or NaN at the surface.
+
+    :param field: The variable to plot.
+    :type field: xr.DataArray
+    :returns: A 2-tuple ``(slice, target_k)`` of the selected data and the
+        (0-indexed) vertical level.
+    :rtype: tuple[xr.DataArray, int]
+    """
+    tmp_plt = field
+    if 'time' in field.dims:
+        tmp_plt = field.isel(time=0)
+
+    target_k = 0
+    if 'WVEL' in field.name or 'DRHO' in field.name:
+        target_k = 1
+
+    for dim in ('k_l', 'k', 'Z'):
+        if dim in field.dims:
+            tmp_plt = tmp_plt.isel({dim: target_k})
+            break
+    return tmp_plt, target_k
+
+
+def decimate_native(field: xr.DataArray, stride: int) -> xr.DataArray:
+    """
+    Decimate the horizontal (tile ``i``/``j``) dimensions of a native-grid
+    variable by an integer stride.
+
+    :param field: Native-grid variable.
+    :type field: xr.DataArray
+    :param stride: Decimation stride; ``1`` returns ``field`` unchanged.
+    :type stride: int
+    :returns: The decimated variable.
+    :rtype: xr.DataArray
+    """
+    if stride <= 1:
+        return field
+    return field.isel({dim: slice(None, None, stride) for dim in ('i', 'j', 'i_g', 'j_g') if dim in field.dims})
+
+
+def _init_render_worker() -> None:
+    """Render figures headless in worker processes."""
+    plt.switch_backend('Agg')
+
+
+def _render_figure_job(
+    config_dictionary: dict,
+    granule_path: str,
+    variable_name: str,
+    figure_path: str
+) -> tuple:
+    """Render one figure, opening its granule in the worker so that only the
+    plotted slice is loaded. Returns ``(figure_path, status)``, where status is
+    ``'rendered'``, ``'unchanged'`` or an error message."""
+    try:
+        with xr.open_dataset(granule_path) as dataset:
+            rendered = plot_if_changed(config_dictionary, dataset, dataset[variable_name], figure_path)
+        return figure_path, 'rendered' if rendered else 'unchanged'
+    except Exception as e:
+        plt.close('all')
+        return figure_path, f"{type(e).__name__}: {e}"
+
+
+def render_figures(config_dictionary: dict, figure_jobs: list, max_workers: int = None) -> dict:
+    """
+    Render data variable plot images across a pool of (headless) worker
+    processes, skipping figures whose content is unchanged (see
+    :func:`plot_if_changed`).
+
+    :param config_dictionary: Configuration mapping (see :func:`data_var_plot`).
+    :type config_dictionary: dict
+    :param figure_jobs: ``(granule_path, variable_name, figure_path)`` tuples,
+        e.g., with ``figure_path`` from :func:`get_figure_path`.
+    :type figure_jobs: list[tuple]
+    :param max_workers: Maximum number of worker processes. Defaults to the
+        number of CPUs; ``1`` renders serially, in-process.
+    :type max_workers: int
+    :returns: Number of ``'rendered'``, ``'unchanged'`` and ``'failed'``
+        figures.
+    :rtype: dict
+    """
+    counts = {'rendered': 0, 'unchanged': 0, 'failed': 0}
+    if not figure_jobs:
+        return counts
+
+    max_workers = min(max_workers or os.cpu_count() or 1, len(figure_jobs))
+    job_args = [(config_dictionary,) + tuple(job) for job in figure_jobs]
+    if max_workers > 1:
+        with ProcessPoolExecutor(max_workers=max_workers, initializer=_init_render_worker) as executor:
+            results = list(executor.map(_render_figure_job, *zip(*job_args)))
+    else:
+        results = [_render_figure_job(*args) for args in job_args]
+
+    for figure_path, status in results:
+        if status in counts:
+            counts[status] += 1
+        else:
+            counts['failed'] += 1
+            print(f"Error rendering {figure_path}: {status}")
+    print(f"figures: {counts['rendered']} rendered, {counts['unchanged']} unchanged, {counts['failed']} failed")
+    return counts
+
+
+def plot_native(dataset: xr.Dataset, field: xr.DataArray, figure_path: str, decimation: int = 1) -> None:
     """
     Create and save a native LLC-grid tile plot for a data variable.
 
@@ -125,6 +374,10 @@ def plot_native(dataset: xr.Dataset, field: xr.DataArray, figure_path: str) -> N
     :type field: xr.DataArray
     :param figure_path: Full path to the output PNG file.
     :type figure_path: str
+    :param decimation: Tile ``i``/``j`` decimation stride applied before 13-tile
+        plots (see :func:`decimate_native`); colour limits are computed from
+        the full-resolution slice. Default is ``1`` (no decimation).
+    :type decimation: int
     :returns: None
     """
 
@@ -134,22 +387,9 @@ def plot_native(dataset: xr.Dataset, field: xr.DataArray, figure_path: str) -> N
 
     show_colorbar = True
     product_name = dataset.product_name
-    tmp_plt = field
-
-    # Select first time step if variable has a time dimension
-    if 'time' in field.dims:
-        tmp_plt = field.isel(time=0)
-
-    # Select vertical level — default to surface (k=0), but skip it for
-    # variables that are 0 or NaN at the surface
-    target_k = 0
-    if 'WVEL' in field.name or 'DRHO' in field.name:
-        target_k = 1
 
-    if 'k_l' in field.dims:
-        tmp_plt = tmp_plt.isel(k_l=target_k)
-    elif 'k' in field.dims:
-        tmp_plt = tmp_plt.isel(k=target_k)
+    # Select first time step and vertical level (see plot_slice)
+    tmp_plt, target_k = plot_slice(field)
 
     '''
     # Bruce - my hack to stop "vertical level = _" being printed for fields without a depth dimension 
@@ -233,7 +473,7 @@ def plot_native(dataset: xr.Dataset, field: xr.DataArray, figure_path: str) -> N
         show_label = 'units' in tmp_plt.attrs
 
         fig, cur_arr = ecco.plot_tiles(
-            tmp_plt, cmin=cmin, cmax=cmax, fig_num=0, cmap=cmap,
+            decimate_native(tmp_plt, decimation), cmin=cmin, cmax=cmax, fig_num=0, cmap=cmap,
             show_colorbar=show_colorbar, show_tile_labels=False,
             fig_size=8, cbar_label=label, show_cbar_label=show_label
         )
@@ -310,17 +550,9 @@ def plot_latlon(dataset: xr.Dataset, field: xr.DataArray, figure_path: str) -> N
 
     show_colorbar = True
     product_name  = dataset.product_name
-    tmp_plt = field
 
-    if 'time' in field.dims:
-        tmp_plt = field.isel(time=0)
-
-    # Skip surface level for variables that are zero/NaN there
-    target_k = 0
-    if 'WVEL' in field.name or 'DRHO' in field.name:
-        target_k = 1
-    if 'Z' in field.dims:
-        tmp_plt = tmp_plt.isel(Z=target_k)
+    # Skip surface level for variables that are zero/NaN there (see plot_slice)
+    tmp_plt, target_k = plot_slice(field)
 
     '''
     for dim in field.dims:
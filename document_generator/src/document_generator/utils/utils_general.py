@@ -2,14 +2,26 @@ import os
 import re
 import xarray as xr
 import glob
-import subprocess
 import yaml
 from pathlib import Path
 import sys
 import netrc
 import requests
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from PIL import Image
 
+# Ensure the project root is on the path so relative imports resolve correctly
+base_dir = str(Path(__file__).parent.parent.parent.parent.resolve())
+sys.path.append(base_dir)
+import src.document_generator.utils.cdf_headers as cdf_headers
+
+DOWNLOAD_WORKERS = 8
+DOWNLOAD_RETRIES = 3
+DOWNLOAD_TIMEOUT = 60.
+DOWNLOAD_CHUNK_SIZE = 1024 * 1024
+DOWNLOAD_PARTIAL_SUFFIX = '.part'
+
 
 def write_latex_lines_to_file(latex_lines: list, output_file: str) -> None:
     """
@@ -66,8 +78,10 @@ def download_granules(base_dir: str, config_dictionary: dict) -> None:
     Reads a list of granule URLs from the file specified in the config, then
     authenticates using credentials stored in the user's ``.netrc`` file. Each
     URL is matched against grid-type substrings to determine the correct local
-    destination directory. Files that already exist are skipped unless
-    ``overwrite_switch`` is enabled in the config.
+    destination directory (see :func:`classify_granule_urls`). Files that
+    already exist are skipped unless ``overwrite_switch`` is enabled in the
+    config. Files are downloaded concurrently, and interrupted downloads are
+    resumed (see :func:`download_files`).
 
     .. note::
         The ``.netrc`` file must have an entry for the hostname specified in
@@ -84,6 +98,8 @@ def download_granules(base_dir: str, config_dictionary: dict) -> None:
         - ``'url_grid_type_substrings'`` (list[str]) — substrings identifying grid types.
         - ``'url_coordinate_substring'`` (str) — substring identifying coordinate files.
         - ``'overwrite_switch'`` (bool) — if ``True``, re-download existing files.
+        - ``'num_download_workers'`` (int, optional) — number of concurrent
+          downloads (default: :data:`DOWNLOAD_WORKERS`).
         - ``'coordinate_files_{grid_type}_dir'`` / ``'variable_files_{grid_type}_dir'``
           (str) — relative paths for saving coordinate vs. variable granules.
 
@@ -109,44 +125,21 @@ def download_granules(base_dir: str, config_dictionary: dict) -> None:
     if auth_info:
         login, account, password = auth_info
 
-        # Iterate over all grid types (e.g. 'native', 'latlon', '1D')
-        for grid_type_substring in config_dictionary["url_grid_type_substrings"]:
-            for granule_url in granule_url_list:
-                # Normalise 'lat-lon' -> 'latlon' for URL matching, since URLs omit the hyphen
-                if "".join(grid_type_substring.split("-")) in granule_url:
-
-                    # Determine whether this URL points to a coordinate or variable file
-                    if config_dictionary["url_coordinate_substring"] in granule_url:
-                        # Strip leading underscore from grid type substring if present
-                        if grid_type_substring.startswith("_"):
-                            dataset_dir_pre = config_dictionary[f"coordinate_files_{grid_type_substring[1:]}_dir"]
-                        else:
-                            dataset_dir_pre = config_dictionary[f"coordinate_files_{grid_type_substring}_dir"]
-                    else:
-                        if grid_type_substring.startswith("_"):
-                            dataset_dir_pre = config_dictionary[f"variable_files_{grid_type_substring[1:]}_dir"]
-                        else:
-                            dataset_dir_pre = config_dictionary[f"variable_files_{grid_type_substring}_dir"]
-
-                    dataset_dir = os.path.join(os.path.realpath(base_dir), dataset_dir_pre)
-                    os.makedirs(dataset_dir, exist_ok=True)
-                    local_filename = os.path.join(dataset_dir, Path(granule_url).name)
-
-                    # Skip download if file already exists and overwrite is disabled
-                    if not config_dictionary['overwrite_switch']:
-                        if os.path.exists(local_filename):
-                            continue
-
-                    try:
-                        response = requests.get(granule_url, auth=(login, password), stream=True)
-                        response.raise_for_status()
-                        # Write in chunks to avoid loading large files fully into memory
-                        with open(local_filename, 'wb') as fd:
-                            for chunk in response.iter_content(chunk_size=8192):
-                                fd.write(chunk)
-                        print(f"successfully downloaded:      {granule_url}")
-                    except requests.exceptions.RequestException as e:
-                        print(f"An error occurred: {e}")
+        downloads = classify_granule_urls(base_dir, config_dictionary, granule_url_list)
+
+        if config_dictionary['overwrite_switch']:
+            # Discard any partial downloads so that files are fetched afresh
+            for granule_url, local_filename in downloads:
+                if os.path.exists(local_filename + DOWNLOAD_PARTIAL_SUFFIX):
+                    os.remove(local_filename + DOWNLOAD_PARTIAL_SUFFIX)
+        else:
+            # Skip download if file already exists and overwrite is disabled
+            downloads = [(url, local_filename) for url, local_filename in downloads if not os.path.exists(local_filename)]
+
+        download_files(
+            downloads, auth=(login, password),
+            max_workers=config_dictionary.get('num_download_workers', DOWNLOAD_WORKERS)
+        )
     else:
         print(
             f"No entry found for {hostname} in .netrc file.  "
@@ -154,13 +147,227 @@ def download_granules(base_dir: str, config_dictionary: dict) -> None:
         )
 
 
+def classify_granule_urls(base_dir: str, config_dictionary: dict, granule_url_list: list) -> list:
+    """
+    Determine the local destination of each granule URL, in a single pass.
+
+    Each URL is matched against all grid-type substrings at once, and against
+    the coordinate substring to distinguish coordinate from variable granules.
+
+    :param base_dir: Root directory of the project.
+    :type base_dir: str
+    :param config_dictionary: Configuration mapping (see
+        :func:`download_granules`).
+    :type config_dictionary: dict
+    :param granule_url_list: Granule URLs.
+    :type granule_url_list: list[str]
+    :returns: Unique ``(granule_url, local_filename)`` tuples. URLs matching no
+        grid type are omitted.
+    :rtype: list[tuple[str, str]]
+    """
+    # Map normalised URL substrings (URLs omit the hyphen in 'lat-lon') to grid
+    # types (without leading underscore), as used in config directory keys
+    grid_types = {}
+    for grid_type_substring in config_dictionary["url_grid_type_substrings"]:
+        grid_type = grid_type_substring[1:] if grid_type_substring.startswith("_") else grid_type_substring
+        grid_types["".join(grid_type_substring.split("-"))] = grid_type
+    grid_type_re = re.compile("|".join(re.escape(s) for s in sorted(grid_types, key=len, reverse=True)))
+
+    real_base_dir = os.path.realpath(base_dir)
+    downloads = {}
+    for granule_url in granule_url_list:
+        granule_type = "coordinate" if config_dictionary["url_coordinate_substring"] in granule_url else "variable"
+        for grid_type in dict.fromkeys(grid_types[match] for match in grid_type_re.findall(granule_url)):
+            dataset_dir = os.path.join(real_base_dir, config_dictionary[f"{granule_type}_files_{grid_type}_dir"])
+            downloads[(granule_url, os.path.join(dataset_dir, Path(granule_url).name))] = None
+    return list(downloads)
+
+
+def _content_range_total(response: requests.Response):
+    """Total resource size from a response's ``Content-Range`` header (e.g.
+    ``'bytes 100-999/1000'`` or ``'bytes */1000'``), or None if unknown."""
+    total = response.headers.get('Content-Range', '').rpartition('/')[2]
+    return int(total) if total.isdigit() else None
+
+
+def download_file(
+    session: requests.Session,
+    url: str,
+    local_filename: str,
+    retries: int = DOWNLOAD_RETRIES,
+    timeout: float = DOWNLOAD_TIMEOUT
+) -> int:
+    """
+    Download a file, resuming any partial download and verifying its size.
+
+    Data are written to ``local_filename`` + :data:`DOWNLOAD_PARTIAL_SUFFIX`,
+    which is renamed to ``local_filename`` once complete. If a partial file
+    exists (e.g., from an interrupted run, or a failed attempt), only the
+    remaining bytes are requested (HTTP ``Range``); servers that ignore range
+    requests return the whole file, which then replaces the partial file. The
+    downloaded size is checked against the size reported by the server.
+
+    :param session: HTTP session (authentication, connection reuse).
+    :type session: requests.Session
+    :param url: URL to download.
+    :type url: str
+    :param local_filename: Destination file path.
+    :type local_filename: str
+    :param retries: Number of retries after a failed attempt.
+    :type retries: int
+    :param timeout: Connection/read timeout, in seconds.
+    :type timeout: float
+    :returns: Number of bytes transferred.
+    :rtype: int
+    :raises requests.exceptions.RequestException: If the download fails
+        after all retries.
+    :raises IOError: If the downloaded size does not match the expected size
+        after all retries.
+    """
+    partial_filename = local_filename + DOWNLOAD_PARTIAL_SUFFIX
+    transferred = 0
+    for attempt in range(retries + 1):
+        offset = os.path.getsize(partial_filename) if os.path.exists(partial_filename) else 0
+        headers = {'Range': f'bytes={offset}-'} if offset else {}
+        try:
+            with session.get(url, headers=headers, stream=True, timeout=timeout) as response:
+                if response.status_code == 416 and offset:
+                    # Nothing left to fetch if the partial file is complete
+                    if _content_range_total(response) == offset:
+                        break
+                    raise IOError(f"partial download of {url} is larger than the remote file")
+                response.raise_for_status()
+                if response.status_code == 206:
+                    expected_size = _content_range_total(response)
+                    mode = 'ab'
+                else:
+                    expected_size = response.headers.get('Content-Length')
+                    expected_size = int(expected_size) if expected_size is not None else None
+                    mode = 'wb'
+                # Write in chunks to avoid loading large files fully into memory
+                with open(partial_filename, mode) as fd:
+                    for chunk in response.iter_content(chunk_size=DOWNLOAD_CHUNK_SIZE):
+                        fd.write(chunk)
+                        transferred += len(chunk)
+            size = os.path.getsize(partial_filename)
+            if expected_size is not None and size != expected_size:
+                if size > expected_size:
+                    os.remove(partial_filename)
+                raise IOError(f"{url}: expected {expected_size} bytes, received {size}")
+            break
+        except (requests.exceptions.RequestException, IOError) as e:
+            if attempt == retries:
+                raise
+            print(f"retrying {url} ({e})")
+            time.sleep(min(2 ** attempt, 30))
+    os.replace(partial_filename, local_filename)
+    return transferred
+
+
+def download_files(
+    downloads: list,
+    auth: tuple = None,
+    max_workers: int = DOWNLOAD_WORKERS,
+    retries: int = DOWNLOAD_RETRIES
+) -> dict:
+    """
+    Download files concurrently over a shared keep-alive HTTP session.
+
+    :param downloads: ``(url, local_filename)`` tuples. Destination
+        directories are created as needed.
+    :type downloads: list[tuple[str, str]]
+    :param auth: Optional ``(login, password)`` tuple.
+    :type auth: tuple
+    :param max_workers: Maximum number of concurrent downloads.
+    :type max_workers: int
+    :param retries: Number of retries per file (see :func:`download_file`).
+    :type retries: int
+    :returns: Number of files ``'downloaded'`` and ``'failed'``, and total
+        ``'bytes'`` transferred.
+    :rtype: dict
+    """
+    counts = {'downloaded': 0, 'failed': 0, 'bytes': 0}
+    if not downloads:
+        return counts
+
+    for dataset_dir in {os.path.dirname(local_filename) for _, local_filename in downloads}:
+        os.makedirs(dataset_dir, exist_ok=True)
+
+    with requests.Session() as session:
+        session.auth = auth
+        # (sizes are verified against Content-Length, so disable transfer compression)
+        session.headers['Accept-Encoding'] = 'identity'
+        adapter = requests.adapters.HTTPAdapter(pool_connections=max_workers, pool_maxsize=max_workers)
+        session.mount('https://', adapter)
+        session.mount('http://', adapter)
+
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures = {
+                executor.submit(download_file, session, url, local_filename, retries): url
+                for url, local_filename in downloads
+            }
+            for future in as_completed(futures):
+                try:
+                    counts['bytes'] += future.result()
+                    counts['downloaded'] += 1
+                    print(f"successfully downloaded:      {futures[future]}")
+                except (requests.exceptions.RequestException, IOError) as e:
+                    counts['failed'] += 1
+                    print(f"An error occurred: {e}")
+
+    print(f"{counts['downloaded']} files downloaded ({counts['bytes']} bytes), {counts['failed']} failed")
+    return counts
+
+
+def scan_nc_dir(base_dir: str, nc_dir: str, max_workers: int = None) -> dict:
+    """
+    Summarize the headers of the NetCDF files in a directory.
+
+    Headers are read in-process (in parallel, without reading any variable
+    data) and cached in a header index in the directory, so that repeated
+    file selections from the same directory only re-read new or modified files
+    (see :func:`cdf_headers.scan_headers`).
+
+    :param base_dir: Root directory of the project.
+    :type base_dir: str
+    :param nc_dir: Path to the directory containing ``.nc`` files, relative
+        to ``base_dir``.
+    :type nc_dir: str
+    :param max_workers: Maximum number of header-reading processes. Defaults
+        to the number of CPUs.
+    :type max_workers: int
+    :returns: Mapping of each readable ``.nc`` file path, in directory listing
+        order, to a summary with keys ``'num_vars'`` (number of variables
+        carrying a ``long_name`` attribute), ``'num_variables'`` (total number
+        of variables), ``'dimensions'`` (dimension name to size mapping) and
+        ``'size'`` (file size in bytes).
+    :rtype: dict
+    """
+    nc_dir = os.path.join(base_dir, nc_dir)
+    nc_files = glob.glob(f"{nc_dir}/*.nc")
+    headers = cdf_headers.scan_headers(
+        nc_files, index_file=os.path.join(nc_dir, cdf_headers.HEADER_INDEX_FILENAME), max_workers=max_workers)
+
+    summaries = {}
+    for nc_file in nc_files:
+        if nc_file not in headers:
+            continue
+        variables = headers[nc_file]['variables']
+        summaries[nc_file] = {
+            'num_vars': sum('long_name' in variable['attrs'] for variable in variables.values()),
+            'num_variables': len(variables),
+            'dimensions': headers[nc_file]['dimensions'],
+            'size': os.path.getsize(nc_file),
+        }
+    return summaries
+
+
 def get_a_file_with_min_num_vars(base_dir: str, nc_dir: str) -> str:
     """
     Return the path to the NetCDF file with the fewest variables in a directory.
 
-    Variable count is estimated by the number of occurrences of the string
-    ``"long_name"`` in the output of ``ncdump -h``, which corresponds to the
-    number of coordinate and data variables that carry a ``long_name`` attribute.
+    Variable count is the number of coordinate and data variables that carry a
+    ``long_name`` attribute (see :func:`scan_nc_dir`).
 
     :param base_dir: Root directory of the project.
     :type base_dir: str
@@ -170,40 +377,16 @@ def get_a_file_with_min_num_vars(base_dir: str, nc_dir: str) -> str:
     :returns: Absolute path to the ``.nc`` file with the minimum variable count.
     :rtype: str
     """
-    num_vars_per_file_list = []
-    num_vars_min = 9999  # Sentinel value; assumes no file has more variables than this
-    nc_files = glob.glob(f"{os.path.join(base_dir, nc_dir)}/*.nc")
-
-    for nc_file in nc_files:
-        # Shell pipeline equivalent: ncdump -h FILE | grep long_name | wc -l
-        cmd1 = ["ncdump", "-h", nc_file]
-        cmd2 = ["grep", "long_name"]
-        cmd3 = ["wc", "-l"]
-        p1 = subprocess.Popen(cmd1, stdout=subprocess.PIPE, text=True)
-        p2 = subprocess.Popen(cmd2, stdin=p1.stdout, stdout=subprocess.PIPE, text=True)
-        p3 = subprocess.Popen(cmd3, stdin=p2.stdout, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
-        p2.stdout.close()
-        p1.stdout.close()
-        stdout, stderr = p3.communicate()
-
-        if stdout:
-            num_vars = int(stdout)
-            num_vars_per_file_list.append(num_vars)
-            num_vars_min = num_vars if num_vars < num_vars_min else num_vars_min
-        if stderr:
-            print("STDERR Output:")
-            print(stderr)
-
-    return nc_files[num_vars_per_file_list.index(num_vars_min)]
+    summaries = scan_nc_dir(base_dir, nc_dir)
+    return min(summaries, key=lambda nc_file: summaries[nc_file]['num_vars'])
 
 
 def get_a_file_with_max_num_vars(base_dir: str, nc_dir: str) -> str:
     """
     Return the path to the NetCDF file with the most variables in a directory.
 
-    Variable count is estimated by the number of occurrences of the string
-    ``"long_name"`` in the output of ``ncdump -h``, which corresponds to the
-    number of coordinate and data variables that carry a ``long_name`` attribute.
+    Variable count is the number of coordinate and data variables that carry a
+    ``long_name`` attribute (see :func:`scan_nc_dir`).
 
     :param base_dir: Root directory of the project.
     :type base_dir: str
@@ -213,31 +396,8 @@ def get_a_file_with_max_num_vars(base_dir: str, nc_dir: str) -> str:
     :returns: Absolute path to the ``.nc`` file with the maximum variable count.
     :rtype: str
     """
-    num_vars_per_file_list = []
-    num_vars_max = 0
-    nc_files = glob.glob(f"{os.path.join(base_dir, nc_dir)}/*.nc")
-
-    for nc_file in nc_files:
-        # Shell pipeline equivalent: ncdump -h FILE | grep long_name | wc -l
-        cmd1 = ["ncdump", "-h", nc_file]
-        cmd2 = ["grep", "long_name"]
-        cmd3 = ["wc", "-l"]
-        p1 = subprocess.Popen(cmd1, stdout=subprocess.PIPE, text=True)
-        p2 = subprocess.Popen(cmd2, stdin=p1.stdout, stdout=subprocess.PIPE, text=True)
-        p3 = subprocess.Popen(cmd3, stdin=p2.stdout, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
-        p2.stdout.close()
-        p1.stdout.close()
-        stdout, stderr = p3.communicate()
-
-        if stdout:
-            num_vars = int(stdout)
-            num_vars_per_file_list.append(num_vars)
-            num_vars_max = num_vars if num_vars > num_vars_max else num_vars_max
-        if stderr:
-            print("STDERR Output:")
-            print(stderr)
-
-    return nc_files[num_vars_per_file_list.index(num_vars_max)]
+    summaries = scan_nc_dir(base_dir, nc_dir)
+    return max(summaries, key=lambda nc_file: summaries[nc_file]['num_vars'])
 
 
 def sanitize(config_dictionary: dict, string: str) -> str:
@@ -1,7 +1,7 @@
 import pdb
 import copy
-import xarray as xr
 import json
+from collections import Counter
 from pathlib import Path
 import sys
 import os
@@ -10,88 +10,153 @@ import os
 base_dir = str(Path(__file__).parent.parent.parent.parent.resolve())
 sys.path.append(base_dir)
 import src.document_generator.utils.utils_general as utils_general
+import src.document_generator.utils.cdf_headers as cdf_headers
 
 
 
-def check_for_attributes(base_dir: str, config_dictionary: dict, required_ratio: float) -> None:
+# Attributes that xarray's CF decoding moves from a variable's attributes to its
+# encoding (and that are therefore absent from xr.open_dataset attribute lists):
+XARRAY_ENCODING_ATTRIBUTES = ('_FillValue', 'missing_value', 'scale_factor', 'add_offset', '_Unsigned', 'coordinates')
+XARRAY_TIME_ENCODING_ATTRIBUTES = ('units', 'calendar')
 
-    #var_types_to_consider = ['data_vars','coords']
-    var_types_to_consider = ['data_vars','coords', 'dims']
-    attr_string_buffer = 30
 
-    # Collect all global and variable attributes present in the granules downloaded by the user
-    all_granule_paths = [str(p) for p in (Path(base_dir) / config_dictionary["user_generated_granules_dir_relative"]).rglob('*.nc') if p.is_file()]
+def _decoded_attribute_names(record: dict) -> list:
+    """Attribute names of a header record, as presented by xarray after CF
+    decoding."""
+    hidden = set(XARRAY_ENCODING_ATTRIBUTES)
+    if ' since ' in record.get('units', ''):
+        hidden.update(XARRAY_TIME_ENCODING_ATTRIBUTES)
+    return [s.strip() for s in record['attrs'] if s not in hidden]
 
-    granules_attributes_dictionary = {}
-    granules_attributes_dictionary['global'] = {}
-    granules_attributes_dictionary['variable'] = {}
 
-    for granule_path in all_granule_paths:
-        dataset = xr.open_dataset(granule_path)
-        granules_attributes_dictionary['global'][dataset.attrs['product_name']] = [s.strip() for s in list(dataset.attrs.keys())]
+def granule_attributes_from_header(header: dict) -> tuple:
+    """
+    Classify a granule's attribute names as :func:`xarray.open_dataset` would,
+    from its header alone.
+
+    Variables that are dimensions, or that are listed in a ``coordinates``
+    attribute, are coordinates; all other variables are data variables.
+
+    :param header: Granule header record (see
+        :func:`cdf_headers.read_header`).
+    :type header: dict
+    :returns: ``(global_attributes, variable_attributes)`` tuple, where
+        ``global_attributes`` is a list of global attribute names and
+        ``variable_attributes`` maps each of ``'data_vars'``, ``'coords'`` and
+        ``'dims'`` to a variable name to attribute names mapping.
+    :rtype: tuple
+    """
+    variables = header['variables']
+    coord_names = set(header['dimensions'])
+    for record in [header] + list(variables.values()):
+        coord_names.update(record.get('coordinates', '').split())
+
+    global_attributes = _decoded_attribute_names(header)
+    variable_attributes = {'data_vars': {}, 'coords': {}, 'dims': {}}
+    for var, record in variables.items():
+        var_type = 'coords' if var in coord_names else 'data_vars'
+        variable_attributes[var_type][var] = _decoded_attribute_names(record)
+    for dim in header['dimensions']:
+        variable_attributes['dims'][dim] = _decoded_attribute_names(variables[dim]) if dim in variables else []
+    return global_attributes, variable_attributes
+
+
+def granule_header_index_file(base_dir: str, config_dictionary: dict) -> str:
+    """
+    Return the path to the granule header index file.
 
-        data_vars = {}
-        coords = {}
-        dims = {}
+    :param base_dir: Root directory of the project.
+    :type base_dir: str
+    :param config_dictionary: Configuration mapping. The index file is
+        ``'granule_header_index_file_relative'`` if given, otherwise
+        :data:`cdf_headers.HEADER_INDEX_FILENAME` in
+        ``'user_generated_granules_dir_relative'``.
+    :type config_dictionary: dict
+    :returns: Path to the index file.
+    :rtype: str
+    """
+    if config_dictionary.get("granule_header_index_file_relative"):
+        return os.path.join(base_dir, config_dictionary["granule_header_index_file_relative"])
+    return os.path.join(base_dir, config_dictionary["user_generated_granules_dir_relative"], cdf_headers.HEADER_INDEX_FILENAME)
 
-        for var in dataset.data_vars:
-            data_vars[var] = [s.strip() for s in list(dataset[var].attrs.keys())]
-            #variable_attributes_temp_dict[var] = [s.strip() for s in list(dataset[var].attrs.keys())]
-        for var in dataset.coords:
-            coords[var] = [s.strip() for s in list(dataset[var].attrs.keys())]
-            #variable_attributes_temp_dict[var] = [s.strip() for s in list(dataset[var].attrs.keys())]
-        for var in dataset.dims:
-            dims[var] = [s.strip() for s in list(dataset[var].attrs.keys())]
-            #variable_attributes_temp_dict[var] = [s.strip() for s in list(dataset[var].attrs.keys())]
 
-        temp_dict = {}
-        temp_dict['data_vars'] = data_vars
-        temp_dict['coords'] = coords
-        temp_dict['dims'] = dims
+def collect_granule_attributes(granule_paths: list, index_file: str = None, max_workers: int = None) -> dict:
+    """
+    Collect the global and variable attribute names of a collection of
+    granules, keyed by product name, from their headers only.
+
+    :param granule_paths: Paths to the granule files.
+    :type granule_paths: list[str]
+    :param index_file: Optional path to a header index file, used to avoid
+        re-reading unchanged granules (see :func:`cdf_headers.scan_headers`).
+    :type index_file: str
+    :param max_workers: Maximum number of header-reading processes.
+    :type max_workers: int
+    :returns: Dictionary with keys ``'global'`` (product name to global
+        attribute names) and ``'variable'`` (product name to
+        :func:`granule_attributes_from_header` variable attributes).
+    :rtype: dict
+    """
+    granules_attributes_dictionary = {'global': {}, 'variable': {}}
+    headers = cdf_headers.scan_headers(granule_paths, index_file=index_file, max_workers=max_workers)
+    for granule_path in granule_paths:
+        if granule_path not in headers:
+            continue
+        header = headers[granule_path]
+        global_attributes, variable_attributes = granule_attributes_from_header(header)
+        granules_attributes_dictionary['global'][header['product_name']] = global_attributes
+        granules_attributes_dictionary['variable'][header['product_name']] = variable_attributes
+    return granules_attributes_dictionary
+
+
+def compute_attribute_ratios(granules_attributes_dictionary: dict, num_granules: int) -> tuple:
+    """
+    Compute the fraction of granules (global attributes), and of variables of
+    each variable type (variable attributes), in which each attribute occurs.
+
+    :param granules_attributes_dictionary: As returned by
+        :func:`collect_granule_attributes`.
+    :type granules_attributes_dictionary: dict
+    :param num_granules: Number of granules, the global attribute denominator.
+    :type num_granules: int
+    :returns: ``(attribute_ratios_global, attribute_ratios_variable)`` tuple,
+        where ``attribute_ratios_variable`` is keyed by variable type.
+    :rtype: tuple
+    """
+    attribute_ratios_global = Counter()
+    for global_attributes_list in granules_attributes_dictionary['global'].values():
+        attribute_ratios_global.update(global_attributes_list)
 
-        granules_attributes_dictionary['variable'][dataset.attrs['product_name']] = temp_dict
-        #granules_attributes_dictionary['variable'][dataset.attrs['product_name']] = variable_attributes_temp_dict
+    attribute_ratios_variable = {var_type: Counter() for var_type in ('data_vars', 'coords', 'dims')}
+    num_variables = Counter()
+    for temp_dict in granules_attributes_dictionary['variable'].values():
+        for var_type, var_attributes in temp_dict.items():
+            num_variables[var_type] += len(var_attributes)
+            for attr_list in var_attributes.values():
+                attribute_ratios_variable[var_type].update(attr_list)
 
-    
+    attribute_ratios_global = {attr: count / num_granules for attr, count in attribute_ratios_global.items()}
+    attribute_ratios_variable = {
+        var_type: {attr: count / num_variables[var_type] for attr, count in counts.items()}
+        for var_type, counts in attribute_ratios_variable.items()}
+    return attribute_ratios_global, attribute_ratios_variable
 
-    # Determine which attributes are "common"
-    attribute_ratios_global = {}
-    attribute_ratios_variable = {}
-    attribute_ratios_variable['data_vars'] = {}
-    attribute_ratios_variable['coords'] = {}
-    attribute_ratios_variable['dims'] = {}
-    
-    num_granules = len(all_granule_paths)
-    num_variables = {}
-    num_variables['data_vars'] = 0 
-    num_variables['coords'] = 0 
-    num_variables['dims'] = 0 
 
+def check_for_attributes(base_dir: str, config_dictionary: dict, required_ratio: float, max_workers: int = None) -> None:
 
-    for global_attributes_list in granules_attributes_dictionary['global'].values():
-        for attr in global_attributes_list:
-            if attr not in attribute_ratios_global.keys():
-                attribute_ratios_global[attr] = 1 
-            else:
-                attribute_ratios_global[attr] += 1 
+    #var_types_to_consider = ['data_vars','coords']
+    var_types_to_consider = ['data_vars','coords', 'dims']
+    attr_string_buffer = 30
 
-    for temp_dict in granules_attributes_dictionary['variable'].values():
-        for var_type in temp_dict.keys():
-            for attr_list in temp_dict[var_type].values():
-                num_variables[var_type] += 1
-                for attr in attr_list:
-                    if attr not in attribute_ratios_variable[var_type].keys():
-                        attribute_ratios_variable[var_type][attr] = 1 
-                    else:
-                        attribute_ratios_variable[var_type][attr] += 1 
+    # Collect all global and variable attributes present in the granules downloaded by the user
+    all_granule_paths = [str(p) for p in (Path(base_dir) / config_dictionary["user_generated_granules_dir_relative"]).rglob('*.nc') if p.is_file()]
 
-    
-    for attr in attribute_ratios_global.keys():
-        attribute_ratios_global[attr] /= num_granules
+    granules_attributes_dictionary = collect_granule_attributes(
+        all_granule_paths, granule_header_index_file(base_dir, config_dictionary), max_workers)
 
-    for var_type in attribute_ratios_variable.keys():
-        for attr in attribute_ratios_variable[var_type].keys():
-            attribute_ratios_variable[var_type][attr] /= num_variables[var_type]
+    # Determine which attributes are "common"
+    attribute_ratios_global, attribute_ratios_variable = compute_attribute_ratios(
+        granules_attributes_dictionary, len(all_granule_paths))
 
 
     for attribute_type in ['global', 'variable']:
@@ -454,16 +519,13 @@ def write_attributes_tables_tex(base_dir: str, config_dictionary: dict) -> None:
     global_attributes_granules = set()
     non_global_attributes_granules = set()
 
-    for granule_path in all_granule_paths:
-        dataset = xr.open_dataset(granule_path)
-        #pdb.set_trace()
-        global_attributes_granules.update([el.lower() for el in list(dataset.attrs.keys())])
-        for var in dataset.data_vars:
-            non_global_attributes_granules.update([s.strip() for s in list(dataset[var].attrs.keys())])
-        for var in dataset.coords:
-            non_global_attributes_granules.update([s.strip() for s in list(dataset[var].attrs.keys())])
-        for var in dataset.dims:
-            non_global_attributes_granules.update([s.strip() for s in list(dataset[var].attrs.keys())])
+    headers = cdf_headers.scan_headers(all_granule_paths, index_file=granule_header_index_file(base_dir, config_dictionary))
+    for header in headers.values():
+        global_attributes, variable_attributes = granule_attributes_from_header(header)
+        global_attributes_granules.update([el.lower() for el in global_attributes])
+        for var_attributes in variable_attributes.values():
+            for attr_list in var_attributes.values():
+                non_global_attributes_granules.update(attr_list)
 
 
     required = ["latex_lines", "json_file", "tex_file"]
@@ -0,0 +1,104 @@
+import os
+
+import numpy as np
+import pytest
+import xarray as xr
+from PIL import Image
+
+from document_generator.utils import cdf_plotter
+
+CONFIG = {'thumbnail_path_modifier_string': '_thumb', 'thumbnail_size': 8}
+
+
+def make_dataset(seed=0):
+    """Native-grid dataset with a single 3-D variable, 'THETA'."""
+    rng = np.random.default_rng(seed)
+    return xr.Dataset(
+        {'THETA': (('time','k','tile','j','i'), rng.random((2,2,13,4,4)),
+            {'long_name': 'Potential temperature', 'units': 'degree_C'})},
+        coords={'time': np.array(['2000-01-16', '2000-02-15'], dtype='datetime64[ns]')},
+        attrs={'product_name': 'THETA_mon_mean_2000-01_ECCO_V4r4_native_llc0090.nc'})
+
+
+@pytest.fixture
+def renders(monkeypatch):
+    """Substitute a minimal PNG writer for the native plotting function, and
+    record the figures it renders."""
+    renders = []
+    def plot_native(dataset, field, figure_path, decimation=1):
+        renders.append((figure_path, decimation))
+        Image.new('RGB', (32, 32)).save(figure_path, format='PNG')
+    monkeypatch.setattr(cdf_plotter, 'plot_native', plot_native)
+    return renders
+
+
+def test_unchanged_figures_not_rerendered(tmp_path, renders):
+    """Test that a figure is rendered once for a given plotted slice and set
+    of rendering parameters, and re-rendered if any of these change, but not
+    if only data outside of the plotted slice changes."""
+    figure_path = str(tmp_path/'figures'/'THETA.png')
+    ds = make_dataset()
+    assert cdf_plotter.plot_if_changed(CONFIG, ds, ds['THETA'], figure_path)
+    assert os.path.isfile(cdf_plotter.get_thumbnail_path(CONFIG, figure_path))
+    assert not cdf_plotter.plot_if_changed(CONFIG, ds, ds['THETA'], figure_path)
+    assert len(renders) == 1
+
+    # data outside of the plotted (first time step, surface) slice:
+    ds['THETA'][1] = 0.
+    ds['THETA'][0,1] = 0.
+    assert not cdf_plotter.plot_if_changed(CONFIG, ds, ds['THETA'], figure_path)
+
+    # plotted slice, label, and decimation changes:
+    ds['THETA'][0,0,0,0,0] = -1.
+    assert cdf_plotter.plot_if_changed(CONFIG, ds, ds['THETA'], figure_path)
+    ds['THETA'].attrs['long_name'] = 'In situ temperature'
+    assert cdf_plotter.plot_if_changed(CONFIG, ds, ds['THETA'], figure_path)
+    config = dict(CONFIG, native_figure_decimation=2)
+    assert cdf_plotter.plot_if_changed(config, ds, ds['THETA'], figure_path)
+    assert not cdf_plotter.plot_if_changed(config, ds, ds['THETA'], figure_path)
+    assert renders == [(figure_path, 1)]*3 + [(figure_path, 2)]
+
+
+def test_content_hash():
+    """Test that figure content hashes depend on the plotted slice, labels and
+    rendering parameters only."""
+    ds = make_dataset()
+    content_hash = cdf_plotter.figure_content_hash(CONFIG, ds, ds['THETA'])
+    assert content_hash == cdf_plotter.figure_content_hash(CONFIG, make_dataset(), make_dataset()['THETA'])
+    assert content_hash != cdf_plotter.figure_content_hash(CONFIG, ds, make_dataset(seed=1)['THETA'])
+    assert content_hash != cdf_plotter.figure_content_hash(
+        dict(CONFIG, native_figure_decimation=2), ds, ds['THETA'])
+    ds['THETA'].attrs['units'] = 'K'
+    assert content_hash != cdf_plotter.figure_content_hash(CONFIG, ds, ds['THETA'])
+
+
+@pytest.mark.parametrize('missing', ['thumbnail', 'hash'])
+def test_missing_outputs_force_render(tmp_path, renders, missing):
+    """Test that a missing thumbnail or hash sidecar file forces a render,
+    even if the figure itself is up to date."""
+    figure_path = str(tmp_path/'THETA.png')
+    ds = make_dataset()
+    cdf_plotter.plot_if_changed(CONFIG, ds, ds['THETA'], figure_path)
+    os.remove({
+        'thumbnail': cdf_plotter.get_thumbnail_path(CONFIG, figure_path),
+        'hash': figure_path+cdf_plotter.FIGURE_HASH_SUFFIX}[missing])
+    assert cdf_plotter.plot_if_changed(CONFIG, ds, ds['THETA'], figure_path)
+    assert len(renders) == 2
+    assert not cdf_plotter.plot_if_changed(CONFIG, ds, ds['THETA'], figure_path)
+
+
+def test_render_figures_reports_failures(tmp_path, renders):
+    """Test that per-figure failures are counted and reported, without
+    aborting the rest of the batch."""
+    granule_path = str(tmp_path/'THETA.nc')
+    make_dataset().to_netcdf(granule_path)
+    figure_jobs = [
+        (granule_path, 'THETA', str(tmp_path/'a'/'THETA.png')),
+        (granule_path, 'SALT', str(tmp_path/'b'/'SALT.png')),
+        (str(tmp_path/'missing.nc'), 'THETA', str(tmp_path/'c'/'THETA.png')),
+        (granule_path, 'THETA', str(tmp_path/'d'/'THETA.png'))]
+    counts = cdf_plotter.render_figures(CONFIG, figure_jobs, max_workers=1)
+    assert counts == {'rendered': 2, 'unchanged': 0, 'failed': 2}
+    assert [path for path, decimation in renders] == [figure_jobs[0][2], figure_jobs[3][2]]
+    counts = cdf_plotter.render_figures(CONFIG, figure_jobs, max_workers=1)
+    assert counts == {'rendered': 0, 'unchanged': 2, 'failed': 2}
@@ -0,0 +1,205 @@
+import http.server
+import os
+import threading
+
+import netCDF4
+import pytest
+import requests
+
+from document_generator.utils import utils_general
+
+def make_nc_file(path, num_vars, num_unnamed=1):
+    """NetCDF file with num_vars variables carrying a long_name attribute, and
+    num_unnamed variables that do not."""
+    with netCDF4.Dataset(path, 'w') as ds:
+        ds.createDimension('i', 2)
+        for n in range(num_vars + num_unnamed):
+            var = ds.createVariable(f'VAR{n}', 'f4', ('i',))
+            if n < num_vars:
+                var.long_name = f'variable {n}'
+
+
+CONTENT = {f'/granule_{i}.nc': os.urandom(50000 + i) for i in range(3)}
+
+
+class GranuleHandler(http.server.BaseHTTPRequestHandler):
+    """Serves CONTENT, with optional HTTP Range support, and optionally
+    truncating responses (see GranuleServer)."""
+
+    def do_GET(self):
+        server = self.server
+        content = CONTENT[self.path]
+        with server.lock:
+            server.requests.append((self.path, self.headers.get('Range')))
+            truncate = server.truncate.get(self.path, 0)
+            if truncate and server.truncate_count:
+                server.truncate[self.path] = truncate if server.truncate_count < 0 else 0
+        start = 0
+        if self.headers.get('Range') and server.honor_range:
+            start = int(self.headers['Range'].split('=')[1].rstrip('-'))
+            if start >= len(content):
+                self.send_response(416)
+                self.send_header('Content-Range', f'bytes */{len(content)}')
+                self.end_headers()
+                return
+            self.send_response(206)
+            self.send_header('Content-Range', f'bytes {start}-{len(content)-1}/{len(content)}')
+        else:
+            self.send_response(200)
+        body = content[start:]
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        # (a truncated body, followed by connection close, as if interrupted)
+        self.wfile.write(body[:truncate] if truncate else body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class GranuleServer(http.server.ThreadingHTTPServer):
+    """Local HTTP server stand-in for granule downloads.
+
+    Attributes:
+        honor_range: If False, Range headers are ignored.
+        truncate: Number of body bytes sent, per path (all if absent).
+        truncate_count: 1 to truncate only the first response per path, -1 to
+            truncate all responses.
+        requests: (path, Range header) of all requests received.
+    """
+
+    def __init__(self, honor_range=True, truncate=None, truncate_count=1):
+        super().__init__(('127.0.0.1', 0), GranuleHandler)
+        self.honor_range = honor_range
+        self.truncate = dict(truncate or {})
+        self.truncate_count = truncate_count
+        self.requests = []
+        self.lock = threading.Lock()
+
+    def url(self, path):
+        return f'http://127.0.0.1:{self.server_address[1]}{path}'
+
+
+@pytest.fixture
+def serve(monkeypatch):
+    """Start a GranuleServer (without download retry delays)."""
+    monkeypatch.setattr(utils_general.time, 'sleep', lambda seconds: None)
+    servers = []
+    def serve(**kwargs):
+        server = GranuleServer(**kwargs)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        servers.append(server)
+        return server
+    yield serve
+    for server in servers:
+        server.shutdown()
+        server.server_close()
+
+
+def test_interrupted_downloads_resume(tmp_path, serve, monkeypatch):
+    """Test that interrupted downloads are resumed from where they left off
+    (i.e., from the last complete chunk), and that the resumed files are
+    identical to the originals."""
+    monkeypatch.setattr(utils_general, 'DOWNLOAD_CHUNK_SIZE', 4096)
+    server = serve(truncate={path: 3*4096 for path in CONTENT})
+    downloads = [(server.url(path), str(tmp_path/'granules'/path[1:])) for path in CONTENT]
+    counts = utils_general.download_files(downloads, max_workers=3)
+    assert counts == {'downloaded': 3, 'failed': 0, 'bytes': sum(map(len, CONTENT.values()))}
+    for path, content in CONTENT.items():
+        assert (tmp_path/'granules'/path[1:]).read_bytes() == content
+        assert [r for p, r in server.requests if p == path] == [None, f'bytes={3*4096}-']
+    assert not list((tmp_path/'granules').glob('*'+utils_general.DOWNLOAD_PARTIAL_SUFFIX))
+
+
+def test_complete_partial_download(tmp_path, serve):
+    """Test that a complete partial file (416 response to its range request)
+    is published without transferring any data."""
+    server = serve()
+    path, content = '/granule_0.nc', CONTENT['/granule_0.nc']
+    local_filename = str(tmp_path/'granule_0.nc')
+    with open(local_filename+utils_general.DOWNLOAD_PARTIAL_SUFFIX, 'wb') as f:
+        f.write(content)
+    with requests.Session() as session:
+        assert utils_general.download_file(session, server.url(path), local_filename) == 0
+    assert server.requests == [(path, f'bytes={len(content)}-')]
+    with open(local_filename, 'rb') as f:
+        assert f.read() == content
+
+
+def test_range_ignored(tmp_path, serve):
+    """Test that a partial file is replaced, rather than appended to, if the
+    server ignores range requests."""
+    server = serve(honor_range=False)
+    path, content = '/granule_1.nc', CONTENT['/granule_1.nc']
+    local_filename = str(tmp_path/'granule_1.nc')
+    with open(local_filename+utils_general.DOWNLOAD_PARTIAL_SUFFIX, 'wb') as f:
+        f.write(b'x'*100)
+    with requests.Session() as session:
+        assert utils_general.download_file(session, server.url(path), local_filename) == len(content)
+    assert server.requests == [(path, 'bytes=100-')]
+    with open(local_filename, 'rb') as f:
+        assert f.read() == content
+
+
+def test_short_responses_fail_after_retries(tmp_path, serve):
+    """Test that persistently short responses raise once retries have been
+    exhausted, without publishing the incomplete file."""
+    server = serve(honor_range=False, truncate={'/granule_2.nc': 1000}, truncate_count=-1)
+    local_filename = str(tmp_path/'granule_2.nc')
+    with requests.Session() as session, \
+        pytest.raises((IOError, requests.exceptions.RequestException)):
+        utils_general.download_file(session, server.url('/granule_2.nc'), local_filename, retries=2)
+    assert len(server.requests) == 3
+    assert not os.path.exists(local_filename)
+
+    counts = utils_general.download_files(
+        [(server.url('/granule_2.nc'), local_filename)], retries=1)
+    assert (counts['downloaded'], counts['failed']) == (0, 1)
+    assert not os.path.exists(local_filename)
+
+
+@pytest.fixture
+def nc_dir(tmp_path):
+    """Directory of NetCDF files with 2, 1 and 3 (long_name) variables, and an
+    unreadable file."""
+    nc_dir = tmp_path/'granules'
+    nc_dir.mkdir()
+    for name, num_vars in (('b.nc', 2), ('a.nc', 1), ('c.nc', 3)):
+        make_nc_file(str(nc_dir/name), num_vars)
+    (nc_dir/'corrupt.nc').write_bytes(b'not a NetCDF file')
+    return nc_dir
+
+
+def test_min_max_num_vars(tmp_path, nc_dir):
+    """Test the selection of the files with the fewest and most variables
+    carrying a long_name attribute, skipping unreadable files."""
+    summaries = utils_general.scan_nc_dir(str(tmp_path), 'granules')
+    assert {os.path.basename(path): summary['num_vars'] for path, summary in summaries.items()} == \
+        {'a.nc': 1, 'b.nc': 2, 'c.nc': 3}
+    assert all(summary['num_variables'] == summary['num_vars']+1 for summary in summaries.values())
+    assert utils_general.get_a_file_with_min_num_vars(str(tmp_path), 'granules') == str(nc_dir/'a.nc')
+    assert utils_general.get_a_file_with_max_num_vars(str(tmp_path), 'granules') == str(nc_dir/'c.nc')
+
+
+def test_scan_index_reused_for_unchanged_files(tmp_path, nc_dir, monkeypatch):
+    """Test that repeated directory scans reuse the header index, re-reading
+    only new or modified files."""
+    summaries = utils_general.scan_nc_dir(str(tmp_path), 'granules', max_workers=1)
+    assert (nc_dir/utils_general.cdf_headers.HEADER_INDEX_FILENAME).is_file()
+
+    read = []
+    read_header = utils_general.cdf_headers.read_header
+    monkeypatch.setattr(utils_general.cdf_headers, 'read_header',
+        lambda path: read.append(os.path.basename(path)) or read_header(path))
+    assert utils_general.scan_nc_dir(str(tmp_path), 'granules', max_workers=1) == summaries
+    # (unreadable files are not indexed, and are retried:)
+    assert read == ['corrupt.nc']
+
+    read.clear()
+    make_nc_file(str(nc_dir/'a.nc'), 4)
+    os.utime(nc_dir/'a.nc', ns=(0, 0))
+    make_nc_file(str(nc_dir/'d.nc'), 0)
+    summaries = utils_general.scan_nc_dir(str(tmp_path), 'granules', max_workers=1)
+    assert sorted(read) == ['a.nc', 'corrupt.nc', 'd.nc']
+    assert summaries[str(nc_dir/'a.nc')]['num_vars'] == 4
+    assert utils_general.get_a_file_with_max_num_vars(str(tmp_path), 'granules') == str(nc_dir/'a.nc')
+    assert utils_general.get_a_file_with_min_num_vars(str(tmp_path), 'granules') == str(nc_dir/'d.nc')
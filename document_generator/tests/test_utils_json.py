@@ -0,0 +1,111 @@
+import os
+
+import netCDF4
+import numpy as np
+import pytest
+import xarray as xr
+
+from document_generator.utils import cdf_headers
+from document_generator.utils import utils_json
+
+
+def make_granule(path, product_name='THETA_mon_mean_2000-01_ECCO_V4r4_native_llc0090.nc'):
+    """Small granule with CF-encoded time and data variables, and variable and
+    global coordinates attributes."""
+    with netCDF4.Dataset(path, 'w') as ds:
+        ds.title = 'ECCO Ocean Temperature'
+        ds.product_name = product_name
+        ds.coordinates = 'time_bnds'
+        for name, size in (('time', 2), ('nv', 2), ('j', 3), ('i', 4)):
+            ds.createDimension(name, size)
+        time = ds.createVariable('time', 'f8', ('time',))
+        time.setncatts({'long_name': 'center time', 'units': 'days since 2000-01-01', 'calendar': 'gregorian'})
+        time[:] = [15.5, 45.]
+        time_bnds = ds.createVariable('time_bnds', 'f8', ('time','nv'))
+        time_bnds.comment = 'time bounds'
+        time_bnds[:] = [[0., 31.], [31., 60.]]
+        i = ds.createVariable('i', 'i4', ('i',))
+        i.long_name = 'grid index in x'
+        i[:] = np.arange(4)
+        for name in ('XC', 'YC'):
+            coord = ds.createVariable(name, 'f4', ('j','i'))
+            coord.setncatts({'long_name': name, 'units': 'degrees'})
+            coord[:] = np.ones((3,4))
+        theta = ds.createVariable('THETA', 'i2', ('time','j','i'), fill_value=np.int16(-9999))
+        theta.setncatts({'missing_value': np.int16(-9999), 'scale_factor': 0.01,
+            'add_offset': 10., 'long_name': 'Potential temperature', 'units': 'degree_C',
+            'coordinates': 'XC YC'})
+        theta[:] = np.ones((2,3,4))
+
+
+def xarray_attributes(path):
+    """(global_attributes, variable_attributes) as given by xr.open_dataset."""
+    with xr.open_dataset(path) as ds:
+        return list(ds.attrs), {
+            'data_vars': {var: list(ds[var].attrs) for var in ds.data_vars},
+            'coords': {var: list(ds[var].attrs) for var in ds.coords},
+            'dims': {dim: list(ds[dim].attrs) if dim in ds.variables else [] for dim in ds.dims}}
+
+
+def test_header_attributes_match_xarray(tmp_path):
+    """Test that attribute names classified from headers alone match those
+    presented by xr.open_dataset after CF decoding."""
+    path = str(tmp_path/'granule.nc')
+    make_granule(path)
+    header = cdf_headers.read_header(path)
+    global_attributes, variable_attributes = utils_json.granule_attributes_from_header(header)
+    expected_global, expected_variable = xarray_attributes(path)
+    assert global_attributes == expected_global
+    assert variable_attributes.keys() == expected_variable.keys()
+    for var_type, expected in expected_variable.items():
+        assert variable_attributes[var_type] == expected, var_type
+    # (sanity check of the encoding attributes that are hidden:)
+    assert variable_attributes['data_vars']['THETA'] == ['long_name', 'units']
+    assert variable_attributes['coords']['time'] == ['long_name']
+    assert set(variable_attributes['coords']) == {'time', 'time_bnds', 'i', 'XC', 'YC'}
+
+
+def test_compute_attribute_ratios():
+    """Test attribute ratios, per granule (global) and per variable of each
+    type (variable)."""
+    granules_attributes_dictionary = {
+        'global': {'a.nc': ['title', 'summary'], 'b.nc': ['title']},
+        'variable': {
+            'a.nc': {
+                'data_vars': {'X': ['units', 'long_name'], 'Y': ['units']},
+                'coords': {'XC': ['long_name']},
+                'dims': {'i': []}},
+            'b.nc': {
+                'data_vars': {'X': ['units']},
+                'coords': {'XC': ['long_name']},
+                'dims': {'i': ['long_name']}}}}
+    attribute_ratios_global, attribute_ratios_variable = utils_json.compute_attribute_ratios(
+        granules_attributes_dictionary, 2)
+    assert attribute_ratios_global == {'title': 1., 'summary': .5}
+    assert attribute_ratios_variable['data_vars'] == pytest.approx({'units': 1., 'long_name': 1/3})
+    assert attribute_ratios_variable['coords'] == {'long_name': 1.}
+    assert attribute_ratios_variable['dims'] == {'long_name': .5}
+
+
+def test_header_index_reused_for_unchanged_files(tmp_path, monkeypatch):
+    """Test that indexed headers are reused for unchanged files, and re-read
+    only for changed files."""
+    paths = [str(tmp_path/f'granule_{n}.nc') for n in range(3)]
+    for path in paths:
+        make_granule(path)
+    index_file = str(tmp_path/'index'/cdf_headers.HEADER_INDEX_FILENAME)
+    headers = cdf_headers.scan_headers(paths, index_file=index_file, max_workers=1)
+    assert os.path.isfile(index_file)
+
+    read = []
+    read_header = cdf_headers.read_header
+    monkeypatch.setattr(cdf_headers, 'read_header', lambda path: read.append(path) or read_header(path))
+    assert cdf_headers.scan_headers(paths, index_file=index_file, max_workers=1) == headers
+    assert not read
+
+    make_granule(paths[1], product_name='SALT_mon_mean_2000-01_ECCO_V4r4_native_llc0090.nc')
+    os.utime(paths[1], ns=(0, 0))
+    rescanned = cdf_headers.scan_headers(paths, index_file=index_file, max_workers=1)
+    assert read == [os.path.abspath(paths[1])]
+    assert rescanned[paths[1]]['product_name'].startswith('SALT')
+    assert [rescanned[path] for path in (paths[0], paths[2])] == [headers[path] for path in (paths[0], paths[2])]
@@ -66,10 +66,17 @@ through the pipeline:
 from . import apps
 from . import aws
 from . import ecco_dataset
+from . import ecco_factors_manifest
 from . import ecco_file
+from . import ecco_granule_cache
 from . import ecco_grid
+from . import ecco_inventory
 from . import ecco_mapping_factors
 from . import ecco_metadata
+from . import ecco_pipeline
 from . import ecco_podaac_metadata
+from . import ecco_shared_store
 from . import ecco_task
+from . import ecco_tasklist
 from . import ecco_time
+from . import ecco_work_queue
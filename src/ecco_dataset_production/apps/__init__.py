@@ -14,7 +14,11 @@ Example command-line usage::
 """
 #from . import aws_s3_sync
 #from . import create_factors
+from . import create_grid_geometry
 from . import create_job_files
 from . import create_job_task_list
+from . import find_missing_granules
 from . import generate_datasets
+from . import partition_tasklists
 from . import subset_tasklists
+from . import work_queue
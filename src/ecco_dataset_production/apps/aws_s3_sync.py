@@ -42,7 +42,8 @@ def create_parser():
     parser.add_argument('--dest', default='.', help="""
         Destination location (local path or AWS S3 URI) (default: "%(default)s")""")
     parser.add_argument('--nproc', type=int, default=1, help="""
-        Maximum number of local-remote sync processes (default: %(default)s)""")
+        Maximum number of concurrent local-remote file uploads (default:
+        %(default)s)""")
     parser.add_argument('--keygen', help="""
         If running in an institutionally-managed AWS IAM Identity Center (SSO)
         environment, federated login key generation script (e.g.,
@@ -66,7 +67,9 @@ def main():
     parser = create_parser()
     args = parser.parse_args()
 
-    ecco_aws_s3_sync.aws_s3_sync( src=args.src, dest=args.dest,
+    stats = ecco_aws_s3_sync.aws_s3_sync( src=args.src, dest=args.dest,
         nproc=args.nproc, dryrun=args.dryrun, log_level=args.log_level,
         keygen=args.keygen, profile=args.profile)
+    if stats and stats['failed']:
+        sys.exit(f"{stats['failed']} uploads failed")
 
@@ -9,6 +9,7 @@ import logging
 import sys
 
 from ..config import ECCODatasetProductionConfig
+from .. import ecco_factors_manifest
 from .. import utils
 #import ecco_production.configuration
 #import ecco_production.utils
@@ -39,6 +40,12 @@ def create_parser():
     parser.add_argument('dims', nargs='+', default=['2', '3'], help="""
         Dimension(s) of mapping factors to be generated, e.g., --dims 2 3 if
         both two- and three-dimensional mapping factors are to be created.""")
+    parser.add_argument('--check', action='store_true', help="""
+        Rather than creating mapping factors, verify existing mapping factors
+        against their build manifest (presence, checksums, and consistency
+        with the current input grid and configuration), list any missing,
+        modified, corrupt, or stale files, and exit with nonzero status if
+        any are found.""")
     parser.add_argument('-l','--log', dest='log_level',
         choices=['DEBUG','INFO','WARNING','ERROR','CRITICAL'],
         default='WARNING', help="""
@@ -52,12 +59,14 @@ def create_parser():
         Additionally, configuration fields starting with 'latlon' are referenced
         if lon/lat-based mapping factors are to be generated, while
         'custom_grid_and_factors' is used if custom target grid mappings are to
-        instead be generated."""
+        instead be generated. Only mapping factors files that are missing, or
+        out of date with respect to the input grid, configuration, or the
+        files they are derived from, are (re)created."""
 
     return parser
 
 
-def create_factors(cfg, workingdir=None, dims=None, log_level=None):
+def create_factors(cfg, workingdir=None, dims=None, log_level=None, check=False):
     """Convenience wrapper for call to
     ecco_production.utils.mapping_factors_utils.create_all_factors.
 
@@ -70,10 +79,14 @@ def create_factors(cfg, workingdir=None, dims=None, log_level=None):
             mapping).
         log_level (str): log_level choices per Python logging module
             ('DEBUG','INFO','WARNING','ERROR' or 'CRITICAL'; default='WARNING').
+        check (bool): If True, verify existing mapping factors against their
+            build manifest rather than creating them.
 
     Returns:
         Indirectly, 2- and/or 3-D grid mapping factors in directory defined by
-        configuration variables ['mapping_factors_dir']/['ecco_version'].
+        configuration variables ['mapping_factors_dir']/['ecco_version']. If
+        check is True, dictionary of problem descriptions by mapping factors
+        file name (see ecco_factors_manifest.check_factors).
 
     Note:
         Configuration parameters referenced by this, and all called routines,
@@ -99,6 +112,8 @@ def create_factors(cfg, workingdir=None, dims=None, log_level=None):
         errstr = f'{sys._getframe().f_code.co_name} "dims" input error'
         log.exception('%s', errstr)
 
+    if check:
+        return ecco_factors_manifest.check_factors(cfg, dims)
     utils.mapping_factors_utils.create_all_factors(cfg, dims)
 
 
@@ -112,5 +127,10 @@ def main():
     # Load configuration from parsed args
     cfg = ECCODatasetProductionConfig.from_parsed_args(args)
 
-    create_factors(cfg, args.workingdir, args.dims, args.log_level)
+    problems = create_factors(cfg, args.workingdir, args.dims, args.log_level, args.check)
+    if args.check:
+        for name,problem in problems.items():
+            print(f'{name}: {problem}')
+        print(f'{len(problems)} problem(s) found in {cfg["mapping_factors_dir"]}')
+        sys.exit(1 if problems else 0)
     
@@ -0,0 +1,313 @@
+#!/usr/bin/env python3
+"""
+CLI tool for creating the ECCO latlon GRID_GEOMETRY auxiliary file from the
+native grid geometry file and the latlon mapping factors.
+
+Rather than re-deriving pyresample grid mappings and remapping each field and
+level separately, the precomputed native to latlon sparse mapping factors (see
+edp_create_factors) are reused: at each depth level, all geometry fields
+defined at that level are mapped to the latlon grid with one sparse matrix
+product, using the same fused regrid operators as granule generation (see
+ecco_dataset.regrid_level), with levels processed concurrently. Grid cell
+bounds and areas are computed with array operations, and the result is written
+with compressed, per-level chunked NetCDF4 encodings.
+"""
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+import logging
+import os
+
+import netCDF4
+import numpy as np
+import xarray as xr
+
+from .. import ecco_dataset
+from .. import ecco_grid
+from .. import ecco_mapping_factors
+
+logging.basicConfig(
+    format='%(levelname)-10s %(funcName)s %(asctime)s %(message)s')
+log = logging.getLogger('edp')
+
+# native grid fields remapped to the latlon grid, and whether each is
+# three-dimensional (k,tile,j,i) or two-dimensional (tile,j,i):
+GRID_GEOMETRY_FIELDS = {'hFacC':True, 'Depth':False}
+
+# WGS84 ellipsoid semi-major axis (m) and first eccentricity, for cell areas:
+WGS84_A = 6378137.
+WGS84_E = 0.0818191908426215
+
+DEFAULT_COMPLEVEL = 5
+
+
+def create_parser():
+    """Set up command-line arguments for create_grid_geometry.
+
+    Returns:
+        argparser.ArgumentParser instance.
+    """
+    parser = argparse.ArgumentParser(
+        description="""Create the latlon GRID_GEOMETRY auxiliary file by
+            remapping native grid geometry fields using precomputed mapping
+            factors.""")
+
+    parser.add_argument('--grid_loc', required=True, help="""
+        ECCO grid directory containing the native (*native*.nc) grid geometry
+        file, or AWS S3 bucket/prefix.""")
+
+    parser.add_argument('--mapping_factors_loc', required=True, help="""
+        ECCO mapping factors directory (see edp_create_factors), or AWS S3
+        bucket/prefix.""")
+
+    parser.add_argument('--output', required=True, help="""
+        Output (path and) file name, e.g.,
+        GRID_GEOMETRY_ECCO_V4r5_latlon_0p50deg.nc""")
+
+    parser.add_argument('--array_precision', choices=['float32', 'float64'],
+        default='float32', help="""
+        Remapped field precision (default: %(default)s).""")
+
+    parser.add_argument('--num_workers', type=int, help="""
+        Number of depth levels remapped concurrently (default: number of
+        CPUs).""")
+
+    parser.add_argument('--complevel', type=int, default=DEFAULT_COMPLEVEL,
+        help="""
+        NetCDF4 zlib compression level (default: %(default)s).""")
+
+    parser.add_argument('--keygen', help="""
+        If grid or mapping factors locations reference AWS S3 endpoints and if
+        running in an institutionally-managed AWS IAM Identity Center (SSO)
+        environment, (path and) name of federated login key generation script
+        (e.g., /usr/local/bin/aws-login.darwin.universal, etc.)""")
+
+    parser.add_argument('--profile', help="""
+        Optional profile name to be used in combination with keygen (e.g.,
+        'saml-pub', 'default', etc.)""")
+
+    parser.add_argument('-l', '--log', dest='log_level',
+        choices=['DEBUG', 'INFO', 'WARNING', 'ERROR', 'CRITICAL'],
+        default='INFO', help="""
+        Set logging level (default: %(default)s).""")
+
+    return parser
+
+
+def _authalic_q( lat):
+    """Authalic latitude function q(lat) of the WGS84 ellipsoid (lat in
+    degrees), such that the area between the equator and lat, per radian of
+    longitude, is WGS84_A**2*q(lat)/2.
+
+    """
+    sin_lat = np.sin(np.radians(lat))
+    e_sin_lat = WGS84_E*sin_lat
+    return (1.-WGS84_E**2) * (sin_lat/(1.-e_sin_lat**2)
+        - np.log((1.-e_sin_lat)/(1.+e_sin_lat))/(2.*WGS84_E))
+
+
+def latlon_cell_area( latitude_bounds, longitude_bounds):
+    """Areas of latlon grid cells on the WGS84 ellipsoid.
+
+    Args:
+        latitude_bounds ((nlat,2) numpy.ndarray): Latitude bounds, degrees.
+        longitude_bounds ((nlon,2) numpy.ndarray): Longitude bounds, degrees.
+
+    Returns:
+        (nlat,nlon) numpy.ndarray of cell areas, in m^2.
+
+    """
+    band = WGS84_A**2/2. * np.abs(
+        _authalic_q(latitude_bounds[:,1]) - _authalic_q(latitude_bounds[:,0]))
+    width = np.radians(np.abs(longitude_bounds[:,1] - longitude_bounds[:,0]))
+    return np.outer(band, width)
+
+
+def remap_to_latlon( fields, grid, mapping_factors, dtype=np.float64, max_workers=None):
+    """Map native grid fields to the latlon grid, one sparse matrix product per
+    depth level for all fields defined at that level (see
+    ecco_dataset.regrid_level).
+
+    Args:
+        fields (dict): Native grid field name keyed dictionary of
+            (numpy.ndarray, is_3d) tuples, where arrays are (k,tile,j,i) if
+            is_3d, (tile,j,i) otherwise.
+        grid (ECCOGrid): Native grid (for wet point indices).
+        mapping_factors (ECCOMappingFactors): Native to latlon mapping factors
+            and regrid operators.
+        dtype (numpy.dtype): Result precision.
+        max_workers (int): Maximum number of levels remapped concurrently
+            (default: number of CPUs).
+
+    Returns:
+        Field name keyed dictionary of latlon arrays, (k,nlat,nlon) if is_3d,
+        (nlat,nlon) otherwise, with land points set to NaN.
+
+    """
+    nlat = mapping_factors.latitude_bounds.shape[0]
+    nlon = mapping_factors.longitude_bounds.shape[0]
+    nz = max((data.shape[0] for data,is_3d in fields.values() if is_3d), default=1)
+    remapped = {name: np.empty((nz,nlat,nlon) if is_3d else (nlat,nlon), dtype=dtype)
+        for name,(data,is_3d) in fields.items()}
+
+    def remap_level(z):
+        names = [name for name,(_,is_3d) in fields.items() if is_3d or z==0]
+        out = np.full((len(names),nlat*nlon), np.nan, dtype=dtype)
+        ecco_dataset.regrid_level(
+            [fields[name][0][z] if fields[name][1] else fields[name][0] for name in names],
+            z, grid, mapping_factors, out=out, dtype=dtype)
+        for name,result in zip(names,out):
+            if fields[name][1]:
+                remapped[name][z] = result.reshape(nlat,nlon)
+            else:
+                remapped[name][:] = result.reshape(nlat,nlon)
+        log.debug('level %d remapped (%s)', z, ', '.join(names))
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        list(executor.map(remap_level, range(nz)))
+    return remapped
+
+
+def latlon_grid_geometry( grid, mapping_factors, dtype=np.float32, max_workers=None):
+    """Create the latlon grid geometry dataset.
+
+    Args:
+        grid (ECCOGrid): Native grid.
+        mapping_factors (ECCOMappingFactors): Native to latlon mapping factors.
+        dtype (numpy.dtype): Remapped field precision.
+        max_workers (int): Maximum number of levels remapped concurrently.
+
+    Returns:
+        xarray.Dataset with data variables hFacC, Depth, area, drF, and maskC,
+        and coordinates Z, latitude, longitude, and their bounds. Variable and
+        global attributes are carried over from the native grid.
+
+    """
+    native = grid.native_grid
+    fields = {name: (np.asarray(native[name]), is_3d)
+        for name,is_3d in GRID_GEOMETRY_FIELDS.items()}
+    remapped = remap_to_latlon(fields, grid, mapping_factors, dtype, max_workers)
+
+    latitude_bounds = np.asarray(mapping_factors.latitude_bounds)
+    longitude_bounds = np.asarray(mapping_factors.longitude_bounds)
+    z = native['Z'].values
+
+    ds = xr.Dataset(
+        data_vars={
+            'hFacC': (('Z','latitude','longitude'), remapped['hFacC']),
+            'Depth': (('latitude','longitude'), remapped['Depth']),
+            'area': (('latitude','longitude'),
+                latlon_cell_area(latitude_bounds,longitude_bounds).astype(dtype)),
+            'drF': (('Z',), native['drF'].values),
+            'maskC': (('Z','latitude','longitude'), remapped['hFacC']>0)},
+        coords={
+            'Z': ('Z', z),
+            'latitude': ('latitude', latitude_bounds.mean(axis=1)),
+            'longitude': ('longitude', longitude_bounds.mean(axis=1)),
+            'Z_bnds': (('Z','nv'), np.asarray(native['Z_bnds'])),
+            'latitude_bnds': (('latitude','nv'), latitude_bounds),
+            'longitude_bnds': (('longitude','nv'), longitude_bounds)},
+        attrs=dict(native.attrs))
+    for name in ('hFacC','Depth','drF','maskC','Z','Z_bnds'):
+        if name in native.variables:
+            ds[name].attrs = {k:v for k,v in native[name].attrs.items() if k!='coordinates'}
+    return ds
+
+
+def grid_geometry_encoding( ds, complevel=DEFAULT_COMPLEVEL):
+    """NetCDF4 encoding for the latlon grid geometry dataset: compressed data
+    variables, chunked by depth level so that single levels may be read
+    without decompressing the full field, and uncompressed float32 (or int32)
+    coordinates without fill values.
+
+    Args:
+        ds (xarray.Dataset): Latlon grid geometry dataset.
+        complevel (int): zlib compression level.
+
+    Returns:
+        to_netcdf encoding dictionary.
+
+    """
+    encoding = {}
+    for name,var in ds.data_vars.items():
+        encoding[name] = {'zlib':True, 'complevel':complevel, 'shuffle':True}
+        if 'latitude' in var.dims:
+            encoding[name]['chunksizes'] = tuple(
+                1 if dim=='Z' else size for dim,size in var.sizes.items())
+        if var.dtype == bool:
+            encoding[name].update({'dtype':'int8', '_FillValue':None})
+        else:
+            encoding[name]['_FillValue'] = netCDF4.default_fillvals[
+                'f4' if var.dtype==np.float32 else 'f8']
+        var.encoding['coordinates'] = ' '.join(
+            c for c in ('Z','latitude','longitude') if c in var.dims)
+    for name,coord in ds.coords.items():
+        encoding[name] = {'_FillValue':None, 'dtype':
+            'int32' if np.issubdtype(coord.dtype,np.integer) else 'float32'}
+    return encoding
+
+
+def create_grid_geometry(
+    grid_loc=None,
+    mapping_factors_loc=None,
+    output=None,
+    array_precision='float32',
+    num_workers=None,
+    complevel=DEFAULT_COMPLEVEL,
+    log_level='INFO',
+    **kwargs):
+    """Create the latlon GRID_GEOMETRY auxiliary file.
+
+    Args:
+        grid_loc (str): ECCO grid directory, or AWS S3 bucket/prefix.
+        mapping_factors_loc (str): ECCO mapping factors directory, or AWS S3
+            bucket/prefix.
+        output (str): Output (path and) file name.
+        array_precision (str): Remapped field precision, 'float32' or
+            'float64'.
+        num_workers (int): Number of depth levels remapped concurrently.
+        complevel (int): zlib compression level.
+        log_level (str): Logging level.
+        **kwargs: Passed to ECCOGrid and ECCOMappingFactors (e.g., keygen,
+            profile).
+
+    Returns:
+        Latlon grid geometry xarray.Dataset, as written to output.
+
+    """
+    log.setLevel(log_level)
+
+    grid = ecco_grid.ECCOGrid(grid_loc=grid_loc, eager=True, **kwargs)
+    mapping_factors = ecco_mapping_factors.ECCOMappingFactors(
+        mapping_factors_loc=mapping_factors_loc, **kwargs)
+    ds = latlon_grid_geometry(grid, mapping_factors,
+        dtype=ecco_dataset.compute_dtype({'array_precision':array_precision}),
+        max_workers=num_workers)
+    ds.attrs['product_name'] = os.path.basename(output)
+
+    if os.path.dirname(output):
+        os.makedirs(os.path.dirname(output), exist_ok=True)
+    ds.to_netcdf(output, encoding=grid_geometry_encoding(ds, complevel))
+    log.info('wrote %s', output)
+    return ds
+
+
+def main():
+    """Main entry point for CLI."""
+    parser = create_parser()
+    args = parser.parse_args()
+
+    create_grid_geometry(
+        grid_loc=args.grid_loc,
+        mapping_factors_loc=args.mapping_factors_loc,
+        output=args.output,
+        array_precision=args.array_precision,
+        num_workers=args.num_workers,
+        complevel=args.complevel,
+        log_level=args.log_level,
+        keygen=args.keygen,
+        profile=args.profile
+    )
+
+
+if __name__ == '__main__':
+    main()
@@ -5,11 +5,9 @@ import ast
 import boto3
 import collections
 import importlib.resources
-import json
 import logging
 import numpy as np
 import os
-import pandas as pd
 import re
 import subprocess
 import sys
@@ -19,6 +17,7 @@ from .. import aws
 from ..config import ECCODatasetProductionConfig
 from .. import ecco_file
 from .. import ecco_metadata
+from .. import ecco_tasklist
 from .. import ecco_time
 
 
@@ -53,7 +52,13 @@ def create_parser():
         ECCO Dataset Production output root location, either directory path
         (e.g., ECCOV4r5_datasets) or AWS S3 bucket (s3://bucket_name).""")
     parser.add_argument('--outfile', help="""
-        Resulting job task output file (json format) (default: stdout).""")
+        Resulting job task output file (default: stdout).""")
+    parser.add_argument('--outfile_format', choices=ecco_tasklist.TASKLIST_FORMATS,
+        help="""
+        Output tasklist format: 'json' (array of complete task descriptors) or
+        'jsonl' (compact JSON lines, with fields shared by consecutive tasks
+        written once). Default: 'jsonl' if outfile has a '.jsonl' extension,
+        otherwise 'json'.""")
     parser.add_argument('--keygen', help="""
         If ecco_source_root references an S3 bucket and if running in an
         institutionally-managed AWS IAM Identity Center (SSO) environment
@@ -460,32 +465,27 @@ def create_job_task_list(
                     # consist of just those variables for which all components
                     # are available:
 
-                    # the following can probably be optimised:
+                    # time-keyed .data/.meta pairs, for each component
+                    # (file_list[0] -> just use first element of .data/.meta
+                    # pair):
+                    component_files_by_time = []
+                    for v in all_variable_input_component_files.values():
+                        files_by_time = {}
+                        for time, file_list in zip(ecco_file.parse_many(
+                            [os.path.basename(file_list[0]) for file_list in v])['time'].tolist(), v):
+                            files_by_time.setdefault(time, file_list)
+                        component_files_by_time.append(files_by_time)
 
                     # get list of times common across all variable input components:
-                    times = None
-                    for _,v in all_variable_input_component_files.items():
-                        if not times:
-                            # init:
-                            times = {
-                                ecco_file.ECCOMDSFilestr(os.path.basename(file_list[0])).time
-                                for file_list in v}   # file_list[0] -> just use first element of .data/.meta pair
-                        else:
-                            # compare:
-                            times = times & {
-                                ecco_file.ECCOMDSFilestr(os.path.basename(file_list[0])).time
-                                for file_list in v}   # file_list[0] -> just use first element of .data/.meta pair
-                    times = list(times)
-                    times.sort()
+                    times = set(component_files_by_time[0]) if component_files_by_time else set()
+                    for files_by_time in component_files_by_time[1:]:
+                        times &= files_by_time.keys()
+                    times = sorted(times)
                     log.info("Found %d common time steps for all components", len(times))
                     # reduce, and group by time:
                     for time in times:
-                        tmp = []
-                        for _,v in all_variable_input_component_files.items():
-                            tmp.append(next(file_list for file_list in v if
-                                time==ecco_file.ECCOMDSFilestr(os.path.basename(file_list[0])).time))
-                            # as above, file_list[0] -> just use first element of .data/.meta pair
-                        variable_files.append(tmp)
+                        variable_files.append(
+                            [files_by_time[time] for files_by_time in component_files_by_time])
 
                 else:
                     log.info("Variable '%s' is a direct mapping", variable)
@@ -624,45 +624,47 @@ def create_job_task_list(
                 # nothing to write to task list; continue with next jobfile entry
                 continue
 
-            for time in all_times:
+            # time bounds and center times, for all time steps at once:
+            model_start_time=cfg['model_start_time']
+            model_end_time=cfg['model_end_time']
+            model_timestep=cfg['model_timestep']
+            model_timestep_units=cfg['model_timestep_units']
+
+            if 'snap' in job.frequency.lower():
+                mst = np.datetime64(model_start_time)
+                td64 = (np.array(all_times,dtype=np.int64)*model_timestep).astype(
+                    f'timedelta64[{model_timestep_units}]')
+                all_center_times = mst + td64
+                all_tb = np.stack([all_center_times,all_center_times],axis=-1)
+
+            else:
+                all_tb,all_center_times = ecco_time.make_time_bounds_metadata_batch(
+                    granule_times=all_times,
+                    model_start_time=model_start_time,
+                    model_end_time=model_end_time,
+                    model_timestep=model_timestep,
+                    model_timestep_units=model_timestep_units,
+                    averaging_period=job.frequency)
+
+            all_tb_start_str = ecco_time.isoformat(all_tb[:,0])
+            all_tb_end_str = ecco_time.isoformat(all_tb[:,1])
+            all_center_time_str = ecco_time.isoformat(all_center_times)
+
+            if file_freq_pat == 'mon_mean':
+                # in the case of monthly means, ensure file date stamp is
+                # correct (tb[1] sometimes places end date at start of
+                # subsequent month, e.g., tb = [1992-01,1992-02] for a
+                # 1992-01 monthly average)
+                all_file_date_stamp_str = all_center_time_str
+            else:
+                all_file_date_stamp_str = all_tb_end_str
+
+            for j,time in enumerate(all_times):
                 log.debug("Creating task for time step: %s", time)
                 # TODO: when finalized, replace 'task={}' with 'task =
                 # ECCOTask()'; subsequent operations using class functions.
                 task = {}
 
-                model_start_time=cfg['model_start_time']
-                model_end_time=cfg['model_end_time']
-                model_timestep=cfg['model_timestep']
-                model_timestep_units=cfg['model_timestep_units']
-
-                if 'snap' in job.frequency.lower():
-                    mst = np.datetime64(model_start_time)
-                    td64 = np.timedelta64(int(time)*model_timestep ,model_timestep_units)
-                    center_time = \
-                        mst + \
-                        td64
-                    tb = []
-                    tb.append(center_time)
-                    tb.append(center_time)
-
-                else:
-                    tb,center_time = ecco_time.make_time_bounds_metadata(
-                        granule_time=time,
-                        model_start_time=model_start_time,
-                        model_end_time=model_end_time,
-                        model_timestep=model_timestep,
-                        model_timestep_units=model_timestep_units,
-                        averaging_period=job.frequency)
-
-                if file_freq_pat == 'mon_mean':
-                    # in the case of monthly means, ensure file date stamp is
-                    # correct (tb[1] sometimes places end date at start of
-                    # subsequent month, e.g., tb = [1992-01,1992-02] for a
-                    # 1992-01 monthly average)
-                    file_date_stamp = center_time
-                else:
-                    file_date_stamp = tb[1]
-
                 # in the future, the input file frequency pattern will just be
                 # 'snap' instead of 'day_snap'. In the meantime, make sure
                 # output files adhere to the future standard:
@@ -674,7 +676,7 @@ def create_job_task_list(
                 output_filename = ecco_file.ECCOGranuleFilestr(
                     prefix=job_metadata['filename'],
                     averaging_period=_file_freq_pat,    # see above test
-                    date=pd.Timestamp(file_date_stamp).strftime("%Y-%m-%dT%H:%M:%S"),
+                    date=str(all_file_date_stamp_str[j]),
                     #date=pd.Timestamp(tb[1]).strftime("%Y-%m-%dT%H:%M:%S"),
                     version=cfg['ecco_version'],
                     grid_type=job.product_type,
@@ -708,9 +710,9 @@ def create_job_task_list(
                 task['dynamic_metadata'] = {
                     'name':job_metadata['name'],
                     'dimension':job_metadata['dimension'],
-                    'time_coverage_start': pd.Timestamp(tb[0]).strftime("%Y-%m-%dT%H:%M:%S"),
-                    'time_coverage_end': pd.Timestamp(tb[1]).strftime("%Y-%m-%dT%H:%M:%S"),
-                    'time_coverage_center': pd.Timestamp(center_time).strftime("%Y-%m-%dT%H:%M:%S")
+                    'time_coverage_start': str(all_tb_start_str[j]),
+                    'time_coverage_end': str(all_tb_end_str[j]),
+                    'time_coverage_center': str(all_center_time_str[j])
                 }
                 task['dynamic_metadata']['time_long_name']          = time_long_name
                 task['dynamic_metadata']['time_coverage_duration']  = time_coverage_duration
@@ -785,10 +787,5 @@ def main():
         log_level=args.log_level
     )
 
-    if args.outfile:
-        fp = open(args.outfile,'w')
-    else:
-        fp = sys.stdout
-    json.dump(task_list,fp,indent=4)
-    fp.close()
+    ecco_tasklist.write_tasklist(task_list, args.outfile, format=args.outfile_format)
 
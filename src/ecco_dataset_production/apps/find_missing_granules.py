@@ -0,0 +1,271 @@
+#!/usr/bin/env python3
+"""
+CLI tool for identifying missing, empty, or undersized ECCO granules and
+generating tasklists for their regeneration.
+
+Rather than checking granules one at a time, each output directory (or AWS S3
+prefix) referenced by the input tasklists is listed once (see ECCOInventory),
+and all tasks are checked against the cached listings. Tasks whose granules
+need to be regenerated are written to cost-balanced redo tasklists, ready for
+resubmission (see edp_partition_tasklists).
+"""
+import argparse
+from collections import Counter
+import json
+import logging
+import os
+import statistics
+
+from .. import ecco_file
+from .. import ecco_inventory
+from .. import ecco_tasklist
+from . import partition_tasklists
+
+logging.basicConfig(
+    format='%(levelname)-10s %(funcName)s %(asctime)s %(message)s')
+log = logging.getLogger('edp')
+
+OK = 'ok'
+MISSING = 'missing'
+UNDERSIZED = 'undersized'
+
+
+def create_parser():
+    """Set up command-line arguments for find_missing_granules.
+
+    Returns:
+        argparser.ArgumentParser instance.
+    """
+    parser = argparse.ArgumentParser(
+        description="""Check the granules referenced by ECCO tasklists against
+            their output locations, and write tasklists of tasks whose granules
+            are missing, empty, or undersized.""")
+
+    parser.add_argument('input_paths', nargs='+', help="""
+        Input tasklist file(s) (JSON array or compact JSON lines) and/or
+        directories containing tasklist files.""")
+
+    parser.add_argument('--output_base', help="""
+        Base (path and) name for redo tasklist files, written as
+        <output_base>_001.json, <output_base>_002.json, etc. If not provided,
+        granules are checked and reported only.""")
+
+    parser.add_argument('-n', '--num_partitions', type=int, default=1, help="""
+        Number of cost-balanced redo tasklists (e.g., number of AWS Batch jobs)
+        (default: %(default)s).""")
+
+    parser.add_argument('--output_format', choices=ecco_tasklist.TASKLIST_FORMATS,
+        default='json', help="""
+        Redo tasklist format (file extension): 'json' (array of complete task
+        descriptors) or 'jsonl' (compact JSON lines). Default: %(default)s""")
+
+    parser.add_argument('--min_size', type=int, default=1, help="""
+        Minimum acceptable granule size, in bytes; smaller granules are
+        flagged as undersized (default: %(default)s, i.e., only empty granules
+        are flagged).""")
+
+    parser.add_argument('--min_size_fraction', type=float, help="""
+        Optional minimum acceptable granule size, as a fraction of the median
+        size of granules of the same product (prefix, averaging period,
+        version, grid type and label) in the same location, e.g., 0.5.""")
+
+    parser.add_argument('--report', help="""
+        Optional JSON lines output file listing each flagged granule, its
+        status ('missing' or 'undersized') and size.""")
+
+    parser.add_argument('--pattern', default='*.json*', help="""
+        File pattern to match when an input path is a directory.
+        Default: %(default)s""")
+
+    parser.add_argument('--endpoint_url', help="""
+        Optional AWS S3 endpoint URL, e.g., of a local S3-compatible stand-in
+        (alternatively, set AWS_ENDPOINT_URL).""")
+
+    parser.add_argument('--keygen', help="""
+        If tasklist descriptors reference AWS S3 endpoints and if running in an
+        institutionally-managed AWS IAM Identity Center (SSO) environment,
+        (path and) name of federated login key generation script (e.g.,
+        /usr/local/bin/aws-login.darwin.universal, etc.)""")
+
+    parser.add_argument('--profile', help="""
+        Optional profile name to be used in combination with keygen (e.g.,
+        'saml-pub', 'default', etc.)""")
+
+    parser.add_argument('-l', '--log', dest='log_level',
+        choices=['DEBUG', 'INFO', 'WARNING', 'ERROR', 'CRITICAL'],
+        default='INFO', help="""
+        Set logging level (default: %(default)s).""")
+
+    return parser
+
+
+def _product_key(name):
+    """Granule product key (all file name fields other than date), or None if
+    name is not a granule file name.
+
+    """
+    try:
+        fields = ecco_file.parse_granule_filestr(name)
+    except ValueError:
+        return None
+    return (fields.prefix, fields.averaging_period, fields.version,
+        fields.grid_type, fields.grid_label, fields.ext)
+
+
+class ECCOGranuleChecker(object):
+    """Granule status checks against cached output location listings.
+
+    Args:
+        inventory (ECCOInventory): Output location inventory.
+        min_size (int): Minimum acceptable granule size, in bytes.
+        min_size_fraction (float): Optional minimum acceptable granule size,
+            as a fraction of the median size of granules of the same product
+            in the same location.
+
+    """
+    def __init__( self, inventory, min_size=1, min_size_fraction=None):
+        self.inventory = inventory
+        self.min_size = min_size
+        self.min_size_fraction = min_size_fraction
+        self._medians = {}
+
+
+    def median_size( self, granule):
+        """Median size of granules of the same product as granule in the same
+        location (computed once per location).
+
+        """
+        location = os.path.dirname(granule)
+        if location not in self._medians:
+            sizes = {}
+            for name, stat in self.inventory.listing(location).items():
+                sizes.setdefault(_product_key(name), []).append(stat['size'])
+            self._medians[location] = {
+                key: statistics.median(s) for key, s in sizes.items() if key}
+        return self._medians[location].get(_product_key(os.path.basename(granule)))
+
+
+    def status( self, granule):
+        """Status of a granule.
+
+        Returns:
+            (status, size) tuple, where status is 'ok', 'missing', or
+            'undersized', and size is the granule size in bytes (None if
+            missing).
+
+        """
+        stat = self.inventory.stat(granule)
+        if stat is None:
+            return MISSING, None
+        size = stat['size']
+        if size < self.min_size:
+            return UNDERSIZED, size
+        if self.min_size_fraction:
+            median = self.median_size(granule)
+            if median and size < self.min_size_fraction*median:
+                return UNDERSIZED, size
+        return OK, size
+
+
+def find_missing_granules(
+    input_paths=None,
+    output_base=None,
+    num_partitions=1,
+    output_format='json',
+    min_size=1,
+    min_size_fraction=None,
+    report=None,
+    pattern='*.json*',
+    log_level='INFO',
+    **kwargs):
+    """Identify tasks whose granules are missing, empty, or undersized, and
+    write cost-balanced redo tasklists.
+
+    Args:
+        input_paths (list): Input tasklist file and/or directory names.
+        output_base (str): Optional base (path and) name for redo tasklist
+            files (<output_base>_001.json, etc.)
+        num_partitions (int): Number of redo tasklists.
+        output_format (str): Redo tasklist format, 'json' or 'jsonl' (also
+            used as output file extension).
+        min_size (int): Minimum acceptable granule size, in bytes.
+        min_size_fraction (float): Optional minimum acceptable granule size,
+            as a fraction of the median size of granules of the same product
+            in the same location.
+        report (str): Optional JSON lines report file name.
+        pattern (str): File pattern to match when an input path is a directory.
+        log_level (str): Logging level.
+        **kwargs: Passed to ECCOInventory (e.g., keygen, profile,
+            endpoint_url).
+
+    Returns:
+        (redo_tasks, counts) tuple, where redo_tasks is the list of task
+        descriptors to be rerun, and counts is a dictionary of the number of
+        'ok', 'missing', 'undersized', and 'duplicate' granules.
+    """
+    log.setLevel(log_level)
+
+    checker = ECCOGranuleChecker(
+        ecco_inventory.ECCOInventory(**kwargs), min_size, min_size_fraction)
+    seen = set()
+    redo_tasks = []
+    counts = Counter({OK:0, MISSING:0, UNDERSIZED:0, 'duplicate':0})
+    report_fp = open(report,'w') if report else None
+    try:
+        for task in partition_tasklists.iter_tasks(input_paths, pattern):
+            granule = task['granule']
+            if granule in seen:
+                counts['duplicate'] += 1
+                log.debug('duplicate granule %s', granule)
+                continue
+            seen.add(granule)
+            status, size = checker.status(granule)
+            counts[status] += 1
+            if status != OK:
+                log.debug('%s: %s', granule, status)
+                redo_tasks.append(task)
+                if report_fp:
+                    report_fp.write(json.dumps(
+                        {'granule':granule, 'status':status, 'size':size}) + '\n')
+    finally:
+        if report_fp:
+            report_fp.close()
+
+    log.info('%d granules: %d ok, %d missing, %d undersized (%d duplicate tasks ignored)',
+        len(seen), counts[OK], counts[MISSING], counts[UNDERSIZED], counts['duplicate'])
+
+    if output_base:
+        if redo_tasks:
+            costs = partition_tasklists.estimate_task_costs(redo_tasks)
+            partitions, loads = partition_tasklists.lpt_partition(
+                costs, min(num_partitions, len(redo_tasks)))
+            partition_tasklists.write_partitions(
+                redo_tasks, partitions, loads, output_base, output_format)
+        else:
+            log.info('all granules present, nothing to redo')
+    return redo_tasks, dict(counts)
+
+
+def main():
+    """Main entry point for CLI."""
+    parser = create_parser()
+    args = parser.parse_args()
+
+    find_missing_granules(
+        input_paths=args.input_paths,
+        output_base=args.output_base,
+        num_partitions=args.num_partitions,
+        output_format=args.output_format,
+        min_size=args.min_size,
+        min_size_fraction=args.min_size_fraction,
+        report=args.report,
+        pattern=args.pattern,
+        log_level=args.log_level,
+        endpoint_url=args.endpoint_url,
+        keygen=args.keygen,
+        profile=args.profile
+    )
+
+
+if __name__ == '__main__':
+    main()
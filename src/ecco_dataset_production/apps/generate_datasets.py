@@ -36,6 +36,61 @@ def create_parser():
     parser.add_argument('--profile', help="""
         Optional profile name to be used in combination with keygen (e.g.,
         'saml-pub', 'default', etc.)""")
+    parser.add_argument('--eager_grid', action='store_true', default=None, help="""
+        Load grid variables required for granule generation as in-memory numpy
+        arrays, bypassing dask (overrides configuration file 'eager_grid'
+        setting).""")
+    parser.add_argument('--cache_dir', help="""
+        Shared local cache directory for AWS S3-hosted grid, mapping factors,
+        and metadata, for reuse by concurrent and subsequent processes on the
+        same host (default: EDP_CACHE_DIR environment variable, if set, or no
+        caching).""")
+    parser.add_argument('--incremental', action='store_true', help="""
+        Skip tasks whose output granules already exist. Existence is checked
+        in bulk, using one directory scan, or AWS S3 listing, per output
+        location.""")
+    parser.add_argument('--fingerprint', action='store_true', help="""
+        Record a task fingerprint (digest of task descriptor, configuration,
+        and input ETags/modification times) alongside each generated granule
+        ('<granule>.fingerprint'). In combination with --incremental, existing
+        granules are skipped only if their recorded fingerprints match.""")
+    parser.add_argument('--timings', help="""
+        Local JSON lines file to which per-task elapsed times are appended
+        (e.g., for calibration of edp_partition_tasklists cost
+        estimates).""")
+    parser.add_argument('--queue', help="""
+        Work queue location (e.g., SQLite database file on shared storage, as
+        loaded by edp_work_queue). If provided, tasks are leased from the
+        queue until it is drained, instead of being read from --tasklist.""")
+    parser.add_argument('--worker_id', help="""
+        Work queue worker identifier (default: AWS_BATCH_JOB_ID environment
+        variable, if set, else hostname and process id).""")
+    parser.add_argument('--visibility_timeout', type=float, help="""
+        Work queue lease visibility timeout, in seconds: tasks whose workers
+        stop heartbeating for this long are re-leased to other workers
+        (default: 600).""")
+    parser.add_argument('--pipeline', nargs='?', const='', metavar='STAGE=N,...', help="""
+        Overlap input fetch, granule computation, NetCDF write, and AWS S3
+        upload of different tasks using a pipelined executor. Optionally,
+        per-stage concurrency limits may be given as a comma-separated list,
+        e.g., 'fetch=8,compute=2,write=1,upload=8' (defaults: fetch=4,
+        compute=1, write=1, upload=4).""")
+    parser.add_argument('--pipeline_queue_size', type=int, default=1, help="""
+        Maximum number of tasks waiting between consecutive pipeline stages
+        (default: %(default)s).""")
+    parser.add_argument('--shared_store', nargs='?', const=True, metavar='DIR', help="""
+        Publish grid and mapping factors arrays once per host to a shared,
+        memory-mapped store, to which all worker processes on the host attach
+        rather than holding their own copies. Optionally, the store root
+        directory may be given (default: EDP_SHARED_STORE_DIR environment
+        variable, if set, or /dev/shm/edp).""")
+    parser.add_argument('--granule_cache_dir', help="""
+        Local granule data cache directory. The regridded data of each
+        generated granule are cached, and reruns of tasks whose inputs, grid,
+        mapping factors, and precision are unchanged (e.g., following
+        metadata-only changes) skip input fetch, MDS load, and regridding
+        (default: EDP_GRANULE_CACHE_DIR environment variable, if set, or no
+        caching).""")
 
     return parser
 
@@ -46,6 +101,15 @@ def main():
     """
     parser = create_parser()
     args = parser.parse_args()
+    if not args.tasklist and not args.queue:
+        parser.error('one of --tasklist or --queue is required')
+    pipeline = None
+    if args.pipeline is not None:
+        try:
+            pipeline = {stage: int(n) for stage, n in
+                (item.split('=') for item in args.pipeline.split(',') if item)} or True
+        except ValueError:
+            parser.error(f"invalid --pipeline value '{args.pipeline}'")
 
     # application-level logger:
     log = logging.getLogger('edp')
@@ -54,5 +118,11 @@ def main():
     ecco_generate_datasets.generate_datasets(
         tasklist=args.tasklist,
         #log_level=args.log_level,  # logger hierarchy makes this redundant
+        eager_grid=args.eager_grid, cache_dir=args.cache_dir,
+        incremental=args.incremental, fingerprint=args.fingerprint,
+        timings=args.timings, queue=args.queue, worker_id=args.worker_id,
+        visibility_timeout=args.visibility_timeout,
+        pipeline=pipeline, pipeline_queue_size=args.pipeline_queue_size,
+        shared_store=args.shared_store, granule_cache_dir=args.granule_cache_dir,
         keygen=args.keygen, profile=args.profile)
 
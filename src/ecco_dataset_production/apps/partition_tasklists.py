@@ -0,0 +1,446 @@
+#!/usr/bin/env python3
+"""
+CLI tool for partitioning ECCO tasklists into cost-balanced subsets, e.g., one
+per AWS Batch job.
+
+Tasks are assigned using longest-processing-time-first (LPT) scheduling: tasks
+are sorted by decreasing estimated cost, and each is assigned to the partition
+with the least total estimated cost so far. Task cost estimates are based on
+grid type and either total input data size or, if sizes are not requested,
+dimension and number of variables and vector components; all tasks are costed
+on the same basis, and calibrated, if available, using recorded task timings
+(see edp_generate_datasets --timings).
+"""
+import argparse
+from collections import defaultdict
+import heapq
+import json
+import logging
+import os
+import statistics
+from pathlib import Path
+
+from .. import ecco_inventory
+from .. import ecco_task
+from .. import ecco_tasklist
+
+logging.basicConfig(
+    format='%(levelname)-10s %(funcName)s %(asctime)s %(message)s')
+log = logging.getLogger('edp')
+
+# uncalibrated relative cost factors:
+GRID_TYPE_COST = {'latlon': 1.5, 'native': 1.0}
+DIMENSION_COST = {'2D': 1.0, '3D': 50.0}
+VECTOR_COMPONENT_COST = 1.0     # additional cost per additional vector component
+MEGABYTE = 1024**2
+
+
+def create_parser():
+    """Set up command-line arguments for partition_tasklists.
+
+    Returns:
+        argparser.ArgumentParser instance.
+    """
+    parser = argparse.ArgumentParser(
+        description="""Partition ECCO tasklist JSON files into a number of
+            subsets with approximately equal total estimated processing
+            cost.""")
+
+    parser.add_argument('input_paths', nargs='+', help="""
+        Input tasklist JSON file(s) and/or directories containing tasklist
+        files.""")
+
+    parser.add_argument('-n', '--num_partitions', type=int, required=True, help="""
+        Number of output partitions (e.g., number of AWS Batch jobs).""")
+
+    parser.add_argument('--output_base', required=True, help="""
+        Base (path and) name for the output files. Each partition will be
+        written to <output_base>_001.json, <output_base>_002.json, etc.""")
+
+    parser.add_argument('--output_format', choices=ecco_tasklist.TASKLIST_FORMATS,
+        default='json', help="""
+        Output tasklist format (file extension): 'json' (array of complete task
+        descriptors) or 'jsonl' (compact JSON lines). Default: %(default)s""")
+
+    parser.add_argument('--timings', help="""
+        Optional JSON lines file(s) of recorded task timings, as written by
+        'edp_generate_datasets --timings', used to calibrate task cost
+        estimates. Multiple files may be provided as a comma-separated
+        list.""")
+
+    parser.add_argument('--input_sizes', action='store_true', help="""
+        Base task cost estimates on input data sizes. Sizes are collected
+        using one directory scan, or AWS S3 listing, per input location; tasks
+        whose inputs cannot be found are assigned median sizes.""")
+
+    parser.add_argument('--pattern', default='*.json*', help="""
+        File pattern to match when an input path is a directory.
+        Default: %(default)s""")
+
+    parser.add_argument('--keygen', help="""
+        If input sizes are requested, tasklist descriptors reference AWS S3
+        endpoints, and if running in an institutionally-managed AWS IAM
+        Identity Center (SSO) environment, (path and) name of federated login
+        key generation script (e.g., /usr/local/bin/aws-login.darwin.universal,
+        etc.)""")
+
+    parser.add_argument('--profile', help="""
+        Optional profile name to be used in combination with keygen (e.g.,
+        'saml-pub', 'default', etc.)""")
+
+    parser.add_argument('-l', '--log', dest='log_level',
+        choices=['DEBUG', 'INFO', 'WARNING', 'ERROR', 'CRITICAL'],
+        default='INFO', help="""
+        Set logging level (default: %(default)s).""")
+
+    return parser
+
+
+def task_cost_class(task):
+    """Cost class of a task, used to group recorded timings for calibration.
+
+    Args:
+        task (dict or ECCOTask): Task descriptor.
+
+    Returns:
+        (grid_type, dimension, is_vector) tuple, e.g., ('latlon', '3D', True).
+    """
+    if not isinstance(task, ecco_task.ECCOTask):
+        task = ecco_task.ECCOTask(task)
+    is_vector = any(
+        not task.is_variable_single_component(variable)
+        for variable in task.variable_names)
+    return (task.grid_type, task['dynamic_metadata']['dimension'].upper(), is_vector)
+
+
+def task_input_sizes(tasks, inventory):
+    """Per-variable input data sizes of each task, for size-based cost
+    estimates.
+
+    So that all tasks are costed on the same (size) basis, the sizes of
+    variables whose inputs cannot all be found (e.g., not yet generated) are
+    substituted by the median variable input size of tasks of the same cost
+    class or, if none of that class could be sized, of all tasks.
+
+    Args:
+        tasks (list): Task descriptors.
+        inventory (ECCOInventory): Inventory used to look up task input sizes.
+
+    Returns:
+        list: For each task, a list of per-variable input sizes (MB), or None
+        if no task inputs could be sized at all.
+    """
+    classes, sizes, known = [], [], defaultdict(list)
+    for task in tasks:
+        if not isinstance(task, ecco_task.ECCOTask):
+            task = ecco_task.ECCOTask(task)
+        cost_class = task_cost_class(task)
+        task_sizes = []
+        for variable in task.variable_names or [None]:
+            stats = [inventory.stat(file)
+                for component in (task.variable_inputs(variable) if variable else [])
+                for file in component]
+            input_mb = sum(stat['size'] for stat in stats)/MEGABYTE \
+                if stats and all(stats) else None
+            if input_mb:
+                known[cost_class].append(input_mb)
+            task_sizes.append(input_mb or None)
+        classes.append(cost_class)
+        sizes.append(task_sizes)
+    if not known:
+        return None
+    medians = {cost_class: statistics.median(s) for cost_class, s in known.items()}
+    median = statistics.median([mb for s in known.values() for mb in s])
+    num_missing = sum(mb is None for task_sizes in sizes for mb in task_sizes)
+    if num_missing:
+        log.info('%d task variable(s) without input sizes; using median sizes', num_missing)
+    return [[mb if mb is not None else medians.get(cost_class, median) for mb in task_sizes]
+        for cost_class, task_sizes in zip(classes, sizes)]
+
+
+def base_task_cost(task, input_mb=None):
+    """Uncalibrated relative cost estimate of a task.
+
+    Args:
+        task (dict or ECCOTask): Task descriptor.
+        input_mb (list): Optional per-variable input sizes, in MB (see
+            task_input_sizes). If provided, cost is proportional to total input
+            size (which already scales with dimension and number of vector
+            components), otherwise to the number of variables and vector
+            components. Costs on the two bases are not comparable, so either
+            all or none of the tasks being compared should be sized.
+
+    Returns:
+        float: Relative cost estimate.
+    """
+    if not isinstance(task, ecco_task.ECCOTask):
+        task = ecco_task.ECCOTask(task)
+    grid_type, dimension, _ = task_cost_class(task)
+    if input_mb is not None:
+        return sum(input_mb) * GRID_TYPE_COST.get(grid_type, 1.)
+    cost = sum(
+        1. + VECTOR_COMPONENT_COST*max(len(task.variable_inputs(variable))-1, 0)
+        for variable in task.variable_names) or 1.
+    return cost * GRID_TYPE_COST.get(grid_type, 1.) * DIMENSION_COST.get(dimension, 1.)
+
+
+def load_timings(timings_files):
+    """Load recorded task timings.
+
+    Args:
+        timings_files (list): JSON lines file names, each line a dictionary
+            with (at least) 'granule' and 'seconds' keys.
+
+    Returns:
+        dict: Granule name-keyed dictionary of elapsed seconds (most recent
+        record, if multiple).
+    """
+    timings = {}
+    for timings_file in timings_files:
+        with open(timings_file) as f:
+            for line in f:
+                if line.strip():
+                    record = json.loads(line)
+                    if record.get('status', 'ok') == 'ok':
+                        timings[os.path.basename(record['granule'])] = float(record['seconds'])
+    return timings
+
+
+def calibrate(tasks, timings, input_sizes=None):
+    """Derive per-cost class scale factors (seconds per unit of base cost) from
+    recorded timings of previously-run tasks.
+
+    Args:
+        tasks (list): Task descriptors.
+        timings (dict): Granule name-keyed dictionary of elapsed seconds (see
+            load_timings).
+        input_sizes (list): Optional per-task input sizes (see
+            task_input_sizes), in which case factors are derived for size-based
+            costs, otherwise for count-based costs.
+
+    Returns:
+        dict: Cost class-keyed dictionary of scale factors, including a
+        None-keyed default (median over all classes), or an empty dictionary
+        if no tasks have recorded timings.
+    """
+    ratios = defaultdict(list)
+    for i, task in enumerate(tasks):
+        seconds = timings.get(os.path.basename(task['granule']))
+        if seconds is not None:
+            cost = base_task_cost(task, input_sizes[i] if input_sizes else None)
+            ratios[task_cost_class(task)].append(seconds/cost)
+    if not ratios:
+        return {}
+    factors = {cost_class: statistics.median(r) for cost_class, r in ratios.items()}
+    factors[None] = statistics.median([r for rs in ratios.values() for r in rs])
+    for cost_class, factor in factors.items():
+        log.debug('calibration: %s: %.3g s per unit cost (%d samples)',
+            cost_class, factor, len(ratios.get(cost_class, [])))
+    return factors
+
+
+def estimate_task_cost(task, factors=None, input_mb=None):
+    """Estimated cost of a task (seconds, if calibrated).
+
+    Args:
+        task (dict or ECCOTask): Task descriptor.
+        factors (dict): Optional calibration factors (see calibrate), derived
+            on the same cost basis as input_mb.
+        input_mb (list): Optional per-variable input sizes (see
+            base_task_cost).
+
+    Returns:
+        float: Estimated cost.
+    """
+    cost = base_task_cost(task, input_mb)
+    if factors:
+        cost *= factors.get(task_cost_class(task), factors[None])
+    return cost
+
+
+def estimate_task_costs(tasks, timings=None, inventory=None):
+    """Estimated costs of a set of tasks, all on the same basis: input size if
+    an inventory is provided (and any task inputs can be sized), otherwise
+    number of variables and vector components; calibrated, on that basis, if
+    timings are provided.
+
+    Args:
+        tasks (list): Task descriptors.
+        timings (dict): Optional granule name-keyed dictionary of elapsed
+            seconds (see load_timings).
+        inventory (ECCOInventory): Optional inventory used to look up task
+            input sizes.
+
+    Returns:
+        list: Estimated cost of each task.
+    """
+    input_sizes = task_input_sizes(tasks, inventory) if inventory is not None else None
+    if inventory is not None and input_sizes is None:
+        log.warning('no task input sizes found; using count-based cost estimates')
+    factors = calibrate(tasks, timings, input_sizes) if timings else {}
+    if timings and not factors:
+        log.warning('no recorded timings match input tasks; using uncalibrated cost estimates')
+    return [estimate_task_cost(task, factors, input_sizes[i] if input_sizes else None)
+        for i, task in enumerate(tasks)]
+
+
+def lpt_partition(costs, num_partitions):
+    """Longest-processing-time-first assignment of items to partitions.
+
+    Args:
+        costs (list): Item costs.
+        num_partitions (int): Number of partitions.
+
+    Returns:
+        (partitions, loads) tuple, where partitions is a list of lists of item
+        indices, and loads is a list of total partition costs.
+
+    Raises:
+        ValueError: If num_partitions is less than 1.
+    """
+    if num_partitions is None or num_partitions < 1:
+        raise ValueError(f"Number of partitions must be at least 1, got {num_partitions}")
+    partitions = [[] for _ in range(num_partitions)]
+    loads = [0.]*num_partitions
+    heap = [(0., p) for p in range(num_partitions)]
+    for i in sorted(range(len(costs)), key=lambda i: costs[i], reverse=True):
+        load, p = heapq.heappop(heap)
+        partitions[p].append(i)
+        loads[p] = load + costs[i]
+        heapq.heappush(heap, (loads[p], p))
+    return partitions, loads
+
+
+def iter_tasks(input_paths, pattern='*.json*'):
+    """Lazily iterate over all tasks in tasklist files (of either format; see
+    ecco_tasklist) and/or directories of tasklist files.
+
+    Args:
+        input_paths (list): Tasklist file and/or directory names.
+        pattern (str): File pattern to match for directories.
+
+    Yields:
+        Task descriptors.
+    """
+    for input_path in map(Path, input_paths):
+        files = sorted(input_path.glob(pattern)) if input_path.is_dir() else [input_path]
+        for file in files:
+            log.info('reading %s', file)
+            yield from ecco_tasklist.read_tasklist(str(file))
+
+
+def load_tasks(input_paths, pattern='*.json*'):
+    """Load all tasks from tasklist files and/or directories of tasklist files.
+
+    Args:
+        input_paths (list): Tasklist file and/or directory names.
+        pattern (str): File pattern to match for directories.
+
+    Returns:
+        list: All task descriptors.
+    """
+    return list(iter_tasks(input_paths, pattern))
+
+
+def write_partitions(tasks, partitions, loads, output_base, output_format='json'):
+    """Write partitioned tasks to tasklist files
+    <output_base>_001.<output_format>, <output_base>_002.<output_format>, etc.
+
+    Args:
+        tasks (list): Task descriptors.
+        partitions (list): Lists of task indices, one per partition (see
+            lpt_partition).
+        loads (list): Estimated total partition costs (for logging).
+        output_base (str): Base (path and) name for output files.
+        output_format (str): Output tasklist format, 'json' or 'jsonl'.
+
+    Returns:
+        list: Output file names.
+    """
+    if os.path.dirname(output_base):
+        os.makedirs(os.path.dirname(output_base), exist_ok=True)
+    output_files = []
+    for p, partition in enumerate(partitions):
+        output_file = f'{output_base}_{p+1:03}.{output_format}'
+        ecco_tasklist.write_tasklist(
+            (tasks[i] for i in partition), output_file, format=output_format)
+        log.info('%s: %d tasks, estimated cost %.4g', output_file, len(partition), loads[p])
+        output_files.append(output_file)
+    return output_files
+
+
+def partition_tasklists(
+    input_paths=None,
+    num_partitions=None,
+    output_base=None,
+    timings=None,
+    input_sizes=False,
+    pattern='*.json*',
+    output_format='json',
+    log_level='INFO',
+    **kwargs):
+    """Partition tasklists into cost-balanced subsets.
+
+    Args:
+        input_paths (list): Input tasklist file and/or directory names.
+        num_partitions (int): Number of output partitions.
+        output_base (str): Base (path and) name for output files
+            (<output_base>_001.json, etc.)
+        output_format (str): Output tasklist format, 'json' or 'jsonl' (also
+            used as output file extension).
+        timings (list): Optional JSON lines timing file names used for
+            calibration.
+        input_sizes (bool): If True, include input sizes in cost estimates.
+        pattern (str): File pattern to match when an input path is a directory.
+        log_level (str): Logging level.
+        **kwargs: Passed to ECCOInventory if input_sizes (e.g., keygen,
+            profile).
+
+    Returns:
+        list: Estimated total cost of each partition.
+
+    Raises:
+        ValueError: If num_partitions is less than 1.
+    """
+    log.setLevel(log_level)
+    if num_partitions is None or num_partitions < 1:
+        raise ValueError(f"Number of partitions must be at least 1, got {num_partitions}")
+
+    tasks = load_tasks(input_paths, pattern)
+    log.info('%d tasks total', len(tasks))
+
+    inventory = ecco_inventory.ECCOInventory(**kwargs) if input_sizes else None
+    costs = estimate_task_costs(
+        tasks, load_timings(timings) if timings else None, inventory)
+    partitions, loads = lpt_partition(costs, num_partitions)
+    write_partitions(tasks, partitions, loads, output_base, output_format)
+
+    if tasks:
+        log.info('estimated makespan %.4g (%.1f%% above mean partition cost)',
+            max(loads), 100.*(max(loads)/(sum(loads)/num_partitions)-1.))
+    return loads
+
+
+def main():
+    """Main entry point for CLI."""
+    parser = create_parser()
+    args = parser.parse_args()
+    if args.num_partitions < 1:
+        parser.error(f'--num_partitions must be at least 1, got {args.num_partitions}')
+
+    partition_tasklists(
+        input_paths=args.input_paths,
+        num_partitions=args.num_partitions,
+        output_base=args.output_base,
+        timings=args.timings.split(',') if args.timings else None,
+        input_sizes=args.input_sizes,
+        pattern=args.pattern,
+        output_format=args.output_format,
+        log_level=args.log_level,
+        keygen=args.keygen,
+        profile=args.profile
+    )
+
+
+if __name__ == '__main__':
+    main()
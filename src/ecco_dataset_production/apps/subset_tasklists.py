@@ -7,6 +7,8 @@ import logging
 import random
 from pathlib import Path
 
+from .. import ecco_tasklist
+
 logging.basicConfig(
     format='%(levelname)-10s %(funcName)s %(asctime)s %(message)s')
 log = logging.getLogger('edp')
@@ -59,7 +61,7 @@ def create_parser():
     parser.add_argument('--percent', type=float, help="""
         Percentage of entries to select for 'percentage' mode (0-100).""")
 
-    parser.add_argument('--pattern', default='*.json', help="""
+    parser.add_argument('--pattern', default='*.json*', help="""
         File pattern to match when input_path is a directory.
         Default: %(default)s""")
 
@@ -180,8 +182,10 @@ def process_tasklist_file(input_file, output_file, mode, count=12, seed=None,
     """Process a single tasklist file and create a subset.
 
     Args:
-        input_file (Path): Input tasklist JSON file.
-        output_file (Path): Output path for subset tasklist.
+        input_file (Path): Input tasklist JSON (array or compact JSON lines)
+            file.
+        output_file (Path): Output path for subset tasklist (written in the
+            same format as input_file).
         mode (str): Subset mode.
         count (int): Number of entries to select.
         seed (int, optional): Random seed for reproducible sampling.
@@ -195,19 +199,18 @@ def process_tasklist_file(input_file, output_file, mode, count=12, seed=None,
     log.info(f"Processing {input_file.name}...")
 
     try:
-        with open(input_file, 'r') as f:
-            data = json.load(f)
-
-        if not isinstance(data, list):
-            log.warning(f"{input_file.name} is not a JSON array, skipping")
+        try:
+            data = ecco_tasklist.load_tasklist(str(input_file))
+        except RuntimeError:
+            log.warning(f"{input_file.name} is not a tasklist, skipping")
             return (0, 0)
 
         input_count = len(data)
         subset = subset_entries(data, mode, count, seed, step, indices, percent)
         output_count = len(subset)
 
-        with open(output_file, 'w') as f:
-            json.dump(subset, f, indent=4)
+        ecco_tasklist.write_tasklist(
+            subset, str(output_file), format=ecco_tasklist.tasklist_format(input_file))
 
         log.info(f"  {input_file.name}: {output_count}/{input_count} entries -> {output_file}")
 
@@ -226,7 +229,7 @@ def subset_tasklists(
     output_dir=None,
     mode=None,
     count=12,
-    pattern='*.json',
+    pattern='*.json*',
     seed=None,
     step=10,
     indices=None,
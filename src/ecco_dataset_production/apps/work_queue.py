@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""
+CLI tool for loading and monitoring ECCO granule task work queues, from which
+'edp_generate_datasets --queue' workers lease tasks.
+"""
+import argparse
+import json
+import logging
+
+from .. import ecco_work_queue
+from . import partition_tasklists
+
+logging.basicConfig(
+    format='%(levelname)-10s %(funcName)s %(asctime)s %(message)s')
+log = logging.getLogger('edp')
+
+
+def create_parser():
+    """Set up command-line arguments for work_queue.
+
+    Returns:
+        argparser.ArgumentParser instance.
+    """
+    parser = argparse.ArgumentParser(
+        description="""Load ECCO tasklists into, and report the status of, a
+            work queue shared by edp_generate_datasets workers.""")
+
+    parser.add_argument('--queue', required=True, help="""
+        Work queue location, e.g., (path and) name of SQLite database file on
+        storage shared by all workers (created if necessary).""")
+
+    parser.add_argument('-l', '--log', dest='log_level',
+        choices=['DEBUG', 'INFO', 'WARNING', 'ERROR', 'CRITICAL'],
+        default='INFO', help="""
+        Set logging level (default: %(default)s).""")
+
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    load = subparsers.add_parser('load', help="""
+        Add all tasks in tasklist file(s) and/or directories to the queue.""")
+    load.add_argument('input_paths', nargs='+', help="""
+        Input tasklist file(s) (JSON array or compact JSON lines) and/or
+        directories containing tasklist files.""")
+    load.add_argument('--pattern', default='*.json*', help="""
+        File pattern to match when an input path is a directory.
+        Default: %(default)s""")
+
+    subparsers.add_parser('status', help="""
+        Report the number of pending, leased, done, and failed tasks.""")
+
+    subparsers.add_parser('failed', help="""
+        List failed granules and their errors.""")
+
+    subparsers.add_parser('requeue', help="""
+        Return failed tasks to the queue.""")
+
+    return parser
+
+
+def main():
+    """Main entry point for CLI."""
+    parser = create_parser()
+    args = parser.parse_args()
+    log.setLevel(args.log_level)
+
+    queue = ecco_work_queue.open_work_queue(args.queue)
+
+    if args.command == 'load':
+        queue.put(partition_tasklists.iter_tasks(args.input_paths, args.pattern))
+    elif args.command == 'failed':
+        for task, error in queue.failed_tasks():
+            print(f"{task.get('granule')}: {error}")
+    elif args.command == 'requeue':
+        log.info('%d failed tasks requeued', queue.requeue_failed())
+    print(json.dumps(queue.status()))
+
+
+if __name__ == '__main__':
+    main()
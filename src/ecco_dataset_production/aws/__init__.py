@@ -16,6 +16,7 @@ Example:
 
 """
 #from . import ecco_aws
+from . import ecco_aws_s3_cache
 from . import ecco_aws_s3_cp
 from . import ecco_aws_s3_sync
 from . import utils
@@ -0,0 +1,341 @@
+#!/usr/bin/env python
+"""Shared, content-addressed local cache for AWS S3 downloads.
+
+Multiple processes (or containers sharing a host volume) that reference the
+same AWS S3 objects, e.g., ECCO grid, mapping factors, and metadata, can share
+a single local copy rather than each downloading (and, in the case of the ECCO
+grid, extracting) their own. Cache entries are keyed by AWS S3 URI and ETag(s),
+so that any change to the remote object(s) results in a new entry.
+
+Cache directory layout::
+
+    <cache_dir>/
+        <key>/          published entry (object file, or prefix hierarchy)
+        <key>.json      entry description (uri, etag, size)
+        <key>.lock      entry (in use) lock file
+        <key>.fetch.lock    entry download lock file
+        .tmp-*/         in-progress downloads
+        .evict.lock     eviction lock file
+
+Concurrency:
+
+- Downloads are serialized per entry via an exclusive lock on
+  <key>.fetch.lock; processes that arrive while a download is in progress
+  block until it is published, and then use the published entry.
+- Entries are published by atomic rename of a fully-populated temporary
+  directory, and are never modified thereafter.
+- Entries in use hold a shared lock on <key>.lock, and are never evicted.
+
+"""
+import fcntl
+import glob
+import hashlib
+import json
+import logging
+import os
+import shutil
+import tempfile
+import time
+
+from . import ecco_aws_s3_cp
+from . import ecco_aws_s3_sync
+from . import utils
+
+CACHE_DIR_ENV = 'EDP_CACHE_DIR'
+CACHE_MAX_BYTES_ENV = 'EDP_CACHE_MAX_BYTES'
+DEFAULT_CACHE_MAX_BYTES = 20*1024**3
+STALE_TMPDIR_SECONDS = 24*60*60
+
+log = logging.getLogger('edp.'+__name__)
+
+
+def cache_from_env( cache_dir=None, **kwargs):
+    """Return an ECCOAWSS3Cache instance for cache_dir or, if not provided, for
+    the directory named by the EDP_CACHE_DIR environment variable.
+
+    Args:
+        cache_dir (str): Optional cache directory name.
+        **kwargs: Passed to ECCOAWSS3Cache.
+
+    Returns:
+        ECCOAWSS3Cache instance, or None if neither cache_dir nor
+        EDP_CACHE_DIR have been provided.
+
+    """
+    cache_dir = cache_dir or os.environ.get(CACHE_DIR_ENV)
+    if not cache_dir:
+        return None
+    return ECCOAWSS3Cache(cache_dir=cache_dir, **kwargs)
+
+
+class ECCOAWSS3CacheEntry(object):
+    """Handle to a published cache entry. Holds a shared lock on the entry for
+    as long as the handle is in use, preventing eviction.
+
+    The handle is interface-compatible with tempfile.TemporaryDirectory (i.e.,
+    'name' attribute, cleanup() method) so that it can be substituted for the
+    temporary directories used by the ECCO resource classes.
+
+    Args:
+        name (str): Local path of the published entry directory.
+        lock_fd (int): File descriptor of the (shared-locked) entry lock file.
+
+    Attributes:
+        name (str): Local path of the published entry directory.
+
+    """
+    def __init__( self, name, lock_fd):
+        self.name = name
+        self._lock_fd = lock_fd
+
+
+    def cleanup(self):
+        """Release the entry (the entry itself remains in the cache).
+
+        """
+        if self._lock_fd is not None:
+            try:
+                fcntl.flock(self._lock_fd,fcntl.LOCK_UN)
+                os.close(self._lock_fd)
+            finally:
+                self._lock_fd = None
+
+
+    def __del__(self):
+        try:
+            self.cleanup()
+        except:
+            pass
+
+
+class ECCOAWSS3Cache(object):
+    """Shared local cache of AWS S3 objects and bucket/prefix hierarchies.
+
+    Args:
+        cache_dir (str): Local cache directory name (created if necessary).
+        max_bytes (int): Optional cache size limit, in bytes. If not provided,
+            the value of the EDP_CACHE_MAX_BYTES environment variable is used,
+            or DEFAULT_CACHE_MAX_BYTES if that is not set either. Least recently
+            used entries that are not in use are evicted when the limit is
+            exceeded.
+
+    Attributes:
+        cache_dir (str): Local cache directory name.
+        max_bytes (int): Cache size limit, in bytes.
+
+    Example:
+        >>> cache = ECCOAWSS3Cache('/var/cache/edp')
+        >>> entry = cache.fetch('s3://bucket/grid/', recursive=True)
+        >>> os.listdir(entry.name)
+
+    """
+    def __init__( self, cache_dir=None, max_bytes=None, **kwargs):
+        self.cache_dir = cache_dir
+        if max_bytes is None:
+            max_bytes = int(os.environ.get(CACHE_MAX_BYTES_ENV,DEFAULT_CACHE_MAX_BYTES))
+        self.max_bytes = max_bytes
+        os.makedirs(self.cache_dir,exist_ok=True)
+
+
+    def etag( self, s3uri, recursive=False, **kwargs):
+        """Return the AWS S3 ETag of an object or, if recursive, a digest of
+        the keys and ETags of all objects under a bucket/prefix.
+
+        Args:
+            s3uri (str): AWS S3Uri.
+            recursive (bool): If True, s3uri is a bucket/prefix.
+            **kwargs: Passed to aws.utils.s3_client (e.g., profile).
+
+        Returns:
+            ETag (or ETag digest) string.
+
+        Raises:
+            RuntimeError if no objects are found.
+
+        """
+        client = utils.s3_client(**kwargs)
+        if recursive:
+            objects = utils.s3_list_objects(s3uri, client=client)
+            if not objects:
+                raise RuntimeError(f'No objects found at {s3uri}')
+            digest = hashlib.sha256()
+            for obj in sorted(objects, key=lambda obj: obj['Key']):
+                digest.update(f"{obj['Key']} {obj['ETag']}\n".encode())
+            return digest.hexdigest()
+        else:
+            bucket, key = utils.split_s3_uri(s3uri)
+            try:
+                return client.head_object(Bucket=bucket, Key=key)['ETag']
+            except Exception as e:
+                raise RuntimeError(f'Could not get ETag for {s3uri}: {e}')
+
+
+    def key( self, s3uri, etag):
+        """Cache key for a given AWS S3Uri and ETag.
+
+        """
+        return hashlib.sha256(f'{s3uri}\n{etag}'.encode()).hexdigest()
+
+
+    def fetch( self, s3uri, recursive=False, post_fetch=None, **kwargs):
+        """Return a handle to the cached copy of an AWS S3 object or
+        bucket/prefix, downloading it first if necessary.
+
+        Args:
+            s3uri (str): AWS S3Uri.
+            recursive (bool): If True, s3uri is a bucket/prefix whose contents
+                are to be synced, otherwise s3uri is a single object.
+            post_fetch (callable): Optional function, taking the download
+                directory name as its only argument, to be applied to newly
+                downloaded data prior to publishing (e.g., archive extraction).
+            **kwargs: Passed to aws_s3_sync/aws_s3_cp and aws.utils.s3_client
+                (e.g., keygen, profile).
+
+        Returns:
+            ECCOAWSS3CacheEntry instance whose 'name' attribute is the local
+            entry directory name (containing the object if not recursive).
+
+        """
+        ecco_aws_s3_sync.update_credentials(**kwargs)
+        etag = self.etag(s3uri, recursive=recursive, **kwargs)
+        key = self.key(s3uri, etag)
+        entry_dir = os.path.join(self.cache_dir,key)
+
+        lock_fd = os.open(entry_dir+'.lock', os.O_RDWR|os.O_CREAT, 0o664)
+        try:
+            while True:
+                if not os.path.isdir(entry_dir):
+                    self._download_once(s3uri, recursive, post_fetch, key, etag, **kwargs)
+                else:
+                    log.debug('%s found in cache (%s)', s3uri, entry_dir)
+                # hold shared lock for as long as the entry is in use:
+                fcntl.flock(lock_fd,fcntl.LOCK_SH)
+                if os.path.isdir(entry_dir):
+                    break
+                # evicted between publication and locking; fetch again:
+                fcntl.flock(lock_fd,fcntl.LOCK_UN)
+        except:
+            os.close(lock_fd)
+            raise
+
+        # least recently used bookkeeping:
+        os.utime(entry_dir)
+
+        self.evict()
+        return ECCOAWSS3CacheEntry(entry_dir, lock_fd)
+
+
+    def _download_once( self, s3uri, recursive, post_fetch, key, etag, **kwargs):
+        """Download entry 'key' unless another process publishes it first.
+        Downloads are serialized by an exclusive lock on <key>.fetch.lock,
+        separate from the entry's in-use lock, so that processes waiting for a
+        download are not blocked by the shared locks of entries in use.
+
+        """
+        entry_dir = os.path.join(self.cache_dir,key)
+        fetch_fd = os.open(entry_dir+'.fetch.lock', os.O_RDWR|os.O_CREAT, 0o664)
+        try:
+            fcntl.flock(fetch_fd,fcntl.LOCK_EX)
+            if not os.path.isdir(entry_dir):
+                self._download(s3uri, recursive, post_fetch, key, etag, **kwargs)
+        finally:
+            os.close(fetch_fd)
+
+
+    def _download( self, s3uri, recursive, post_fetch, key, etag, **kwargs):
+        """Download to temporary directory, then atomically publish as entry
+        'key'. Assumes the caller holds the entry's fetch lock.
+
+        """
+        entry_dir = os.path.join(self.cache_dir,key)
+        tmpdir = tempfile.mkdtemp(prefix='.tmp-', dir=self.cache_dir)
+        try:
+            log.info('caching %s ...', s3uri)
+            if recursive:
+                ecco_aws_s3_sync.aws_s3_sync(src=s3uri, dest=tmpdir, **kwargs)
+            else:
+                ecco_aws_s3_cp.aws_s3_cp(src=s3uri, dest=tmpdir, **kwargs)
+            if not os.listdir(tmpdir):
+                raise RuntimeError(f'Fetch of {s3uri} returned no data')
+            if post_fetch:
+                post_fetch(tmpdir)
+            size = _du(tmpdir)
+            with open(entry_dir+'.json','w') as f:
+                json.dump({'uri':s3uri, 'etag':etag, 'size':size}, f)
+            os.rename(tmpdir,entry_dir)
+            log.info('... cached %s (%d bytes) as %s', s3uri, size, entry_dir)
+        except:
+            shutil.rmtree(tmpdir,ignore_errors=True)
+            if not os.path.isdir(entry_dir):
+                _remove(entry_dir+'.json')
+            raise
+
+
+    def evict(self):
+        """Evict least recently used entries not currently in use until total
+        cache size is within max_bytes. Also removes abandoned temporary
+        download directories. If another process is evicting, returns
+        immediately.
+
+        """
+        evict_fd = os.open(os.path.join(self.cache_dir,'.evict.lock'), os.O_RDWR|os.O_CREAT, 0o664)
+        try:
+            try:
+                fcntl.flock(evict_fd,fcntl.LOCK_EX|fcntl.LOCK_NB)
+            except BlockingIOError:
+                return
+
+            for tmpdir in glob.glob(os.path.join(self.cache_dir,'.tmp-*')):
+                try:
+                    if time.time()-os.path.getmtime(tmpdir) > STALE_TMPDIR_SECONDS:
+                        shutil.rmtree(tmpdir,ignore_errors=True)
+                except OSError:
+                    pass
+
+            entries = []
+            for desc in glob.glob(os.path.join(self.cache_dir,'*.json')):
+                entry_dir = os.path.splitext(desc)[0]
+                try:
+                    with open(desc) as f:
+                        size = json.load(f)['size']
+                    entries.append((os.path.getmtime(entry_dir),size,entry_dir))
+                except (OSError,ValueError,KeyError):
+                    continue
+            total = sum(size for _,size,_ in entries)
+
+            for _,size,entry_dir in sorted(entries):
+                if total <= self.max_bytes:
+                    break
+                lock_fd = os.open(entry_dir+'.lock', os.O_RDWR|os.O_CREAT, 0o664)
+                try:
+                    fcntl.flock(lock_fd,fcntl.LOCK_EX|fcntl.LOCK_NB)
+                except BlockingIOError:
+                    # in use:
+                    os.close(lock_fd)
+                    continue
+                try:
+                    log.info('evicting %s (%d bytes)', entry_dir, size)
+                    os.remove(entry_dir+'.json')
+                    shutil.rmtree(entry_dir,ignore_errors=True)
+                    total -= size
+                finally:
+                    fcntl.flock(lock_fd,fcntl.LOCK_UN)
+                    os.close(lock_fd)
+        finally:
+            os.close(evict_fd)
+
+
+def _remove(path):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+def _du(path):
+    """Total size, in bytes, of all files in a directory hierarchy.
+
+    """
+    return sum(
+        os.path.getsize(os.path.join(root,file))
+        for root,_,files in os.walk(path) for file in files)
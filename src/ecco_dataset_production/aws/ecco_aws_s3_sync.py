@@ -2,15 +2,18 @@
 """Python wrappers for CLI-driven AWS S3 SYNC operations.
 
 """
+import concurrent.futures
+import hashlib
 import logging
 import os
 import subprocess
 import sys
+import threading
 import time
 
 from . import utils
 
-SLEEP_SECONDS = 5
+MD5_CHUNK_SIZE = 8*1024*1024
 
 
 def update_credentials( log_level=None, **kwargs):
@@ -39,15 +42,134 @@ def update_credentials( log_level=None, **kwargs):
         log.info('...done')
 
 
+def scan_local( src):
+    """Collect sizes and modification times of all files under a local
+    directory, in a single pass.
+
+    Args:
+        src (str): Local directory name.
+
+    Returns:
+        Dictionary of (size, mtime) tuples keyed by '/'-separated path
+        relative to src.
+
+    """
+    files = {}
+    for dirpath,_,filenames in os.walk(src,followlinks=True):
+        reldir = os.path.relpath(dirpath,src)
+        for filename in filenames:
+            st = os.stat(os.path.join(dirpath,filename))
+            relpath = filename if reldir=='.' else os.path.join(reldir,filename)
+            files[relpath.replace(os.sep,'/')] = (st.st_size, st.st_mtime)
+    return files
+
+
+def scan_remote( dest, client):
+    """Collect sizes, modification times and ETags of all objects under an AWS
+    S3 bucket/prefix, using a single (paginated) listing.
+
+    Args:
+        dest (str): AWS S3 URI bucket/prefix.
+        client (obj): boto3 S3 client instance.
+
+    Returns:
+        Dictionary of (size, mtime, etag) tuples keyed by object key relative
+        to the dest prefix.
+
+    """
+    bucket, prefix = _split_dest(dest)
+    return {
+        obj['Key'][len(prefix):]: (
+            obj['Size'], obj['LastModified'].timestamp(), obj['ETag'].strip('"'))
+        for obj in utils.s3_list_objects(f's3://{bucket}/{prefix}', client=client)}
+
+
+def _split_dest( dest):
+    """Split destination AWS S3 URI into bucket and key prefix, the latter
+    either empty or '/'-terminated.
+
+    """
+    bucket, prefix = utils.split_s3_uri(dest)
+    prefix = prefix.strip('/')
+    return bucket, prefix+'/' if prefix else ''
+
+
+def file_md5( path):
+    """MD5 hex digest of a local file (the ETag of a single-part AWS S3
+    upload).
+
+    """
+    digest = hashlib.md5()
+    with open(path,'rb') as f:
+        for chunk in iter(lambda: f.read(MD5_CHUNK_SIZE), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def needs_upload( local, remote, path=None):
+    """Determine whether or not a local file differs from its AWS S3 copy.
+
+    As with 'aws s3 sync', a file is uploaded if it does not exist remotely,
+    if sizes differ, or if the local file is newer. In the latter case, if the
+    local path is provided and the object has a single-part upload ETag, file
+    content is compared as well, so that files that have merely been touched
+    (e.g., regenerated identically) are not re-uploaded.
+
+    Args:
+        local (tuple): Local file (size, mtime).
+        remote (tuple): Remote object (size, mtime, etag), or None if the
+            object does not exist.
+        path (str): Optional local file name, for content comparison.
+
+    Returns:
+        True if the file should be uploaded, False otherwise.
+
+    """
+    if remote is None:
+        return True
+    size, mtime = local
+    remote_size, remote_mtime, etag = remote
+    if size != remote_size:
+        return True
+    if mtime <= remote_mtime:
+        return False
+    if path and '-' not in etag:
+        return file_md5(path) != etag
+    return True
+
+
+def plan_uploads( local_files, remote_objects):
+    """Determine which local files may need to be uploaded, based on size and
+    modification time only (see needs_upload).
+
+    Args:
+        local_files (dict): Local files, as returned by scan_local.
+        remote_objects (dict): Remote objects, as returned by scan_remote.
+
+    Returns:
+        Sorted list of relative paths of candidate files for upload.
+
+    """
+    return sorted(
+        relpath for relpath,local in local_files.items()
+        if needs_upload(local, remote_objects.get(relpath)))
+
+
 def sync_local_to_remote( src=None, dest=None, nproc=1, dryrun=False,
     log_level=None, **kwargs):
-    """Functional wrapper for multiprocess 'aws s3 sync <local> <s3uri>'
+    """Parallel, file-level equivalent of 'aws s3 sync <local> <s3uri>'.
+
+    Local files are compared against a single listing of the destination
+    bucket/prefix (see needs_upload), and only new or changed files are
+    uploaded, by a pool of nproc concurrent workers (which also perform any
+    necessary content comparisons). Credentials are updated
+    once at the outset and, if they expire, once more before retrying.
 
     Args:
         src (str): Source location (local path).
         dest (str): Destination location (AWS S3 URI).
-        nproc (int):  Maximum number of local-remote sync processes.
-        dryrun (bool): Set AWS S3 CLI argument '--dryrun'.
+        nproc (int):  Maximum number of concurrent file uploads.
+        dryrun (bool): Only report the files that would be uploaded.
         log_level (str): Optional local logging level ('DEBUG', 'INFO',
             'WARNING', 'ERROR' or 'CRITICAL').  If called by a top-level
             application, the default will be that of the parent logger ('edp'),
@@ -61,108 +183,92 @@ def sync_local_to_remote( src=None, dest=None, nproc=1, dryrun=False,
             profile (str): Optional profile to be used in combination with
                 keygen (e.g., 'saml-pub', 'default', etc.)
 
+    Returns:
+        Dictionary of sync statistics: files (number of local files), uploaded
+        (number of files uploaded, or that would be if dryrun), unchanged
+        (number of newer files with unchanged content), failed (number of
+        failed uploads), bytes (bytes uploaded), seconds (elapsed time).
+
     """
     log = logging.getLogger('edp.'+__name__)
     if log_level:
         log.setLevel(log_level)
 
-    # list of submitted processes:
-    proclist = []
-
-    # parallelize at subdirectory level(s), working our way up the tree (note
-    # that is incurs some overhead as AWS S3 checks sync status of previously-
-    # synced subdirectores/folders, but the assumption is that this overhead is
-    # more than compensated for by enabling nproc simultaneous syncs):
-
-    for (dirpath,dirnames,_) in os.walk(src,topdown=False):
-
-        this_proc_is_running = False
-
-        # s3uri destination for this directory:
-        dest_folder = os.path.relpath(dirpath,src).strip('./')
-        dest_s3uri = os.path.join(dest,dest_folder)
-
-        # s3uri destinations for this directory's subdirectories:
-        dest_sub_s3uri = []
-        for dirname in dirnames:
-            dest_sub_folder = os.path.relpath(
-                os.path.join(dirpath,dirname),src).strip('./')
-            dest_sub_s3uri.append(os.path.join(dest,dest_sub_folder))
-
-        log.debug('destination s3 uri: %s', dest_s3uri)
-        log.debug('destination sub s3 uri(s): %s', dest_sub_s3uri)
-
-        while not this_proc_is_running:
-
-            # if none of this directory's (possible) subdirectories are
-            # still syncing (blocking_procs>0) and if a process slot is
-            # available (running_procs<nproc), submit, otherwise wait:
-
-            blocking_procs  = 0
-            running_procs   = 0
-            completed_procs = 0
-            for p in proclist:
-                p.poll()
-                if p.returncode is not None:
-                    completed_procs += 1
+    start = time.perf_counter()
+    update_credentials(log_level,**kwargs)
+    client = utils.s3_client(max_pool_connections=max(nproc,10), **kwargs)
+    client_lock = threading.Lock()
+
+    local_files = scan_local(src)
+    remote_objects = scan_remote(dest, client)
+    uploads = plan_uploads(local_files, remote_objects)
+    log.info('%d local files, %d remote objects; %d new or newer files (%d bytes)',
+        len(local_files), len(remote_objects), len(uploads),
+        sum(local_files[relpath][0] for relpath in uploads))
+
+    bucket, prefix = _split_dest(dest)
+
+    def upload(relpath):
+        # returns True if uploaded, False if unchanged:
+        nonlocal client
+        path = os.path.join(src,relpath)
+        if not needs_upload(local_files[relpath], remote_objects.get(relpath), path):
+            return False
+        for attempt in range(2):
+            expired_client = client
+            try:
+                if not dryrun:
+                    expired_client.upload_file(path, bucket, prefix+relpath)
                 else:
-                    running_procs += 1
-                    # are any of these blocking?
-                    for s3uri in dest_sub_s3uri:
-                        if s3uri in p.args:
-                            blocking_procs += 1
-
-            log.debug('running_procs: %d, completed_procs: %d, blocking_procs: %d',
-                running_procs, completed_procs, blocking_procs)
-
-            if running_procs<nproc and not blocking_procs>0:
-
-                # there's room in the queue, and no subdirectory syncs are
-                # running; make sure credentials are up-to-date (because some of
-                # these subdirectory-level syncs can take a *long* time), and
-                # submit:
-                # TODO: figure out a better method for determining whether or
-                # not credentials actually need to be updated.
-
-                update_credentials(log_level,**kwargs)
-
-                cmd = [ 'aws', 's3', 'sync', '--quiet',
-                    dirpath,                # "source"
-                    dest_s3uri]             # "destination"
-                if kwargs.get('profile',None):
-                    cmd.extend(['--profile',kwargs['profile']])
-                if dryrun:
-                    cmd.append('--dryrun')
-                log.info('invoking subprocess: %s', cmd)
-                proclist.append(subprocess.Popen(
-                    cmd
-                    #stdout=subprocess.PIPE,    <- buffer overflows and hangs
-                    #stderr=subprocess.PIPE     <- for "real" ecco syncs
-                    ))
-                this_proc_is_running = True
-
+                    log.info('(dryrun) upload: %s to s3://%s/%s', path, bucket, prefix+relpath)
+                return True
+            except Exception as e:
+                if attempt or not _is_expired_credentials_error(e):
+                    raise
+                # credentials have expired mid-sync; update them once (in
+                # whichever worker gets here first) and retry:
+                with client_lock:
+                    if client is expired_client:
+                        log.warning('credentials expired; updating ...')
+                        update_credentials(log_level,**kwargs)
+                        client = utils.s3_client(
+                            max_pool_connections=max(nproc,10), **kwargs)
+
+    stats = {'files':len(local_files), 'uploaded':0, 'unchanged':0, 'failed':0,
+        'bytes':0, 'seconds':0.}
+    with concurrent.futures.ThreadPoolExecutor(
+        max_workers=nproc, thread_name_prefix='edp-s3-sync') as executor:
+        futures = {executor.submit(upload,relpath):relpath for relpath in uploads}
+        for future in concurrent.futures.as_completed(futures):
+            relpath = futures[future]
+            try:
+                uploaded = future.result()
+            except Exception as e:
+                log.error('upload of %s failed: %s', relpath, e)
+                stats['failed'] += 1
+                continue
+            if uploaded:
+                stats['uploaded'] += 1
+                stats['bytes'] += local_files[relpath][0]
+                log.debug('uploaded %s (%d of %d)', relpath, stats['uploaded'], len(uploads))
             else:
+                stats['unchanged'] += 1
 
-                # the queue is either full, or a subdirectory sync is blocking,
-                # wait for a bit:
-                time.sleep(SLEEP_SECONDS)
-
-            if this_proc_is_running:
+    stats['seconds'] = time.perf_counter() - start
+    log.info('%d files (%d bytes) uploaded, %d failed, in %.1fs (%.2f MB/s, %.1f files/s)',
+        stats['uploaded'], stats['bytes'], stats['failed'], stats['seconds'],
+        stats['bytes']/1024**2/stats['seconds'] if stats['seconds'] else 0.,
+        stats['uploaded']/stats['seconds'] if stats['seconds'] else 0.)
+    return stats
 
-                # try for the next:
-                break
 
-    # wait for all sync processes to complete and produce final diagnostics:
+def _is_expired_credentials_error( e):
+    """True if exception e is due to expired AWS credentials.
 
-    for p in proclist:
-        p.wait()
-        # as per above comment, pipe buffers overflow for large sync operations;
-        # just rely on regular sys output.
-        #stdout,stderr = p.communicate()     # read to eof and wait for returncode
-        log.info('sync process %s:', p.args)
-        log.info('   rtn:    %d', p.returncode)
-        #log.info('   stdout: %s', bytes.decode(stdout))
-        #log.info('   stderr: %s', bytes.decode(stderr))
+    """
+    response = getattr(e,'response',None) or {}
+    return response.get('Error',{}).get('Code') in (
+        'ExpiredToken','ExpiredTokenException','RequestExpired')
 
 
 def sync_remote_to_remote_or_local( src=None, dest=None,
@@ -238,8 +344,9 @@ def aws_s3_sync(
     Args:
         src (str): Source location (local path or AWS S3 URI).
         dest (str): Destination location (local path or AWS S3 URI).
-        nproc (int):  Maximum number of local-remote sync processes.
-        dryrun (bool): Set AWS S3 CLI argument '--dryrun'.
+        nproc (int):  Maximum number of concurrent local-remote file uploads.
+        dryrun (bool): Set AWS S3 CLI argument '--dryrun' (for local-remote
+            syncs, only report the files that would be uploaded).
         log_level (str): Optional local logging level ('DEBUG', 'INFO',
             'WARNING', 'ERROR' or 'CRITICAL').  If called by a top-level
             application, the default will be that of the parent logger ('edp'),
@@ -253,6 +360,10 @@ def aws_s3_sync(
             profile (str): Optional profile to be used in combination with
                 keygen (e.g., 'saml-pub', 'default', etc.)
 
+    Returns:
+        For local-remote syncs, dictionary of sync statistics (see
+        sync_local_to_remote), otherwise None.
+
     """
     log = logging.getLogger('edp.'+__name__)
     if log_level:
@@ -271,7 +382,7 @@ def aws_s3_sync(
 
     if not utils.is_s3_uri(src) and utils.is_s3_uri(dest):
         # upload:
-        sync_local_to_remote( src, dest, nproc, dryrun, log_level, **kwargs)
+        return sync_local_to_remote( src, dest, nproc, dryrun, log_level, **kwargs)
 
     elif utils.is_s3_uri(src) and utils.is_s3_uri(dest):
         # remote sync:
@@ -2,8 +2,11 @@
 
 """
 
+import boto3
+import botocore.config
 import re
 import subprocess
+import sys
 
 
 def is_s3_uri(path_or_uri_str):
@@ -21,6 +24,78 @@ def is_s3_uri(path_or_uri_str):
         return False
 
 
+def split_s3_uri(s3uri):
+    """Split an AWS S3Uri into bucket and key (or prefix) strings.
+
+    Args:
+        s3uri (str): AWS S3Uri (e.g., 's3://bucket/prefix/name').
+
+    Returns:
+        (bucket, key) tuple of strings; key is '' if s3uri references a bucket
+        only.
+
+    """
+    bucket, _, key = re.sub(r'^s3:\/\/', '', s3uri, flags=re.IGNORECASE).partition('/')
+    return bucket, key
+
+
+def s3_client( **kwargs):
+    """Create a boto3 S3 client.
+
+    Args:
+        **kwargs: Depending on run context:
+            profile (str): Optional AWS credentials profile name (e.g.,
+                'saml-pub', 'default', etc.)
+            max_pool_connections (int): Optional maximum number of connections
+                in the client's connection pool (i.e., the number of threads
+                that can use the client concurrently; default: 10).
+            endpoint_url (str): Optional AWS S3 endpoint URL, e.g., of a local
+                S3-compatible stand-in (boto3 also honors the AWS_ENDPOINT_URL
+                environment variable).
+
+    Returns:
+        boto3 S3 client instance.
+
+    """
+    session = boto3.Session(profile_name=kwargs.get('profile'))
+    config = None
+    if kwargs.get('max_pool_connections'):
+        config = botocore.config.Config(
+            max_pool_connections=kwargs['max_pool_connections'])
+    return session.client('s3', config=config, endpoint_url=kwargs.get('endpoint_url'))
+
+
+def s3_list_objects( s3uri, client=None, delimiter=None, **kwargs):
+    """List all objects under an AWS S3 bucket/prefix using a single
+    (paginated) listing.
+
+    Args:
+        s3uri (str): AWS S3Uri bucket/prefix (e.g., 's3://bucket/prefix/').
+        client (obj): Optional boto3 S3 client instance. If not provided, one
+            will be created using kwargs.
+        delimiter (str): Optional list_objects_v2 Delimiter (e.g., '/' to
+            list only the objects immediately under prefix, without
+            descending into its "subdirectories").
+        **kwargs: Passed to s3_client() if client not provided.
+
+    Returns:
+        List of object description dictionaries, each with 'Key', 'Size',
+        'ETag', and 'LastModified' keys, per boto3 list_objects_v2.
+
+    """
+    if not client:
+        client = s3_client(**kwargs)
+    bucket, prefix = split_s3_uri(s3uri)
+    list_kwargs = {'Bucket':bucket, 'Prefix':prefix}
+    if delimiter:
+        list_kwargs['Delimiter'] = delimiter
+    objects = []
+    paginator = client.get_paginator('list_objects_v2')
+    for page in paginator.paginate(**list_kwargs):
+        objects.extend(page.get('Contents',[]))
+    return objects
+
+
 def update_login_credentials( **kwargs):
     """If AWS IAM Identity Center (successor to AWS Single Sign-On) is being
     used to manage AWS access, check/update login credentials via a call to an
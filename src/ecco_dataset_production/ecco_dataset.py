@@ -10,6 +10,9 @@ Key capabilities:
 - Vector field transformations (UV to EW/NS components)
 - Native LLC90 grid to lat/lon interpolation using sparse matrices
 - Land masking for both native and lat/lon grids
+- A precision policy (see compute_dtype) under which, if ``array_precision``
+  is 'float32', data are kept in (native byte order) float32 from MDS read
+  through regridding and masking
 
 The class integrates with :class:`~ecco_dataset_production.ecco_grid.ECCOGrid`
 and :class:`~ecco_dataset_production.ecco_mapping_factors.ECCOMappingFactors`
@@ -42,6 +45,157 @@ from . import ecco_task
 
 log = logging.getLogger('edp.'+__name__)
 
+# maximum difference between float32 and float64 compute path results, relative
+# to the maximum magnitude of the float64 result (mapping factors are
+# interpolation weights, so float32 results differ by no more than a few units
+# in the last place of the largest values; see tests/test_ecco_dataset.py):
+FLOAT32_RTOL = 1e-5
+
+
+def compute_dtype( cfg):
+    """Compute path precision policy.
+
+    If cfg 'array_precision' is 'float32', variable data are cast to native
+    byte order float32 as soon as they have been read, and regridding (using
+    float32 mapping factors) and masking are performed in float32, so that no
+    float64 copies of full fields are made. Otherwise, variable data are
+    computed in float64 (or input precision, for native grid granules) and
+    cast to array_precision only when ancillary data are applied (see
+    ecco_generate_datasets.set_granule_ancillary_data).
+
+    Args:
+        cfg (dict): Parsed ECCO dataset production yaml file.
+
+    Returns:
+        numpy.dtype: float32 or float64.
+
+    """
+    if cfg and 'array_precision' in cfg and cfg['array_precision'] == 'float32':
+        return np.dtype(np.float32)
+    return np.dtype(np.float64)
+
+
+def _native_level( var, dtype):
+    """Native grid level as a flattened numpy vector of the given dtype.
+
+    Args:
+        var (numpy or dask array): Native grid level (no singleton dimensions).
+        dtype (numpy dtype): Result precision.
+
+    Returns:
+        numpy vector, a view of var if var is a contiguous numpy array of the
+        requested dtype.
+
+    """
+    # evaluates, if dask-backed:
+    return np.asarray(var).astype(dtype,copy=False).reshape(-1)
+
+
+def regrid_level( levels, level, grid, mapping_factors, out, dtype=None):
+    """Map a native grid depth level of one or more variables to the latlon
+    grid with a single sparse matrix product, using the level's fused regrid
+    operator (see ECCOMappingFactors.latlon_regrid_operator).
+
+    Args:
+        levels (list): Native grid level (numpy or dask array, no singleton
+            dimensions, e.g., (tile,j,i)) of each variable.
+        level (int): Depth level.
+        grid (ECCOGrid): Native grid (for wet point indices).
+        mapping_factors (ECCOMappingFactors): Native to latlon mapping
+            factors.
+        out (numpy.ndarray): (number of variables, nlat*nlon) result array,
+            or view thereof, written at latlon ocean points only (i.e., land
+            points are left unchanged; typically NaN filled).
+        dtype (numpy dtype): Computational precision.
+
+    """
+    operator, targets = mapping_factors.latlon_regrid_operator(
+        level=level, wet_point_indices=grid.native_wet_point_indices[level],
+        native_shape=levels[0].shape, dtype=dtype)
+    # (native level size x number of variables) block; for a single variable,
+    # a view of its (numpy) data:
+    if len(levels) == 1:
+        block = _native_level(levels[0],dtype)[:,np.newaxis]
+    else:
+        block = np.column_stack([_native_level(var,dtype) for var in levels])
+    out[:,targets] = operator.dot(block).T
+
+
+def as_latlon_stacked( datasets, variables):
+    """Recast several variables of the same task in latlon format, using one
+    sparse matrix-dense matrix product per depth level for all variables
+    (rather than one sparse matrix-vector product per variable and level).
+
+    Each level is regridded (see regrid_level) with a fused operator (see
+    ECCOMappingFactors.latlon_regrid_operator) whose columns index the
+    flattened native level directly and whose rows are the latlon ocean
+    points, so that the product of the operator and the (native level size x
+    number of variables) level values is scattered straight into a
+    preallocated, NaN (land) filled output, without intermediate wet point
+    gather or land mask arrays. Operators are built once per level and
+    reused by all variables and granules.
+
+    Args:
+        datasets (list): ECCOMDSDataset instances, sharing task, grid, and
+            mapping factors.
+        variables (list): Variable name for each dataset.
+
+    Returns:
+        List of named (using variable strings) xarray DataArrays, in variables
+        order, each identical to the result of ECCOMDSDataset.as_latlon.
+
+    """
+    if not datasets:
+        return []
+    task, grid, mapping_factors = \
+        datasets[0].task, datasets[0].grid, datasets[0].mapping_factors
+    dtype = compute_dtype(datasets[0].cfg)
+    if task.is_2d:
+        nz = 1
+    elif task.is_3d:
+        nz = grid.latlon_grid.sizes['Z']
+    else:
+        raise RuntimeError('Could not determine task dimension (2D or 3D)')
+    nlat = grid.latlon_grid['latitude'].shape[0]
+    nlon = grid.latlon_grid['longitude'].shape[0]
+
+    native = [ds.ds[variable].data.squeeze()                    # dask or numpy arrays,
+        for ds,variable in zip(datasets,variables)]             # native grid, no
+                                                                # singleton dimensions
+    # output allocation (variable,z,lat,lon), land values as NaNs, and a
+    # (variable,z,lat*lon) view for scattering to latlon ocean points:
+    stacked_as_latlon = np.full((len(variables),nz,nlat,nlon),np.nan,dtype=dtype)
+    stacked_as_latlon_flat = stacked_as_latlon.reshape(len(variables),nz,nlat*nlon)
+
+    for z in range(nz):
+        regrid_level([var if nz==1 else var[z,:] for var in native],
+            z, grid, mapping_factors, out=stacked_as_latlon_flat[:,z], dtype=dtype)
+
+    time = [pd.Timestamp(task['dynamic_metadata']['time_coverage_center'])]
+    if task.is_2d:
+        dims = ['time','latitude','longitude']
+        coords = [time, grid.latlon_grid['latitude'].data, grid.latlon_grid['longitude'].data]
+    else:
+        dims = ['time','Z','latitude','longitude']
+        coords = [time, grid.latlon_grid['Z'].data,
+            grid.latlon_grid['latitude'].data, grid.latlon_grid['longitude'].data]
+
+    # note: could "promote" to xr.Dataset and add time_bnds coordinates here
+    # as had been done in the original code but, since this is done during
+    # dataset production by the calling, and folow-on metadata/attributes,
+    # code just skip for now.
+
+    return [
+        xr.DataArray(
+            name=variable,
+            # add a "time" axis ((z,lat,lon) -> (time,z,lat,lon), or (lat,lon)
+            # -> (time,lat,lon)):
+            data=np.expand_dims(
+                stacked_as_latlon[i,0] if task.is_2d else stacked_as_latlon[i],0),
+            dims=dims,
+            coords=coords)
+        for i,variable in enumerate(variables)]
+
 
 class ECCOMDSDataset(object):
     """Class that supports dataset production-oriented operations on ECCO
@@ -350,6 +504,20 @@ class ECCOMDSDataset(object):
                     log.error(e1+e2+e3)
                     raise RuntimeError(e1+e2+e3)
 
+            # precision policy (see compute_dtype): if float32, cast (and
+            # byteswap, if necessary) variable data now, before any further
+            # evaluation:
+            if self.ds is not None and compute_dtype(self.cfg) == np.float32:
+                for var in self.ds.data_vars:
+                    if np.issubdtype(self.ds[var].dtype,np.floating) and \
+                        self.ds[var].dtype != np.float32:
+                        self.ds[var].data = self.ds[var].data.astype(np.float32)
+
+            # if grid is in "eager" mode, operate on numpy arrays throughout
+            # (Dataset.load() operates in-place):
+            if self.grid.eager and self.ds is not None:
+                self.ds.load()
+
 
     def determine_mds_prec( self, mds_meta_file):
         """Get data precision (dataprec string) from MITgcm meta file, return as
@@ -411,105 +579,15 @@ class ECCOMDSDataset(object):
                 O --> P
                 P --> Q[Return DataArray]
 
+        See as_latlon_stacked for the equivalent multi-variable operation.
+
         """
-        if self.task.is_2d:
-
-            # output allocation:
-            variable_as_latlon = np.zeros(
-                (self.grid.latlon_grid['latitude'].shape[0],
-                self.grid.latlon_grid['longitude'].shape[0]))
-
-            # operate on surface (z=0) only:
-            var = self.ds[variable].data.squeeze()                  # dask array, native grid,
-                                                                    # no singleton dimensions
-            var = var.vindex[self.grid.native_wet_point_indices[0]] # dask array, native grid,
-                                                                    # no singleton dimensions,
-                                                                    # surface wet points only,
-                                                                    # as vector
-
-            # map from native to latlon using sparse matrix multiplication                                                                    
-            var_latlon = self.mapping_factors.native_to_latlon_mapping_factors(level=0).T.dot(var.compute())
-                                                                    # numpy (vector) array,
-                                                                    # as latlon
-
-            # apply a 2D land mask by setting all nan points in the 'mapping_factors.latlon_land_mask' in level 0 to nan in the variable as well:
-            var_latlon_land_masked = np.where(
-                np.isnan(self.mapping_factors.latlon_land_mask(level=0)), np.nan, var_latlon)
-                                                                    # land values as NaNs
-
-            # reorder to the dimension of teh latlon grid:                                                                    
-            variable_as_latlon[:] = var_latlon_land_masked.reshape( # numpy 1D array to
-                self.grid.latlon_grid['latitude'].shape[0],         # lat x lon array
-                self.grid.latlon_grid['longitude'].shape[0])
-
-            # add a "time" axis ((lat,lon) -> (time,lat,lon)):
-            variable_as_latlon = np.expand_dims(variable_as_latlon,0)
-
-            variable_as_latlon_da = xr.DataArray(
-                name=variable,
-                data=variable_as_latlon,
-                dims=['time','latitude','longitude'],
-                coords=[
-                    [pd.Timestamp(self.task['dynamic_metadata']['time_coverage_center'])],
-                    self.grid.latlon_grid['latitude'].data,
-                    self.grid.latlon_grid['longitude'].data])
-
-        elif self.task.is_3d:
-
-            # num vertical depths:
-            nz = self.grid.latlon_grid.sizes['Z']
-
-            # output allocation:
-            variable_as_latlon = np.zeros(
-                (nz,
-                self.grid.latlon_grid['latitude'].shape[0],
-                self.grid.latlon_grid['longitude'].shape[0]))
-
-            var = self.ds[variable].data.squeeze()                      # dask array, native grid,
-                                                                        # no singleton dimensions
-            for z in range(nz):
-
-                var_z = var[z,:].vindex[                                # dask array, native grid,
-                    self.grid.native_wet_point_indices[z]]              # no singleton dimensions,
-                                                                        # level z wet points only,
-                                                                        # as vector
-                var_z_latlon = \
-                    self.mapping_factors.native_to_latlon_mapping_factors(level=z).T.dot(var_z.compute())
-                                                                        # numpy (vector) array,
-                                                                        # level z, as latlon
-                var_z_latlon_land_masked = np.where(
-                    np.isnan(self.mapping_factors.latlon_land_mask(level=z)), np.nan, var_z_latlon)
-                                                                        # land values, level z,
-                                                                        # as NaNs
-                variable_as_latlon[z,:] = var_z_latlon_land_masked.reshape(
-                    self.grid.latlon_grid['latitude'].shape[0],         # numpy 1D array to
-                    self.grid.latlon_grid['longitude'].shape[0])        # lat x lon array
-
-
-            # add a "time" axis ((z,lat,lon) -> (time,z,lat,lon)):
-            variable_as_latlon = np.expand_dims(variable_as_latlon,0)
-
-            variable_as_latlon_da = xr.DataArray(
-                name=variable,
-                data=variable_as_latlon,
-                dims=['time','Z','latitude','longitude'],
-                coords=[
-                    [pd.Timestamp(self.task['dynamic_metadata']['time_coverage_center'])],
-                    self.grid.latlon_grid['Z'].data,
-                    self.grid.latlon_grid['latitude'].data,
-                    self.grid.latlon_grid['longitude'].data])
-
-        # note: could "promote" to xr.Dataset and add time_bnds coordinates here
-        # as had been done in the original code but, since this is done during
-        # dataset production by the calling, and folow-on metadata/attributes,
-        # code just skip for now.
-
-        return variable_as_latlon_da
+        return as_latlon_stacked([self],[variable])[0]
 
 
     def apply_land_mask_to_native_variable( self, variable=None):
-        """ Apply 1/NaN-based, grid-appropriate land mask to specified variable
-        of 'native' results type.
+        """ Apply grid-appropriate land mask to specified variable of 'native'
+        results type by setting land points to NaN.
 
         Args:
             variable (str): ECCO results variable name.
@@ -517,16 +595,17 @@ class ECCOMDSDataset(object):
         Returns:
             No return; self.ds[variable] masked in-place.
 
+        Notes:
+            Masking is performed as a NaN assignment on the variable's own
+            array buffer using the ECCOGrid-cached boolean land mask; no
+            full-size multiplier or result arrays are allocated (other than
+            the one-time evaluation of dask-backed, or non-float, data).
+
         TODO: Modify routine so lon/lat/native question is answered by
         task['granule'] filename; then function can be generically-named.
 
         """
-        ## get native land mask data from ECCO grid dataset... :
-        #ecco_grid_ds = xr.open_dataset(os.path.join(
-        #    self.grid.grid_dir,self.cfg['ecco_native_grid_filename']))
-
-        # apply grid-appropriate mask to the variable of interest:
-        # ...and apply grid-appropriate mask to the variable of interest:
+        # select grid-appropriate mask for the variable of interest:
         if self.is_variable_c_data(variable):
             mask_type = 'maskC'
         elif self.is_variable_w_data(variable):
@@ -535,17 +614,18 @@ class ECCOMDSDataset(object):
             mask_type = 'maskS'
         else:
             raise RuntimeError(f"Could not determine grid type for variable '{variable}'")
-        # numpy slice object:
-        if self.is_variable_3d(variable):
-            so = np.s_[:]
-        else:
-            so = np.s_[0,:]
-        mask = self.grid.native_grid[mask_type]
-        if mask.chunks is not None:
-            mask.load()
-        self.ds[variable] = self.ds[variable] * np.where(mask[so]==True,1,np.nan)
-        #self.ds[variable] = self.ds[variable] * np.where(self.grid.native_grid[mask_type][so]==True,1,np.nan)
-        #self.ds[variable] = self.ds[variable] * np.where(ecco_grid_ds[mask_type][so]==True,1,np.nan)
+        land_mask = self.grid.native_land_mask(
+            mask_type=mask_type, is_3d=self.is_variable_3d(variable))
+
+        data = np.asarray(self.ds[variable].data)   # evaluates if dask-backed
+        if not np.issubdtype(data.dtype,np.floating):
+            data = data.astype(np.float64)
+        elif not data.flags.writeable:
+            data = data.copy()
+        # land mask spans the trailing (spatial) dimensions, e.g., (tile,j,i)
+        # or (k,tile,j,i), of the variable:
+        data[...,land_mask] = np.nan
+        self.ds[variable].data = data
 
 
     def is_variable_c_data( self, variable=None):
@@ -0,0 +1,338 @@
+"""Dependency-tracked build manifest for ECCO mapping factors.
+
+Creating mapping factors (grid mappings, land masks, latlon grid, and per-level
+sparse matrices; see utils.mapping_factors_utils.create_all_factors) is
+expensive, so artifacts are rebuilt only if they are stale. A JSON manifest in
+the mapping factors directory records, for each artifact, its size,
+modification time and SHA-256 checksum, together with the fingerprint of the
+inputs it was built from:
+
+- grid mappings and the latlon grid depend on the input grid file(s) (hashed)
+  and the configuration parameters that determine the mappings
+  (FACTORS_CONFIG_KEYS);
+- land masks depend on the grid mappings of all points;
+- each level's sparse matrix depends on that level's grid mappings and land
+  mask.
+
+Since dependencies are tracked by checksum, a change to the grid or to a
+mapping parameter invalidates exactly the artifacts derived from it, while an
+upstream artifact that is rebuilt with identical content does not force its
+dependents to be rebuilt. Artifacts that are missing, or modified since they
+were recorded, are also stale. Existing artifacts of a build that predates the
+manifest may be adopted as current (see ECCOFactorsManifest.adopt).
+
+Example:
+    >>> from ecco_dataset_production import ecco_factors_manifest
+    >>> manifest = ecco_factors_manifest.ECCOFactorsManifest(mapping_factors_dir)
+    >>> manifest.set_inputs(ecco_factors_manifest.factors_input_files(cfg), cfg)
+    >>> if not manifest.is_current('land_mask/ecco_latlon_land_mask_0.xz',
+    ...     depends_on=['ecco_latlon_grid_mappings_all.xz']):
+    ...     ... # rebuild, then:
+    ...     manifest.record('land_mask/ecco_latlon_land_mask_0.xz',
+    ...         depends_on=['ecco_latlon_grid_mappings_all.xz'])
+
+"""
+
+import glob
+import hashlib
+import json
+import logging
+import os
+
+from . import ecco_mapping_factors
+
+MANIFEST_FILENAME = 'factors_manifest.json'
+MANIFEST_VERSION = 1
+
+# configuration parameters that determine mapping factors content:
+FACTORS_CONFIG_KEYS = (
+    'custom_grid_and_factors', 'latlon_effective_grid_radius',
+    'latlon_grid_area_extent', 'latlon_grid_dims', 'latlon_grid_resolution',
+    'latlon_max_lat', 'num_vertical_levels', 'source_grid_min_L',
+    'source_grid_max_L')
+
+# artifact names, relative to the mapping factors directory:
+GRID_MAPPINGS_ALL = 'ecco_latlon_grid_mappings_all.xz'
+GRID_MAPPINGS_2D = 'ecco_latlon_grid_mappings_2D.xz'
+LATLON_GRID = f'{ecco_mapping_factors.LATLON_GRID_DIR}/{ecco_mapping_factors.LATLON_GRID_PICKLE}'
+
+log = logging.getLogger('edp.'+__name__)
+
+
+def grid_mappings_3d( k):
+    """Level k 3D grid mappings artifact name."""
+    return f'3D/ecco_latlon_grid_mappings_3D_{k}.xz'
+
+
+def land_mask( k):
+    """Level k land mask artifact name."""
+    return f'land_mask/ecco_latlon_land_mask_{k}.xz'
+
+
+def sparse_matrix( k):
+    """Level k sparse matrix artifact name."""
+    return f'sparse/sparse_matrix_{k}.npz'
+
+
+def latlon_grid_store():
+    """Latlon grid array store artifact names."""
+    return [f'{ecco_mapping_factors.LATLON_GRID_DIR}/{name}.npy'
+        for name in ecco_mapping_factors.LATLON_GRID_STORE_ARRAYS]
+
+
+def sparse_matrix_dependencies( k, custom=False):
+    """Artifacts from which level k's sparse matrix is built."""
+    depends_on = [grid_mappings_3d(k)] if k else [GRID_MAPPINGS_2D, grid_mappings_3d(k)]
+    return depends_on if custom else depends_on + [land_mask(k)]
+
+
+def expected_artifacts( nk, dims, custom=False):
+    """Artifacts of a complete mapping factors build, and their dependencies.
+
+    Args:
+        nk (int): Number of vertical levels.
+        dims (list): Mapping factors dimensions, e.g., ['2D','3D'].
+        custom (bool): If True, custom grid and factors build (latlon grid
+            and land masks are neither created nor tracked).
+
+    Returns:
+        Dictionary of artifact name keyed lists of the artifacts it depends
+        on, in build order.
+
+    """
+    artifacts = {GRID_MAPPINGS_ALL: []}
+    if '2D' in dims:
+        artifacts[GRID_MAPPINGS_2D] = []
+    if '3D' in dims:
+        artifacts.update({grid_mappings_3d(k): [] for k in range(nk)})
+    if not custom:
+        artifacts.update({name: [] for name in [LATLON_GRID] + latlon_grid_store()})
+        artifacts.update({land_mask(k): [GRID_MAPPINGS_ALL] for k in range(nk)})
+    for k in range(nk):
+        artifacts[sparse_matrix(k)] = [name for name in
+            sparse_matrix_dependencies(k, custom) if name in artifacts]
+    return artifacts
+
+
+def factors_input_files( cfg):
+    """Input grid file(s) referenced by a mapping factors build: the ECCO grid
+    file, or all custom source and target grid files.
+
+    """
+    if cfg.get('custom_grid_and_factors'):
+        return sorted(
+            path for subdir in ('source_grids','target_grids')
+            for path in glob.glob(os.path.join(cfg['ecco_grid_dir'], subdir, '*'))
+            if os.path.isfile(path))
+    return [os.path.join(cfg['ecco_grid_dir'], cfg['ecco_grid_filename'])]
+
+
+def file_sha256( path, blocksize=1<<20):
+    """SHA-256 hex digest of a file."""
+    sha256 = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(blocksize), b''):
+            sha256.update(block)
+    return sha256.hexdigest()
+
+
+def _fingerprint( obj):
+    return hashlib.sha256(json.dumps(obj, sort_keys=True, default=str).encode()).hexdigest()
+
+
+class ECCOFactorsManifest(object):
+    """Mapping factors build manifest.
+
+    Args:
+        mapping_factors_dir (str): Mapping factors directory, in which the
+            manifest file (MANIFEST_FILENAME) is read and written.
+
+    Attributes:
+        inputs (dict): Input grid file checksums and configuration parameters
+            of the current build (see set_inputs).
+        artifacts (dict): Recorded artifact entries, by artifact name.
+
+    """
+    def __init__( self, mapping_factors_dir):
+        self.mapping_factors_dir = str(mapping_factors_dir)
+        self.path = os.path.join(self.mapping_factors_dir, MANIFEST_FILENAME)
+        self.inputs = None
+        self.artifacts = {}
+        self._input_files = {}
+        try:
+            with open(self.path) as f:
+                manifest = json.load(f)
+            if manifest.get('version') == MANIFEST_VERSION:
+                self.artifacts = manifest.get('artifacts', {})
+                self._input_files = manifest.get('input_files', {})
+        except (OSError, ValueError):
+            pass
+
+
+    def set_inputs( self, input_files, cfg):
+        """Set the inputs of the current build.
+
+        Args:
+            input_files (list): Input grid file names (see
+                factors_input_files). Files are hashed only if their size or
+                modification time differ from those previously recorded.
+            cfg (dict): Configuration; only FACTORS_CONFIG_KEYS are
+                referenced.
+
+        """
+        grid = {}
+        for path in input_files:
+            stat = os.stat(path)
+            key = os.path.abspath(path)
+            entry = self._input_files.get(key)
+            if not entry or entry['stat'] != [stat.st_size, stat.st_mtime_ns]:
+                log.info('hashing %s', path)
+                entry = {'stat': [stat.st_size, stat.st_mtime_ns], 'sha256': file_sha256(path)}
+                self._input_files[key] = entry
+            grid[os.path.basename(path)] = entry['sha256']
+        self.inputs = {
+            'grid': grid,
+            'config': {key: cfg.get(key) for key in FACTORS_CONFIG_KEYS}}
+
+
+    def _inputs_fingerprint( self, depends_on):
+        """Fingerprint of the build inputs and dependency checksums of an
+        artifact (None if a dependency has not been recorded)."""
+        checksums = [self.artifacts.get(name,{}).get('sha256') for name in depends_on]
+        if None in checksums:
+            return None
+        return _fingerprint([self.inputs, list(depends_on), checksums])
+
+
+    def _stat( self, name):
+        try:
+            stat = os.stat(os.path.join(self.mapping_factors_dir, name))
+        except OSError:
+            return None
+        return [stat.st_size, stat.st_mtime_ns]
+
+
+    def is_current( self, name, depends_on=()):
+        """True if artifact exists, is unmodified since it was recorded, and
+        was built from the current inputs and dependencies.
+
+        """
+        entry = self.artifacts.get(name)
+        if not entry or self._stat(name) != entry['stat']:
+            return False
+        fingerprint = self._inputs_fingerprint(depends_on)
+        return fingerprint is not None and entry['inputs'] == fingerprint
+
+
+    def record( self, name, depends_on=()):
+        """Record a (re)built artifact, and save the manifest.
+
+        """
+        self.artifacts[name] = {
+            'stat': self._stat(name),
+            'sha256': file_sha256(os.path.join(self.mapping_factors_dir, name)),
+            'inputs': self._inputs_fingerprint(depends_on),
+            'depends_on': list(depends_on)}
+        self.save()
+
+
+    def adopt( self, expected):
+        """Record existing artifacts of a build that predates the manifest as
+        current, rather than rebuilding them (if no artifacts have yet been
+        recorded).
+
+        Args:
+            expected (dict): Expected artifacts and their dependencies, in
+                build order (see expected_artifacts).
+
+        Returns:
+            List of adopted artifact names.
+
+        """
+        if self.artifacts:
+            return []
+        adopted = []
+        for name,depends_on in expected.items():
+            if self._stat(name) is not None:
+                self.record(name, [d for d in depends_on if d in self.artifacts])
+                adopted.append(name)
+        if adopted:
+            log.warning(
+                '%d existing mapping factors files in %s, created without a build manifest, '
+                'recorded as current; remove them to force a rebuild',
+                len(adopted), self.mapping_factors_dir)
+        return adopted
+
+
+    def save(self):
+        """Write the manifest (atomically).
+
+        """
+        os.makedirs(self.mapping_factors_dir, exist_ok=True)
+        tmp = f'{self.path}.{os.getpid()}.tmp'
+        with open(tmp, 'w') as f:
+            json.dump({
+                'version': MANIFEST_VERSION,
+                'inputs': self.inputs,
+                'input_files': self._input_files,
+                'artifacts': self.artifacts}, f, indent=1, sort_keys=True)
+        os.replace(tmp, self.path)
+
+
+    def check( self, expected=None, verify_checksums=True):
+        """Verify mapping factors against the manifest.
+
+        Args:
+            expected (dict): Optional expected artifacts and their
+                dependencies (see expected_artifacts); if not provided, all
+                recorded artifacts are checked.
+            verify_checksums (bool): If True, recompute artifact checksums,
+                otherwise compare sizes and modification times only.
+
+        Returns:
+            Dictionary of problem descriptions ('missing', 'unrecorded',
+            'modified', 'corrupt', or 'stale') by artifact name; empty if all
+            artifacts are present, intact, and current.
+
+        """
+        if expected is None:
+            expected = {name: entry['depends_on'] for name,entry in self.artifacts.items()}
+        problems = {}
+        for name,depends_on in expected.items():
+            stat = self._stat(name)
+            entry = self.artifacts.get(name)
+            if stat is None:
+                problems[name] = 'missing'
+            elif not entry:
+                problems[name] = 'unrecorded'
+            elif stat[0] != entry['stat'][0]:
+                problems[name] = 'modified'
+            elif verify_checksums and file_sha256(
+                os.path.join(self.mapping_factors_dir, name)) != entry['sha256']:
+                problems[name] = 'corrupt'
+            elif not verify_checksums and stat != entry['stat']:
+                problems[name] = 'modified'
+            elif self.inputs is not None and \
+                entry['inputs'] != self._inputs_fingerprint(depends_on):
+                problems[name] = 'stale'
+        return problems
+
+
+def check_factors( cfg, dims):
+    """Verify a mapping factors directory against its build manifest and the
+    current input grid and configuration.
+
+    Args:
+        cfg (dict): Configuration (see create_factors).
+        dims (list): Mapping factors dimensions, e.g., ['2D','3D'].
+
+    Returns:
+        Dictionary of problem descriptions by artifact name (see
+        ECCOFactorsManifest.check); empty if the mapping factors are complete,
+        intact, and current.
+
+    """
+    manifest = ECCOFactorsManifest(cfg['mapping_factors_dir'])
+    manifest.set_inputs(factors_input_files(cfg), cfg)
+    return manifest.check(expected_artifacts(
+        cfg['num_vertical_levels'], dims, bool(cfg.get('custom_grid_and_factors'))))
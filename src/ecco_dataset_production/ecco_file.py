@@ -2,11 +2,191 @@
 Filename string classes for ECCO MDS results files (ECCOMDSFilestr) and ECCO
 production results (granule) distribution files (ECCOGranuleFilestr).
 
+For high-volume use (e.g., inventory scans and task grouping over millions of
+file names), parse_mds_filestr and parse_granule_filestr return memoized,
+lightweight parsed-filename records, and parse_many parses entire lists of MDS
+file names into columnar arrays in a single pass.
+
 """
 
 import datetime as dt
+import functools
 import re
 
+import numpy as np
+
+PARSE_CACHE_SIZE = 2**16
+
+# (order matters; alternatives are tried left to right at each position)
+_MDS_AVERAGING_PERIODS = 'day_snap|mon_snap|snap|day_mean|mon_mean'
+_GRANULE_AVERAGING_PERIOD_RE = re.compile('_snap|_day_mean|_mon_mean')
+
+# <prefix>_<averaging_period>.<time>.<ext>, where prefix ends at the first
+# occurrence of an averaging period (ECCO variable names may include
+# underscores):
+_MDS_FILESTR_PATTERN = \
+    r'((?:(?!_(?:{0})).)*)_({0}).(\d{{10}})(?:.(.*))?'.format(_MDS_AVERAGING_PERIODS)
+_MDS_FILESTR_RE = re.compile(_MDS_FILESTR_PATTERN, re.DOTALL)
+# same, applied to newline-separated lists of names, with non-matching names
+# yielding empty fields:
+_MDS_FILESTRS_RE = re.compile(
+    r'^(?:' + _MDS_FILESTR_PATTERN + r'|.*)$', re.MULTILINE)
+
+
+class ECCOMDSFileFields(object):
+    """Parsed ECCO MDS file name components, as returned by
+    parse_mds_filestr. Instances are shared by the parse cache and should be
+    treated as read-only.
+
+    """
+    __slots__ = ('prefix','averaging_period','time','ext')
+
+    def __init__( self, prefix, averaging_period, time, ext):
+        self.prefix = prefix
+        self.averaging_period = averaging_period
+        self.time = time
+        self.ext = ext
+
+
+    def __repr__(self):
+        return (f'{type(self).__name__}(prefix={self.prefix!r}, '
+            f'averaging_period={self.averaging_period!r}, time={self.time!r}, '
+            f'ext={self.ext!r})')
+
+
+class ECCOGranuleFileFields(object):
+    """Parsed ECCO granule file name components, as returned by
+    parse_granule_filestr. Instances are shared by the parse cache and should
+    be treated as read-only.
+
+    """
+    __slots__ = (
+        'prefix','averaging_period','date','version','grid_type','grid_label','ext')
+
+    def __init__( self, prefix, averaging_period, date, version, grid_type,
+        grid_label, ext):
+        self.prefix = prefix
+        self.averaging_period = averaging_period
+        self.date = date
+        self.version = version
+        self.grid_type = grid_type
+        self.grid_label = grid_label
+        self.ext = ext
+
+
+    def __repr__(self):
+        return type(self).__name__ + '(' + ', '.join(
+            f'{k}={getattr(self,k)!r}' for k in self.__slots__) + ')'
+
+
+@functools.lru_cache(maxsize=PARSE_CACHE_SIZE)
+def parse_mds_filestr(filestr):
+    """Parse an ECCO MDS file name of the form
+    <prefix>_<averaging_period>.<time>.<ext> (memoized).
+
+    Args:
+        filestr (str): ECCO MDS file name.
+
+    Returns:
+        ECCOMDSFileFields instance.
+
+    Raises:
+        ValueError if filestr is not an ECCO MDS file name.
+
+    """
+    mo = _MDS_FILESTR_RE.fullmatch(filestr)
+    if not mo:
+        raise ValueError(
+            f'unrecognized file string format; must be of the form {ECCOMDSFilestr.fmt}')
+    prefix, averaging_period, time, ext = mo.groups()
+    return ECCOMDSFileFields(prefix, averaging_period, time, ext or '')
+
+
+@functools.lru_cache(maxsize=PARSE_CACHE_SIZE)
+def parse_granule_filestr(filestr):
+    """Parse an ECCO granule file name of the form
+    <prefix>_<averaging_period>_<date>_ECCO_<version>_<grid_type>_<grid_label>.nc
+    or, if time-invariant, <prefix>_ECCO_<version>_<grid_type>_<grid_label>.nc
+    (memoized).
+
+    Args:
+        filestr (str): ECCO granule (path and) file name.
+
+    Returns:
+        ECCOGranuleFileFields instance.
+
+    Raises:
+        ValueError if filestr is not an ECCO granule file name.
+
+    """
+    # remove path if it exists
+    filestr = filestr.rsplit('/',1)[-1]
+
+    # if a time-invariant granule, it will not have 'day_mean', 'mon_mean',
+    # or 'snap' in the name
+    if not any(period in filestr for period in ['day_mean', 'mon_mean', 'snap']):
+        # Format: <prefix>_ECCO_<version>_<grid_type>_<grid_label>.nc
+        # Example: GRID_GEOMETRY_ECCO_V4r4_native_llc0090.nc
+        # (we can reliably split on '_ECCO_' to separate the prefix from the
+        # rest of the filestring, and then parse the remaining fields)
+        try:
+            prefix, remainder = filestr.split('_ECCO_')[:2]
+            version, grid_type, grid_label_and_ext = remainder.split('_', 2)
+            grid_label, ext = grid_label_and_ext.split('.')
+        except ValueError:
+            raise ValueError(
+                f'unrecognized time-invariant file string format; must be of the form <prefix>_ECCO_<version>_<grid_type>_<grid_label>.nc')
+        return ECCOGranuleFileFields(
+            prefix, 'time-invariant', None, version, grid_type, grid_label, ext)
+
+    # Time-dependent formats
+    try:
+        #tmp: quick fix for Darwin:
+        #re_so = re.search('_day_snap|_mon_snap|_snap|_day_mean|_mon_mean',filestr)
+        start, end = _GRANULE_AVERAGING_PERIOD_RE.search(filestr).span()
+        # remaining fields are reliably separated by '_'; parse accordingly:
+        date,_,version,grid_type,grid_label_and_ext = filestr[end+1:].split('_')
+        grid_label,ext = grid_label_and_ext.split('.')
+    except (AttributeError, ValueError):
+        raise ValueError(
+            f'unrecognized file string format; must be of the form {ECCOGranuleFilestr.fmt}')
+    return ECCOGranuleFileFields(
+        filestr[:start], filestr[start+1:end], date, version, grid_type,
+        grid_label, ext)
+
+
+def parse_many(names):
+    """Parse a list of ECCO MDS file names into columnar arrays, in a single
+    regular expression pass.
+
+    Args:
+        names (list): ECCO MDS file names (without path; names may not contain
+            newlines).
+
+    Returns:
+        Dictionary of equal-length numpy string arrays with keys 'prefix',
+        'averaging_period', 'time', and 'ext', and a boolean array, 'valid',
+        that is False for names that could not be parsed (and for which all
+        other fields are empty strings).
+
+    Example:
+        >>> fields = parse_many(['SSH_day_mean.0000000012.data', 'README'])
+        >>> fields['time'][fields['valid']]
+        array(['0000000012'], dtype='<U10')
+
+    """
+    keys = ('prefix','averaging_period','time','ext')
+    names = list(names)
+    if not names:
+        return {**{k:np.array([],dtype=str) for k in keys}, 'valid':np.array([],dtype=bool)}
+    matches = _MDS_FILESTRS_RE.findall('\n'.join(names))
+    if len(matches) != len(names):
+        raise ValueError('file names may not contain newlines')
+    table = np.array(matches, dtype=str)
+    fields = {k:table[:,i] for i,k in enumerate(keys)}
+    fields['valid'] = fields['time'] != ''
+    return fields
+
 
 class ECCOMDSFilestr(object):
     """Gathers operations on ECCO MDS results file names of the form
@@ -42,23 +222,12 @@ class ECCOMDSFilestr(object):
 
         """
         if filestr:
-            # use filestr to set all attributes (a little complicated because
-            # ECCO variable names may include underscores):
-            try:
-                #tmp: quick fix for the Darwin ocean biochemistry variables:
-                re_so = re.search('_day_snap|_mon_snap|_snap|_day_mean|_mon_mean',filestr)
-                #re_so = re.search('_day_snap|_day_mean|_mon_mean',filestr)
-                
-                self.prefix = filestr[:re_so.span()[0]]
-
-                self.averaging_period = filestr[re_so.span()[0]+1:re_so.span()[1]]
-                time_and_ext = filestr[re_so.span()[1]+1:]
-                re_mo = re.match(r'\d{10}',time_and_ext)
-                self.time = time_and_ext[:re_mo.span()[1]]
-                self.ext = time_and_ext[re_mo.span()[1]+1:]
-            except:
-                raise ValueError(
-                    f'unrecognized file string format; must be of the form {ECCOMDSFilestr.fmt}')
+            # use filestr to set all attributes:
+            fields = parse_mds_filestr(filestr)
+            self.prefix = fields.prefix
+            self.averaging_period = fields.averaging_period
+            self.time = fields.time
+            self.ext = fields.ext
         else:
             # set attributes that may have been provided:
             self.prefix = kwargs.pop('prefix',None)
@@ -156,68 +325,14 @@ class ECCOGranuleFilestr(object):
             # use filestr to set all attributes
             self.str = filestr
             self._re_filestr = None
-            self.averaging_period = None
-            self.grid_type = None
-            self.date = None
-            self.version = None
-            self.grid_label = None
-            self.ext = None
-            self.prefix = None
-
-            # first, determine if this is a time-invariant granule.
-            # if so, it will not have 'day_mean', 'mon_mean', or 'snap' in the name
-            time_invariant = False
-            if not any(period in self.str for period in ['day_mean', 'mon_mean', 'snap']):
-                time_invariant = True
-
-            if time_invariant:
-                # Format: <prefix>_ECCO_<version>_<grid_type>_<grid_label>.nc
-                # Example: GRID_GEOMETRY_ECCO_V4r4_native_llc0090.nc
-                try:
-                    # remove path if it exists
-                    if '/' in filestr:
-                        filestr = filestr.split('/')[-1]
-
-                    # parsing time invariant granule filestring is a little simpler because we know the averaging period is 'time-invariant' and therefore not included in the filestring; we can reliably split on '_ECCO_' to separate the prefix from the rest of the filestring, and then parse the remaining fields accordingly:
-                    tmp_split = filestr.split('_ECCO_')
-                    self.prefix = tmp_split[0]
-                    self.version, self.grid_type, grid_label_and_ext = tmp_split[1].split('_', 2)
-
-                    self.grid_label, self.ext = grid_label_and_ext.split('.')
-                    self.averaging_period = 'time-invariant'
-
-                    # print('parsed time-invariant granule filestring successfully:')
-                    # # print out all the self attributes at this point
-                    # print(f'prefix: {self.prefix}')
-                    # print(f'version: {self.version}')
-                    # print(f'grid_type: {self.grid_type}')
-                    # print(f'grid_label: {self.grid_label}')
-                    # print(f'ext: {self.ext}')
-
-                except ValueError:
-                     raise ValueError(
-                        f'unrecognized time-invariant file string format; must be of the form <prefix>_ECCO_<version>_<grid_type>_<grid_label>.nc')
-
-            else:
-                # Time-dependent formats
-                try:
-                    # remove path if it exists
-                    if '/' in filestr:
-                        filestr = filestr.split('/')[-1]
-                        
-                    #tmp: quick fix for Darwin:
-                    #re_so = re.search('_day_snap|_mon_snap|_snap|_day_mean|_mon_mean',filestr)
-                    re_so = re.search('_snap|_day_mean|_mon_mean',filestr)
-                    self.prefix = filestr[:re_so.span()[0]]
-                    self.averaging_period = filestr[re_so.span()[0]+1:re_so.span()[1]]
-                    date_version_grid_type_grid_label_and_ext = filestr[re_so.span()[1]+1:]
-                    # remaining fields are reliably separated by '_'; parse accordingly:
-                    self.date,_,self.version,self.grid_type,grid_label_and_ext = \
-                        filestr[re_so.span()[1]+1:].split('_')
-                    self.grid_label,self.ext = grid_label_and_ext.split('.')
-                except:
-                    raise ValueError(
-                        f'unrecognized file string format; must be of the form {ECCOGranuleFilestr.fmt}')
+            fields = parse_granule_filestr(filestr)
+            self.prefix = fields.prefix
+            self.averaging_period = fields.averaging_period
+            self.date = fields.date
+            self.version = fields.version
+            self.grid_type = fields.grid_type
+            self.grid_label = fields.grid_label
+            self.ext = fields.ext
         else:
             # set attributes that may have been provided:
             self.prefix = kwargs.pop('prefix',None)
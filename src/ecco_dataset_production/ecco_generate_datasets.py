@@ -27,7 +27,10 @@ import netCDF4
 import numpy as np
 import os
 import tempfile
+import threading
+import time
 import pandas as pd
+import shutil
 import uuid
 import xarray as xr
 import yaml
@@ -38,15 +41,25 @@ from . import aws
 from . import ecco_dataset
 from .config import ECCODatasetProductionConfig
 from . import ecco_file
+from . import ecco_granule_cache
 from . import ecco_grid
+from . import ecco_inventory
 from . import ecco_mapping_factors
 from . import ecco_metadata
+from . import ecco_pipeline
 from . import ecco_podaac_metadata
+from . import ecco_shared_store
 from . import ecco_task
+from . import ecco_tasklist
+from . import ecco_work_queue
+
+# default per-stage concurrency limits for pipelined execution:
+DEFAULT_PIPELINE_CONCURRENCY = {'fetch':4, 'compute':1, 'write':1, 'upload':4}
 
 
 def ecco_make_granule( task, cfg,
-    grid=None, mapping_factors=None, metadata=None, log_level=None, **kwargs):
+    grid=None, mapping_factors=None, metadata=None, log_level=None, granule_cache=None,
+    **kwargs):
     """Create PO.DAAC/ESDIS-ready ECCO granule per instructions provided in
     input task descriptor.
 
@@ -85,6 +98,8 @@ def ecco_make_granule( task, cfg,
             task ('DEBUG', 'INFO', 'WARNING', 'ERROR' or 'CRITICAL').  If called
             by a top-level application, the default will be that of the parent
             logger ('edp').
+        granule_cache (ECCOGranuleCache): Optional granule data cache (see
+            build_granule).
         **kwargs: Depending on run context:
             keygen (str): If tasklist descriptors reference AWS S3 endpoints and
                 if running in an institutionally-managed AWS IAM Identity Center
@@ -110,8 +125,6 @@ def ecco_make_granule( task, cfg,
     # ECCOTask object to answer some basic questions:
     this_task = ecco_task.ECCOTask(task)
 
-    variable_datasets = []
-
     with tempfile.TemporaryDirectory() as build_tmpdir: # (*)
 
         # (*) The reason for this particular construct, i.e., build_tmpdir at
@@ -122,67 +135,169 @@ def ecco_make_granule( task, cfg,
         # build_tmpdir, which can only go out of scope after write and
         # (possible) S3 upload are complete.
 
-        if this_task.is_latlon:
-            log.info('generating %s ...', os.path.basename(this_task['granule']))
-            for variable in this_task.variable_names:
-                log.debug('... adding %s using:', variable)
-                for infile in itertools.chain.from_iterable(this_task.variable_inputs(variable)):
-                    log.debug('    %s', infile)
-                emdsds = ecco_dataset.ECCOMDSDataset(
-                    task=this_task, variable=variable, grid=grid,
-                    mapping_factors=mapping_factors, cfg=cfg, tmpdir=build_tmpdir,
-                    **kwargs)
-                emdsds.drop_all_variables_except(variable)
-                variable_datasets.append(emdsds.as_latlon(variable))    # as_latlon returns xarray DataArray
-            merged_variable_dataset = xr.merge(variable_datasets)
-
-        elif this_task.is_native:
-            log.info('generating %s ...', os.path.basename(this_task['granule']))
-            for variable in this_task.variable_names:
-                log.debug('... adding %s using:', variable)
-                for infile in itertools.chain.from_iterable(this_task.variable_inputs(variable)):
-                    log.debug('    %s', infile)
-                emdsds = ecco_dataset.ECCOMDSDataset(
-                    task=this_task, variable=variable, grid=grid,
-                    mapping_factors=mapping_factors, cfg=cfg, tmpdir=build_tmpdir,
-                    **kwargs)
-                emdsds.drop_all_variables_except(variable)
-                emdsds.apply_land_mask_to_native_variable(variable)
-                variable_datasets.append(emdsds)
-            merged_variable_dataset = xr.merge([ds.ds for ds in variable_datasets])
-
-        else:
-            raise RuntimeError('Could not determine output granule type (latlon or native)')
-
-        # set miscellaneous granule attributes and properties:
-        merged_variable_dataset_with_ancillary_data = set_granule_ancillary_data(
-            dataset=merged_variable_dataset, task=this_task,
-            grid=grid, mapping_factors=mapping_factors, cfg=cfg)
-
-        # append metadata:
-        merged_variable_dataset_with_all_metadata, encoding = set_granule_metadata(
-            dataset=merged_variable_dataset_with_ancillary_data,
-            task=this_task, ecco_metadata=metadata, cfg=cfg)
+        merged_variable_dataset_with_all_metadata, encoding = build_granule(
+            this_task, cfg, grid=grid, mapping_factors=mapping_factors,
+            metadata=metadata, tmpdir=build_tmpdir, log_level=log_level,
+            granule_cache=granule_cache, **kwargs)
 
         # write:
         if this_task.is_granule_local:
-            if os.path.dirname(this_task['granule']) and not os.path.exists(os.path.dirname(this_task['granule'])):
-                os.makedirs(os.path.dirname(this_task['granule']))
-            merged_variable_dataset_with_all_metadata.to_netcdf(
-                this_task['granule'], encoding=encoding)
+            write_granule(
+                merged_variable_dataset_with_all_metadata, encoding, this_task['granule'])
         else:
             with tempfile.TemporaryDirectory() as upload_tmpdir:
                 # temporary directory will self-destruct at end of with block
                 _src = os.path.basename(this_task['granule'])
                 _dest = this_task['granule']
-                merged_variable_dataset_with_all_metadata.to_netcdf(
-                    os.path.join(upload_tmpdir,_src), encoding=encoding)
+                write_granule(
+                    merged_variable_dataset_with_all_metadata, encoding,
+                    os.path.join(upload_tmpdir,_src))
                 log.info('uploading %s to %s', os.path.join(upload_tmpdir,_src), _dest)
                 aws.ecco_aws_s3_cp.aws_s3_cp( src=os.path.join(upload_tmpdir,_src), dest=_dest, **kwargs)
 
     log.info('... done')
 
 
+def fetch_task_inputs( task, tmpdir, **kwargs):
+    """Copy, or download, all variable input files referenced by a task
+    descriptor to a local directory, where they will subsequently be found
+    (and not re-fetched) by ecco_dataset.ECCOMDSDataset.
+
+    Args:
+        task (dict or ECCOTask): Task descriptor.
+        tmpdir (str): Local destination directory name.
+        **kwargs: Passed to aws_s3_cp (e.g., keygen, profile).
+
+    """
+    if not isinstance(task,ecco_task.ECCOTask):
+        task = ecco_task.ECCOTask(task)
+    for variable in task.variable_names:
+        local = task.is_variable_input_local(variable)
+        for infile in itertools.chain.from_iterable(task.variable_inputs(variable)):
+            if not os.path.exists(os.path.join(tmpdir,os.path.basename(infile))):
+                if local:
+                    shutil.copy(infile,tmpdir)
+                else:
+                    aws.ecco_aws_s3_cp.aws_s3_cp( src=infile, dest=tmpdir, **kwargs)
+
+
+def build_granule( task, cfg,
+    grid=None, mapping_factors=None, metadata=None, tmpdir=None, log_level=None,
+    granule_cache=None, **kwargs):
+    """Create an in-memory PO.DAAC/ESDIS-ready ECCO granule dataset per
+    instructions provided in input task descriptor (i.e., everything
+    ecco_make_granule does short of writing the result).
+
+    Args:
+        task (dict or ECCOTask): Single task from parsed ECCO dataset
+            production json-formatted task list.
+        cfg (dict): Parsed ECCO dataset production yaml file.
+        grid (obj): Instance of ECCOGrid class for current granule task.
+        mapping_factors (obj): Instance of ECCOMappingFactors for current
+            granule task.
+        metadata (obj): Optional instance of ECCOMetadata for current granule task.
+        tmpdir (str): Directory for (and possibly already containing) task
+            input files. Must persist until the returned dataset has been
+            written.
+        log_level (str): Optional local logging level.
+        granule_cache (ECCOGranuleCache): Optional granule data cache. If the
+            task's data (i.e., the dataset resulting from
+            set_granule_ancillary_data) are cached, MDS load and regridding are
+            skipped, and only metadata are applied; otherwise, the data are
+            computed and cached.
+        **kwargs: See ecco_make_granule.
+
+    Returns:
+        (dataset, encoding) tuple, where dataset is the xarray Dataset with all
+        ancillary data and metadata, and encoding is the corresponding
+        to_netcdf encoding dictionary.
+
+    Raises:
+        RuntimeError if indeterminate output granule type (i.e., not native or
+        latlon).
+
+    """
+    log = logging.getLogger('edp.'+__name__)
+    if log_level:
+        log.setLevel(log_level)
+
+    this_task = task if isinstance(task,ecco_task.ECCOTask) else ecco_task.ECCOTask(task)
+
+    if granule_cache is not None:
+        cache_key = granule_cache.key(this_task, cfg, grid, mapping_factors)
+        merged_variable_dataset_with_ancillary_data = granule_cache.get(cache_key)
+        if merged_variable_dataset_with_ancillary_data is not None:
+            log.info('generating %s from cached data ...', os.path.basename(this_task['granule']))
+            return set_granule_metadata(
+                dataset=merged_variable_dataset_with_ancillary_data,
+                task=this_task, ecco_metadata=metadata, cfg=cfg)
+
+    variable_datasets = []
+
+    if this_task.is_latlon:
+        log.info('generating %s ...', os.path.basename(this_task['granule']))
+        for variable in this_task.variable_names:
+            log.debug('... adding %s using:', variable)
+            for infile in itertools.chain.from_iterable(this_task.variable_inputs(variable)):
+                log.debug('    %s', infile)
+            emdsds = ecco_dataset.ECCOMDSDataset(
+                task=this_task, variable=variable, grid=grid,
+                mapping_factors=mapping_factors, cfg=cfg, tmpdir=tmpdir,
+                **kwargs)
+            emdsds.drop_all_variables_except(variable)
+            variable_datasets.append(emdsds)
+        # map all variables to latlon together, one sparse matrix product per
+        # level (as_latlon_stacked returns xarray DataArrays):
+        merged_variable_dataset = xr.merge(ecco_dataset.as_latlon_stacked(
+            variable_datasets, this_task.variable_names))
+
+    elif this_task.is_native:
+        log.info('generating %s ...', os.path.basename(this_task['granule']))
+        for variable in this_task.variable_names:
+            log.debug('... adding %s using:', variable)
+            for infile in itertools.chain.from_iterable(this_task.variable_inputs(variable)):
+                log.debug('    %s', infile)
+            emdsds = ecco_dataset.ECCOMDSDataset(
+                task=this_task, variable=variable, grid=grid,
+                mapping_factors=mapping_factors, cfg=cfg, tmpdir=tmpdir,
+                **kwargs)
+            emdsds.drop_all_variables_except(variable)
+            emdsds.apply_land_mask_to_native_variable(variable)
+            variable_datasets.append(emdsds)
+        merged_variable_dataset = xr.merge([ds.ds for ds in variable_datasets])
+
+    else:
+        raise RuntimeError('Could not determine output granule type (latlon or native)')
+
+    # set miscellaneous granule attributes and properties:
+    merged_variable_dataset_with_ancillary_data = set_granule_ancillary_data(
+        dataset=merged_variable_dataset, task=this_task,
+        grid=grid, mapping_factors=mapping_factors, cfg=cfg)
+
+    if granule_cache is not None:
+        granule_cache.put(cache_key, merged_variable_dataset_with_ancillary_data)
+
+    # append metadata:
+    return set_granule_metadata(
+        dataset=merged_variable_dataset_with_ancillary_data,
+        task=this_task, ecco_metadata=metadata, cfg=cfg)
+
+
+def write_granule( dataset, encoding, path):
+    """Write granule dataset to local NetCDF file, creating the destination
+    directory if necessary.
+
+    Args:
+        dataset (xarray.Dataset): Granule dataset (see build_granule).
+        encoding (dict): to_netcdf encoding dictionary.
+        path (str): Local (path and) file name.
+
+    """
+    if os.path.dirname(path) and not os.path.exists(os.path.dirname(path)):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+    dataset.to_netcdf(path, encoding=encoding)
+
+
 def set_granule_ancillary_data(
     dataset=None, task=None, grid=None, mapping_factors=None, cfg=None):
     """Collect, and set, global and ancillary data such as array precision, fill values,
@@ -226,10 +341,17 @@ def set_granule_ancillary_data(
     prec = cfg['array_precision'] if 'array_precision' in cfg else 'float64'
     ncfill = netCDF4.default_fillvals['f4'] if prec=='float32' else netCDF4.default_fillvals['f8']
     for var in dataset.data_vars:
-        dataset[var].values = dataset[var].astype(eval('np.'+prec))
-        dataset[var].attrs['valid_min'] = np.nanmin(dataset[var].values)
-        dataset[var].attrs['valid_max'] = np.nanmax(dataset[var].values)
-        dataset[var].values = np.where(np.isnan(dataset[var].values),ncfill,dataset[var].values)
+        # cast, if not already of the required precision (e.g., if computed
+        # in float32; see ecco_dataset.compute_dtype), and fill in place:
+        values = dataset[var].values
+        if values.dtype != np.dtype(prec):
+            values = values.astype(prec)
+        elif not values.flags.writeable:
+            values = values.copy()
+        dataset[var].attrs['valid_min'] = np.nanmin(values)
+        dataset[var].attrs['valid_max'] = np.nanmax(values)
+        values[np.isnan(values)] = ncfill
+        dataset[var].values = values
 
     # time coordinate bounds:
     if all( [k in task['dynamic_metadata'] for k in
@@ -262,7 +384,8 @@ def set_granule_ancillary_data(
     except:
         pass
 
-    # spatial coordinate bounds:
+    # spatial coordinate bounds (cached, read-only arrays shared by all
+    # granules, wrapped in new coordinate variables without copying):
     if task.is_latlon:
         # assign lat/lon/depth bounds using data from mapping factors:
         dataset = dataset.assign_coords(
@@ -273,25 +396,13 @@ def set_granule_ancillary_data(
             dataset = dataset.assign_coords(
                 {'Z_bnds':(('Z','nv'),mapping_factors.depth_bounds)})
     else: # task.is_native
-        XC_bnds = grid.native_grid['XC_bnds']
-        YC_bnds = grid.native_grid['YC_bnds']
-        if XC_bnds.chunks is not None:
-            XC_bnds.load()
-        if YC_bnds.chunks is not None:
-            YC_bnds.load()
-        dataset = dataset.assign_coords(
-            {"XC_bnds": (("tile","j","i","nb"), XC_bnds.data)})
-            #{"XC_bnds": (("tile","j","i","nb"), grid.native_grid['XC_bnds'].data)})
-        dataset = dataset.assign_coords(
-            {"YC_bnds": (("tile","j","i","nb"), YC_bnds.data)})
-            #{"YC_bnds": (("tile","j","i","nb"), grid.native_grid['YC_bnds'].data)})
+        native_coordinate_bounds = grid.native_coordinate_bounds
+        bounds_names = ['XC_bnds','YC_bnds']
         if task.is_3d:
-            Z_bnds = grid.native_grid['Z_bnds']
-            if Z_bnds.chunks is not None:
-                Z_bnds.load()
-            dataset = dataset.assign_coords(
-                {"Z_bnds": (('k','nv'), Z_bnds.data)})
-                #{'Z_bnds':(('k','nv'),mapping_factors.depth_bounds)})
+            bounds_names.append('Z_bnds')
+        dataset = dataset.assign_coords(
+            {name:(native_coordinate_bounds[name].dims, native_coordinate_bounds[name].data)
+                for name in bounds_names})
     return dataset
 
 
@@ -510,6 +621,7 @@ def set_granule_metadata( dataset=None, task=None, ecco_metadata=None, cfg=None,
         # first, locate podaac metadata source file in ecco metadata directory:
         pm = ecco_podaac_metadata.ECCOPODAACMetadata(
             metadata_src=os.path.join(task['ecco_metadata_loc'],cfg['podaac_metadata_filename']),
+            cache_dir=getattr(ecco_metadata_source,'cache_dir',None),
             **kwargs).metadata
         # get PO.DAAC metadata (row) corresponding to 'DATASET.FILENAME' column
         # element that matches "generic" granule file string (i.e., without date and
@@ -641,7 +753,10 @@ def process_time_invariant_granule(task, cfg, grid=None, mapping_factors=None, m
     log.info('... completely finished processing time-invariant granule %s', os.path.basename(task['granule']))
 
 
-def generate_datasets( tasklist, log_level=None, **kwargs):
+def generate_datasets( tasklist=None, log_level=None, eager_grid=None, cache_dir=None,
+    incremental=False, fingerprint=False, timings=None, queue=None, worker_id=None,
+    visibility_timeout=None, pipeline=None, pipeline_queue_size=1, shared_store=None,
+    granule_cache_dir=None, **kwargs):
     """Generate PO.DAAC/ESDIS-ready ECCO granule(s) for all tasks in tasklist.
 
     .. mermaid::
@@ -666,13 +781,68 @@ def generate_datasets( tasklist, log_level=None, **kwargs):
 
     Args:
         tasklist: (Path and) name, or similar AWS S3 object name of
-            json-formatted file containing list of ECCO dataset generation task
-            descriptions, generated by create_job_task_list. See that function
-            for formats and details.
+            json- or compact jsonl-formatted file containing list of ECCO
+            dataset generation task descriptions, generated by
+            create_job_task_list. See that function, and ecco_tasklist, for
+            formats and details.
         log_level (str): Optional local logging level ('DEBUG', 'INFO',
             'WARNING', 'ERROR' or 'CRITICAL').  If called by a top-level
             application, the default will be that of the parent logger ('edp'),
             or 'WARNING' if called in standalone mode.
+        eager_grid (bool): Optional override of the configuration file
+            'eager_grid' setting. If True, grid variables required for granule
+            generation are loaded as in-memory numpy arrays, and all subsequent
+            MDS -> regrid -> mask operations are performed without dask. If not
+            provided (default), the configuration file setting is used.
+        cache_dir (str): Optional shared local cache directory for AWS S3-hosted
+            grid, mapping factors, and metadata (see aws.ecco_aws_s3_cache). If
+            not provided, the EDP_CACHE_DIR environment variable, if set, is
+            used.
+        incremental (bool): If True, skip tasks whose output granules already
+            exist (and, if fingerprint is also True, whose recorded task
+            fingerprints match the current task fingerprint). Granule
+            existence is determined using one directory scan, or one AWS S3
+            listing, per output location (see ecco_inventory.ECCOInventory).
+            Default: False.
+        fingerprint (bool): If True, record task fingerprints (digest of the
+            task descriptor, configuration, and input ETags/mtimes) in
+            '<granule>.fingerprint' sidecar files for each granule generated
+            and, if incremental, compare against any such existing sidecar
+            files. Default: False.
+        timings (str): Optional (path and) name of local JSON lines file to
+            which per-task elapsed times are appended, one {'granule',
+            'seconds', 'status'} record per task, e.g., for calibration of
+            edp_partition_tasklists cost estimates.
+        queue (str): Optional work queue location (see
+            ecco_work_queue.open_work_queue). If provided, tasks are leased
+            from the queue until it is drained, rather than read from tasklist.
+        worker_id (str): Optional work queue worker identifier (default:
+            ecco_work_queue.default_worker_id()).
+        visibility_timeout (float): Optional work queue lease visibility
+            timeout, in seconds (default:
+            ecco_work_queue.DEFAULT_VISIBILITY_TIMEOUT).
+        pipeline (bool or dict): If True, or a dictionary of per-stage
+            concurrency limits (any of 'fetch', 'compute', 'write', 'upload';
+            see DEFAULT_PIPELINE_CONCURRENCY for defaults), tasks are
+            processed by a pipelined executor (see ecco_pipeline) in which
+            input fetch, granule computation, NetCDF write and AWS S3 upload
+            for different tasks overlap. Not supported in work queue mode.
+        pipeline_queue_size (int): Maximum number of tasks waiting between
+            consecutive pipeline stages (default: 1). Together with the stage
+            concurrency limits, bounds the local disk and memory in use.
+        shared_store (str or bool): If True, or a shared store root
+            directory, grid and mapping factors arrays are published once per
+            host to a shared, memory-mapped store (see ecco_shared_store), to
+            which all worker processes attach rather than holding their own
+            copies. If True, the EDP_SHARED_STORE_DIR environment variable, if
+            set, or ecco_shared_store.DEFAULT_SHARED_STORE_DIR (in POSIX shared
+            memory) is used.
+        granule_cache_dir (str): Optional local granule data cache directory
+            (see ecco_granule_cache). If provided, or if the
+            EDP_GRANULE_CACHE_DIR environment variable is set, the regridded
+            data of each generated granule are cached, and tasks whose data
+            are cached (e.g., reruns following metadata-only changes) skip
+            input fetch, MDS load, and regridding.
         **kwargs: Depending on run context:
             keygen (str): If tasklist, or tasklist descriptors reference AWS S3
                 endpoints and if running in an institutionally-managed AWS IAM
@@ -690,48 +860,108 @@ def generate_datasets( tasklist, log_level=None, **kwargs):
     if log_level:
         log.setLevel(log_level)
 
-    shared_ecco_resources = False
-    shared_ecco_grid = shared_ecco_mapping_factors = shared_ecco_metadata = None
+    if queue and pipeline:
+        raise RuntimeError('Pipelined execution is not supported in work queue mode')
 
-    if aws.utils.is_s3_uri(tasklist):
-        with tempfile.TemporaryDirectory() as tmpdir:
-            _dest = os.path.join(tmpdir,os.path.basename(tasklist))
-            aws.ecco_aws_s3_cp.aws_s3_cp( src=tasklist, dest=_dest, **kwargs)
-            parsed_tasklist = json.load(open(_dest))
-    else:
-        parsed_tasklist = json.load(open(tasklist))
+    shared = {}
+    shared_lock = threading.Lock()
+    num_tasks = num_skipped = 0
+
+    inventory = None
+    if incremental or fingerprint:
+        inventory = ecco_inventory.ECCOInventory(**kwargs)
 
+    granule_cache = ecco_granule_cache.granule_cache_from_env(
+        granule_cache_dir, inventory=inventory, **kwargs)
 
-    for task in parsed_tasklist:
+    def prepare(task):
+        """Load task configuration and, if necessary, create shared resources.
+        Returns (cfg, task_fingerprint), or None if task is to be skipped."""
         print('\n=================================')
         print('NEW TASK!')
         pprint(task)
-        try:
-            cfg = ECCODatasetProductionConfig(cfgfile=task['ecco_cfg_loc'])
-
-            # Assuming all tasks share the same ECCO grid, mapping factors, and
-            # metadata references then, for performance reasons, create ECCOGrid,
-            # ECCOMappingFactors, and ECCOMetadata objects up-front (using the first
-            # task descriptor) to be shared by all granule creation tasks:
-
-            if not shared_ecco_resources:
+        cfg = ECCODatasetProductionConfig(cfgfile=task['ecco_cfg_loc'])
+
+        task_fingerprint = None
+        if fingerprint:
+            task_fingerprint = ecco_inventory.task_fingerprint(task, cfg, inventory)
+
+        if incremental and inventory.exists(task['granule']):
+            if not fingerprint:
+                log.info('%s exists; skipping', task['granule'])
+                return None
+            elif inventory.read_text(ecco_inventory.fingerprint_path(task['granule'])) == task_fingerprint:
+                log.info('%s exists, with unchanged task fingerprint; skipping', task['granule'])
+                return None
+
+        # Assuming all tasks share the same ECCO grid, mapping factors, and
+        # metadata references then, for performance reasons, create ECCOGrid,
+        # ECCOMappingFactors, and ECCOMetadata objects up-front (using the first
+        # task descriptor) to be shared by all granule creation tasks:
+
+        with shared_lock:
+            if not shared:
                 try:
-                    shared_ecco_grid = ecco_grid.ECCOGrid(
-                        task=task, **kwargs)
-                    shared_ecco_mapping_factors = ecco_mapping_factors.ECCOMappingFactors(
-                        task=task, **kwargs)
-                    shared_ecco_metadata = ecco_metadata.ECCOMetadata(
-                        task=task, **kwargs)
-                    shared_ecco_resources = True
+                    shared['grid'] = ecco_grid.ECCOGrid(
+                        task=task,
+                        eager=eager_grid if eager_grid is not None else cfg['eager_grid'],
+                        cache_dir=cache_dir, **kwargs)
+                    shared['mapping_factors'] = ecco_mapping_factors.ECCOMappingFactors(
+                        task=task, cache_dir=cache_dir, **kwargs)
+                    shared['metadata'] = ecco_metadata.ECCOMetadata(
+                        task=task, cache_dir=cache_dir, **kwargs)
+                    if shared_store:
+                        store = ecco_shared_store.open_shared_store(
+                            shared['grid'], shared['mapping_factors'],
+                            root=shared_store if isinstance(shared_store,str) else None,
+                            dtype=ecco_dataset.compute_dtype(cfg))
+                        shared['grid'].attach_shared_store(store)
+                        shared['mapping_factors'].attach_shared_store(store)
                 except Exception as e:
                     # If shared resources can't be created, all subsequent jobs
                     # would most certainly fail, even if they tried to create their
                     # own grid/factors/metadata instances; just take hard exit:
+                    shared.clear()
                     errmsg = 'Could not create shared ECCO resources'
                     log.error(errmsg)
                     log.exception(e)
                     raise SystemExit(e)
-                
+
+        return cfg, task_fingerprint
+
+    def finish(task, task_fingerprint, task_status, task_seconds, error=None):
+        """Record task fingerprint, timing, and any error."""
+        if error is not None:
+            # just log the error and continue
+            try:
+                log.error('Error encountered during generation of %s: %s', task['granule'], error)
+            except:
+                log.error('Error encountered during generation of a granule: %s', error)
+            log.error(error, exc_info=error)
+        elif fingerprint:
+            inventory.write_text(
+                ecco_inventory.fingerprint_path(task['granule']), task_fingerprint)
+        if timings and task_seconds is not None:
+            with open(timings,'a') as f:
+                f.write(json.dumps({
+                    'granule':task.get('granule'),
+                    'seconds':round(task_seconds,3),
+                    'status':task_status}) + '\n')
+
+    def process_task(task):
+        """Generate a single granule. Returns 'ok', 'skipped' or 'error'."""
+        nonlocal num_tasks, num_skipped
+        num_tasks += 1
+        task_start = task_fingerprint = None
+        try:
+            prepared = prepare(task)
+            if prepared is None:
+                num_skipped += 1
+                return 'skipped'
+            cfg, task_fingerprint = prepared
+
+            task_start = time.perf_counter()
+
             # this_task object needed to check for time invariance:
             this_task = ecco_task.ECCOTask(task)
 
@@ -741,19 +971,139 @@ def generate_datasets( tasklist, log_level=None, **kwargs):
                 # data and metadata added; process accordingly:
                 process_time_invariant_granule(
                     task=this_task, cfg=cfg,
-                    grid=shared_ecco_grid, mapping_factors=shared_ecco_mapping_factors,
-                    metadata=shared_ecco_metadata, log_level=log_level, **kwargs)
+                    grid=shared['grid'], mapping_factors=shared['mapping_factors'],
+                    metadata=shared['metadata'], log_level=log_level, **kwargs)
             else:
                 ecco_make_granule( this_task, cfg,
-                    grid=shared_ecco_grid,
-                    mapping_factors=shared_ecco_mapping_factors,
-                    metadata=shared_ecco_metadata,
-                    log_level=log_level, **kwargs)
+                    grid=shared['grid'],
+                    mapping_factors=shared['mapping_factors'],
+                    metadata=shared['metadata'],
+                    log_level=log_level, granule_cache=granule_cache, **kwargs)
+
+            finish(task, task_fingerprint, 'ok',
+                time.perf_counter()-task_start)
+            return 'ok'
 
         except Exception as e:
-            # just log the error and continue
+            finish(task, task_fingerprint, 'error',
+                None if task_start is None else time.perf_counter()-task_start, e)
+            return 'error'
+
+    def timed(stage_func):
+        """Accumulate per-job stage processing time."""
+        def wrapper(job):
+            stage_start = time.perf_counter()
             try:
-                log.error('Error encountered during generation of %s: %s', task['granule'], e)
-            except:
-                log.error('Error encountered during generation of a granule: %s', e)
-            log.exception(e)
+                return stage_func(job)
+            finally:
+                job['seconds'] += time.perf_counter() - stage_start
+        return wrapper
+
+    def cleanup(job):
+        for key in ('input_tmpdir','upload_tmpdir'):
+            if job.get(key):
+                job.pop(key).cleanup()
+        job.pop('dataset', None)
+
+    def fetch_stage(job):
+        prepared = prepare(job['task'])
+        if prepared is None:
+            job['skipped'] = True
+            return job
+        job['cfg'], job['fingerprint'] = prepared
+        job['task'] = ecco_task.ECCOTask(job['task'])
+        if not job['task'].is_time_invariant:
+            job['input_tmpdir'] = tempfile.TemporaryDirectory()
+            if granule_cache is not None and granule_cache.contains(granule_cache.key(
+                job['task'], job['cfg'], shared['grid'], shared['mapping_factors'])):
+                # inputs not needed (if the entry is evicted in the meantime,
+                # build_granule's ECCOMDSDataset instances fetch them):
+                return job
+            fetch_task_inputs(job['task'], job['input_tmpdir'].name, **kwargs)
+        return job
+
+    def compute_stage(job):
+        if job.get('skipped'):
+            return job
+        if job['task'].is_time_invariant:
+            # small, self-contained read-update-write:
+            process_time_invariant_granule(
+                task=job['task'], cfg=job['cfg'],
+                grid=shared['grid'], mapping_factors=shared['mapping_factors'],
+                metadata=shared['metadata'], log_level=log_level, **kwargs)
+            job['written'] = True
+            return job
+        dataset, job['encoding'] = build_granule(
+            job['task'], job['cfg'], grid=shared['grid'],
+            mapping_factors=shared['mapping_factors'], metadata=shared['metadata'],
+            tmpdir=job['input_tmpdir'].name, log_level=log_level,
+            granule_cache=granule_cache, **kwargs)
+        # evaluate any deferred computation here, rather than in write stage:
+        job['dataset'] = dataset.load()
+        return job
+
+    def write_stage(job):
+        if job.get('skipped') or job.get('written'):
+            return job
+        if job['task'].is_granule_local:
+            path = job['task']['granule']
+        else:
+            job['upload_tmpdir'] = tempfile.TemporaryDirectory()
+            path = os.path.join(job['upload_tmpdir'].name, os.path.basename(job['task']['granule']))
+        write_granule(job.pop('dataset'), job['encoding'], path)
+        job['output'] = path
+        # inputs no longer needed:
+        job.pop('input_tmpdir').cleanup()
+        return job
+
+    def upload_stage(job):
+        if job.get('skipped') or job.get('written'):
+            return job
+        if not job['task'].is_granule_local:
+            log.info('uploading %s to %s', job['output'], job['task']['granule'])
+            aws.ecco_aws_s3_cp.aws_s3_cp( src=job['output'], dest=job['task']['granule'], **kwargs)
+            job.pop('upload_tmpdir').cleanup()
+        return job
+
+    def on_done(job, error):
+        nonlocal num_tasks, num_skipped
+        num_tasks += 1
+        cleanup(job)
+        if job.get('skipped') and error is None:
+            num_skipped += 1
+            return
+        finish(job['task'], job.get('fingerprint'), 'ok' if error is None else 'error',
+            job['seconds'] if 'cfg' in job else None, error)
+
+    if queue:
+        # pull tasks from shared work queue until drained:
+        queue_kwargs = {'visibility_timeout':visibility_timeout} if visibility_timeout else {}
+        ecco_work_queue.work(
+            ecco_work_queue.open_work_queue(queue, **queue_kwargs),
+            lambda task: process_task(task) != 'error',
+            worker_id=worker_id)
+    else:
+        # tasks are read lazily, in either tasklist format:
+        parsed_tasklist = ecco_tasklist.read_tasklist(tasklist, **kwargs)
+
+        if pipeline:
+            concurrency = dict(DEFAULT_PIPELINE_CONCURRENCY)
+            if isinstance(pipeline, dict):
+                unknown = set(pipeline) - set(concurrency)
+                if unknown:
+                    raise RuntimeError(f'Unknown pipeline stage(s): {sorted(unknown)}')
+                concurrency.update(pipeline)
+            ecco_pipeline.ECCOPipeline([
+                ecco_pipeline.ECCOPipelineStage(name, timed(func), concurrency=concurrency[name])
+                for name, func in (
+                    ('fetch',fetch_stage), ('compute',compute_stage),
+                    ('write',write_stage), ('upload',upload_stage))],
+                queue_size=pipeline_queue_size).run(
+                    ({'task':task, 'seconds':0.} for task in parsed_tasklist),
+                    on_done=on_done)
+        else:
+            for task in parsed_tasklist:
+                process_task(task)
+
+    if incremental:
+        log.info('%d of %d tasks skipped (existing granules)', num_skipped, num_tasks)
@@ -0,0 +1,238 @@
+"""Local, size-bounded cache of granule data, for metadata-only reruns.
+
+Granule generation is dominated by MDS input fetch and load, and regridding,
+i.e., by the steps up to and including set_granule_ancillary_data, whereas
+set_granule_metadata and NetCDF write are comparatively cheap. Datasets are
+frequently regenerated after changes to metadata (e.g., the
+ECCO-v4-Configurations metadata JSON, or configuration file entries that only
+determine metadata), which leave the numeric content unchanged.
+
+ECCOGranuleCache stores the post-set_granule_ancillary_data dataset of each
+granule as a compressed NetCDF4 file, keyed by a digest of the inputs that
+determine it:
+
+- the task's variables and input files, and the ETags (or sizes and
+  modification times) of the input files;
+- the task's output grid type, and the dynamic metadata referenced during
+  computation (GRANULE_CACHE_TASK_KEYS);
+- the configuration parameters referenced during computation, including
+  array precision (GRANULE_CACHE_CONFIG_KEYS);
+- the contents of the grid and mapping factors directories (see
+  ecco_shared_store.resources_digest).
+
+On a cache hit, build_granule skips input fetch, MDS load and regridding, and
+proceeds directly to set_granule_metadata and write. Since metadata are
+always reapplied, changes to any other task or configuration entries take
+effect without invalidating the cache.
+
+Entries are written to temporary files and published by atomic rename, so
+any number of processes may share a cache directory. Least recently used
+entries are evicted once the cache exceeds its size limit.
+
+Example:
+    >>> from ecco_dataset_production import ecco_granule_cache
+    >>> cache = ecco_granule_cache.ECCOGranuleCache('/var/cache/edp-granules')
+    >>> key = cache.key(task, cfg, grid, mapping_factors)
+    >>> dataset = cache.get(key)    # None if not cached
+
+"""
+
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+
+import xarray as xr
+
+from . import ecco_inventory
+from . import ecco_shared_store
+from . import ecco_task
+
+GRANULE_CACHE_DIR_ENV = 'EDP_GRANULE_CACHE_DIR'
+GRANULE_CACHE_MAX_BYTES_ENV = 'EDP_GRANULE_CACHE_MAX_BYTES'
+DEFAULT_GRANULE_CACHE_MAX_BYTES = 50*1024**3
+GRANULE_CACHE_VERSION = 1
+GRANULE_CACHE_SUFFIX = '.nc'
+GRANULE_CACHE_COMPLEVEL = 1
+STALE_TMPFILE_SECONDS = 24*60*60
+
+# task dynamic metadata, and configuration parameters, referenced by granule
+# computation (MDS load, vector rotation, regridding, ancillary data):
+GRANULE_CACHE_TASK_KEYS = (
+    'dimension', 'field_components', 'field_orientations',
+    'time_coverage_center', 'time_coverage_duration', 'time_coverage_end',
+    'time_coverage_start')
+GRANULE_CACHE_CONFIG_KEYS = ('array_precision', 'model_start_time')
+
+log = logging.getLogger('edp.'+__name__)
+
+
+def granule_cache_from_env( cache_dir=None, **kwargs):
+    """Return an ECCOGranuleCache instance for cache_dir or, if not provided,
+    for the directory named by the EDP_GRANULE_CACHE_DIR environment variable.
+
+    Args:
+        cache_dir (str): Optional cache directory name.
+        **kwargs: Passed to ECCOGranuleCache.
+
+    Returns:
+        ECCOGranuleCache instance, or None if neither cache_dir nor
+        EDP_GRANULE_CACHE_DIR have been provided.
+
+    """
+    cache_dir = cache_dir or os.environ.get(GRANULE_CACHE_DIR_ENV)
+    if not cache_dir:
+        return None
+    return ECCOGranuleCache(cache_dir=cache_dir, **kwargs)
+
+
+class ECCOGranuleCache(object):
+    """Local cache of post-set_granule_ancillary_data granule datasets.
+
+    Args:
+        cache_dir (str): Local cache directory name (created if necessary).
+        max_bytes (int): Optional cache size limit, in bytes. If not provided,
+            the value of the EDP_GRANULE_CACHE_MAX_BYTES environment variable
+            is used, or DEFAULT_GRANULE_CACHE_MAX_BYTES if that is not set
+            either.
+        inventory (ECCOInventory): Optional inventory used to stat task input
+            files (e.g., one shared with incremental processing); one is
+            created if not provided.
+        **kwargs: Passed to ECCOInventory (e.g., keygen, profile), if created.
+
+    Attributes:
+        cache_dir (str): Local cache directory name.
+        max_bytes (int): Cache size limit, in bytes.
+
+    """
+    def __init__( self, cache_dir=None, max_bytes=None, inventory=None, **kwargs):
+        self.cache_dir = cache_dir
+        if max_bytes is None:
+            max_bytes = int(os.environ.get(
+                GRANULE_CACHE_MAX_BYTES_ENV,DEFAULT_GRANULE_CACHE_MAX_BYTES))
+        self.max_bytes = max_bytes
+        self.inventory = inventory or ecco_inventory.ECCOInventory(**kwargs)
+        self._resources_digests = {}
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+
+    def key( self, task, cfg, grid, mapping_factors):
+        """Cache key of a granule task.
+
+        Args:
+            task (dict or ECCOTask): Task descriptor.
+            cfg (dict): Parsed ECCO dataset production yaml file.
+            grid (ECCOGrid): ECCO grid instance.
+            mapping_factors (ECCOMappingFactors): ECCO mapping factors
+                instance.
+
+        Returns:
+            Hexadecimal digest string.
+
+        """
+        if not isinstance(task,ecco_task.ECCOTask):
+            task = ecco_task.ECCOTask(task)
+        resources = (grid.grid_dir, mapping_factors.mapping_factors_dir)
+        if resources not in self._resources_digests:
+            self._resources_digests[resources] = ecco_shared_store.resources_digest(*resources)
+        inputs = {variable: task.variable_inputs(variable) for variable in task.variable_names}
+        return hashlib.sha256(json.dumps({
+            'version': GRANULE_CACHE_VERSION,
+            'inputs': inputs,
+            'stats': [self.inventory.stat(path) for path in ecco_inventory.task_inputs(task)],
+            'grid_type': 'latlon' if task.is_latlon else 'native',
+            'task': {key: task['dynamic_metadata'].get(key) for key in GRANULE_CACHE_TASK_KEYS},
+            'config': {key: cfg.get(key) for key in GRANULE_CACHE_CONFIG_KEYS},
+            'resources': self._resources_digests[resources]},
+            sort_keys=True, default=str).encode()).hexdigest()
+
+
+    def path( self, key):
+        """Cache entry file name."""
+        return os.path.join(self.cache_dir, key+GRANULE_CACHE_SUFFIX)
+
+
+    def contains( self, key):
+        """True if an entry is cached for key."""
+        return os.path.isfile(self.path(key))
+
+
+    def get( self, key):
+        """Return the cached dataset for key, or None if not cached.
+
+        The dataset is loaded into memory, and variable encodings (as read
+        from the cache file) are cleared so that the dataset is written exactly
+        as a newly computed one would be.
+
+        """
+        path = self.path(key)
+        try:
+            with xr.open_dataset(path) as ds:
+                dataset = ds.load()
+            # least recently used bookkeeping:
+            os.utime(path)
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            log.warning('unreadable granule cache entry %s (%s); ignoring', path, e)
+            return None
+        for variable in dataset.variables.values():
+            variable.encoding = {}
+        dataset.encoding = {}
+        log.debug('granule cache hit: %s', path)
+        return dataset
+
+
+    def put( self, key, dataset):
+        """Cache dataset as the entry for key, then evict least recently used
+        entries as necessary.
+
+        """
+        path = self.path(key)
+        tmp = f'{path}.{os.getpid()}.{threading.get_ident()}.tmp'
+        encoding = {name: {'zlib':True, 'shuffle':True, 'complevel':GRANULE_CACHE_COMPLEVEL}
+            for name in dataset.data_vars}
+        try:
+            dataset.to_netcdf(tmp, encoding=encoding)
+            os.replace(tmp, path)
+        except:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+            raise
+        log.debug('granule cache entry written: %s', path)
+        self.evict()
+
+
+    def evict(self):
+        """Evict least recently used entries until total cache size is within
+        max_bytes. Also removes abandoned temporary files.
+
+        """
+        entries, total = [], 0
+        with os.scandir(self.cache_dir) as it:
+            for entry in it:
+                try:
+                    st = entry.stat()
+                except FileNotFoundError:
+                    continue
+                if entry.name.endswith('.tmp'):
+                    if time.time()-st.st_mtime > STALE_TMPFILE_SECONDS:
+                        _remove(entry.path)
+                elif entry.name.endswith(GRANULE_CACHE_SUFFIX):
+                    entries.append((st.st_mtime, st.st_size, entry.path))
+                    total += st.st_size
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            log.info('evicting granule cache entry %s (%d bytes)', path, size)
+            _remove(path)
+            total -= size
+
+
+def _remove(path):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
@@ -9,6 +9,11 @@ Key capabilities:
 - Lazy-loading of native and lat/lon grid datasets
 - Access to coordinate bounds (XC_bnds, YC_bnds, Z_bnds)
 - Wet point indices for efficient sparse matrix operations
+- Cached boolean native land masks, by grid point type and dimension
+- Optional "eager" mode in which the grid variables required by the granule
+  pipeline are held as in-memory numpy arrays rather than dask arrays
+- Optional attachment to a shared, memory-mapped store of these arrays, so
+  that multiple worker processes share a single copy (see ecco_shared_store)
 
 The grid data is essential for:
 
@@ -41,10 +46,91 @@ NETCDF_LATLON_GLOBSTR = '*latlon*.nc'
 NETCDF_NATIVE_GLOBSTR = '*native*.nc'
 ZIPFILE_GLOBSTR = '*.gz'
 
+# native grid variables referenced during granule generation (wet points,
+# land masks, coordinate bounds, vector rotation), and that are loaded as numpy
+# arrays in "eager" mode:
+NATIVE_GRID_EAGER_VARIABLES = (
+    'hFacC', 'maskC', 'maskW', 'maskS', 'XC_bnds', 'YC_bnds', 'Z_bnds', 'CS', 'SN')
+
 
 log = logging.getLogger('edp.'+__name__)
 
 
+def wet_point_indices(hFacC):
+    """Wet point (hFacC>0) indices of all depth levels, found in a single
+    pass over the full (k,...) array rather than one pass per level.
+
+    Args:
+        hFacC (numpy.ndarray): (k,tile,j,i) (or, for custom grids, (k,j,i))
+            partial cell fractions.
+
+    Returns:
+        Level-keyed dictionary of "numpy.where" index tuples, identical to
+        numpy.where(hFacC[k,:]>0) for each level k, whose arrays are views of
+        a single array of indices.
+
+    """
+    hFacC = np.asarray(hFacC)
+    indices = np.nonzero(hFacC>0)
+    # level-major (C) ordering of nonzero's indices, so levels are
+    # contiguous:
+    offsets = np.searchsorted(indices[0], np.arange(hFacC.shape[0]+1))
+    return {k: tuple(index[offsets[k]:offsets[k+1]] for index in indices[1:])
+        for k in range(hFacC.shape[0])}
+
+
+def stack_wet_point_indices(wet_pts_k):
+    """Stack per-level wet point indices into a single array, e.g., for
+    storage as one memory-mappable array.
+
+    Args:
+        wet_pts_k (dict): Level-keyed dictionary of "numpy.where" index tuples
+            (see wet_point_indices).
+
+    Returns:
+        (indices, offsets) tuple, where indices is an (index dimensions,
+        number of wet points) int32 array of all levels' indices, and level
+        k's indices are columns offsets[k]:offsets[k+1].
+
+    """
+    levels = sorted(wet_pts_k)
+    counts = [len(wet_pts_k[k][0]) for k in levels]
+    indices = np.concatenate(
+        [np.array(wet_pts_k[k]) for k in levels], axis=1).astype(np.int32)
+    offsets = np.concatenate([[0], np.cumsum(counts)]).astype(np.int64)
+    return indices, offsets
+
+
+def unstack_wet_point_indices( indices, offsets):
+    """Inverse of stack_wet_point_indices; per-level indices are views of
+    indices (e.g., of a memory-mapped array) rather than copies.
+
+    """
+    return {k: tuple(indices[:,offsets[k]:offsets[k+1]])
+        for k in range(len(offsets)-1)}
+
+
+def _extract_grid_archive(grid_dir):
+    """If grid_dir contains a single zipped tarball, extract it in place (and
+    remove the archive), returning the directory containing the extracted
+    NetCDF grid files. Otherwise, grid_dir is returned unchanged.
+
+    """
+    if  len(os.listdir(grid_dir))==1 and \
+        fnmatch.fnmatch(os.listdir(grid_dir)[0],ZIPFILE_GLOBSTR):
+        zf = glob.glob(os.path.join(grid_dir,ZIPFILE_GLOBSTR))[0]
+        with tarfile.open(zf) as to:
+            to.extractall(grid_dir)
+            # use archive's hierarchy to (possibly) extend grid_dir path. could
+            # search on anything, really, but NetCDF grid files are (hopefully)
+            # pretty foolproof:
+            ncdf_grid_files = \
+                [file for file in to.getnames() if fnmatch.fnmatch(file,NETCDF_GLOBSTR)]
+        os.remove(zf)
+        grid_dir = os.path.join(grid_dir,os.path.dirname(ncdf_grid_files[0]))
+    return grid_dir
+
+
 class ECCOGrid(object):
     """Container class for ECCO grid access. Primarily intended to optimize i/o
     performance by allowing operations, e.g. collections of ECCOMDSDataset
@@ -59,6 +145,17 @@ class ECCOGrid(object):
             (containing XC.*, YC.*, *latlon*.nc, *native*.nc, etc. files), or
             similar remote location given by AWS S3 bucket/prefix.  Either
             grid_loc or task may be provided but not both.
+        eager (bool): If True, open grid NetCDF files without dask chunking and
+            load those native grid variables required for granule generation
+            (NATIVE_GRID_EAGER_VARIABLES) into memory as numpy arrays. Intended
+            for grids that fit comfortably in memory, for which dask task graph
+            overhead generally exceeds the cost of the computations themselves.
+            Default: False (dask-backed, chunks='auto').
+        cache_dir (str): Optional shared local cache directory for AWS S3
+            grid data (see aws.ecco_aws_s3_cache). If not provided, the
+            EDP_CACHE_DIR environment variable, if set, is used. If a cache is
+            used, the grid archive is fetched and extracted once per host,
+            rather than once per ECCOGrid instance.
         \*\*kwargs: If either task or grid_loc reference an AWS S3 endpoint and if
             running within an institutionally-managed AWS IAM Identity Center
             (SSO) environment, additional arguments that may be necessary
@@ -71,11 +168,16 @@ class ECCOGrid(object):
     Attributes:
         task (ECCOTask): If provided, local object store of input task
             descriptor.
+        eager (bool): Local store of eager input.
+        shared_store (ECCOSharedStore): Shared store from which grid arrays
+            are memory-mapped, if attached (see attach_shared_store), None
+            otherwise.
         grid_dir (str): Resulting local ECCO grid directory name (see
             tmpdir), grid_loc otherwise.
         tmpdir (tempfile.TemporaryDirectory object): If task or grid_loc
-            references an AWS S3 endpoint, temporary directory object whose
-            'name' attribute is assigned to grid_dir. In the case of a zipped
+            references an AWS S3 endpoint, temporary directory object (or
+            shared cache entry handle, if cache_dir is in effect) whose 'name'
+            attribute is assigned to grid_dir. In the case of a zipped
             archive (see "Notes"), tmpdir's 'name' may be extended accordingly
             prior to assigning to grid_dir.
 
@@ -84,6 +186,10 @@ class ECCOGrid(object):
             xr.open_dataset() on *latlon*.nc (see Notes, item 2).
         native_grid (xarray Dataset object): Object resulting from
             xr.open_dataset() on *native*.nc (see Notes, item 2).
+        native_coordinate_bounds (dict): 'XC_bnds', 'YC_bnds', and 'Z_bnds'
+            keyed dictionary of native grid coordinate bounds, as xarray
+            DataArray objects backed by read-only numpy arrays (see
+            native_coordinate_bounds property description).
         native_wet_point_indices (dict): Integer-keyed dictionary (by depth;
            0 == surface through nz-1 == max depth) of "numpy.where" indices
            identifying ECCO native grid "wet" points (hFacC>0).
@@ -100,14 +206,18 @@ class ECCOGrid(object):
             description.
 
     """
-    def __init__( self, task=None, grid_loc=None, **kwargs):
+    def __init__( self, task=None, grid_loc=None, eager=False, cache_dir=None, **kwargs):
         """Create instance of ECCOGrid class.
 
         """
         self.task = None
+        self.eager = eager
+        self.shared_store = None
         self.tmpdir = None
         self._latlon_grid = None
+        self._native_coordinate_bounds = None
         self._native_grid = None
+        self._native_land_masks = {}
         self._native_wet_point_indices = None
 
         if task and grid_loc:
@@ -122,7 +232,20 @@ class ECCOGrid(object):
                 self.task = task
             grid_loc = self.task['ecco_grid_loc']
 
-        if aws.utils.is_s3_uri(grid_loc):
+        cache = aws.ecco_aws_s3_cache.cache_from_env(cache_dir)
+
+        if aws.utils.is_s3_uri(grid_loc) and cache:
+            # retrieve ecco grid (extracted, if archived) via shared cache:
+            self.tmpdir = cache.fetch(
+                grid_loc, recursive=True, post_fetch=_extract_grid_archive, **kwargs)
+            # use archive's hierarchy to (possibly) extend grid_dir path:
+            ncdf_grid_files = glob.glob(
+                os.path.join(self.tmpdir.name,'**',NETCDF_GLOBSTR), recursive=True)
+            if not ncdf_grid_files:
+                raise RuntimeError(
+                    f'Cached grid ({self.tmpdir.name}) does not contain NetCDF grid files.')
+            self.grid_dir = os.path.dirname(ncdf_grid_files[0])
+        elif aws.utils.is_s3_uri(grid_loc):
             # retrieve ecco grid to temporary local storage:
             self.tmpdir = tempfile.TemporaryDirectory()
             self.grid_dir = self.tmpdir.name
@@ -130,27 +253,15 @@ class ECCOGrid(object):
             if not os.listdir(self.grid_dir):
                 raise RuntimeError(
                     f'Remote grid fetch failed. Ensure grid_loc ({grid_loc}) refers to a valid s3 bucket and prefix (only).')
+            # unzip/untar if remote archive, and use archive's hierarchy to
+            # (possibly) extend grid_dir path:
+            self.grid_dir = _extract_grid_archive(self.grid_dir)
         else:
-            # just point to local grid directory:
+            # just point to local grid directory; check to make sure directory
+            # contains unzipped/untarred data (i.e., don't make any changes to
+            # local directory):
             self.tmpdir = None
             self.grid_dir = grid_loc
-
-        # unzip/untar if remote archive; if local, check to make sure directory
-        # contains unzipped/untarred data (i.e., don't make any changes to local
-        # directory):
-        if self.tmpdir:
-            if  len(os.listdir(self.grid_dir))==1 and \
-                fnmatch.fnmatch(os.listdir(self.grid_dir)[0],ZIPFILE_GLOBSTR):
-                zf = glob.glob(os.path.join(self.grid_dir,ZIPFILE_GLOBSTR))[0]
-                to = tarfile.open(zf)
-                to.extractall(self.grid_dir)
-                # use archive's hierarchy to (possibly) extend self.grid_dir
-                # path. could search on anything, really, but NetCDF grid files
-                # are (hopefully) pretty foolproof:
-                ncdf_grid_files = \
-                    [file for file in to.getnames() if fnmatch.fnmatch(file,NETCDF_GLOBSTR)]
-                self.grid_dir = os.path.join(self.grid_dir,os.path.dirname(ncdf_grid_files[0]))
-        else:
             if  len(os.listdir(self.grid_dir))==1 and \
                 fnmatch.fnmatch(os.listdir(self.grid_dir)[0],ZIPFILE_GLOBSTR):
                 raise RuntimeError(
@@ -159,6 +270,23 @@ class ECCOGrid(object):
         log.debug('ECCO grid at location %s contains %s', self.grid_dir, os.listdir(self.grid_dir))
 
 
+    def attach_shared_store( self, store):
+        """Use arrays memory-mapped from a shared store (see
+        ecco_shared_store.open_shared_store) for native wet point indices, land
+        masks, coordinate bounds, and CS/SN, rather than per-instance copies.
+        Any such arrays already loaded by this instance are released.
+
+        Args:
+            store (ECCOSharedStore): Published shared store.
+
+        """
+        self.shared_store = store
+        self._native_coordinate_bounds = None
+        self._native_grid = None
+        self._native_land_masks = {}
+        self._native_wet_point_indices = None
+
+
     @property
     def latlon_grid(self):
         """Returns latlon grid xarray.Dataset instance, if found. Raises
@@ -169,7 +297,7 @@ class ECCOGrid(object):
             try:
                 self._latlon_grid = xr.open_dataset(
                     glob.glob(os.path.join(self.grid_dir,NETCDF_LATLON_GLOBSTR))[0],
-                    chunks='auto')
+                    chunks=None if self.eager else 'auto')
             except Exception as e:
                 log.error("'latlon file with name matching '%s' could either not be opened or found in grid directory '%s'",
                     NETCDF_LATLON_GLOBSTR, self.grid_dir)
@@ -187,14 +315,56 @@ class ECCOGrid(object):
             try:
                 self._native_grid = xr.open_dataset(
                     glob.glob(os.path.join(self.grid_dir,NETCDF_NATIVE_GLOBSTR))[0],
-                    chunks='auto')
+                    chunks=None if self.eager else 'auto')
             except Exception as e:
                 log.error("'latlon file with name matching '%s' could either not be opened or found in grid directory '%s'",
                     NETCDF_NATIVE_GLOBSTR, self.grid_dir)
                 raise RuntimeError(e)
+            if self.shared_store is not None:
+                # shared, read-only arrays (no copies) in place of file-backed
+                # data:
+                for name in NATIVE_GRID_EAGER_VARIABLES:
+                    if f'grid/{name}' in self.shared_store:
+                        self._native_grid[name] = self._native_grid[name].copy(
+                            deep=False, data=self.shared_store.array(f'grid/{name}'))
+            elif self.eager:
+                # Variable.load() operates in-place, i.e., the numpy arrays
+                # persist in the cached Dataset object:
+                for name in NATIVE_GRID_EAGER_VARIABLES:
+                    if name in self._native_grid.variables:
+                        self._native_grid.variables[name].load()
+                log.debug('native grid variables %s loaded as numpy arrays',
+                    [name for name in NATIVE_GRID_EAGER_VARIABLES if name in self._native_grid.variables])
         return self._native_grid
 
 
+    @property
+    def native_coordinate_bounds(self):
+        """Returns a dictionary of native grid coordinate bounds ('XC_bnds',
+        'YC_bnds', 'Z_bnds') as xarray DataArrays with dimensions
+        (tile,j,i,nb), (tile,j,i,nb), and (k,nv), respectively. Bounds are read
+        (and, if dask-backed, evaluated) once, and are backed by read-only numpy
+        arrays so that they may be attached to any number of granules without
+        copying.
+
+        """
+        if not self._native_coordinate_bounds:
+            native_coordinate_bounds = {}
+            for name,dims in (
+                ('XC_bnds', ('tile','j','i','nb')),
+                ('YC_bnds', ('tile','j','i','nb')),
+                ('Z_bnds',  ('k','nv'))):
+                if self.shared_store is not None:
+                    bounds = self.shared_store.array(f'grid/{name}')
+                else:
+                    bounds = np.asarray(self.native_grid[name])
+                    bounds.flags.writeable = False
+                native_coordinate_bounds[name] = xr.DataArray(
+                    data=bounds, dims=dims, name=name)
+            self._native_coordinate_bounds = native_coordinate_bounds
+        return self._native_coordinate_bounds
+
+
     @property
     def native_wet_point_indices(self):
         """Returns an nz integer-keyed dictionary (by depth; 0 == surface
@@ -202,15 +372,51 @@ class ECCOGrid(object):
         native grid "wet" points (hFacC>0).
 
         """
-        if not self._native_wet_point_indices:
-            native_wet_point_indices = {}
-            for z in range(self.native_grid['hFacC'].shape[0]):
-                native_wet_point_indices[z] = \
-                    np.where(self.native_grid['hFacC'][z,:]>0)
-            self._native_wet_point_indices = native_wet_point_indices
+        if not self._native_wet_point_indices and self.shared_store is not None:
+            self._native_wet_point_indices = self.shared_store.native_wet_point_indices()
+        elif not self._native_wet_point_indices:
+            # evaluate once, rather than per-level, if dask-backed:
+            self._native_wet_point_indices = wet_point_indices(
+                np.asarray(self.native_grid['hFacC']))
         return self._native_wet_point_indices
 
 
+    def native_land_mask( self, mask_type='maskC', is_3d=False):
+        """Returns a boolean native grid land mask (True at land points) for
+        the specified grid point type. Masks are computed once per (mask_type,
+        is_3d) combination and cached as read-only numpy arrays so that they
+        may be shared by all variables of all granules.
+
+        Args:
+            mask_type (str): Native grid mask variable name, i.e., 'maskC',
+                'maskW', or 'maskS' for 'C', 'W' ('U'), or 'S' ('V')
+                point-based data, respectively.
+            is_3d (bool): If True, return full-depth (k,tile,j,i) mask,
+                otherwise return surface (tile,j,i) mask only.
+
+        Returns:
+            Read-only boolean numpy array, True at land points.
+
+        """
+        key = (mask_type, bool(is_3d))
+        if key not in self._native_land_masks:
+            if (mask_type,True) in self._native_land_masks:
+                # surface slice of cached 3D mask (a view, no copy):
+                land_mask = self._native_land_masks[(mask_type,True)][0,:]
+            elif self.shared_store is not None and f'grid/land_{mask_type}' in self.shared_store:
+                land_mask = self.shared_store.array(f'grid/land_{mask_type}')
+                if not is_3d:
+                    land_mask = land_mask[0,:]
+            else:
+                mask = np.asarray(self.native_grid[mask_type])
+                if not is_3d:
+                    mask = mask[0,:]
+                land_mask = np.logical_not(mask.astype(bool))
+                land_mask.flags.writeable = False
+            self._native_land_masks[key] = land_mask
+        return self._native_land_masks[key]
+
+
     def __del__(self):
         """Remove temporary grid directory when ECCOGrid goes out of scope or is
         explicitly deleted.
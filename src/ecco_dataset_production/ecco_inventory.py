@@ -0,0 +1,203 @@
+"""Bulk existence checks and task fingerprints for granule outputs and inputs.
+
+This module provides the :class:`ECCOInventory` class, which answers "does
+this file exist, and what is its size/ETag/mtime?" questions for large numbers
+of local or AWS S3 paths using one directory scan, or one (paginated) AWS S3
+listing, per directory or prefix, rather than one request per file.
+
+It also provides task fingerprints, i.e., digests of a granule task
+descriptor, its configuration, and the ETags (or sizes and modification times)
+of its inputs. Fingerprints are recorded in small sidecar files alongside
+generated granules (``<granule>.fingerprint``) so that incremental reruns can
+skip tasks whose inputs have not changed.
+
+Example:
+    >>> from ecco_dataset_production import ecco_inventory
+    >>> inventory = ecco_inventory.ECCOInventory()
+    >>> inventory.exists('s3://bucket/prefix/SSH_mon_mean_1992-01_ECCO_V4r4_latlon_0p50deg.nc')
+    True
+
+"""
+
+import hashlib
+import json
+import logging
+import os
+import tempfile
+
+from . import aws
+from . import ecco_task
+
+FINGERPRINT_SUFFIX = '.fingerprint'
+
+log = logging.getLogger('edp.'+__name__)
+
+
+class ECCOInventory(object):
+    """Cached, per-directory (or per-AWS S3 prefix) file inventory.
+
+    Args:
+        **kwargs: If AWS S3 locations are referenced and if running within an
+            institutionally-managed AWS IAM Identity Center (SSO) environment,
+            additional arguments that may be necessary include:
+            keygen (str): Federated login key generation script (e.g.,
+                /usr/local/bin/aws-login.darwin.universal, etc.).
+            profile (str): Optional profile to be used in combination with
+                keygen (e.g., 'default', 'saml-pub', etc.)
+
+    Attributes:
+        listings (dict): Directory or AWS S3 prefix-keyed dictionary of
+            listings, each a basename-keyed dictionary of {'size', 'stamp'}
+            dictionaries, where 'stamp' is the object ETag (AWS S3) or
+            modification time (local).
+
+    """
+    def __init__( self, **kwargs):
+        self.kwargs = kwargs
+        self.listings = {}
+        self._s3_client = None
+
+
+    def listing( self, location):
+        """Return (and cache) the listing of a local directory or AWS S3
+        bucket/prefix "directory" (immediate descendants only).
+
+        Args:
+            location (str): Local directory name or AWS S3Uri bucket/prefix.
+
+        Returns:
+            Basename-keyed dictionary of {'size', 'stamp'} dictionaries. Empty
+            if location does not exist.
+
+        """
+        location = location.rstrip('/')
+        if location not in self.listings:
+            listing = {}
+            if aws.utils.is_s3_uri(location):
+                if not self._s3_client:
+                    aws.ecco_aws_s3_sync.update_credentials(**self.kwargs)
+                    self._s3_client = aws.utils.s3_client(**self.kwargs)
+                prefix = location + '/'
+                _, key_prefix = aws.utils.split_s3_uri(prefix)
+                for obj in aws.utils.s3_list_objects(
+                    prefix, client=self._s3_client, delimiter='/'):
+                    name = obj['Key'][len(key_prefix):]
+                    if name:
+                        listing[name] = {'size':obj['Size'], 'stamp':obj['ETag']}
+            elif os.path.isdir(location or '.'):
+                with os.scandir(location or '.') as it:
+                    for entry in it:
+                        if entry.is_file():
+                            st = entry.stat()
+                            listing[entry.name] = {'size':st.st_size, 'stamp':st.st_mtime_ns}
+            log.debug('%s: %d entries', location, len(listing))
+            self.listings[location] = listing
+        return self.listings[location]
+
+
+    def stat( self, path):
+        """Return {'size', 'stamp'} dictionary for a local file or AWS S3
+        object, or None if it does not exist.
+
+        """
+        return self.listing(os.path.dirname(path)).get(os.path.basename(path))
+
+
+    def exists( self, path):
+        """True if local file or AWS S3 object exists, False otherwise.
+
+        """
+        return self.stat(path) is not None
+
+
+    def read_text( self, path):
+        """Return contents of a (small) local file or AWS S3 object as a
+        string, or None if it does not exist.
+
+        """
+        if not self.exists(path):
+            return None
+        if aws.utils.is_s3_uri(path):
+            bucket, key = aws.utils.split_s3_uri(path)
+            return self._s3_client.get_object(Bucket=bucket, Key=key)['Body'].read().decode()
+        else:
+            with open(path) as f:
+                return f.read()
+
+
+    def write_text( self, path, text):
+        """Write string to local file or AWS S3 object.
+
+        """
+        if aws.utils.is_s3_uri(path):
+            with tempfile.TemporaryDirectory() as tmpdir:
+                src = os.path.join(tmpdir,os.path.basename(path))
+                with open(src,'w') as f:
+                    f.write(text)
+                aws.ecco_aws_s3_cp.aws_s3_cp(src=src, dest=path, **self.kwargs)
+        else:
+            with open(path,'w') as f:
+                f.write(text)
+
+
+def config_hash(cfg):
+    """Digest of a parsed ECCO Dataset Production configuration.
+
+    Args:
+        cfg (dict): Parsed ECCO dataset production yaml file.
+
+    Returns:
+        Hexadecimal digest string.
+
+    """
+    return hashlib.sha256(
+        json.dumps(dict(cfg), sort_keys=True, default=str).encode()).hexdigest()
+
+
+def task_inputs(task):
+    """List of all input files referenced by a task descriptor.
+
+    Args:
+        task (dict or ECCOTask): Task descriptor.
+
+    Returns:
+        List of local pathnames and/or AWS S3Uris.
+
+    """
+    if not isinstance(task,ecco_task.ECCOTask):
+        task = ecco_task.ECCOTask(task)
+    inputs = []
+    for variable in task.variable_names:
+        for component in task.variable_inputs(variable):
+            inputs.extend(component)
+    if task.get('input_netcdf'):
+        inputs.append(task['input_netcdf'])
+    return inputs
+
+
+def task_fingerprint( task, cfg, inventory):
+    """Digest of a task descriptor, its configuration, and the ETags (or sizes
+    and modification times) of its inputs.
+
+    Args:
+        task (dict or ECCOTask): Task descriptor.
+        cfg (dict): Parsed ECCO dataset production yaml file.
+        inventory (ECCOInventory): Inventory used to stat task inputs.
+
+    Returns:
+        Hexadecimal digest string.
+
+    """
+    digest = hashlib.sha256()
+    digest.update(json.dumps(dict(task), sort_keys=True, default=str).encode())
+    digest.update(config_hash(cfg).encode())
+    for path in sorted(task_inputs(task)):
+        digest.update(f'{path} {inventory.stat(path)}\n'.encode())
+    return digest.hexdigest()
+
+
+def fingerprint_path(granule):
+    """Name of sidecar file holding the task fingerprint of a granule.
+
+    """
+    return granule + FINGERPRINT_SUFFIX
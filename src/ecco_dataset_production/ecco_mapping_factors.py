@@ -8,8 +8,14 @@ Key capabilities:
 
 - Loading LZMA-compressed sparse matrices from local or S3 storage
 - Depth-level-specific transformation matrices
+- Per-level regrid operators that fuse the wet point gather, the mapping
+  factors, and the land mask into a single sparse matrix
 - Land mask access for lat/lon grid points
-- Coordinate bounds for latitude, longitude, and depth
+- Coordinate bounds for latitude, longitude, and depth, memory-mapped from
+  the latlon grid array store where available
+- Optional attachment to a shared, memory-mapped store of sparse matrices,
+  land masks and bounds, so that multiple worker processes share a single
+  copy (see ecco_shared_store)
 
 The mapping factors enable efficient interpolation using sparse matrix
 multiplication rather than repeated interpolation calculations.
@@ -23,14 +29,135 @@ Example:
 """
 
 import lzma
+import numpy as np
 import os
 import pickle
 from scipy import sparse
 import tempfile
 
 from . import aws
+from . import ecco_grid
 from . import ecco_task
 
+# latlon grid, as written by mapping_factors_utils.create_ecco_grid_values,
+# both as a single pickle (legacy) and as an array store of one .npy file per
+# array that may be memory-mapped:
+LATLON_GRID_DIR = 'latlon_grid'
+LATLON_GRID_PICKLE = 'latlon_grid.xz'
+LATLON_GRID_STORE_ARRAYS = (
+    'latitude_bounds', 'longitude_bounds', 'depth_bounds',
+    'latitude', 'longitude', 'wet_point_indices', 'wet_point_offsets')
+
+
+def save_latlon_grid_store( latlon_grid_dir, latlon_grid):
+    """Write a latlon grid as an array store of .npy files.
+
+    Args:
+        latlon_grid_dir (str): Output directory (created if necessary).
+        latlon_grid (list): [latlon_bounds, depth_bounds, target_grid_dict,
+            wet_pts_k] list, as pickled to latlon_grid.xz, where latlon_bounds
+            is a {'lat','lon'} dictionary of (n,2) bounds arrays,
+            target_grid_dict includes 'lats_1D' and 'lons_1D' center arrays,
+            and wet_pts_k is a level-keyed dictionary of numpy.where index
+            tuples. Wet point indices of all levels are stored as a single
+            (index dimensions, number of wet points) int32 array, with
+            per-level offsets.
+
+    """
+    latlon_bounds, depth_bounds, target_grid_dict, wet_pts_k = latlon_grid
+    indices, offsets = ecco_grid.stack_wet_point_indices(wet_pts_k)
+    arrays = {
+        'latitude_bounds': latlon_bounds['lat'],
+        'longitude_bounds': latlon_bounds['lon'],
+        'depth_bounds': depth_bounds,
+        'latitude': target_grid_dict['lats_1D'],
+        'longitude': target_grid_dict['lons_1D'],
+        'wet_point_indices': indices,
+        'wet_point_offsets': offsets}
+    os.makedirs(latlon_grid_dir, exist_ok=True)
+    for name,array in arrays.items():
+        tmp = os.path.join(latlon_grid_dir, f'{name}.{os.getpid()}.tmp.npy')
+        np.save(tmp, np.asarray(array))
+        os.replace(tmp, os.path.join(latlon_grid_dir, f'{name}.npy'))
+
+
+def load_latlon_grid_store( latlon_grid_dir, mmap_mode='r'):
+    """Load a latlon grid array store (see save_latlon_grid_store).
+
+    Args:
+        latlon_grid_dir (str): Array store directory.
+        mmap_mode (str): numpy.load memory-map mode; by default, arrays are
+            mapped read-only rather than read, so that they are paged in only
+            as referenced, and shared by all processes on a host.
+
+    Returns:
+        [latlon_bounds, depth_bounds, target_grid_dict, wet_pts_k] list, as
+        pickled to latlon_grid.xz, with per-level wet point indices as views
+        of the stored index array, or None if the store is incomplete or does
+        not exist.
+
+    """
+    paths = {name: os.path.join(latlon_grid_dir, f'{name}.npy')
+        for name in LATLON_GRID_STORE_ARRAYS}
+    if not all(os.path.isfile(path) for path in paths.values()):
+        return None
+    arrays = {name: np.load(path, mmap_mode=mmap_mode) for name,path in paths.items()}
+    wet_pts_k = ecco_grid.unstack_wet_point_indices(
+        arrays['wet_point_indices'], arrays['wet_point_offsets'])
+    target_grid_dict = {
+        'shape': (arrays['latitude'].shape[0], arrays['longitude'].shape[0]),
+        'lats_1D': arrays['latitude'],
+        'lons_1D': arrays['longitude']}
+    return [
+        {'lat': arrays['latitude_bounds'], 'lon': arrays['longitude_bounds']},
+        arrays['depth_bounds'], target_grid_dict, wet_pts_k]
+
+
+def latlon_regrid_operator( factors, land_mask, wet_point_indices, native_shape, dtype=None):
+    """Fuse a level's wet point gather, native to latlon mapping factors, and
+    latlon land mask into a single sparse regrid operator.
+
+    The operator's columns index the flattened native grid level directly
+    (rather than its wet points), and its rows are the latlon ocean points
+    only, so that regridding a native level is one sparse product, whose
+    result is scattered to the ocean points of an otherwise NaN (land) latlon
+    output:
+
+        >>> operator, targets = latlon_regrid_operator(...)
+        >>> latlon = np.full(nlat*nlon, np.nan)
+        >>> latlon[targets] = operator.dot(native_level.reshape(-1))
+
+    Args:
+        factors (scipy.sparse matrix): (number of wet points, number of latlon
+            points) mapping factors (see
+            ECCOMappingFactors.native_to_latlon_mapping_factors).
+        land_mask (numpy.ndarray): Latlon land mask vector, NaN at land points
+            (see ECCOMappingFactors.latlon_land_mask).
+        wet_point_indices (tuple): "numpy.where" indices of the level's native
+            grid wet points (see ECCOGrid.native_wet_point_indices).
+        native_shape (tuple): Native grid level shape, e.g., (tile,j,i).
+        dtype (numpy dtype): Optional operator precision.
+
+    Returns:
+        (operator, targets) tuple, where operator is a (number of latlon ocean
+        points, native level size) scipy.sparse CSR matrix and targets the
+        flattened latlon indices of its rows.
+
+    """
+    targets = np.flatnonzero(~np.isnan(land_mask))
+    gathered = factors.T.tocsr()[targets]
+    # wet point -> flattened native level index (order-preserving, so column
+    # indices remain sorted):
+    size = int(np.prod(native_shape))
+    index_dtype = np.int32 if size <= np.iinfo(np.int32).max else np.int64
+    columns = np.ravel_multi_index(wet_point_indices, native_shape).astype(index_dtype)
+    operator = sparse.csr_matrix(
+        (gathered.data, columns[gathered.indices], gathered.indptr.astype(index_dtype)),
+        shape=(targets.size, size))
+    if dtype:
+        operator = operator.astype(dtype, copy=False)
+    return operator, targets.astype(index_dtype)
+
 
 class ECCOMappingFactors(object):
     """Container class for ECCO mapping factors access. Primarily intended to
@@ -49,6 +176,9 @@ class ECCOMappingFactors(object):
             and the subdirectories 3D, land_mask, latlon_grid, and sparse) or
             similar remote location given by AWS S3 bucket/prefix.  Either
             mapping_factors_loc or task may be provided but not both.
+        cache_dir (str): Optional shared local cache directory for AWS S3
+            mapping factors data (see aws.ecco_aws_s3_cache). If not provided,
+            the EDP_CACHE_DIR environment variable, if set, is used.
         \*\*kwargs: If either task or mapping_factors_loc reference an AWS S3
             endpoint and if running within an institutionally-managed AWS IAM
             Identity Center (SSO) environment, additional arguments that may be
@@ -63,26 +193,33 @@ class ECCOMappingFactors(object):
             descriptor.
         mapping_factors_dir (str): Resulting local ECCO mapping factors
             directory name (see tmpdir).
+        shared_store (ECCOSharedStore): Shared store from which mapping
+            factors arrays are memory-mapped, if attached (see
+            attach_shared_store), None otherwise.
         tmpdir (tempfile.TemporaryDirectory object): If task or
             mapping_factors_loc references an AWS S3 endpoint, temporary
-            directory object whose 'name' attribute is assigned to
-            mapping_factors_dir.
+            directory object (or shared cache entry handle, if cache_dir is in
+            effect) whose 'name' attribute is assigned to mapping_factors_dir.
 
     Properties:
         latitude_bounds ((360,2) numpy.ndarray): Latitude grid bounds per
-            ./latlon_grid/latlon_grid.xz.
+            ./latlon_grid/latlon_grid.xz. As with longitude_bounds and
+            depth_bounds, loaded once and returned as a shared, read-only
+            array.
         longitude_bounds ((720,2) numpy.ndarray): Longitude grid bounds per
             ./latlon_grid/latlon_grid.xz.
         depth_bounds ((no. of grid depths, 2) numpy.ndarray): Depth grid bounds
             per ./latlon_grid/latlon_grid.xz.
 
     """
-    def __init__(self, task=None, mapping_factors_loc=None, **kwargs):
+    def __init__(self, task=None, mapping_factors_loc=None, cache_dir=None, **kwargs):
         """Create instance of MappingFactors class.
         
         """
         self.task = None
+        self.shared_store = None
         self.__latlon_grid = None
+        self._regrid_operators = {}
 
         if task:
             if not isinstance(task,ecco_task.ECCOTask):
@@ -93,7 +230,13 @@ class ECCOMappingFactors(object):
                 self.task = task
             mapping_factors_loc = self.task['ecco_mapping_factors_loc']
 
-        if aws.utils.is_s3_uri(mapping_factors_loc):
+        cache = aws.ecco_aws_s3_cache.cache_from_env(cache_dir)
+
+        if aws.utils.is_s3_uri(mapping_factors_loc) and cache:
+            # retrieve mapping factors via shared cache:
+            self.tmpdir = cache.fetch(mapping_factors_loc, recursive=True, **kwargs)
+            self.mapping_factors_dir = self.tmpdir.name
+        elif aws.utils.is_s3_uri(mapping_factors_loc):
             # retrieve mapping factors to temporary local storage:
             self.tmpdir = tempfile.TemporaryDirectory()
             self.mapping_factors_dir = self.tmpdir.name
@@ -105,46 +248,109 @@ class ECCOMappingFactors(object):
             self.mapping_factors_dir = mapping_factors_loc
 
 
+    def attach_shared_store( self, store):
+        """Use regrid operators, land masks, and coordinate bounds
+        memory-mapped from a shared store (see
+        ecco_shared_store.open_shared_store), rather than building or reading
+        them from the mapping factors directory.
+
+        Args:
+            store (ECCOSharedStore): Published shared store.
+
+        """
+        self.shared_store = store
+        self.__latlon_grid = None
+        self._regrid_operators = {}
+
+
     def latlon_land_mask( self, level):
         """Get numpy land mask vector of length number of latlon grid points
         corresponding to depth "level".
 
         """
+        if self.shared_store is not None:
+            return self.shared_store.array(f'factors/land_mask_{level}')
         return pickle.load(lzma.open(os.path.join(
             self.mapping_factors_dir,'land_mask',f'ecco_latlon_land_mask_{level}.xz')))
 
 
-    def native_to_latlon_mapping_factors( self, level):
+    def native_to_latlon_mapping_factors( self, level, dtype=None):
         """Get scipy sparse matrix native to latlon grid mapping factors
-        corresponding to depth "level".
+        corresponding to depth "level", optionally cast to dtype (e.g.,
+        numpy.float32, for float32 regridding).
 
         """
-        return sparse.load_npz(
+        factors = sparse.load_npz(
             os.path.join(self.mapping_factors_dir,'sparse',f'sparse_matrix_{level}.npz'))
+        return factors.astype(dtype,copy=False) if dtype else factors
+
+
+    def latlon_regrid_operator( self, level, wet_point_indices, native_shape, dtype=None):
+        """Get depth "level"'s fused regrid operator and latlon target indices
+        (see latlon_regrid_operator), built once per level and precision. If a
+        shared store is attached, the operator references the shared arrays,
+        and is only copied if its precision differs from dtype.
+
+        Args:
+            level (int): Depth level.
+            wet_point_indices (tuple): "numpy.where" indices of the level's
+                native grid wet points (see ECCOGrid.native_wet_point_indices).
+            native_shape (tuple): Native grid level shape, e.g., (tile,j,i).
+            dtype (numpy dtype): Optional operator precision.
+
+        Returns:
+            (operator, targets) tuple.
+
+        """
+        if self.shared_store is not None and self.shared_store.has_regrid_operator(level):
+            operator, targets = self.shared_store.regrid_operator(level)
+            return (operator.astype(dtype,copy=False) if dtype else operator), targets
+        key = (level, np.dtype(dtype).name if dtype else None)
+        if key not in self._regrid_operators:
+            self._regrid_operators[key] = latlon_regrid_operator(
+                self.native_to_latlon_mapping_factors(level=level),
+                self.latlon_land_mask(level=level),
+                wet_point_indices, native_shape, dtype)
+        return self._regrid_operators[key]
 
 
     @property
     def latitude_bounds(self):
-        if not self.__latlon_grid:
-            self.__latlon_grid = pickle.load(lzma.open(os.path.join(
-                self.mapping_factors_dir,'latlon_grid','latlon_grid.xz')))
-        return self.__latlon_grid[0]['lat']
+        return self._latlon_grid()[0]['lat']
 
 
     @property
     def longitude_bounds(self):
-        if not self.__latlon_grid:
-            self.__latlon_grid = pickle.load(lzma.open(os.path.join(
-                self.mapping_factors_dir,'latlon_grid','latlon_grid.xz')))
-        return self.__latlon_grid[0]['lon']
+        return self._latlon_grid()[0]['lon']
 
 
     @property
     def depth_bounds(self):
-        if not self.__latlon_grid:
-            self.__latlon_grid = pickle.load(lzma.open(os.path.join(
-                self.mapping_factors_dir,'latlon_grid','latlon_grid.xz')))
-        return self.__latlon_grid[1]
+        return self._latlon_grid()[1]
+
+
+    def _latlon_grid(self):
+        """Load ./latlon_grid once, memory-mapped from its array store if
+        present (see load_latlon_grid_store), otherwise from latlon_grid.xz,
+        marking coordinate bounds arrays read-only so that they may be
+        attached to any number of granules without copying. If a shared store
+        is attached, only the coordinate bounds are referenced, from the
+        store.
+
+        """
+        if not self.__latlon_grid and self.shared_store is not None:
+            self.__latlon_grid = [
+                {'lat': self.shared_store.array('factors/latitude_bounds'),
+                 'lon': self.shared_store.array('factors/longitude_bounds')},
+                self.shared_store.array('factors/depth_bounds')]
+        elif not self.__latlon_grid:
+            latlon_grid_dir = os.path.join(self.mapping_factors_dir,LATLON_GRID_DIR)
+            self.__latlon_grid = load_latlon_grid_store(latlon_grid_dir) or \
+                pickle.load(lzma.open(os.path.join(latlon_grid_dir,LATLON_GRID_PICKLE)))
+            for bounds in (self.__latlon_grid[0]['lat'],
+                self.__latlon_grid[0]['lon'], self.__latlon_grid[1]):
+                bounds.flags.writeable = False
+        return self.__latlon_grid
 
 
     def __del__(self):
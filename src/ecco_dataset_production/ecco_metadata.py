@@ -49,6 +49,9 @@ class ECCOMetadata(object):
         ecco_metadata_loc (str): Optional pathname of either ECCO metadata directory,
             or similar remote location given by AWS S3 bucket/prefix. Either
             ecco_metadata_loc or task may be provided but not both.
+        cache_dir (str): Optional shared local cache directory for AWS S3
+            metadata (see aws.ecco_aws_s3_cache). If not provided, the
+            EDP_CACHE_DIR environment variable, if set, is used.
         \*\*kwargs: If either task or ecco_metadata_loc references an AWS S3
             endpoint and if running within an institutionally-managed AWS IAM
             Identity Center (SSO) environment, additional arguments that may be
@@ -59,21 +62,24 @@ class ECCOMetadata(object):
                 keygen (e.g., 'default', 'saml-pub', etc.)
 
     Attributes:
+        cache_dir (str): Local store of cache_dir input.
         task (ECCOTask): If provided, local object store of input task
             descriptor.
         metadata_dir (str): Resulting local ECCO metadata directory name (see
             tmpdir), ecco_metadata_loc otherwise.
         tmpdir (tempfile.TemporaryDirectory object): If task or ecco_metadata_loc
-            references an AWS S3 endpoint, temporary directory object whose
-            'name' attribute is assigned to metadata_dir. In the case of a zipped
+            references an AWS S3 endpoint, temporary directory object (or
+            shared cache entry handle, if cache_dir is in effect) whose 'name'
+            attribute is assigned to metadata_dir. In the case of a zipped
             archive (see "Notes"), tmpdir's 'name' may be extended accordingly
             prior to assigning to grid_dir.
 
     """
-    def __init__( self, task=None, ecco_metadata_loc=None, **kwargs):
+    def __init__( self, task=None, ecco_metadata_loc=None, cache_dir=None, **kwargs):
         """Create instance of ECCOMetadata class.
 
         """
+        self.cache_dir = cache_dir
         self.metadata_dir = None
         self.task = None
         self.tmpdir = None
@@ -93,7 +99,13 @@ class ECCOMetadata(object):
         if ecco_metadata_loc is None:
             raise ValueError("ecco_metadata_loc cannot be None")
             
-        if aws.utils.is_s3_uri(ecco_metadata_loc):
+        cache = aws.ecco_aws_s3_cache.cache_from_env(cache_dir)
+
+        if aws.utils.is_s3_uri(ecco_metadata_loc) and cache:
+            # retrieve ecco metadata via shared cache:
+            self.tmpdir = cache.fetch(ecco_metadata_loc, recursive=True, **kwargs)
+            self.metadata_dir = self.tmpdir.name
+        elif aws.utils.is_s3_uri(ecco_metadata_loc):
             # retrieve ecco metadata to temporary local storage:
             self.tmpdir = tempfile.TemporaryDirectory()
             self.metadata_dir = self.tmpdir.name
@@ -0,0 +1,237 @@
+"""Pipelined, multi-stage executor with bounded inter-stage queues.
+
+Granule generation consists of largely independent I/O-bound (input fetch,
+output upload) and CPU-bound (MDS read, regrid, mask, metadata, NetCDF
+encoding) stages. Running them strictly in sequence for each task leaves the
+CPU idle during transfers, and the network idle during computation.
+
+:class:`ECCOPipeline` runs a sequence of :class:`ECCOPipelineStage` functions
+over a stream of items, with each stage processing up to its configured
+number of items concurrently, in its own thread (or process) pool, driven by
+an asyncio event loop. Stages are connected by bounded queues, so that the
+number of items in flight, and therefore the memory and local disk used by
+fetched inputs and intermediate results, is capped at (approximately) the sum
+of stage concurrencies and queue sizes.
+
+Per-stage occupancy metrics are collected to aid tuning of concurrency limits:
+a stage with occupancy near 1 and a starved downstream stage is a bottleneck;
+a stage that is frequently blocked on a full output queue is ahead of its
+downstream stages.
+
+Example:
+    >>> from ecco_dataset_production import ecco_pipeline
+    >>> pipeline = ecco_pipeline.ECCOPipeline([
+    ...     ecco_pipeline.ECCOPipelineStage('fetch', fetch, concurrency=4),
+    ...     ecco_pipeline.ECCOPipelineStage('compute', compute, concurrency=2),
+    ...     ecco_pipeline.ECCOPipelineStage('upload', upload, concurrency=4)])
+    >>> pipeline.run(items, on_done=report)
+    >>> pipeline.metrics()
+
+"""
+
+import asyncio
+import concurrent.futures
+import logging
+import time
+
+log = logging.getLogger('edp.'+__name__)
+
+_DONE = object()
+
+
+class ECCOPipelineStage(object):
+    """Single pipeline stage.
+
+    Args:
+        name (str): Stage name (for metrics and logging).
+        func (callable): Function taking a single item as input and returning
+            the (possibly updated) item to be passed to the next stage.
+            Exceptions are reported via the pipeline's on_done callback, and
+            the item is dropped from subsequent stages.
+        concurrency (int): Maximum number of items processed at once.
+        executor (str): 'thread' (default), or 'process' for CPU-bound
+            functions that hold the GIL. If 'process', func and items must be
+            picklable, and any changes func makes to its input item are only
+            visible downstream via its return value.
+
+    Attributes:
+        name (str): Stage name.
+        concurrency (int): Maximum number of items processed at once.
+        stats (dict): Raw counters accumulated during the most recent run
+            (items, errors, busy_seconds, starved_seconds, blocked_seconds,
+            max_queue_depth).
+
+    """
+    def __init__( self, name, func, concurrency=1, executor='thread'):
+        if executor not in ('thread','process'):
+            raise RuntimeError(f"Unknown pipeline stage executor type '{executor}'")
+        if concurrency < 1:
+            raise RuntimeError(f"Pipeline stage '{name}' concurrency must be at least 1")
+        self.name = name
+        self.func = func
+        self.concurrency = concurrency
+        self.executor = executor
+        self.reset_stats()
+
+
+    def reset_stats(self):
+        """Reset stage counters.
+
+        """
+        self.stats = {
+            'items':0, 'errors':0, 'busy_seconds':0., 'starved_seconds':0.,
+            'blocked_seconds':0., 'max_queue_depth':0}
+
+
+    def create_executor(self):
+        """Return a new executor for this stage.
+
+        """
+        if self.executor == 'process':
+            return concurrent.futures.ProcessPoolExecutor(max_workers=self.concurrency)
+        return concurrent.futures.ThreadPoolExecutor(
+            max_workers=self.concurrency, thread_name_prefix=f'edp-{self.name}')
+
+
+class ECCOPipeline(object):
+    """Pipelined executor for a sequence of stages.
+
+    Args:
+        stages (list): ECCOPipelineStage instances, in processing order.
+        queue_size (int): Maximum number of items waiting between consecutive
+            stages (default: 1).
+
+    """
+    def __init__( self, stages, queue_size=1):
+        if not stages:
+            raise RuntimeError('Pipeline requires at least one stage')
+        self.stages = stages
+        self.queue_size = queue_size
+        self.elapsed_seconds = 0.
+
+
+    def run( self, items, on_done=None):
+        """Process all items through all pipeline stages.
+
+        Args:
+            items (iterable): Input items (consumed lazily, as the first
+                stage has capacity).
+            on_done (callable): Optional function called, in the event loop
+                thread, as on_done(item, error) once for each item, either
+                after the last stage (error=None) or after the stage in which
+                it failed (error=the raised exception).
+
+        Returns:
+            Per-stage metrics dictionary (see metrics()).
+
+        """
+        for stage in self.stages:
+            stage.reset_stats()
+        start = time.perf_counter()
+        try:
+            asyncio.run(self._run(items, on_done))
+        finally:
+            self.elapsed_seconds = time.perf_counter() - start
+        metrics = self.metrics()
+        for name, m in metrics.items():
+            log.info(
+                'stage %s: %d items (%d errors), occupancy %.2f, starved %.1fs, '
+                'blocked %.1fs, max queue depth %d', name, m['items'], m['errors'],
+                m['occupancy'], m['starved_seconds'], m['blocked_seconds'],
+                m['max_queue_depth'])
+        return metrics
+
+
+    async def _run( self, items, on_done):
+        loop = asyncio.get_running_loop()
+        queues = [asyncio.Queue(maxsize=self.queue_size) for _ in self.stages]
+        executors = [stage.create_executor() for stage in self.stages]
+
+        def done(item, error):
+            if on_done:
+                try:
+                    on_done(item, error)
+                except Exception as e:
+                    log.exception(e)
+
+        async def put(i, item):
+            queue = queues[i]
+            stats = self.stages[i-1].stats if i else None
+            t0 = time.perf_counter()
+            await queue.put(item)
+            if stats is not None:
+                stats['blocked_seconds'] += time.perf_counter() - t0
+            if item is not _DONE:
+                self.stages[i].stats['max_queue_depth'] = max(
+                    self.stages[i].stats['max_queue_depth'], queue.qsize())
+
+        async def feed():
+            for item in items:
+                await put(0, item)
+            for _ in range(self.stages[0].concurrency):
+                await put(0, _DONE)
+
+        async def worker(i):
+            stage, stats = self.stages[i], self.stages[i].stats
+            while True:
+                t0 = time.perf_counter()
+                item = await queues[i].get()
+                t1 = time.perf_counter()
+                if item is _DONE:
+                    break
+                stats['starved_seconds'] += t1 - t0
+                try:
+                    result = await loop.run_in_executor(executors[i], stage.func, item)
+                except Exception as e:
+                    stats['busy_seconds'] += time.perf_counter() - t1
+                    stats['errors'] += 1
+                    log.debug('stage %s failed: %s', stage.name, e)
+                    done(item, e)
+                    continue
+                stats['busy_seconds'] += time.perf_counter() - t1
+                stats['items'] += 1
+                if i+1 < len(self.stages):
+                    await put(i+1, result)
+                else:
+                    done(result, None)
+
+        async def run_stage(i):
+            await asyncio.gather(*[worker(i) for _ in range(self.stages[i].concurrency)])
+            if i+1 < len(self.stages):
+                for _ in range(self.stages[i+1].concurrency):
+                    await put(i+1, _DONE)
+
+        try:
+            await asyncio.gather(feed(), *[run_stage(i) for i in range(len(self.stages))])
+        finally:
+            for executor in executors:
+                executor.shutdown(wait=True)
+
+
+    def metrics(self):
+        """Per-stage metrics from the most recent run.
+
+        Returns:
+            Stage name-keyed dictionary of dictionaries with keys:
+            items (int): Items successfully processed.
+            errors (int): Items that raised exceptions.
+            busy_seconds (float): Total time spent processing items, summed
+                over concurrent workers.
+            occupancy (float): busy_seconds/(elapsed time * concurrency),
+                i.e., the fraction of available stage capacity used.
+            starved_seconds (float): Total worker time spent waiting for
+                input.
+            blocked_seconds (float): Total worker time spent waiting for
+                space in the next stage's input queue.
+            max_queue_depth (int): Maximum number of items observed waiting
+                in the stage's input queue.
+
+        """
+        metrics = {}
+        for stage in self.stages:
+            m = dict(stage.stats)
+            capacity = self.elapsed_seconds*stage.concurrency
+            m['occupancy'] = m['busy_seconds']/capacity if capacity else 0.
+            m['concurrency'] = stage.concurrency
+            metrics[stage.name] = m
+        return metrics
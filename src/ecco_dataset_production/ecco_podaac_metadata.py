@@ -38,12 +38,15 @@ class ECCOPODAACMetadata(object):
     """Class to manage access to ECCO-related PO.DAAC metadata, cleanup.
 
     """
-    def __init__( self, metadata_src=None, **kwargs):
+    def __init__( self, metadata_src=None, cache_dir=None, **kwargs):
         """Create instance of ECCOPODAACMetadata class.
 
         Args:
             metadata_src (str): (Path and) filename of ECCO-related PO.DAAC
                 metadata, or similar AWS S3 bucket/prefix/name.
+            cache_dir (str): Optional shared local cache directory for AWS S3
+                metadata (see aws.ecco_aws_s3_cache). If not provided, the
+                EDP_CACHE_DIR environment variable, if set, is used.
             \*\*kwargs: If metadata_src references an AWS S3 endpoint and if
                 running within an institutionally-managed AWS IAM Identity
                 Center (SSO) environment, additional arguments that may be
@@ -59,9 +62,14 @@ class ECCOPODAACMetadata(object):
 
         if metadata_src:
             if aws.utils.is_s3_uri(metadata_src):
-                # retrieve remote metadata to temporary local storage:
-                self.tmpdir = tempfile.TemporaryDirectory()
-                aws.ecco_aws_s3_cp.aws_s3_cp( src=metadata_src, dest=self.tmpdir.name, **kwargs)
+                cache = aws.ecco_aws_s3_cache.cache_from_env(cache_dir)
+                if cache:
+                    # retrieve remote metadata via shared cache:
+                    self.tmpdir = cache.fetch(metadata_src, **kwargs)
+                else:
+                    # retrieve remote metadata to temporary local storage:
+                    self.tmpdir = tempfile.TemporaryDirectory()
+                    aws.ecco_aws_s3_cp.aws_s3_cp( src=metadata_src, dest=self.tmpdir.name, **kwargs)
                 self.metadata_src = os.path.join(self.tmpdir.name,os.path.basename(metadata_src))
             else:
                 # just point to local metadata source:
@@ -0,0 +1,258 @@
+"""Shared, memory-mapped store of read-only ECCO grid and mapping factors
+arrays for multi-process workers.
+
+Each granule generation process otherwise holds its own copy of the arrays
+derived from the ECCO grid and mapping factors: native wet point indices, land
+masks, CS/SN vector rotation fields, coordinate bounds, and, per depth level,
+regrid operators (see ecco_mapping_factors.latlon_regrid_operator) and latlon
+land masks. With one worker process per core,
+the resident grid/factors footprint is multiplied by the number of cores.
+
+Instead, the first process on a host publishes these arrays once, as one .npy
+file per array, to a store directory, by default in POSIX shared memory
+(/dev/shm). All processes, including the publisher, then attach to the store by
+memory-mapping the arrays read-only (see ECCOGrid.attach_shared_store and
+ECCOMappingFactors.attach_shared_store), so that a single physical copy is
+shared by all of them, and pages are only faulted in as referenced.
+
+Store directory layout::
+
+    <root>/
+        <key>/          published store (<group>/<name>.npy files, index.json)
+        <key>.lock      publication lock file
+        .tmp-*/         in-progress publication
+
+Stores are keyed by a digest of the grid and mapping factors files (names,
+sizes and modification times) and the mapping factors precision, so that
+changed inputs result in a new store. Stores are published by atomic rename
+of a fully-populated temporary directory, serialized per key by an exclusive
+lock on <key>.lock, and are never modified thereafter. Since shared memory
+persists until reboot, stores that are no longer needed should be removed
+(e.g., rm -rf /dev/shm/edp) once all workers have exited.
+
+Example:
+    >>> from ecco_dataset_production import ecco_shared_store
+    >>> store = ecco_shared_store.open_shared_store(grid, mapping_factors)
+    >>> grid.attach_shared_store(store)
+    >>> mapping_factors.attach_shared_store(store)
+
+"""
+import fcntl
+import hashlib
+import json
+import logging
+import os
+import shutil
+import tempfile
+
+import numpy as np
+from scipy import sparse
+
+from . import ecco_grid
+
+SHARED_STORE_DIR_ENV = 'EDP_SHARED_STORE_DIR'
+DEFAULT_SHARED_STORE_DIR = '/dev/shm/edp' if os.path.isdir('/dev/shm') \
+    else os.path.join(tempfile.gettempdir(),'edp-shm')
+SHARED_STORE_VERSION = 2
+INDEX_FILENAME = 'index.json'
+
+# native grid variables published as-is, and mask variables published as
+# boolean (True at land points) full-depth land masks ('grid/land_<mask>'):
+SHARED_NATIVE_GRID_VARIABLES = ('CS', 'SN', 'XC_bnds', 'YC_bnds', 'Z_bnds')
+SHARED_NATIVE_LAND_MASKS = ('maskC', 'maskW', 'maskS')
+
+log = logging.getLogger('edp.'+__name__)
+
+
+def _listing( directory):
+    """Sorted (relative path, size, modification time) of all files below
+    directory."""
+    listing = []
+    for dirpath,_,filenames in os.walk(directory):
+        for filename in filenames:
+            path = os.path.join(dirpath,filename)
+            stat = os.stat(path)
+            listing.append([os.path.relpath(path,directory), stat.st_size, int(stat.st_mtime)])
+    return sorted(listing)
+
+
+def resources_digest( grid_dir, mapping_factors_dir):
+    """Digest of the contents of a grid and mapping factors directory pair.
+
+    Files are identified by name, size and modification time (rather than by
+    absolute path) so that processes referencing different local copies of the
+    same inputs, e.g., AWS S3 downloads, compute the same digest.
+
+    """
+    return hashlib.sha256(json.dumps(
+        [_listing(grid_dir), _listing(mapping_factors_dir)]).encode()).hexdigest()
+
+
+def store_key( grid_dir, mapping_factors_dir, dtype=None):
+    """Shared store key for a grid and mapping factors directory pair (see
+    resources_digest) and mapping factors precision.
+
+    """
+    return hashlib.sha256(json.dumps([
+        SHARED_STORE_VERSION, resources_digest(grid_dir, mapping_factors_dir),
+        np.dtype(dtype).name if dtype else None]).encode()).hexdigest()
+
+
+class ECCOSharedStore(object):
+    """Read-only, memory-mapped view of a published shared store.
+
+    Args:
+        store_dir (str): Published store directory.
+
+    Attributes:
+        store_dir (str): Published store directory.
+        index (dict): Store description: array names, and regrid operator
+            shapes by depth level.
+
+    """
+    def __init__( self, store_dir):
+        self.store_dir = store_dir
+        with open(os.path.join(store_dir,INDEX_FILENAME)) as f:
+            self.index = json.load(f)
+        self._arrays = {}
+
+
+    def __contains__( self, name):
+        return name in self.index['arrays']
+
+
+    def array( self, name):
+        """Returns named array (e.g., 'grid/CS'), memory-mapped read-only.
+
+        """
+        if name not in self._arrays:
+            self._arrays[name] = np.load(
+                os.path.join(self.store_dir,f'{name}.npy'), mmap_mode='r')
+        return self._arrays[name]
+
+
+    def native_wet_point_indices(self):
+        """Level-keyed dictionary of native grid wet point indices, as views of
+        the shared index array (see ECCOGrid.native_wet_point_indices).
+
+        """
+        return ecco_grid.unstack_wet_point_indices(
+            self.array('grid/wet_point_indices'), self.array('grid/wet_point_offsets'))
+
+
+    def has_regrid_operator( self, level):
+        """True if level's regrid operator has been published."""
+        return str(level) in self.index['operator_shapes']
+
+
+    def regrid_operator( self, level):
+        """Level's (operator, targets) regrid operator (see
+        ecco_mapping_factors.latlon_regrid_operator), as a CSR matrix whose
+        data and index arrays are the shared arrays (no copies).
+
+        """
+        operator = sparse.csr_matrix(
+            (self.array(f'factors/operator_{level}_data'),
+             self.array(f'factors/operator_{level}_indices'),
+             self.array(f'factors/operator_{level}_indptr')),
+            shape=tuple(self.index['operator_shapes'][str(level)]), copy=False)
+        return operator, self.array(f'factors/operator_{level}_targets')
+
+
+def _publish_arrays( grid, mapping_factors, operator_shapes, dtype=None):
+    """Generate (name, array) pairs of all shared grid and mapping factors
+    arrays, computed using the (unshared) grid and mapping factors instances,
+    recording regrid operator shapes, by level, in operator_shapes."""
+    wet_pts_k = grid.native_wet_point_indices
+    indices, offsets = ecco_grid.stack_wet_point_indices(wet_pts_k)
+    yield 'grid/wet_point_indices', indices
+    yield 'grid/wet_point_offsets', offsets
+    native_grid = grid.native_grid
+    for name in SHARED_NATIVE_LAND_MASKS:
+        if name in native_grid.variables:
+            yield f'grid/land_{name}', grid.native_land_mask(mask_type=name, is_3d=True)
+    for name in SHARED_NATIVE_GRID_VARIABLES:
+        if name in native_grid.variables:
+            yield f'grid/{name}', np.asarray(native_grid[name])
+
+    yield 'factors/latitude_bounds', mapping_factors.latitude_bounds
+    yield 'factors/longitude_bounds', mapping_factors.longitude_bounds
+    yield 'factors/depth_bounds', mapping_factors.depth_bounds
+    for level in range(len(offsets)-1):
+        if not os.path.isfile(os.path.join(
+            mapping_factors.mapping_factors_dir,'sparse',f'sparse_matrix_{level}.npz')):
+            break
+        operator, targets = mapping_factors.latlon_regrid_operator(
+            level=level, wet_point_indices=wet_pts_k[level],
+            native_shape=native_grid['hFacC'].shape[1:], dtype=dtype)
+        yield f'factors/operator_{level}_data', operator.data
+        yield f'factors/operator_{level}_indices', operator.indices
+        yield f'factors/operator_{level}_indptr', operator.indptr
+        yield f'factors/operator_{level}_targets', targets
+        operator_shapes[str(level)] = [int(n) for n in operator.shape]
+        yield f'factors/land_mask_{level}', mapping_factors.latlon_land_mask(level=level)
+
+
+def _publish( store_dir, grid, mapping_factors, dtype=None):
+    """Write all shared arrays to a temporary directory, then atomically
+    publish it as store_dir. Assumes the caller holds the store's exclusive
+    lock.
+
+    """
+    root = os.path.dirname(store_dir)
+    tmpdir = tempfile.mkdtemp(prefix='.tmp-', dir=root)
+    try:
+        log.info('publishing shared grid and mapping factors store %s ...', store_dir)
+        index = {'arrays': [], 'operator_shapes': {}}
+        for name,array in _publish_arrays(
+            grid, mapping_factors, index['operator_shapes'], dtype):
+            os.makedirs(os.path.join(tmpdir,os.path.dirname(name)), exist_ok=True)
+            np.save(os.path.join(tmpdir,f'{name}.npy'), np.asarray(array))
+            index['arrays'].append(name)
+        with open(os.path.join(tmpdir,INDEX_FILENAME),'w') as f:
+            json.dump(index, f)
+        os.rename(tmpdir,store_dir)
+        log.info('... published %d arrays', len(index['arrays']))
+    except:
+        shutil.rmtree(tmpdir,ignore_errors=True)
+        raise
+
+
+def open_shared_store( grid, mapping_factors, root=None, dtype=None):
+    """Return the shared store for a grid and mapping factors pair, publishing
+    it first if no other process has yet done so.
+
+    Args:
+        grid (ECCOGrid): ECCO grid instance, used only if the store is to be
+            published.
+        mapping_factors (ECCOMappingFactors): ECCO mapping factors instance,
+            used only if the store is to be published.
+        root (str): Optional shared store root directory. If not provided, the
+            EDP_SHARED_STORE_DIR environment variable, if set, is used, or
+            DEFAULT_SHARED_STORE_DIR (in POSIX shared memory, if available)
+            otherwise.
+        dtype (numpy dtype): Optional mapping factors precision (e.g.,
+            numpy.float32, for float32 regridding); if not provided, mapping
+            factors are published as stored.
+
+    Returns:
+        ECCOSharedStore instance.
+
+    """
+    root = root or os.environ.get(SHARED_STORE_DIR_ENV) or DEFAULT_SHARED_STORE_DIR
+    os.makedirs(root, exist_ok=True)
+    store_dir = os.path.join(
+        root, store_key(grid.grid_dir, mapping_factors.mapping_factors_dir, dtype))
+
+    if not os.path.isdir(store_dir):
+        lock_fd = os.open(store_dir+'.lock', os.O_RDWR|os.O_CREAT, 0o664)
+        try:
+            # serialize publication among competing processes:
+            fcntl.flock(lock_fd,fcntl.LOCK_EX)
+            if not os.path.isdir(store_dir):
+                _publish(store_dir, grid, mapping_factors, dtype)
+        finally:
+            os.close(lock_fd)
+    else:
+        log.debug('attaching to shared grid and mapping factors store %s', store_dir)
+    return ECCOSharedStore(store_dir)
@@ -113,7 +113,7 @@ class ECCOTask(dict):
         ``'day_mean'``, ``'mon_mean'``, or ``'snap'``.
 
         """
-        return ecco_file.ECCOGranuleFilestr(self.__getitem__('granule')).averaging_period
+        return ecco_file.parse_granule_filestr(self.__getitem__('granule')).averaging_period
 
 
     @property
@@ -124,7 +124,7 @@ class ECCOTask(dict):
         filename convention.
 
         """
-        return ecco_file.ECCOGranuleFilestr(self.__getitem__('granule')).grid_type
+        return ecco_file.parse_granule_filestr(self.__getitem__('granule')).grid_type
 
 
     @property
@@ -177,7 +177,7 @@ class ECCOTask(dict):
         Determined by parsing the granule filename to extract the grid type.
 
         """
-        return ecco_file.ECCOGranuleFilestr(self.__getitem__('granule')).grid_type == 'latlon'
+        return ecco_file.parse_granule_filestr(self.__getitem__('granule')).grid_type == 'latlon'
 
 
     @property
@@ -187,7 +187,7 @@ class ECCOTask(dict):
         Determined by parsing the granule filename to extract the grid type.
 
         """
-        return ecco_file.ECCOGranuleFilestr(self.__getitem__('granule')).grid_type == 'native'
+        return ecco_file.parse_granule_filestr(self.__getitem__('granule')).grid_type == 'native'
 
 
     @property
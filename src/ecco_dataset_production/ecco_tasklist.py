@@ -0,0 +1,273 @@
+"""Streaming tasklist readers and writers.
+
+Two tasklist formats are supported:
+
+``json``
+    The original format: a single JSON array of complete task descriptors, as
+    generated by create_job_task_list.
+
+``jsonl``
+    A compact, line-oriented format in which fields that are shared by
+    consecutive tasks (configuration, grid, mapping factors and metadata
+    locations, and all dynamic metadata other than time coverage) are written
+    once, rather than repeated in every task::
+
+        {"edp_tasklist": 1}
+        {"_defaults": {"ecco_cfg_loc": "...", ..., "dynamic_metadata": {"name": "...", ...}}}
+        {"granule": "...", "variables": {...}, "dynamic_metadata": {"time_coverage_start": "...", ...}}
+        {"granule": "...", "variables": {...}, "dynamic_metadata": {"time_coverage_start": "...", ...}}
+        {"_defaults": {...}}
+        ...
+
+    The first line is a format header. Each '_defaults' record replaces the
+    shared fields applied to all subsequent task records; task records are
+    merged with the current defaults (one level deep for 'dynamic_metadata').
+
+Both formats are read lazily, one task at a time, so that tasklists need not
+be held in memory in their entirety, and written incrementally.
+
+Example:
+    >>> from ecco_dataset_production import ecco_tasklist
+    >>> for task in ecco_tasklist.read_tasklist('tasks.jsonl'):
+    ...     print(task['granule'])
+    >>> ecco_tasklist.write_tasklist(tasks, 'tasks.jsonl')
+
+"""
+
+import json
+import logging
+import os
+import re
+import sys
+import tempfile
+
+from . import aws
+
+TASKLIST_FORMATS = ('json','jsonl')
+JSONL_HEADER_KEY = 'edp_tasklist'
+JSONL_VERSION = 1
+JSONL_DEFAULTS_KEY = '_defaults'
+
+# task fields, and dynamic metadata fields, that vary from task to task:
+TASK_VARYING_FIELDS = ('granule','variables','input_netcdf')
+DYNAMIC_METADATA_VARYING_FIELDS = (
+    'time_coverage_start','time_coverage_end','time_coverage_center')
+
+_READ_CHUNK_SIZE = 1024*1024
+_JSON_ARRAY_SEPARATORS = re.compile(r'[\s,]*')
+
+log = logging.getLogger('edp.'+__name__)
+
+
+def tasklist_format(path):
+    """Tasklist format implied by file name extension ('jsonl' if '.jsonl',
+    otherwise 'json').
+
+    """
+    return 'jsonl' if str(path).endswith('.jsonl') else 'json'
+
+
+def read_tasklist( tasklist, **kwargs):
+    """Lazily iterate over the task descriptors in a tasklist file of either
+    format (determined from content, not file name).
+
+    Args:
+        tasklist (str): (Path and) name, or AWS S3 object name, of tasklist
+            file.
+        **kwargs: If tasklist is an AWS S3 object, passed to aws_s3_cp (e.g.,
+            keygen, profile).
+
+    Yields:
+        Task descriptor dictionaries.
+
+    Raises:
+        RuntimeError if the file is not a recognizable tasklist.
+
+    """
+    if aws.utils.is_s3_uri(tasklist):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            _dest = os.path.join(tmpdir,os.path.basename(tasklist))
+            aws.ecco_aws_s3_cp.aws_s3_cp( src=tasklist, dest=_dest, **kwargs)
+            yield from read_tasklist(_dest)
+        return
+
+    with open(tasklist) as f:
+        first = _peek_nonspace(f)
+        if first == '[':
+            yield from _iter_json_array(f)
+        elif first == '{':
+            yield from _iter_jsonl(f)
+        elif first:
+            raise RuntimeError(f'{tasklist} is not a recognized tasklist format')
+
+
+def load_tasklist( tasklist, **kwargs):
+    """Read a complete tasklist into a list (see read_tasklist).
+
+    """
+    return list(read_tasklist(tasklist, **kwargs))
+
+
+def _peek_nonspace(f):
+    """Return first non-whitespace character of a text file, leaving the file
+    positioned at that character.
+
+    """
+    while True:
+        pos = f.tell()
+        c = f.read(1)
+        if not c or not c.isspace():
+            f.seek(pos)
+            return c
+
+
+def _iter_json_array(f):
+    """Incrementally decode the elements of a JSON array.
+
+    Elements are decoded in place, at an offset into the current read buffer;
+    the buffer is only copied when refilled, i.e., once per chunk read.
+
+    """
+    decoder = json.JSONDecoder()
+    buf = f.read(_READ_CHUNK_SIZE)
+    idx = buf.index('[') + 1
+    eof = False
+    while True:
+        idx = _JSON_ARRAY_SEPARATORS.match(buf, idx).end()
+        if idx < len(buf) and buf[idx] == ']':
+            return
+        try:
+            obj, end = decoder.raw_decode(buf, idx)
+        except json.JSONDecodeError:
+            if eof:
+                raise
+            # element incomplete, or buffer exhausted: refill and retry
+            chunk = f.read(_READ_CHUNK_SIZE)
+            eof = not chunk
+            buf, idx = buf[idx:] + chunk, 0
+            continue
+        yield obj
+        idx = end
+
+
+def _iter_jsonl(f):
+    """Decode tasks from compact JSON lines tasklist, applying defaults.
+
+    """
+    defaults = {}
+    for lineno, line in enumerate(f, start=1):
+        if not line.strip():
+            continue
+        record = json.loads(line)
+        if JSONL_HEADER_KEY in record:
+            if record[JSONL_HEADER_KEY] > JSONL_VERSION:
+                raise RuntimeError(
+                    f'Unsupported tasklist version {record[JSONL_HEADER_KEY]} (line {lineno})')
+        elif JSONL_DEFAULTS_KEY in record:
+            defaults = record[JSONL_DEFAULTS_KEY]
+        else:
+            task = dict(defaults)
+            task.update(record)
+            if 'dynamic_metadata' in defaults:
+                # (copy, so that tasks do not share mutable defaults)
+                task['dynamic_metadata'] = dict(defaults['dynamic_metadata'])
+                task['dynamic_metadata'].update(record.get('dynamic_metadata',{}))
+            yield task
+
+
+def split_task(task):
+    """Split a task descriptor into its shared (defaults) and task-specific
+    parts, per TASK_VARYING_FIELDS and DYNAMIC_METADATA_VARYING_FIELDS.
+
+    Returns:
+        (shared, specific) tuple of dictionaries.
+
+    """
+    shared, specific = {}, {}
+    for key, value in task.items():
+        if key in TASK_VARYING_FIELDS:
+            specific[key] = value
+        elif key == 'dynamic_metadata' and isinstance(value, dict):
+            shared[key] = {k:v for k,v in value.items() if k not in DYNAMIC_METADATA_VARYING_FIELDS}
+            varying = {k:v for k,v in value.items() if k in DYNAMIC_METADATA_VARYING_FIELDS}
+            if varying:
+                specific[key] = varying
+        else:
+            shared[key] = value
+    return shared, specific
+
+
+class ECCOTasklistWriter(object):
+    """Incremental tasklist writer.
+
+    Args:
+        fp (file): Open text file (or sys.stdout).
+        format (str): 'json' (default) or 'jsonl'.
+
+    Example:
+        >>> with open('tasks.jsonl','w') as fp:
+        ...     writer = ECCOTasklistWriter(fp, format='jsonl')
+        ...     for task in tasks:
+        ...         writer.write(task)
+        ...     writer.close()
+
+    """
+    def __init__( self, fp, format='json'):
+        if format not in TASKLIST_FORMATS:
+            raise RuntimeError(f"Unknown tasklist format '{format}'")
+        self.fp = fp
+        self.format = format
+        self.count = 0
+        self._defaults = None
+        if format == 'jsonl':
+            self.fp.write(json.dumps({JSONL_HEADER_KEY:JSONL_VERSION}) + '\n')
+
+
+    def write( self, task):
+        """Write a single task descriptor.
+
+        """
+        if self.format == 'json':
+            # element formatting identical to json.dump(tasks, fp, indent=4):
+            self.fp.write(('[\n' if not self.count else ',\n') + json.dumps([task], indent=4)[2:-2])
+        else:
+            shared, specific = split_task(task)
+            if shared != self._defaults:
+                self.fp.write(json.dumps({JSONL_DEFAULTS_KEY:shared}) + '\n')
+                self._defaults = shared
+            self.fp.write(json.dumps(specific) + '\n')
+        self.count += 1
+
+
+    def close(self):
+        """Complete the tasklist (the underlying file is not closed).
+
+        """
+        if self.format == 'json':
+            self.fp.write('\n]' if self.count else '[]')
+
+
+def write_tasklist( tasks, tasklist=None, format=None):
+    """Write task descriptors to a tasklist file.
+
+    Args:
+        tasks (iterable): Task descriptors (consumed incrementally).
+        tasklist (str): Output (path and) file name, or None for stdout.
+        format (str): 'json' or 'jsonl'. Default: as implied by the tasklist
+            file name extension (see tasklist_format), or 'json' for stdout.
+
+    Returns:
+        Number of tasks written.
+
+    """
+    format = format or (tasklist_format(tasklist) if tasklist else 'json')
+    fp = open(tasklist,'w') if tasklist else sys.stdout
+    try:
+        writer = ECCOTasklistWriter(fp, format=format)
+        for task in tasks:
+            writer.write(task)
+        writer.close()
+    finally:
+        if tasklist:
+            fp.close()
+    return writer.count
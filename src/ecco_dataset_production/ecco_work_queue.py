@@ -0,0 +1,415 @@
+"""Pull-based work queue for dynamic distribution of granule tasks to workers.
+
+Rather than pre-splitting tasklists into static per-job chunks, a coordinator
+loads all task descriptors into a queue, and any number of workers (e.g., AWS
+Batch jobs, or processes on a single host) repeatedly lease, process, and
+acknowledge tasks until the queue is drained. Workers that finish early simply
+lease more tasks, so throughput scales with the number of workers.
+
+Leases carry a visibility timeout. Workers extend their leases with periodic
+heartbeats while a task is in progress; if a worker dies, its lease expires and
+the task is automatically re-leased to another worker (up to a maximum number
+of attempts, after which the task is marked failed).
+
+Backends are pluggable via the :class:`ECCOWorkQueue` interface. A SQLite
+implementation, suitable for a single host or for shared storage with working
+POSIX file locking (e.g., Amazon EFS), is provided; ``':memory:'`` may be used
+as an in-process stand-in for testing.
+
+Example:
+    >>> from ecco_dataset_production import ecco_work_queue
+    >>> queue = ecco_work_queue.open_work_queue('/efs/edp/queue.db')
+    >>> queue.put(tasks)
+    >>> lease = queue.lease(worker_id='worker-1')
+    >>> ... # process lease.task
+    >>> queue.ack(lease)
+
+"""
+
+import abc
+import json
+import logging
+import os
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+
+DEFAULT_VISIBILITY_TIMEOUT = 600.
+DEFAULT_MAX_ATTEMPTS = 3
+
+PENDING = 'pending'
+LEASED = 'leased'
+DONE = 'done'
+FAILED = 'failed'
+
+log = logging.getLogger('edp.'+__name__)
+
+
+class ECCOWorkQueueLease(object):
+    """Leased task handle.
+
+    Args:
+        task_id (int): Queue task identifier.
+        lease_id (str): Unique lease identifier (invalidated if the lease
+            expires and the task is re-leased).
+        task (dict): Task descriptor.
+        attempt (int): Lease attempt number (1 for first lease).
+
+    """
+    def __init__( self, task_id, lease_id, task, attempt):
+        self.task_id = task_id
+        self.lease_id = lease_id
+        self.task = task
+        self.attempt = attempt
+
+
+class ECCOWorkQueue(abc.ABC):
+    """Work queue backend interface.
+
+    Args:
+        visibility_timeout (float): Seconds after which an un-heartbeated lease
+            expires and its task becomes available for re-lease.
+        max_attempts (int): Maximum number of leases per task before it is
+            marked failed.
+
+    """
+    def __init__( self, visibility_timeout=DEFAULT_VISIBILITY_TIMEOUT,
+        max_attempts=DEFAULT_MAX_ATTEMPTS):
+        self.visibility_timeout = visibility_timeout
+        self.max_attempts = max_attempts
+
+
+    @abc.abstractmethod
+    def put( self, tasks):
+        """Add task descriptors to the queue. Returns number of tasks added.
+
+        """
+
+
+    @abc.abstractmethod
+    def lease( self, worker_id=None):
+        """Lease the next available task. Returns ECCOWorkQueueLease, or None
+        if no tasks are currently available.
+
+        """
+
+
+    @abc.abstractmethod
+    def heartbeat( self, lease):
+        """Extend a lease by visibility_timeout. Returns False if the lease is
+        no longer held (i.e., it expired and the task was re-leased).
+
+        """
+
+
+    @abc.abstractmethod
+    def ack( self, lease):
+        """Mark a leased task done. Returns False if the lease is no longer
+        held.
+
+        """
+
+
+    @abc.abstractmethod
+    def fail( self, lease, error=None):
+        """Release a leased task after a processing error; the task is
+        re-queued unless max_attempts has been reached, in which case it is
+        marked failed. Returns False if the lease is no longer held.
+
+        """
+
+
+    @abc.abstractmethod
+    def status(self):
+        """Return state-keyed dictionary of task counts.
+
+        """
+
+
+    @abc.abstractmethod
+    def failed_tasks(self):
+        """Return list of (task descriptor, error) tuples for failed tasks.
+
+        """
+
+
+    @abc.abstractmethod
+    def requeue_failed(self):
+        """Return failed tasks to the queue with reset attempt counts. Returns
+        the number of tasks requeued.
+
+        """
+
+
+    def is_drained(self):
+        """True if no tasks are pending or leased.
+
+        """
+        counts = self.status()
+        return not counts.get(PENDING) and not counts.get(LEASED)
+
+
+class ECCOSQLiteWorkQueue(ECCOWorkQueue):
+    """SQLite-backed work queue.
+
+    Args:
+        path (str): SQLite database file name (created if necessary), or
+            ':memory:' for an in-process queue.
+        **kwargs: Passed to ECCOWorkQueue (visibility_timeout, max_attempts).
+
+    """
+    def __init__( self, path, **kwargs):
+        super().__init__(**kwargs)
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(
+            path, timeout=60., isolation_level=None, check_same_thread=False)
+        with self._lock:
+            self._conn.execute(
+                """CREATE TABLE IF NOT EXISTS tasks (
+                    id INTEGER PRIMARY KEY,
+                    task TEXT NOT NULL,
+                    state TEXT NOT NULL,
+                    attempts INTEGER NOT NULL DEFAULT 0,
+                    lease_id TEXT,
+                    lease_expires REAL,
+                    worker TEXT,
+                    error TEXT)""")
+            self._conn.execute(
+                'CREATE INDEX IF NOT EXISTS tasks_state ON tasks (state, lease_expires)')
+
+
+    def _transaction( self, statements):
+        """Run statements(cursor) in an immediate (write-locked) transaction
+        and return its result.
+
+        """
+        with self._lock:
+            cursor = self._conn.cursor()
+            cursor.execute('BEGIN IMMEDIATE')
+            try:
+                result = statements(cursor)
+                cursor.execute('COMMIT')
+                return result
+            except:
+                cursor.execute('ROLLBACK')
+                raise
+
+
+    def put( self, tasks):
+        # (tasks consumed lazily, e.g., from ecco_tasklist.read_tasklist)
+        count = self._transaction(lambda cursor: cursor.executemany(
+            'INSERT INTO tasks (task, state) VALUES (?, ?)',
+            ((json.dumps(task), PENDING) for task in tasks)).rowcount)
+        log.info('%d tasks added to %s', count, self.path)
+        return count
+
+
+    def lease( self, worker_id=None):
+        def statements(cursor):
+            now = time.time()
+            # tasks of dead workers that have exhausted their attempts:
+            cursor.execute(
+                """UPDATE tasks SET state=?, lease_id=NULL, error='lease expired'
+                WHERE state=? AND lease_expires<? AND attempts>=?""",
+                (FAILED, LEASED, now, self.max_attempts))
+            row = cursor.execute(
+                """SELECT id, task, attempts FROM tasks
+                WHERE state=? OR (state=? AND lease_expires<?)
+                ORDER BY id LIMIT 1""", (PENDING, LEASED, now)).fetchone()
+            if row is None:
+                return None
+            task_id, task, attempts = row
+            lease_id = uuid.uuid4().hex
+            cursor.execute(
+                """UPDATE tasks SET state=?, attempts=?, lease_id=?,
+                lease_expires=?, worker=? WHERE id=?""",
+                (LEASED, attempts+1, lease_id, now+self.visibility_timeout,
+                worker_id, task_id))
+            if attempts:
+                log.warning('re-leasing task %d (attempt %d)', task_id, attempts+1)
+            return ECCOWorkQueueLease(task_id, lease_id, json.loads(task), attempts+1)
+        return self._transaction(statements)
+
+
+    def _update_lease( self, lease, sql, params):
+        """Apply update to a task only if lease is still held."""
+        return self._transaction(lambda cursor: cursor.execute(
+            sql + ' WHERE id=? AND lease_id=? AND state=?',
+            params + (lease.task_id, lease.lease_id, LEASED)).rowcount == 1)
+
+
+    def heartbeat( self, lease):
+        return self._update_lease(lease,
+            'UPDATE tasks SET lease_expires=?',
+            (time.time()+self.visibility_timeout,))
+
+
+    def ack( self, lease):
+        return self._update_lease(lease,
+            'UPDATE tasks SET state=?, lease_id=NULL, error=NULL', (DONE,))
+
+
+    def fail( self, lease, error=None):
+        state = FAILED if lease.attempt >= self.max_attempts else PENDING
+        return self._update_lease(lease,
+            'UPDATE tasks SET state=?, lease_id=NULL, error=?',
+            (state, None if error is None else str(error)))
+
+
+    def status(self):
+        with self._lock:
+            now = time.time()
+            counts = dict(self._conn.execute(
+                'SELECT state, COUNT(*) FROM tasks GROUP BY state').fetchall())
+            # expired leases are effectively pending:
+            expired = self._conn.execute(
+                'SELECT COUNT(*) FROM tasks WHERE state=? AND lease_expires<?',
+                (LEASED, now)).fetchone()[0]
+        if expired:
+            counts[LEASED] -= expired
+            counts[PENDING] = counts.get(PENDING, 0) + expired
+        return {state: counts.get(state, 0) for state in (PENDING, LEASED, DONE, FAILED)}
+
+
+    def failed_tasks(self):
+        with self._lock:
+            rows = self._conn.execute(
+                'SELECT task, error FROM tasks WHERE state=? ORDER BY id',
+                (FAILED,)).fetchall()
+        return [(json.loads(task), error) for task, error in rows]
+
+
+    def requeue_failed(self):
+        return self._transaction(lambda cursor: cursor.execute(
+            'UPDATE tasks SET state=?, attempts=0, error=NULL WHERE state=?',
+            (PENDING, FAILED)).rowcount)
+
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+    def __del__(self):
+        try:
+            self.close()
+        except:
+            pass
+
+
+def open_work_queue( location, **kwargs):
+    """Open a work queue given its location.
+
+    Args:
+        location (str): Queue location. Either 'sqlite://<path>', a plain
+            SQLite database file name, or ':memory:'.
+        **kwargs: Passed to the backend (visibility_timeout, max_attempts).
+
+    Returns:
+        ECCOWorkQueue instance.
+
+    Raises:
+        RuntimeError if the location scheme is not supported.
+
+    """
+    if location.startswith('sqlite://'):
+        return ECCOSQLiteWorkQueue(location[len('sqlite://'):], **kwargs)
+    elif '://' not in location:
+        return ECCOSQLiteWorkQueue(location, **kwargs)
+    raise RuntimeError(f'Unsupported work queue location: {location}')
+
+
+def default_worker_id():
+    """Worker identifier, from AWS Batch job id if available, else host and
+    process id.
+
+    """
+    return os.environ.get('AWS_BATCH_JOB_ID') or f'{socket.gethostname()}-{os.getpid()}'
+
+
+class _Heartbeat(threading.Thread):
+    """Background thread that periodically heartbeats a lease until stopped.
+
+    """
+    def __init__( self, queue, lease, interval):
+        super().__init__(daemon=True)
+        self.queue = queue
+        self.lease = lease
+        self.interval = interval
+        self.lost = False
+        self._stop_event = threading.Event()
+
+
+    def run(self):
+        while not self._stop_event.wait(self.interval):
+            try:
+                if not self.queue.heartbeat(self.lease):
+                    log.warning('lease on task %d lost', self.lease.task_id)
+                    self.lost = True
+                    return
+            except Exception as e:
+                log.warning('heartbeat on task %d failed: %s', self.lease.task_id, e)
+
+
+    def stop(self):
+        self._stop_event.set()
+        self.join()
+
+
+def work( queue, process, worker_id=None, heartbeat_interval=None, poll_interval=10.):
+    """Lease and process tasks until the queue is drained.
+
+    Args:
+        queue (ECCOWorkQueue): Work queue.
+        process (callable): Function taking a task descriptor as its only
+            argument, and returning True if processing succeeded (the task is
+            then acknowledged), False otherwise (the task is then failed and,
+            depending on remaining attempts, re-queued). Exceptions are treated
+            as failures.
+        worker_id (str): Optional worker identifier (default:
+            default_worker_id()).
+        heartbeat_interval (float): Seconds between lease heartbeats (default:
+            one third of the queue's visibility timeout).
+        poll_interval (float): Seconds to wait before retrying when no tasks
+            are available but others are still leased (and may be re-leased if
+            their workers die).
+
+    Returns:
+        (num_done, num_failed) tuple of the number of tasks processed by this
+        worker.
+
+    """
+    worker_id = worker_id or default_worker_id()
+    heartbeat_interval = heartbeat_interval or queue.visibility_timeout/3.
+    num_done = num_failed = 0
+    while True:
+        lease = queue.lease(worker_id=worker_id)
+        if lease is None:
+            if queue.is_drained():
+                break
+            time.sleep(poll_interval)
+            continue
+        heartbeat = _Heartbeat(queue, lease, heartbeat_interval)
+        heartbeat.start()
+        error = None
+        try:
+            ok = process(lease.task)
+        except Exception as e:
+            ok, error = False, e
+        finally:
+            heartbeat.stop()
+        if heartbeat.lost:
+            # the task has been (or will be) re-leased; its outcome is recorded
+            # by the new lease holder:
+            log.warning('task %d result discarded; lease lost', lease.task_id)
+        elif ok:
+            queue.ack(lease)
+            num_done += 1
+        else:
+            queue.fail(lease, error)
+            num_failed += 1
+    log.info('worker %s: %d tasks done, %d failed', worker_id, num_done, num_failed)
+    return num_done, num_failed
@@ -23,6 +23,8 @@ from pandas import read_csv
 from concurrent import futures
 from collections import OrderedDict
 
+from ..ecco_mapping_factors import load_latlon_grid_store
+
 log = logging.getLogger('ecco_dataset_production')
 
 # =================================================================================================
@@ -372,8 +374,12 @@ def get_latlon_grid(mapping_factors_dir,
     # check to see if you have already calculated the latlon_grid
     latlon_grid_name = Path(mapping_factors_dir) / 'latlon_grid' / f'latlon_grid.xz'
 
-    # if so, load
-    if latlon_grid_name.is_file():
+    # if so, load (memory-mapped from the array store, if present)
+    latlon_grid_store = load_latlon_grid_store(latlon_grid_name.parent)
+    if latlon_grid_store is not None:
+        if extra_prints: print('.... mapping latlon_grid array store')
+        latlon_grid = latlon_grid_store
+    elif latlon_grid_name.is_file():
         if extra_prints: print('.... loading latlon_grid')
 
         try:
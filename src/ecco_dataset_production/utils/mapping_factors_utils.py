@@ -24,6 +24,9 @@ import xarray as xr
 
 import ecco_cloud_utils
 from . import gen_netcdf_utils
+from .. import ecco_factors_manifest
+from ..ecco_grid import wet_point_indices
+from ..ecco_mapping_factors import save_latlon_grid_store
 
 log = logging.getLogger('ecco_dataset_production')
 
@@ -37,6 +40,30 @@ log = logging.getLogger('ecco_dataset_production')
 #from ecco_utils import ecco_cloud_utils as ea
 
 
+# =================================================================================================
+# BUILD MANIFEST HELPERS
+# =================================================================================================
+def _is_current(manifest, mapping_factors_dir, name, depends_on=()):
+    """
+    True if mapping factors artifact name (relative to mapping_factors_dir) need
+    not be rebuilt: per the build manifest, if provided (see
+    ecco_factors_manifest.ECCOFactorsManifest.is_current), otherwise if the
+    artifact exists.
+    """
+    if manifest is None:
+        return (Path(mapping_factors_dir) / name).is_file()
+    return manifest.is_current(name, depends_on)
+
+
+def _record(manifest, name, depends_on=()):
+    """
+    Record a (re)built mapping factors artifact in the build manifest, if
+    provided.
+    """
+    if manifest is not None:
+        manifest.record(name, depends_on)
+
+
 # =================================================================================================
 # GET MAPPING FACTORS
 # =================================================================================================
@@ -126,7 +153,8 @@ def create_mapping_factors(dataset_dim,
                            source_grid_min_L, 
                            source_grid_max_L, 
                            source_grid_k, 
-                           nk):
+                           nk,
+                           manifest=None):
     """
     Create mapping factors for dataset_dim for nk many vertical levels
 
@@ -140,6 +168,9 @@ def create_mapping_factors(dataset_dim,
         source_grid_max_L (float): Maximum ECCO grid cell length
         source_grid_k (list): List of nk many pyresample.geometry.SwathDefinition
         nk (int): Integer number of total vertical levels
+        manifest (optional, ECCOFactorsManifest): Build manifest; if provided,
+            only stale mapping factors files are rebuilt, otherwise only
+            missing ones.
 
     Returns:
         status (str): String that is either "SUCCESS" or "ERROR {error message}"
@@ -147,8 +178,6 @@ def create_mapping_factors(dataset_dim,
     print(f'\nCreating Grid Mappings ({dataset_dim})')
 
     status = 'SUCCESS'
-    grid_mapping_fname_all = Path(mapping_factors_dir) / 'ecco_latlon_grid_mappings_all.xz'
-    grid_mapping_fname_2D = Path(mapping_factors_dir) / 'ecco_latlon_grid_mappings_2D.xz'
     grid_mapping_fname_3D = Path(mapping_factors_dir) / '3D'
 
     # check that the 3D directory exists
@@ -159,69 +188,44 @@ def create_mapping_factors(dataset_dim,
             status = f'ERROR Cannot make grid mappings 3D directory "{grid_mapping_fname_3D}"'
             return status
 
-    # first check to see if you have already calculated the grid mapping factors
-    # if the dataset is 3D, check to see that all the nk vertical levels have a matching grid_mappings file
-    if dataset_dim == '3D':
-        all_3D = True
-        all_3D_fnames = [f'ecco_latlon_grid_mappings_3D_{i}.xz' for i in range(nk)]
-        curr_3D_fnames = os.listdir(grid_mapping_fname_3D)
-        for fname in all_3D_fnames:
-            if fname not in curr_3D_fnames:  
-                all_3D = False
-                break
-
-    # if dataset dim is 2D and the 2D mapping factors file exists, or if dataset dim is 3D and all
-    # 3D mapping factors files exist, dont remake the factors
-    if (dataset_dim == '2D' and grid_mapping_fname_2D.is_file()) or (dataset_dim == '3D' and all_3D):
+    # mapping factors files to be (re)made, each checked individually so that,
+    # e.g., a single missing level does not force a full recompute:
+    # (name, source grid) tuples, where name is relative to mapping_factors_dir
+    to_make = []
+    if not _is_current(manifest, mapping_factors_dir, ecco_factors_manifest.GRID_MAPPINGS_ALL):
+        # the mapping between all points of the ECCO grid and the target grid
+        to_make.append((ecco_factors_manifest.GRID_MAPPINGS_ALL, source_grid_all))
+    # the mapping factors between all wet points of the ECCO grid at each
+    # vertical level and the target grid (if the dataset is 2D, only one level)
+    if dataset_dim == '2D':
+        level_names = [ecco_factors_manifest.GRID_MAPPINGS_2D]
+    else:
+        level_names = [ecco_factors_manifest.grid_mappings_3d(k_i) for k_i in range(nk)]
+    for k_i,name in enumerate(level_names):
+        if not _is_current(manifest, mapping_factors_dir, name):
+            to_make.append((name, source_grid_k[k_i]))
+
+    if not to_make:
         # Factors already made, continuing
         print('... mapping factors already created')
     else:
-        # if not, make new grid mapping factors
-        print('... no mapping factors found, recalculating')
-
-        if ~(grid_mapping_fname_all.is_file()):
-            # find the mapping between all points of the ECCO grid and the target grid.
-            grid_mappings_all = \
-                ecco_cloud_utils.mapping.find_mappings_from_source_to_target_for_processing(
-                    source_grid_all,
-                    target_grid,
-                    target_grid_radius,
-                    source_grid_min_L,
-                    source_grid_max_L)
-
-            # Save grid_mappings_all
-            try:
-                pickle.dump(grid_mappings_all, lzma.open(grid_mapping_fname_all, 'wb'))
-            except:
-                status = f'ERROR Cannot save grid_mappings_all file "{grid_mapping_fname_all}"'
-                return status
-
-        # If the dataset is 2D, only compute one level of the mapping factors
-        if dataset_dim == '2D':
-            nk = 1
-
-        # Find the mapping factors between all wet points of the ECCO grid
-        # at each vertical level and the target grid (create mapping factors)
-        for k_i in range(nk):
-            print(k_i)
-            grid_mappings_k = \
+        print(f'... making {len(to_make)} mapping factors file(s)')
+        for name,source_grid in to_make:
+            print(name)
+            grid_mappings = \
                 ecco_cloud_utils.mapping.find_mappings_from_source_to_target_for_processing(
-                    source_grid_k[k_i],
+                    source_grid,
                     target_grid,
                     target_grid_radius,
                     source_grid_min_L,
                     source_grid_max_L)
             try:
-                # if the dataset dim is 2D, save the factors using the 2D name, otherwise
-                # save it with the 3D name, and with level {k}
-                if dataset_dim == '2D':
-                    pickle.dump(grid_mappings_k, lzma.open(grid_mapping_fname_2D, 'wb'))
-                elif dataset_dim == '3D':
-                    fname_3D = Path(grid_mapping_fname_3D) / f'ecco_latlon_grid_mappings_3D_{k_i}.xz'
-                    pickle.dump(grid_mappings_k, lzma.open(fname_3D, 'wb'))
+                with lzma.open(Path(mapping_factors_dir) / name, 'wb') as f:
+                    pickle.dump(grid_mappings, f)
             except:
-                status = f'ERROR Cannot save grid_mappings_k file(s) "{mapping_factors_dir}"'
+                status = f'ERROR Cannot save grid mappings file "{Path(mapping_factors_dir) / name}"'
                 return status
+            _record(manifest, name)
     return status
 
 
@@ -232,7 +236,8 @@ def create_land_mask(mapping_factors_dir,
                      nk, 
                      target_grid_shape, 
                      ecco_grid, 
-                     dataset_dim):
+                     dataset_dim,
+                     manifest=None):
     """
     Create land mask file(s) for dataset_dim for nk many vertical levels
 
@@ -242,6 +247,9 @@ def create_land_mask(mapping_factors_dir,
         target_grid_shape (tuple): Tuple of the shape of the target grid (i.e. (360, 720))
         ecco_grid (xarray.Dataset): ECCO grid xarray dataset
         dataset_dim (str): Dimension of the dataset to create factors for
+        manifest (optional, ECCOFactorsManifest): Build manifest; if provided,
+            only stale land mask files are rebuilt, otherwise only missing
+            ones.
 
     Returns:
         status (str): String that is either "SUCCESS" or "ERROR {error message}"
@@ -249,8 +257,6 @@ def create_land_mask(mapping_factors_dir,
     print(f'\nCreating Land Mask ({dataset_dim})')
 
     status = 'SUCCESS'
-    ecco_land_mask_c = ecco_grid.maskC.copy(deep=True)
-    ecco_land_mask_c.values = np.where(ecco_land_mask_c==True, 1, np.nan)
 
     land_mask_fname = Path(mapping_factors_dir) / 'land_mask'
 
@@ -262,20 +268,17 @@ def create_land_mask(mapping_factors_dir,
             status = f'ERROR Cannot make land_mask directory "{land_mask_fname}"'
             return status
 
-    # first check to see if you have already calculated all the land mask files for each vertical level
-    all_mask = True
-    all_mask_fnames = [f'ecco_latlon_land_mask_{i}.xz' for i in range(nk)]
-    curr_mask_fnames = os.listdir(land_mask_fname)
-    for fname in all_mask_fnames:
-        if fname not in curr_mask_fnames:  
-            all_mask = False
-            break
+    # check each vertical level's land mask individually:
+    depends_on = [ecco_factors_manifest.GRID_MAPPINGS_ALL]
+    levels = [k for k in range(nk) if not _is_current(
+        manifest, mapping_factors_dir, ecco_factors_manifest.land_mask(k), depends_on)]
 
-    if all_mask:
+    if not levels:
         # Land mask already made, continuing
         print('... land mask already created')
     else:
         # if not, recalculate.
+        ecco_land_mask_c = np.where(ecco_grid.maskC.values==True, 1, np.nan)
 
         # land mask needs the "grid_mappings_all" mapping factors
         (status, grid_mappings_all, _) = get_mapping_factors(dataset_dim, 
@@ -283,18 +286,15 @@ def create_land_mask(mapping_factors_dir,
                                                              'all')
 
         if status != 'SUCCESS':
-            raise RuntimeError(status)
+            return status
 
         source_indices_within_target_radius_i, nearest_source_index_to_target_index_i = grid_mappings_all
 
-        if status != 'SUCCESS':
-            return status
-
-        for k in range(nk):
+        for k in levels:
             print(k)
 
             # create source field for level k
-            source_field = ecco_land_mask_c.values[k,:].ravel()
+            source_field = ecco_land_mask_c[k,:].ravel()
 
             # create land mask for level k
             land_mask_ll = \
@@ -306,11 +306,13 @@ def create_land_mask(mapping_factors_dir,
                     allow_nearest_neighbor=True)
             try:
                 # save land mask with level {k}
-                fname_mask = Path(land_mask_fname) / f'ecco_latlon_land_mask_{k}.xz'
-                pickle.dump(land_mask_ll.ravel(), lzma.open(fname_mask, 'wb'))
+                fname_mask = Path(mapping_factors_dir) / ecco_factors_manifest.land_mask(k)
+                with lzma.open(fname_mask, 'wb') as f:
+                    pickle.dump(land_mask_ll.ravel(), f)
             except:
                 status = f'ERROR Cannot save land_mask file "{land_mask_fname}"'
                 return status
+            _record(manifest, ecco_factors_manifest.land_mask(k), depends_on)
     return status
 
 
@@ -319,7 +321,7 @@ def create_land_mask(mapping_factors_dir,
 # ====================================================================================================
 def create_sparse_matrix(
     mapping_factors_dir, product_generation_config, 
-    target_grid_shape, wet_pts_k 
+    target_grid_shape, wet_pts_k, manifest=None
 #                         extra_prints=False):
     ):
     """
@@ -330,7 +332,9 @@ def create_sparse_matrix(
         product_generation_config (dict): Dictionary of product_generation_config.yaml config file
         target_grid_shape (tuple): Tuple of the shape of the target grid (i.e. (360, 720))
         wet_pts_k (optional, dict): Dictionary of wet point indices where keys are vertical levels
-        extra_prints (optional, bool): Boolean to enable more print statements
+        manifest (optional, ECCOFactorsManifest): Build manifest; if provided,
+            only stale sparse matrix files are rebuilt, otherwise only missing
+            ones.
 
     Returns:
         status (str): String that is either "SUCCESS" or "ERROR {error message}"
@@ -350,15 +354,21 @@ def create_sparse_matrix(
             status = f'ERROR Cannot make sparse matrix directory "{sm_path}"'
             return status
 
-    # Check if all sparse matrices are already present
-    present_sm_files = list(sorted(os.listdir(f'{mapping_factors_dir}/sparse')))
-    expected_sm_files = list(sorted([f'sparse_matrix_{k}.npz' for k in range(nk)]))
-    if present_sm_files == expected_sm_files:
+    # Check each vertical level's sparse matrix individually, against the
+    # grid mappings (and land mask) it is made from:
+    depends_on = {}
+    for k in range(nk):
+        depends_on[k] = [name for name in ecco_factors_manifest.sparse_matrix_dependencies(
+                k, product_generation_config['custom_grid_and_factors'])
+            if (Path(mapping_factors_dir) / name).is_file()]
+    levels = [k for k in range(nk) if not _is_current(
+        manifest, mapping_factors_dir, ecco_factors_manifest.sparse_matrix(k), depends_on[k])]
+    if not levels:
         # sparse matrices already made, continuing
         print('... sparse matrices already created')
     else:
-        for k in range(nk):
-            sm_path_fname = Path(sm_path) / f'sparse_matrix_{k}.npz'
+        for k in levels:
+            sm_path_fname = Path(mapping_factors_dir) / ecco_factors_manifest.sparse_matrix(k)
             log.info('Level: %d', k)
             
             # get the land mask for level k
@@ -441,6 +451,7 @@ def create_sparse_matrix(
                 except:
                     status = f'ERROR Cannot save sparse matrix file "{sm_path_fname}"'
                     return status
+            _record(manifest, ecco_factors_manifest.sparse_matrix(k), depends_on[k])
     return status
 
 
@@ -479,17 +490,11 @@ def create_custom_grid_values(product_generation_config,
         source_grid_max_L = float(product_generation_config['source_grid_max_L'])
     
     # create land mask from source
-    wet_pts_k = {}
-    xc_wet_k = {}
-    yc_wet_k = {}
+    wet_pts_k = wet_point_indices(source_grid_data['hFacC'][:nk])
     source_grid_k = {}
     for k in range(nk):
-        wet_pts_k[k] = np.where(source_grid_data['hFacC'][k,:] > 0)
-        xc_wet_k[k] = source_grid_data['XC'][wet_pts_k[k]]
-        yc_wet_k[k] = source_grid_data['YC'][wet_pts_k[k]]
-
-        source_grid_k[k] = pr.geometry.SwathDefinition(lons=xc_wet_k[k],
-                                                        lats=yc_wet_k[k])
+        source_grid_k[k] = pr.geometry.SwathDefinition(lons=source_grid_data['XC'][wet_pts_k[k]],
+                                                        lats=source_grid_data['YC'][wet_pts_k[k]])
     # ========== </Prepare source grid information> ============================================
 
 
@@ -661,8 +666,38 @@ def __get_meta_data(grid_path):
 # =================================================================================================
 # PREPARE ECCO GRID VALUES
 # =================================================================================================
+def latlon_cell_bounds(centers, resolution):
+    """
+    Cell bounds of a regular 1D grid.
+
+    Args:
+        centers (numpy.ndarray): Cell center coordinates.
+        resolution (float): Cell width.
+
+    Returns:
+        (len(centers),2) numpy.ndarray of (lower, upper) cell bounds.
+    """
+    centers = np.asarray(centers, dtype=np.float64)
+    return np.column_stack((centers - resolution/2, centers + resolution/2))
+
+
+def depth_bounds_from_thickness(drF):
+    """
+    Vertical cell bounds (0 at the surface, negative downward) from cell
+    thicknesses.
+
+    Args:
+        drF (numpy.ndarray): Cell thicknesses, surface to max depth.
+
+    Returns:
+        (len(drF),2) numpy.ndarray of (top, bottom) cell bounds.
+    """
+    bottom = -np.cumsum(drF, dtype=np.float64)
+    return np.column_stack((np.concatenate(([0.], bottom[:-1])), bottom))
+
+
 def create_ecco_grid_values(
-    product_generation_config, mapping_factors_dir
+    product_generation_config, mapping_factors_dir, manifest=None
 #                            extra_prints):
     ):
     """
@@ -673,6 +708,11 @@ def create_ecco_grid_values(
         product_generation_config (dict): Configuration data, generally
             originating from product_generation_config.yaml, with defaults
             applied.
+        mapping_factors_dir (PosixPath): Mapping factors directory, to which
+            the latlon grid is written.
+        manifest (optional, ECCOFactorsManifest): Build manifest; if provided,
+            the latlon grid is rewritten only if stale, otherwise only if
+            missing.
 
     Returns:
         Dictionary of ECCO source and target grid data.
@@ -702,30 +742,26 @@ def create_ecco_grid_values(
             log.exception(errstr)
             sys.exit(errstr)
 
-    wet_pts_k = {}
-    xc_wet_k = {}
-    yc_wet_k = {}
-
     # ========== <Prepare grid values> ========================================================
+    # wet points of all levels, found in a single pass over the (numpy) hFacC
+    # array:
+    wet_pts_k = wet_point_indices(ecco_grid.hFacC.values[:nk])
+    XC = ecco_grid.XC.values
+    YC = ecco_grid.YC.values
+
     # Dictionary of pyresample 'grids' for each level of the ECCO grid where
     # there are wet points.  Used for the bin-averaging.  We don't want to bin
     # average dry points.
-    source_grid_k = {}
     log.info('Swath Definitions')
     log.info('... making swath definitions for latlon grid levels 1..nk')
     log.info(f' nk = {nk}')
-    for k in range(nk):
-        wet_pts_k[k] = np.where(ecco_grid.hFacC[k,:] > 0)
-        xc_wet_k[k] = ecco_grid.XC.values[wet_pts_k[k]]
-        yc_wet_k[k] = ecco_grid.YC.values[wet_pts_k[k]]
-        source_grid_k[k] = pr.geometry.SwathDefinition(
-            lons=xc_wet_k[k], lats=yc_wet_k[k])
+    source_grid_k = {
+        k: pr.geometry.SwathDefinition(lons=XC[wet_pts_k[k]], lats=YC[wet_pts_k[k]])
+        for k in range(nk)}
 
     # The pyresample 'grid' information for the 'source' (ECCO grid) defined using
     # all XC and YC points, even land.  Used to create the land mask
-    source_grid = pr.geometry.SwathDefinition(
-        lons=ecco_grid.XC.values.ravel(),
-        lats=ecco_grid.YC.values.ravel())
+    source_grid = pr.geometry.SwathDefinition(lons=XC.ravel(), lats=YC.ravel())
 
     # the largest and smallest length of grid cell size in the ECCO grid.  Used
     # to determine how big of a lookup table we need to do the bin-average interp.
@@ -795,26 +831,11 @@ def create_ecco_grid_values(
     #   - wet_pts_k: Dictionary with key=vertical level index, and value=tuple of numpy.arrays of source grid wet points
 
     ## MAKE LAT AND LON BOUNDS FOR NEW DATA ARRAYS
-    lat_bounds = np.zeros((latlon_grid_dims[1],2))
-    for i in range(latlon_grid_dims[1]):
-        lat_bounds[i,0] = target_grid_lats[i,0] - latlon_grid_resolution/2
-        lat_bounds[i,1] = target_grid_lats[i,0] + latlon_grid_resolution/2
-
-    lon_bounds = np.zeros((latlon_grid_dims[0],2))
-    for i in range(latlon_grid_dims[0]):
-        lon_bounds[i,0] = target_grid_lons[0,i] - latlon_grid_resolution/2
-        lon_bounds[i,1] = target_grid_lons[0,i] + latlon_grid_resolution/2
+    lat_bounds = latlon_cell_bounds(target_grid_lats_1D, latlon_grid_resolution)
+    lon_bounds = latlon_cell_bounds(target_grid_lons_1D, latlon_grid_resolution)
 
     # Make depth bounds
-    depth_bounds = np.zeros((nk,2))
-    tmp = np.cumsum(ecco_grid.drF.values)
-
-    for k in range(nk):
-        if k == 0:
-            depth_bounds[k,0] = 0.0
-        else:
-            depth_bounds[k,0] = -tmp[k-1]
-        depth_bounds[k,1] = -tmp[k]
+    depth_bounds = depth_bounds_from_thickness(ecco_grid.drF.values[:nk])
 
     latlon_bounds = {'lat':lat_bounds, 'lon':lon_bounds}
     target_grid_dict = {'shape':target_grid_shape, 'lats_1D':target_grid_lats_1D, 'lons_1D':target_grid_lons_1D}
@@ -824,18 +845,29 @@ def create_ecco_grid_values(
     latlon_grid_dir = Path(mapping_factors_dir) / 'latlon_grid'
     if not os.path.exists(latlon_grid_dir):
         os.makedirs(latlon_grid_dir, exist_ok=True)
-    latlon_grid_name = latlon_grid_dir / 'latlon_grid.xz'
-    if latlon_grid_name.is_file():
+    latlon_grid_name = Path(mapping_factors_dir) / ecco_factors_manifest.LATLON_GRID
+    if _is_current(manifest, mapping_factors_dir, ecco_factors_manifest.LATLON_GRID):
         # latlon grid already made, continuing
         print('... latlon grid already created')
     else:
         # if not, recalculate.
         print('.... making new latlon_grid')
         try:
-            pickle.dump(latlon_grid, lzma.open(latlon_grid_name, 'wb'))
+            with lzma.open(latlon_grid_name, 'wb') as f:
+                pickle.dump(latlon_grid, f)
         except:
             status = f'ERROR Cannot save latlon_grid file "{latlon_grid_name}"'
             return status
+        _record(manifest, ecco_factors_manifest.LATLON_GRID)
+    # memory-mappable array store of the same (see
+    # ecco_mapping_factors.load_latlon_grid_store), also written for latlon
+    # grids created before the store was introduced:
+    latlon_grid_store = ecco_factors_manifest.latlon_grid_store()
+    if not all(_is_current(manifest, mapping_factors_dir, name) for name in latlon_grid_store):
+        print('.... making latlon_grid array store')
+        save_latlon_grid_store(latlon_grid_dir, latlon_grid)
+        for name in latlon_grid_store:
+            _record(manifest, name)
     # ========== </Create latlon grid> ============================================================
 
     ecco_grid_values = {
@@ -877,6 +909,19 @@ def create_all_factors(product_generation_config,
     """           
     mapping_factors_dir = Path(product_generation_config['mapping_factors_dir'])
 
+    # build manifest, used to rebuild only those mapping factors files that
+    # are missing, modified, or out of date with respect to the input grid,
+    # configuration, or the files they are made from:
+    manifest = ecco_factors_manifest.ECCOFactorsManifest(mapping_factors_dir)
+    manifest.set_inputs(
+        ecco_factors_manifest.factors_input_files(product_generation_config),
+        product_generation_config)
+    if not isinstance(dataset_dim, list):
+        dataset_dim = [dataset_dim]
+    manifest.adopt(ecco_factors_manifest.expected_artifacts(
+        product_generation_config['num_vertical_levels'], dataset_dim,
+        bool(product_generation_config['custom_grid_and_factors'])))
+
     # ========== <Prepare grid values> ===========================================================
     # Create custom or ecco grid values
     if product_generation_config['custom_grid_and_factors']:
@@ -884,7 +929,7 @@ def create_all_factors(product_generation_config,
             product_generation_config, mapping_factors_dir)
     else:
         grid_values = create_ecco_grid_values(
-            product_generation_config, mapping_factors_dir
+            product_generation_config, mapping_factors_dir, manifest
 #           extra_prints)
             )
     # ========== </Prepare grid values> ===========================================================
@@ -904,15 +949,19 @@ def create_all_factors(product_generation_config,
             grid_values['source_grid_min_L'], 
             grid_values['source_grid_max_L'], 
             grid_values['source_grid_k'], 
-            grid_values['nk'])
+            grid_values['nk'],
+            manifest)
         if not product_generation_config['custom_grid_and_factors']:
             # make a land mask in lat-lon using hfacC
-            create_land_mask(
+            status = create_land_mask(
                 mapping_factors_dir, 
                 grid_values['nk'], 
                 grid_values['target_grid_shape'], 
                 grid_values['ecco_grid'], 
-                dim)
+                dim,
+                manifest)
+            if status != 'SUCCESS':
+                raise RuntimeError(status)
     # ========== </Create mapping factors and land mask> ==========================================
 
 
@@ -920,7 +969,7 @@ def create_all_factors(product_generation_config,
     # create sparse matrices
     create_sparse_matrix(
         mapping_factors_dir, product_generation_config, 
-        grid_values['target_grid_shape'], grid_values['wet_pts_k']
+        grid_values['target_grid_shape'], grid_values['wet_pts_k'], manifest
 #                                  extra_prints=extra_prints)
         )
     # ========== </Create sparse matrices> ========================================================
@@ -1,14 +1,19 @@
-import json
-import math
 import argparse
 
+from ecco_dataset_production import ecco_tasklist
+from ecco_dataset_production.apps import partition_tasklists
+
 def split_json(input_file, num_files, output_base):
     """
     Splits a JSON file into multiple smaller JSON files.
 
-    The function reads a JSON file, divides it into ``num_files`` parts, and writes
-    each part into a new JSON file. Each new file will contain a roughly equal
-    number of entries from the original JSON file.
+    The function reads a JSON file, divides it into ``num_files`` parts with
+    approximately equal total estimated processing cost, and writes each part
+    into a new JSON file (a thin wrapper around the cost-aware partitioning of
+    edp_partition_tasklists, which should be used directly if cost calibration
+    or input sizes are required). Compact JSON lines tasklists (see
+    ecco_tasklist) are also supported, and are split into files of the same
+    format.
 
     Args:
         input_file (str): Path to the input JSON file to split.
@@ -18,36 +23,20 @@ def split_json(input_file, num_files, output_base):
     """
     
     # Load the original JSON file
-    with open(input_file, 'r') as infile:
-        data = json.load(infile)
-
-    # Total number of entries in the input JSON
-    n = len(data)
-
-    # Calculate the number of entries per file (ceiling division to ensure all data is covered)
-    entries_per_file = math.ceil(n / num_files)
-
-    # Split the data and write to new JSON files
-    for i in range(num_files):
-        start_index = i * entries_per_file
-        end_index = start_index + entries_per_file
+    data = ecco_tasklist.load_tasklist(input_file)
 
-        # Create a subset of the data for the current split
-        subset = data[start_index:end_index]
-
-        # Output filename with zero-padded numbers (e.g., output_base_001.json)
-        output_filename = f'{output_base}_{i+1:03}.json'
-
-        # Write the subset to the output file
-        with open(output_filename, 'w') as outfile:
-            json.dump(subset, outfile, indent=4)
+    # Assign tasks to files by estimated cost, and write
+    costs = partition_tasklists.estimate_task_costs(data)
+    partitions, loads = partition_tasklists.lpt_partition(costs, num_files)
+    partition_tasklists.write_partitions(
+        data, partitions, loads, output_base, ecco_tasklist.tasklist_format(input_file))
 
     print(f"Split into {num_files} files.")
 
 # Set up argument parsing
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(
-        description='Split a JSON file into multiple smaller files.'
+        description='Split a JSON file into multiple smaller files of approximately equal estimated processing cost.'
     )
     
     # Positional argument for input file
@@ -67,4 +56,3 @@ if __name__ == "__main__":
     
     # Call the function to split the JSON
     split_json(args.input_file, args.num_files, args.output_base)
-
@@ -0,0 +1,195 @@
+import lzma
+import pickle
+import types
+
+import numpy as np
+import pandas as pd
+import pytest
+from scipy import sparse
+import xarray as xr
+
+import ecco_dataset_production
+
+NZ, NLAT, NLON = 3, 4, 6
+NATIVE_SHAPE = (13, 5, 5)
+
+GRANULE_FILE = 'SEA_SURFACE_HEIGHT_day_mean_1992-01-01_ECCO_V4r4_latlon_0p50deg.nc'
+
+
+@pytest.fixture
+def synthetic_grid():
+    """Synthetic native grid geometry, with random land/sea masks, and native
+    to latlon mapping factors and land masks."""
+    rng = np.random.default_rng(0)
+    hFacC = np.where(rng.random((NZ,)+NATIVE_SHAPE) > 0.3, rng.random((NZ,)+NATIVE_SHAPE), 0.)
+    dims3, dims2 = ('k','tile','j','i'), ('tile','j','i')
+    native = xr.Dataset(
+        {'hFacC': (dims3, hFacC),
+         'maskC': (dims3, hFacC > 0),
+         'maskW': (dims3, rng.random((NZ,)+NATIVE_SHAPE) > 0.3),
+         'CS': (dims2, rng.random(NATIVE_SHAPE)),
+         'SN': (dims2, rng.random(NATIVE_SHAPE)),
+         'Depth': (dims2, rng.random(NATIVE_SHAPE)*5000., {'units':'m'}),
+         'drF': (('k',), np.array([10., 20., 30.])),
+         'XC_bnds': (dims2+('nb',), rng.random(NATIVE_SHAPE+(4,))),
+         'YC_bnds': (dims2+('nb',), rng.random(NATIVE_SHAPE+(4,))),
+         'Z_bnds': (('k','nv'), np.array([[0., -10.], [-10., -30.], [-30., -60.]]))},
+        coords={'Z': (('k',), np.array([-5., -20., -45.]))},
+        attrs={'title':'native grid geometry'})
+    wet = ecco_dataset_production.ecco_grid.wet_point_indices(hFacC)
+    return types.SimpleNamespace(
+        nz=NZ, nlat=NLAT, nlon=NLON, native_shape=NATIVE_SHAPE,
+        native=native, wet=wet,
+        factors=[sparse.random(len(wet[z][0]), NLAT*NLON, density=0.2, random_state=z, format='csr')
+            for z in range(NZ)],
+        masks=[np.where(rng.random(NLAT*NLON) > 0.2, 1., np.nan) for z in range(NZ)],
+        latitude_bounds=np.column_stack([np.linspace(-90, 45, NLAT), np.linspace(-45, 90, NLAT)]),
+        longitude_bounds=np.column_stack([np.linspace(-180, 120, NLON), np.linspace(-120, 180, NLON)]))
+
+
+@pytest.fixture
+def grid_and_factors(synthetic_grid):
+    """In-memory stand-ins for ECCOGrid and ECCOMappingFactors instances, for
+    the synthetic grid."""
+    grid = types.SimpleNamespace(
+        native_grid=synthetic_grid.native,
+        native_wet_point_indices=synthetic_grid.wet,
+        latlon_grid=xr.Dataset(coords={
+            'latitude':np.arange(NLAT), 'longitude':np.arange(NLON), 'Z':np.arange(NZ)}))
+    factors, masks = synthetic_grid.factors, synthetic_grid.masks
+    mapping_factors = types.SimpleNamespace(
+        native_to_latlon_mapping_factors=lambda level, dtype=None:
+            factors[level].astype(dtype) if dtype else factors[level],
+        latlon_land_mask=lambda level: masks[level],
+        latlon_regrid_operator=lambda level, wet_point_indices, native_shape, dtype=None:
+            ecco_dataset_production.ecco_mapping_factors.latlon_regrid_operator(
+                factors[level], masks[level], wet_point_indices, native_shape, dtype),
+        latitude_bounds=synthetic_grid.latitude_bounds,
+        longitude_bounds=synthetic_grid.longitude_bounds)
+    return grid, mapping_factors
+
+
+@pytest.fixture
+def grid_dir(tmp_path, synthetic_grid):
+    """Grid directory containing the synthetic native grid geometry file."""
+    grid_dir = tmp_path/'grid'
+    grid_dir.mkdir()
+    synthetic_grid.native.to_netcdf(grid_dir/'GRID_GEOMETRY_native.nc')
+    return str(grid_dir)
+
+
+@pytest.fixture
+def mapping_factors_dir(tmp_path, synthetic_grid):
+    """Mapping factors directory (sparse matrices, land masks, and latlon grid
+    store) for the synthetic grid."""
+    factors_dir = tmp_path/'factors'
+    (factors_dir/'sparse').mkdir(parents=True)
+    (factors_dir/'land_mask').mkdir()
+    for z in range(NZ):
+        sparse.save_npz(factors_dir/'sparse'/f'sparse_matrix_{z}.npz', synthetic_grid.factors[z])
+        with lzma.open(factors_dir/'land_mask'/f'ecco_latlon_land_mask_{z}.xz', 'wb') as f:
+            pickle.dump(synthetic_grid.masks[z], f)
+    ecco_mapping_factors = ecco_dataset_production.ecco_mapping_factors
+    ecco_mapping_factors.save_latlon_grid_store(
+        factors_dir/ecco_mapping_factors.LATLON_GRID_DIR, [
+            {'lat': synthetic_grid.latitude_bounds, 'lon': synthetic_grid.longitude_bounds},
+            synthetic_grid.native['Z_bnds'].values,
+            {'lats_1D': synthetic_grid.latitude_bounds.mean(axis=1),
+             'lons_1D': synthetic_grid.longitude_bounds.mean(axis=1)},
+            synthetic_grid.wet])
+    return str(factors_dir)
+
+
+@pytest.fixture
+def latlon_grid():
+    """Synthetic latlon grid list, as pickled to latlon_grid.xz, and the
+    native hFacC it was derived from (with no wet points at the deepest
+    level)."""
+    rng = np.random.default_rng(0)
+    hFacC = np.where(rng.random((4, 13, 6, 6)) > 0.3, 1., 0.)
+    hFacC[3] = 0.
+    lats, lons = np.arange(-89.5, 90, 1.), np.arange(-179.5, 180, 1.)
+    latlon_grid = [
+        {'lat': np.column_stack((lats-.5, lats+.5)), 'lon': np.column_stack((lons-.5, lons+.5))},
+        np.array([[0., -10.], [-10., -30.], [-30., -60.], [-60., -100.]]),
+        {'shape': (lats.size, lons.size), 'lats_1D': lats, 'lons_1D': lons},
+        ecco_dataset_production.ecco_grid.wet_point_indices(hFacC)]
+    return latlon_grid, hFacC
+
+
+@pytest.fixture
+def mds_dataset():
+    """Factory of ECCOMDSDataset instances wrapping given data variables,
+    without reading any MDS files."""
+    def mds_dataset(data_vars, grid=None, mapping_factors=None, task=None, cfg=None):
+        ds = object.__new__(ecco_dataset_production.ecco_dataset.ECCOMDSDataset)
+        ds.task, ds.grid, ds.mapping_factors, ds.cfg = task, grid, mapping_factors, cfg
+        ds.ds = xr.Dataset(data_vars)
+        return ds
+    return mds_dataset
+
+
+@pytest.fixture
+def mds_datasets(grid_and_factors, mds_dataset):
+    """Factory of ECCOMDSDataset instances, one per variable, with random
+    native data, sharing a task, and the synthetic grid and mapping
+    factors."""
+    grid, mapping_factors = grid_and_factors
+    def mds_datasets(dimension, variables, array_precision='float64'):
+        rng = np.random.default_rng(0)
+        task = ecco_dataset_production.ecco_task.ECCOTask({
+            'granule':'X_day_mean_1992-01-01_ECCO_V4r4_latlon_0p50deg.nc',
+            'dynamic_metadata':{'dimension':dimension,
+                'time_coverage_center':'1992-01-01T12:00:00'}})
+        shape = NATIVE_SHAPE if dimension == '2D' else (NZ,)+NATIVE_SHAPE
+        return [mds_dataset(
+            {variable: (('time','k','tile','j','i')[-len(shape)-1:],
+                rng.random((1,)+shape).astype(np.float32))},
+            grid=grid, mapping_factors=mapping_factors, task=task,
+            cfg={'array_precision':array_precision})
+            for variable in variables]
+    return mds_datasets
+
+
+@pytest.fixture
+def local_task(tmp_path):
+    """Minimal local task descriptor, and grid and mapping factors directory
+    stand-ins, with placeholder input files."""
+    for subdir in ('input', 'grid', 'factors'):
+        (tmp_path/subdir).mkdir()
+    for ext in ('data','meta'):
+        (tmp_path/'input'/f'SSH_day_mean.0000000012.{ext}').write_text(ext)
+    (tmp_path/'grid'/'GRID_GEOMETRY_native.nc').write_text('grid')
+    (tmp_path/'factors'/'sparse_matrix_0.npz').write_text('factors')
+    task = {
+        'granule': str(tmp_path/'output'/GRANULE_FILE),
+        'variables': {'SSH': [[
+            str(tmp_path/'input'/'SSH_day_mean.0000000012.data'),
+            str(tmp_path/'input'/'SSH_day_mean.0000000012.meta')]]},
+        'dynamic_metadata': {'dimension': '2D',
+            'time_coverage_start': '1992-01-01T00:00:00',
+            'time_coverage_end': '1992-01-02T00:00:00',
+            'time_coverage_center': '1992-01-01T12:00:00',
+            'summary': 'Sea surface height'}}
+    grid = types.SimpleNamespace(grid_dir=str(tmp_path/'grid'))
+    mapping_factors = types.SimpleNamespace(mapping_factors_dir=str(tmp_path/'factors'))
+    return task, grid, mapping_factors
+
+
+@pytest.fixture
+def granule_dataset():
+    """Factory of granule datasets, as returned by set_granule_ancillary_data,
+    with random (per seed) data."""
+    def granule_dataset(seed=0):
+        rng = np.random.default_rng(seed)
+        data = rng.random((1, 4, 6)).astype(np.float32)
+        dataset = xr.Dataset(
+            {'SSH': (('time','latitude','longitude'), data,
+                {'valid_min': data.min(), 'valid_max': data.max()})},
+            coords={'time': [pd.Timestamp('1992-01-01T12:00:00')],
+                'latitude': np.arange(4.), 'longitude': np.arange(6.)})
+        dataset.coords['time_bnds'] = (('time','nv'),
+            [[pd.Timestamp('1992-01-01'), pd.Timestamp('1992-01-02')]])
+        dataset.coords['latitude_bnds'] = (('latitude','nv'), np.column_stack([np.arange(4.)]*2))
+        return dataset
+    return granule_dataset
@@ -0,0 +1,150 @@
+import fcntl
+import os
+import threading
+import time
+from unittest import mock
+
+import pytest
+
+import ecco_dataset_production
+
+ecco_aws_s3_cache = ecco_dataset_production.aws.ecco_aws_s3_cache
+
+
+def objects(prefix, etag='"a"'):
+    """AWS S3 listing of a single-object bucket/prefix."""
+    return [{'Key':f'{prefix}/file.nc', 'Size':10, 'ETag':etag}]
+
+
+def mock_s3( sync):
+    """Patch AWS S3 access, with sync substituted for aws_s3_sync."""
+    def list_objects(s3uri, client=None, **kwargs):
+        return objects(s3uri.rstrip('/').split('/')[-1])
+    return mock.patch.multiple(ecco_dataset_production.aws.utils,
+        s3_client=mock.MagicMock(), s3_list_objects=list_objects), \
+        mock.patch.object(ecco_dataset_production.aws.ecco_aws_s3_sync, 'aws_s3_sync', sync)
+
+
+def sync_writing( nbytes=10, delay=0., calls=None):
+    """aws_s3_sync stand-in that writes one nbytes file, after delay, and
+    records its calls."""
+    def sync(src, dest, **kwargs):
+        if calls is not None:
+            calls.append(src)
+        time.sleep(delay)
+        with open(os.path.join(dest,'file.nc'),'wb') as f:
+            f.write(b'x'*nbytes)
+    return sync
+
+
+def test_concurrent_fetches_download_once(tmp_path):
+    """Test that concurrent fetches of the same bucket/prefix result in a
+    single download, shared by all, while entries remain in use."""
+    cache = ecco_aws_s3_cache.ECCOAWSS3Cache(str(tmp_path/'cache'))
+    calls, entries, errors = [], [], []
+    barrier = threading.Barrier(8)
+    def fetch():
+        try:
+            barrier.wait()
+            entries.append(cache.fetch('s3://bucket/grid/', recursive=True))
+        except Exception as e:
+            errors.append(e)
+    patch_s3, patch_sync = mock_s3(sync_writing(delay=0.2, calls=calls))
+    with patch_s3, patch_sync:
+        threads = [threading.Thread(target=fetch) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join(timeout=10)
+    assert not any(thread.is_alive() for thread in threads)
+    assert not errors
+    assert calls == ['s3://bucket/grid/']
+    assert len({entry.name for entry in entries}) == 1
+    assert os.listdir(entries[0].name) == ['file.nc']
+    assert not [name for name in os.listdir(cache.cache_dir) if name.startswith('.tmp-')]
+    for entry in entries:
+        entry.cleanup()
+
+
+def test_fetch_waiting_on_download_not_blocked_by_entry_in_use(tmp_path):
+    """Test that a fetch that waits on another process's download proceeds
+    once the entry is published, although the entry is then in use."""
+    cache = ecco_aws_s3_cache.ECCOAWSS3Cache(str(tmp_path/'cache'))
+    calls, entries = [], []
+    patch_s3, patch_sync = mock_s3(sync_writing(calls=calls))
+    with patch_s3, patch_sync:
+        s3uri = 's3://bucket/grid/'
+        key = cache.key(s3uri, cache.etag(s3uri, recursive=True))
+        entry_dir = os.path.join(cache.cache_dir, key)
+
+        # another process's download in progress:
+        fetch_fd = os.open(entry_dir+'.fetch.lock', os.O_RDWR|os.O_CREAT)
+        fcntl.flock(fetch_fd, fcntl.LOCK_EX)
+        waiting = threading.Thread(
+            target=lambda: entries.append(cache.fetch(s3uri, recursive=True)))
+        waiting.start()
+        time.sleep(0.2)
+        assert not entries
+
+        # ... is published, and remains in use:
+        cache._download(s3uri, True, None, key, 'etag')
+        lock_fd = os.open(entry_dir+'.lock', os.O_RDWR)
+        fcntl.flock(lock_fd, fcntl.LOCK_SH)
+        os.close(fetch_fd)
+        waiting.join(timeout=10)
+    assert not waiting.is_alive()
+    assert len(calls) == 1
+    assert entries[0].name == entry_dir
+    entries[0].cleanup()
+    os.close(lock_fd)
+
+
+def test_failed_fetch_publishes_nothing(tmp_path):
+    """Test that a failed download leaves no entry (published or temporary),
+    and that a subsequent fetch downloads again."""
+    cache = ecco_aws_s3_cache.ECCOAWSS3Cache(str(tmp_path/'cache'))
+    def failing_sync(src, dest, **kwargs):
+        sync_writing()(src, dest)
+        raise RuntimeError('connection reset')
+    patch_s3, patch_sync = mock_s3(failing_sync)
+    with patch_s3, patch_sync, pytest.raises(RuntimeError, match='connection reset'):
+        cache.fetch('s3://bucket/grid/', recursive=True)
+    assert not [name for name in os.listdir(cache.cache_dir)
+        if not name.endswith('.lock')]
+
+    calls = []
+    patch_s3, patch_sync = mock_s3(sync_writing(calls=calls))
+    with patch_s3, patch_sync:
+        entry = cache.fetch('s3://bucket/grid/', recursive=True)
+    assert calls == ['s3://bucket/grid/']
+    assert os.listdir(entry.name) == ['file.nc']
+    entry.cleanup()
+
+
+def test_eviction_is_lru_and_skips_entries_in_use(tmp_path):
+    """Test that least recently used entries are evicted first, but never
+    while in use."""
+    cache = ecco_aws_s3_cache.ECCOAWSS3Cache(str(tmp_path/'cache'), max_bytes=25)
+    patch_s3, patch_sync = mock_s3(sync_writing())
+    with patch_s3, patch_sync:
+        fetch = lambda name: cache.fetch(f's3://bucket/{name}/', recursive=True)
+        entries = {}
+        for i,name in enumerate(('a','b')):
+            entries[name] = fetch(name)
+            os.utime(entries[name].name, (i, i))
+        entries['b'].cleanup()
+
+        # 'a' is least recently used, but in use; 'b' is evicted instead:
+        entries['c'] = fetch('c')
+        assert os.path.isdir(entries['a'].name) and os.path.isdir(entries['c'].name)
+        assert not os.path.exists(entries['b'].name)
+        assert not os.path.exists(entries['b'].name+'.json')
+
+        # once released, 'a' is evicted in preference to more recent 'c':
+        entries['a'].cleanup()
+        os.utime(entries['a'].name, (0, 0))
+        entries['c'].cleanup()
+        entries['d'] = fetch('d')
+        assert not os.path.exists(entries['a'].name)
+        assert os.path.isdir(entries['c'].name) and os.path.isdir(entries['d'].name)
+        entries['d'].cleanup()
@@ -0,0 +1,28 @@
+import datetime as dt
+import hashlib
+from unittest import mock
+
+import ecco_dataset_production
+
+
+def test_sync_local_to_remote_uploads_only_changes(tmp_path):
+    """Test file-level local-remote sync against a single remote listing."""
+    (tmp_path/'day_mean').mkdir()
+    for name, content in (('same.nc','same'), ('touched.nc','touched'),
+        ('resized.nc','resized'), ('day_mean/new.nc','new')):
+        (tmp_path/name).write_text(content)
+    past = dt.datetime(2000,1,1,tzinfo=dt.timezone.utc)
+    future = dt.datetime.now(dt.timezone.utc) + dt.timedelta(days=1)
+    objects = [
+        {'Key':'prefix/same.nc', 'Size':4, 'LastModified':future, 'ETag':'"x"'},
+        {'Key':'prefix/touched.nc', 'Size':7, 'LastModified':past,
+            'ETag':'"'+hashlib.md5(b'touched').hexdigest()+'"'},
+        {'Key':'prefix/resized.nc', 'Size':1, 'LastModified':future, 'ETag':'"x"'}]
+    client = mock.MagicMock()
+    with mock.patch.object(ecco_dataset_production.aws.utils, 's3_client', return_value=client), \
+        mock.patch.object(ecco_dataset_production.aws.utils, 's3_list_objects', return_value=objects):
+        stats = ecco_dataset_production.aws.ecco_aws_s3_sync.sync_local_to_remote(
+            src=str(tmp_path), dest='s3://bucket/prefix/', nproc=2)
+    uploaded = sorted(call.args[1:] for call in client.upload_file.call_args_list)
+    assert uploaded == [('bucket','prefix/day_mean/new.nc'), ('bucket','prefix/resized.nc')]
+    assert (stats['files'], stats['uploaded'], stats['unchanged'], stats['failed']) == (4, 2, 1, 0)
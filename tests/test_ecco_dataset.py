@@ -0,0 +1,45 @@
+import numpy as np
+import xarray as xr
+
+import ecco_dataset_production
+
+
+def test_as_latlon_stacked_matches_per_variable(synthetic_grid, grid_and_factors, mds_datasets):
+    """Test stacked multi-variable regrid against per-level, per-variable
+    sparse matrix-vector products."""
+    variables = ['SSH', 'OBP', 'ETAN']
+    grid = grid_and_factors[0]
+    factors, masks = synthetic_grid.factors, synthetic_grid.masks
+    nlat, nlon = synthetic_grid.nlat, synthetic_grid.nlon
+    for dimension in ('2D', '3D'):
+        datasets = mds_datasets(dimension, variables)
+        results = ecco_dataset_production.ecco_dataset.as_latlon_stacked(datasets, variables)
+        for ds, variable, result in zip(datasets, variables, results):
+            var = ds.ds[variable].data.squeeze()
+            levels = [0] if dimension == '2D' else range(synthetic_grid.nz)
+            expected = np.stack([
+                np.where(np.isnan(masks[z]), np.nan, factors[z].T.dot(
+                    (var if dimension == '2D' else var[z])[grid.native_wet_point_indices[z]])
+                    ).reshape(nlat, nlon)
+                for z in levels])
+            assert result.name == variable
+            assert result.dims == (('time','latitude','longitude') if dimension == '2D'
+                else ('time','Z','latitude','longitude'))
+            np.testing.assert_array_equal(
+                result.data[0], expected[0] if dimension == '2D' else expected)
+            xr.testing.assert_identical(result, ds.as_latlon(variable))
+
+
+def test_as_latlon_stacked_float32_tolerance(mds_datasets):
+    """Test float32 compute path against float64 path, per FLOAT32_RTOL."""
+    variables = ['THETA', 'SALT']
+    results = {}
+    for array_precision in ('float32', 'float64'):
+        datasets = mds_datasets('3D', variables, array_precision)
+        results[array_precision] = \
+            ecco_dataset_production.ecco_dataset.as_latlon_stacked(datasets, variables)
+    for r32, r64 in zip(results['float32'], results['float64']):
+        assert r32.dtype == np.float32 and r64.dtype == np.float64
+        np.testing.assert_array_equal(np.isnan(r32.data), np.isnan(r64.data))
+        np.testing.assert_allclose(r32.data, r64.data, rtol=0,
+            atol=ecco_dataset_production.ecco_dataset.FLOAT32_RTOL*np.nanmax(np.abs(r64.data)))
@@ -0,0 +1,110 @@
+import os
+
+from ecco_dataset_production import ecco_factors_manifest as efm
+
+NK = 2
+
+
+def make_factors(tmp_path):
+    """Configuration, input grid file, and a mapping factors directory
+    containing one file per expected artifact."""
+    grid_dir = tmp_path / 'grid'
+    grid_dir.mkdir()
+    (grid_dir / 'GRID_GEOMETRY.nc').write_bytes(b'grid')
+    cfg = {'ecco_grid_dir': str(grid_dir), 'ecco_grid_filename': 'GRID_GEOMETRY.nc',
+        'mapping_factors_dir': str(tmp_path / 'factors'), 'num_vertical_levels': NK,
+        'latlon_grid_resolution': 0.5, 'custom_grid_and_factors': False}
+    expected = efm.expected_artifacts(NK, ['2D', '3D'])
+    for name in expected:
+        write(cfg, name, name)
+    return cfg, expected
+
+
+def write(cfg, name, content):
+    path = os.path.join(cfg['mapping_factors_dir'], name)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'w') as f:
+        f.write(content)
+
+
+def build(cfg, expected):
+    """Record all expected artifacts, as a complete build would."""
+    manifest = efm.ECCOFactorsManifest(cfg['mapping_factors_dir'])
+    manifest.set_inputs(efm.factors_input_files(cfg), cfg)
+    for name, depends_on in expected.items():
+        manifest.record(name, depends_on)
+    return manifest
+
+
+def stale(cfg, expected):
+    """Names of artifacts a rebuild would remake."""
+    manifest = efm.ECCOFactorsManifest(cfg['mapping_factors_dir'])
+    manifest.set_inputs(efm.factors_input_files(cfg), cfg)
+    return {name for name, depends_on in expected.items()
+        if not manifest.is_current(name, depends_on)}
+
+
+def test_expected_artifacts_dependencies():
+    """Test artifact dependency graph."""
+    expected = efm.expected_artifacts(NK, ['2D', '3D'])
+    assert expected[efm.land_mask(1)] == [efm.GRID_MAPPINGS_ALL]
+    assert expected[efm.sparse_matrix(0)] == \
+        [efm.GRID_MAPPINGS_2D, efm.grid_mappings_3d(0), efm.land_mask(0)]
+    assert expected[efm.sparse_matrix(1)] == [efm.grid_mappings_3d(1), efm.land_mask(1)]
+    names = list(expected)
+    for name, depends_on in expected.items():
+        assert all(names.index(d) < names.index(name) for d in depends_on)
+
+
+def test_only_stale_artifacts_rebuilt(tmp_path):
+    """Test staleness propagation through the dependency graph."""
+    cfg, expected = make_factors(tmp_path)
+    build(cfg, expected)
+    assert stale(cfg, expected) == set()
+    assert efm.check_factors(cfg, ['2D', '3D']) == {}
+
+    # a single missing level:
+    os.remove(os.path.join(cfg['mapping_factors_dir'], efm.sparse_matrix(1)))
+    assert stale(cfg, expected) == {efm.sparse_matrix(1)}
+    write(cfg, efm.sparse_matrix(1), 'rebuilt')
+    build(cfg, {efm.sparse_matrix(1): expected[efm.sparse_matrix(1)]})
+    assert stale(cfg, expected) == set()
+
+    # identical upstream rebuild does not invalidate dependents, a changed
+    # one does:
+    manifest = build(cfg, {efm.GRID_MAPPINGS_ALL: []})
+    assert stale(cfg, expected) == set()
+    write(cfg, efm.GRID_MAPPINGS_ALL, 'changed')
+    manifest.record(efm.GRID_MAPPINGS_ALL)
+    assert stale(cfg, expected) == {efm.land_mask(k) for k in range(NK)}
+    # ... and so on, down the dependency chain:
+    write(cfg, efm.land_mask(1), 'changed')
+    build(cfg, {efm.land_mask(k): expected[efm.land_mask(k)] for k in range(NK)})
+    assert stale(cfg, expected) == {efm.sparse_matrix(1)}
+
+    # configuration change invalidates everything:
+    build(cfg, expected)
+    cfg['latlon_grid_resolution'] = 0.25
+    assert stale(cfg, expected) == set(expected)
+    assert set(efm.check_factors(cfg, ['2D', '3D']).values()) == {'stale'}
+
+
+def test_check_reports_problems(tmp_path):
+    """Test --check problem classification, and adoption of a build
+    predating the manifest."""
+    cfg, expected = make_factors(tmp_path)
+    assert set(efm.check_factors(cfg, ['2D', '3D']).values()) == {'unrecorded'}
+
+    manifest = efm.ECCOFactorsManifest(cfg['mapping_factors_dir'])
+    manifest.set_inputs(efm.factors_input_files(cfg), cfg)
+    assert manifest.adopt(expected) == list(expected)
+    assert manifest.adopt(expected) == []
+    assert stale(cfg, expected) == set()
+
+    path = os.path.join(cfg['mapping_factors_dir'], efm.land_mask(0))
+    stat = os.stat(path)
+    write(cfg, efm.land_mask(0), efm.land_mask(0).upper())  # same size
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+    os.remove(os.path.join(cfg['mapping_factors_dir'], efm.sparse_matrix(1)))
+    assert efm.check_factors(cfg, ['2D', '3D']) == {
+        efm.land_mask(0): 'corrupt', efm.sparse_matrix(1): 'missing'}
@@ -66,3 +66,26 @@ def test_ecco_day_mean_granulefilestr():
             version=epf.version,
             grid_type=epf.grid_type,
             grid_label=epf.grid_label).filestr
+
+
+def test_parse_many():
+    """Test bulk MDS filestr parsing against single filestr parsing."""
+    names = [ECCO_DAY_MEAN_RESULTS_FILE, 'README', ECCO_DAY_SNAP_RESULTS_FILE,
+        'OBP_ECCO_mon_mean.0000000732.meta']
+    fields = ecco_dataset_production.ecco_file.parse_many(names)
+    assert fields['valid'].tolist() == [True, False, True, True]
+    for i, name in enumerate(names):
+        if fields['valid'][i]:
+            ef = ecco_dataset_production.ecco_file.ECCOMDSFilestr(name)
+            assert (ef.prefix, ef.averaging_period, ef.time, ef.ext) == \
+                tuple(fields[k][i] for k in ('prefix','averaging_period','time','ext'))
+    assert fields['prefix'][3] == 'OBP_ECCO'
+
+
+def test_parse_granule_filestr_cached():
+    """Test memoized granule filestr parsing."""
+    path = 's3://bucket/day_mean/' + ECCO_DAY_MEAN_GRANULE_FILE
+    fields = ecco_dataset_production.ecco_file.parse_granule_filestr(path)
+    assert fields is ecco_dataset_production.ecco_file.parse_granule_filestr(path)
+    assert (fields.averaging_period, fields.grid_type, fields.date) == \
+        ('day_mean', 'latlon', '1992-01-01')
@@ -0,0 +1,77 @@
+import os
+
+import xarray as xr
+
+from ecco_dataset_production import ecco_generate_datasets
+from ecco_dataset_production import ecco_granule_cache
+
+cfg = {
+    'array_precision'   : 'float32',
+    'model_start_time'  : '1992-01-01T12:00:00',
+    'ecco_version'      : 'V4r4',
+}
+
+
+def test_key_ignores_metadata_only_changes(tmp_path, local_task):
+    """Test that cache keys change with granule data inputs, but not with
+    metadata-only task or configuration changes."""
+    task, grid, mapping_factors = local_task
+    def key(task, cfg):
+        cache = ecco_granule_cache.ECCOGranuleCache(str(tmp_path/'cache'))
+        return cache.key(task, cfg, grid, mapping_factors)
+
+    key1 = key(task, cfg)
+    assert key(task, cfg) == key1
+    metadata_task = dict(task, dynamic_metadata=dict(task['dynamic_metadata'], summary='SSH'))
+    assert key(metadata_task, dict(cfg, ecco_version='V4r5')) == key1
+
+    assert key(task, dict(cfg, array_precision='float64')) != key1
+    time_task = dict(task, dynamic_metadata=dict(
+        task['dynamic_metadata'], time_coverage_center='1992-01-01T13:00:00'))
+    assert key(time_task, cfg) != key1
+    (tmp_path/'factors'/'sparse_matrix_0.npz').write_text('rebuilt factors')
+    key2 = key(task, cfg)
+    assert key2 != key1
+    (tmp_path/'input'/'SSH_day_mean.0000000012.data').write_text('modified data')
+    assert key(task, cfg) != key2
+
+
+def test_round_trip_and_eviction(tmp_path, granule_dataset):
+    """Test that cached datasets are identical to those cached, without
+    file encodings, and least recently used eviction."""
+    cache = ecco_granule_cache.ECCOGranuleCache(str(tmp_path/'cache'))
+    dataset = granule_dataset()
+    assert cache.get('a') is None
+    cache.put('a', dataset)
+    cached = cache.get('a')
+    xr.testing.assert_identical(cached, dataset)
+    assert all(not variable.encoding for variable in cached.variables.values())
+
+    size = os.path.getsize(cache.path('a'))
+    cache.max_bytes = 2*size
+    os.utime(cache.path('a'), (0, 0))
+    cache.put('b', granule_dataset(1))
+    cache.put('c', granule_dataset(2))
+    assert not cache.contains('a')
+    assert cache.contains('b') and cache.contains('c')
+    assert not [name for name in os.listdir(cache.cache_dir) if name.endswith('.tmp')]
+
+
+def test_build_granule_cache_hit_skips_computation(tmp_path, local_task, granule_dataset, monkeypatch):
+    """Test that a cached granule proceeds directly to metadata application."""
+    task, grid, mapping_factors = local_task
+    cache = ecco_granule_cache.ECCOGranuleCache(str(tmp_path/'cache'))
+    dataset = granule_dataset()
+    cache.put(cache.key(task, cfg, grid, mapping_factors), dataset)
+
+    def no_computation(*args, **kwargs):
+        raise AssertionError('granule data recomputed')
+    monkeypatch.setattr(ecco_generate_datasets.ecco_dataset, 'ECCOMDSDataset', no_computation)
+    monkeypatch.setattr(ecco_generate_datasets, 'set_granule_ancillary_data', no_computation)
+    monkeypatch.setattr(ecco_generate_datasets, 'set_granule_metadata',
+        lambda dataset, task, ecco_metadata, cfg: (dataset, {}))
+    metadata_cfg = dict(cfg, ecco_version='V4r5')
+    result, encoding = ecco_generate_datasets.build_granule(
+        task, metadata_cfg, grid=grid, mapping_factors=mapping_factors,
+        granule_cache=cache)
+    xr.testing.assert_identical(result, dataset)
@@ -0,0 +1,89 @@
+import dask.array
+import numpy as np
+import pytest
+
+import ecco_dataset_production
+
+
+def test_eager_and_lazy_grids_agree(grid_dir, synthetic_grid):
+    """Test that eager (numpy) and lazy (dask) grids provide identical wet
+    point indices, land masks and coordinate bounds, as read-only arrays."""
+    native = synthetic_grid.native
+    grids = {eager: ecco_dataset_production.ecco_grid.ECCOGrid(grid_loc=grid_dir, eager=eager)
+        for eager in (True, False)}
+    assert isinstance(grids[True].native_grid['maskC'].variable._data, np.ndarray)
+    assert isinstance(grids[False].native_grid['maskC'].data, dask.array.Array)
+
+    for z in range(synthetic_grid.nz):
+        for eager_index, lazy_index, expected_index in zip(
+            grids[True].native_wet_point_indices[z], grids[False].native_wet_point_indices[z],
+            np.where(native['hFacC'].values[z] > 0)):
+            np.testing.assert_array_equal(eager_index, expected_index)
+            np.testing.assert_array_equal(lazy_index, expected_index)
+    for mask_type in ('maskC', 'maskW'):
+        for is_3d in (True, False):
+            expected = ~native[mask_type].values if is_3d else ~native[mask_type].values[0]
+            for grid in grids.values():
+                land_mask = grid.native_land_mask(mask_type=mask_type, is_3d=is_3d)
+                assert land_mask.dtype == bool and not land_mask.flags.writeable
+                np.testing.assert_array_equal(land_mask, expected)
+                assert grid.native_land_mask(mask_type=mask_type, is_3d=is_3d) is land_mask
+    for name in ('XC_bnds', 'YC_bnds', 'Z_bnds'):
+        for grid in grids.values():
+            bounds = grid.native_coordinate_bounds[name]
+            assert isinstance(bounds.data, np.ndarray) and not bounds.data.flags.writeable
+            np.testing.assert_array_equal(bounds, native[name])
+            assert grid.native_coordinate_bounds[name].data is bounds.data
+
+
+@pytest.mark.parametrize('eager', [True, False])
+def test_apply_land_mask_in_place(grid_dir, synthetic_grid, mds_dataset, eager):
+    """Test that land points are set to NaN in the variable's own buffer, if
+    writable float data, otherwise in a float copy, and that neither the
+    cached land mask nor the coordinate bounds are modified."""
+    grid = ecco_dataset_production.ecco_grid.ECCOGrid(grid_loc=grid_dir, eager=eager)
+    land_mask = grid.native_land_mask(mask_type='maskC', is_3d=True)
+    land_mask_copy = land_mask.copy()
+    bounds = {name: grid.native_coordinate_bounds[name].data.copy()
+        for name in ('XC_bnds', 'YC_bnds', 'Z_bnds')}
+    rng = np.random.default_rng(1)
+    values = rng.random((1, synthetic_grid.nz)+synthetic_grid.native_shape).astype(np.float32)
+    expected = np.where(land_mask_copy, np.nan, values)
+
+    # writable float data, masked in place:
+    data = values.copy()
+    ds = mds_dataset({'X': (('time','k','tile','j','i'), data)}, grid=grid)
+    for name in bounds:
+        ds.ds.coords[name] = (grid.native_coordinate_bounds[name].dims,
+            grid.native_coordinate_bounds[name].data)
+    ds.apply_land_mask_to_native_variable('X')
+    assert ds.ds['X'].data is data
+    np.testing.assert_array_equal(data, expected)
+
+    # read-only, integer, and dask-backed data, masked as copies:
+    readonly = values.copy()
+    readonly.flags.writeable = False
+    for data, dtype in (
+        (readonly, np.float32),
+        ((values*100).astype(np.int32), np.float64),
+        (dask.array.from_array(values, chunks=(1,1)+synthetic_grid.native_shape), np.float32)):
+        ds = mds_dataset({'X': (('time','k','tile','j','i'), data)}, grid=grid)
+        ds.apply_land_mask_to_native_variable('X')
+        result = ds.ds['X'].data
+        assert isinstance(result, np.ndarray) and result.dtype == dtype
+        np.testing.assert_array_equal(np.isnan(result), land_mask_copy[np.newaxis])
+        np.testing.assert_array_equal(result[~np.isnan(result)],
+            np.asarray(data)[~np.isnan(result)].astype(dtype))
+    np.testing.assert_array_equal(readonly, values)
+
+    # surface-only variables use the (cached) surface mask:
+    data = values[:,0].copy()
+    ds = mds_dataset({'X': (('time','tile','j','i'), data)}, grid=grid)
+    ds.apply_land_mask_to_native_variable('X')
+    np.testing.assert_array_equal(data, expected[:,0])
+
+    np.testing.assert_array_equal(land_mask, land_mask_copy)
+    assert not land_mask.flags.writeable
+    for name, expected_bounds in bounds.items():
+        np.testing.assert_array_equal(grid.native_coordinate_bounds[name], expected_bounds)
+        assert not grid.native_coordinate_bounds[name].data.flags.writeable
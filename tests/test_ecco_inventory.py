@@ -0,0 +1,82 @@
+from unittest import mock
+
+import ecco_dataset_production
+
+
+# some configuration test data:
+cfg = {
+    'model_start_time'      : '1992-01-01T12:00:00',
+    'model_end_time'        : '2017-12-31T12:00:00',
+    'model_timestep'        : 1,
+    'model_timestep_units'  : 'h',
+}
+
+GRANULE_FILE = 'SEA_SURFACE_HEIGHT_day_mean_1992-01-01_ECCO_V4r4_latlon_0p50deg.nc'
+
+
+def make_task(tmp_path):
+    """Minimal local task descriptor with one input file pair."""
+    (tmp_path/'input').mkdir()
+    for ext in ('data','meta'):
+        (tmp_path/'input'/f'SSH_day_mean.0000000012.{ext}').write_text(ext)
+    return {
+        'granule': str(tmp_path/'output'/GRANULE_FILE),
+        'variables': {'SSH': [[
+            str(tmp_path/'input'/'SSH_day_mean.0000000012.data'),
+            str(tmp_path/'input'/'SSH_day_mean.0000000012.meta')]]},
+        'dynamic_metadata': {'dimension': '2D'}}
+
+
+def test_inventory_exists(tmp_path):
+    """Test bulk (per-directory) existence checks."""
+    (tmp_path/'output').mkdir()
+    (tmp_path/'output'/GRANULE_FILE).write_text('granule')
+    inventory = ecco_dataset_production.ecco_inventory.ECCOInventory()
+    assert inventory.exists(str(tmp_path/'output'/GRANULE_FILE))
+    assert not inventory.exists(str(tmp_path/'output'/'missing.nc'))
+    assert not inventory.exists(str(tmp_path/'no_such_dir'/GRANULE_FILE))
+    assert inventory.stat(str(tmp_path/'output'/GRANULE_FILE))['size'] == len('granule')
+
+
+def test_inventory_s3_listing_not_recursive(monkeypatch):
+    """Test that AWS S3 "directory" listings request only the objects
+    immediately under the prefix."""
+    keys = ['output/a.nc', 'output/b.nc', 'output/sub/c.nc']
+    requests = []
+    def paginate(**kwargs):
+        requests.append(kwargs)
+        contents = [{'Key':key, 'Size':1, 'ETag':f'"{key}"'} for key in keys
+            if kwargs.get('Delimiter') != '/' or '/' not in key[len(kwargs['Prefix']):]]
+        return [{'Contents': contents}]
+    client = mock.MagicMock()
+    client.get_paginator.return_value.paginate = paginate
+    aws = ecco_dataset_production.aws
+    monkeypatch.setattr(aws.ecco_aws_s3_sync, 'update_credentials', lambda **kwargs: None)
+    monkeypatch.setattr(aws.utils, 's3_client', lambda **kwargs: client)
+    inventory = ecco_dataset_production.ecco_inventory.ECCOInventory()
+    assert sorted(inventory.listing('s3://bucket/output')) == ['a.nc', 'b.nc']
+    assert requests == [{'Bucket':'bucket', 'Prefix':'output/', 'Delimiter':'/'}]
+
+
+def test_task_fingerprint_tracks_inputs(tmp_path):
+    """Test task fingerprint is stable, and changes with task inputs."""
+    task = make_task(tmp_path)
+    fp1 = ecco_dataset_production.ecco_inventory.task_fingerprint(
+        task, cfg, ecco_dataset_production.ecco_inventory.ECCOInventory())
+    fp2 = ecco_dataset_production.ecco_inventory.task_fingerprint(
+        task, cfg, ecco_dataset_production.ecco_inventory.ECCOInventory())
+    assert fp1 == fp2
+    (tmp_path/'input'/'SSH_day_mean.0000000012.data').write_text('modified data')
+    fp3 = ecco_dataset_production.ecco_inventory.task_fingerprint(
+        task, cfg, ecco_dataset_production.ecco_inventory.ECCOInventory())
+    assert fp1 != fp3
+
+
+def test_task_fingerprint_tracks_config(tmp_path):
+    """Test task fingerprint changes with configuration."""
+    task = make_task(tmp_path)
+    inventory = ecco_dataset_production.ecco_inventory.ECCOInventory()
+    fp1 = ecco_dataset_production.ecco_inventory.task_fingerprint(task, cfg, inventory)
+    fp2 = ecco_dataset_production.ecco_inventory.task_fingerprint(
+        task, dict(cfg, model_timestep=2), inventory)
+    assert fp1 != fp2
@@ -0,0 +1,76 @@
+import lzma
+import os
+import pickle
+
+import numpy as np
+from scipy import sparse
+
+from ecco_dataset_production import ecco_grid
+from ecco_dataset_production import ecco_mapping_factors
+
+
+def test_wet_point_indices(latlon_grid):
+    """Test single-pass wet point indices against per-level numpy.where."""
+    _, hFacC = latlon_grid
+    wet_pts_k = ecco_grid.wet_point_indices(hFacC)
+    assert sorted(wet_pts_k) == list(range(hFacC.shape[0]))
+    for k in range(hFacC.shape[0]):
+        expected = np.where(hFacC[k,:] > 0)
+        assert len(wet_pts_k[k]) == len(expected)
+        for index, expected_index in zip(wet_pts_k[k], expected):
+            np.testing.assert_array_equal(index, expected_index)
+
+
+def test_latlon_grid_store_round_trip(tmp_path, latlon_grid):
+    """Test that the array store reproduces the pickled latlon grid, and that
+    ECCOMappingFactors prefers it."""
+    latlon_grid, hFacC = latlon_grid
+    latlon_grid_dir = tmp_path / ecco_mapping_factors.LATLON_GRID_DIR
+    assert ecco_mapping_factors.load_latlon_grid_store(latlon_grid_dir) is None
+
+    ecco_mapping_factors.save_latlon_grid_store(latlon_grid_dir, latlon_grid)
+    assert not [f for f in os.listdir(latlon_grid_dir) if 'tmp' in f]
+    stored = ecco_mapping_factors.load_latlon_grid_store(latlon_grid_dir)
+    assert isinstance(stored[1], np.memmap)
+    np.testing.assert_array_equal(stored[0]['lat'], latlon_grid[0]['lat'])
+    np.testing.assert_array_equal(stored[0]['lon'], latlon_grid[0]['lon'])
+    np.testing.assert_array_equal(stored[1], latlon_grid[1])
+    assert stored[2]['shape'] == latlon_grid[2]['shape']
+    for k in range(hFacC.shape[0]):
+        for index, expected_index in zip(stored[3][k], latlon_grid[3][k]):
+            np.testing.assert_array_equal(index, expected_index)
+        # usable as native wet point indices:
+        np.testing.assert_array_equal(hFacC[k][stored[3][k]], hFacC[k][latlon_grid[3][k]])
+
+    # store preferred over (here, deliberately different) pickle:
+    pickled = [latlon_grid[0], latlon_grid[1]*2, latlon_grid[2], latlon_grid[3]]
+    with lzma.open(latlon_grid_dir / ecco_mapping_factors.LATLON_GRID_PICKLE, 'wb') as f:
+        pickle.dump(pickled, f)
+    mapping_factors = ecco_mapping_factors.ECCOMappingFactors(mapping_factors_loc=str(tmp_path))
+    np.testing.assert_array_equal(mapping_factors.depth_bounds, latlon_grid[1])
+    assert not mapping_factors.latitude_bounds.flags.writeable
+
+    # pickle fallback:
+    os.remove(latlon_grid_dir / 'wet_point_offsets.npy')
+    mapping_factors = ecco_mapping_factors.ECCOMappingFactors(mapping_factors_loc=str(tmp_path))
+    np.testing.assert_array_equal(mapping_factors.depth_bounds, pickled[1])
+
+
+def test_latlon_regrid_operator_matches_gather_map_mask(latlon_grid):
+    """Test fused regrid operator against wet point gather, mapping factors
+    product, and land masking."""
+    _, hFacC = latlon_grid
+    wet_pts_k = ecco_grid.wet_point_indices(hFacC)
+    rng = np.random.default_rng(1)
+    nlatlon = 20
+    factors = sparse.random(len(wet_pts_k[0][0]), nlatlon, density=0.3, random_state=0, format='csr')
+    land_mask = np.where(rng.random(nlatlon) > 0.3, 1., np.nan)
+    level = rng.random(hFacC.shape[1:])
+
+    operator, targets = ecco_mapping_factors.latlon_regrid_operator(
+        factors, land_mask, wet_pts_k[0], level.shape)
+    assert operator.shape == (np.count_nonzero(~np.isnan(land_mask)), level.size)
+    latlon = np.full(nlatlon, np.nan)
+    latlon[targets] = operator.dot(level.reshape(-1))
+    expected = np.where(np.isnan(land_mask), np.nan, factors.T.dot(level[wet_pts_k[0]]))
+    np.testing.assert_array_equal(latlon, expected)
@@ -0,0 +1,49 @@
+import threading
+import time
+
+import ecco_dataset_production
+
+
+def test_pipeline_processes_all_items():
+    """Test all items pass through all stages, and stage errors are reported."""
+    def double(x):
+        return 2*x
+    def fail_on_six(x):
+        if x == 6:
+            raise ValueError(x)
+        return x + 1
+    results, errors = [], []
+    def on_done(item, error):
+        (errors if error else results).append(item)
+    pipeline = ecco_dataset_production.ecco_pipeline.ECCOPipeline([
+        ecco_dataset_production.ecco_pipeline.ECCOPipelineStage('double', double, concurrency=2),
+        ecco_dataset_production.ecco_pipeline.ECCOPipelineStage('increment', fail_on_six, concurrency=3)])
+    metrics = pipeline.run(range(10), on_done=on_done)
+    assert sorted(results) == [2*x+1 for x in range(10) if x != 3]
+    assert errors == [6]
+    assert metrics['double']['items'] == 10
+    assert metrics['increment']['items'] == 9
+    assert metrics['increment']['errors'] == 1
+
+
+def test_pipeline_bounds_items_in_flight():
+    """Test stage concurrency limits and bounded queues cap items in flight."""
+    lock = threading.Lock()
+    in_flight = {'now': 0, 'max': 0}
+    def fetch(x):
+        with lock:
+            in_flight['now'] += 1
+            in_flight['max'] = max(in_flight['max'], in_flight['now'])
+        return x
+    def slow_upload(x):
+        time.sleep(0.01)
+        with lock:
+            in_flight['now'] -= 1
+        return x
+    stages = [
+        ecco_dataset_production.ecco_pipeline.ECCOPipelineStage('fetch', fetch, concurrency=4),
+        ecco_dataset_production.ecco_pipeline.ECCOPipelineStage('upload', slow_upload, concurrency=1)]
+    metrics = ecco_dataset_production.ecco_pipeline.ECCOPipeline(stages, queue_size=1).run(range(20))
+    # upload concurrency + queue size + fetch concurrency (blocked on put):
+    assert in_flight['max'] <= 1 + 1 + 4
+    assert metrics['upload']['occupancy'] > metrics['fetch']['occupancy']
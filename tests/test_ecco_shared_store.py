@@ -0,0 +1,64 @@
+import os
+import types
+
+import numpy as np
+
+from ecco_dataset_production import ecco_grid
+from ecco_dataset_production import ecco_mapping_factors
+from ecco_dataset_production import ecco_shared_store
+
+
+def test_shared_store_matches_unshared(tmp_path, synthetic_grid, grid_dir, mapping_factors_dir):
+    """Test that store-backed grid and mapping factors return the same values
+    as unshared instances, as read-only views of a single published copy."""
+    root = str(tmp_path / 'shm')
+    expected_grid = ecco_grid.ECCOGrid(grid_loc=grid_dir, eager=True)
+    expected_factors = ecco_mapping_factors.ECCOMappingFactors(mapping_factors_loc=mapping_factors_dir)
+
+    # publish, using (and releasing) a worker's own copies:
+    grid = ecco_grid.ECCOGrid(grid_loc=grid_dir, eager=True)
+    mapping_factors = ecco_mapping_factors.ECCOMappingFactors(mapping_factors_loc=mapping_factors_dir)
+    store = ecco_shared_store.open_shared_store(grid, mapping_factors, root=root, dtype=np.float32)
+    grid.attach_shared_store(store)
+    mapping_factors.attach_shared_store(store)
+    assert not [name for name in os.listdir(root) if name.startswith('.tmp-')]
+
+    for z in range(synthetic_grid.nz):
+        for index, expected_index in zip(
+            grid.native_wet_point_indices[z], expected_grid.native_wet_point_indices[z]):
+            np.testing.assert_array_equal(index, expected_index)
+        wet = expected_grid.native_wet_point_indices[z]
+        operator, targets = mapping_factors.latlon_regrid_operator(
+            level=z, wet_point_indices=None, native_shape=synthetic_grid.native_shape, dtype=np.float32)
+        expected_operator, expected_targets = expected_factors.latlon_regrid_operator(
+            level=z, wet_point_indices=wet, native_shape=synthetic_grid.native_shape)
+        assert operator.dtype == np.float32
+        assert np.shares_memory(operator.data, store.array(f'factors/operator_{z}_data'))
+        np.testing.assert_allclose(operator.toarray(), expected_operator.toarray(), rtol=1e-6)
+        np.testing.assert_array_equal(targets, expected_targets)
+        np.testing.assert_array_equal(mapping_factors.latlon_land_mask(level=z),
+            expected_factors.latlon_land_mask(level=z))
+    for mask_type in ('maskC', 'maskW'):
+        for is_3d in (False, True):
+            land_mask = grid.native_land_mask(mask_type=mask_type, is_3d=is_3d)
+            assert not land_mask.flags.writeable
+            np.testing.assert_array_equal(land_mask,
+                expected_grid.native_land_mask(mask_type=mask_type, is_3d=is_3d))
+    for name, bounds in grid.native_coordinate_bounds.items():
+        assert isinstance(bounds.data, np.memmap)
+        np.testing.assert_array_equal(bounds, expected_grid.native_coordinate_bounds[name])
+    for name in ('CS', 'SN'):
+        assert np.shares_memory(grid.native_grid[name].values, store.array(f'grid/{name}'))
+        np.testing.assert_array_equal(grid.native_grid[name], expected_grid.native_grid[name])
+    np.testing.assert_array_equal(mapping_factors.latitude_bounds, expected_factors.latitude_bounds)
+    np.testing.assert_array_equal(mapping_factors.depth_bounds, expected_factors.depth_bounds)
+
+    # other workers attach to the published store (without publishing, for
+    # which these would not suffice), and a different precision results in a
+    # new one:
+    worker_grid = types.SimpleNamespace(grid_dir=grid_dir)
+    worker_factors = types.SimpleNamespace(mapping_factors_dir=mapping_factors_dir)
+    assert ecco_shared_store.open_shared_store(
+        worker_grid, worker_factors, root=root, dtype=np.float32).store_dir == store.store_dir
+    assert ecco_shared_store.open_shared_store(
+        expected_grid, expected_factors, root=root).store_dir != store.store_dir
@@ -0,0 +1,68 @@
+import json
+
+import pytest
+
+import ecco_dataset_production
+
+
+def make_tasks():
+    """Tasks from two 'jobs', differing in shared fields."""
+    return [
+        {
+            'granule': f'{name}_mon_mean_1992-0{i+1}_ECCO_V4r4_latlon_0p50deg.nc',
+            'variables': {name: [[f'{name}_mon_mean.{i:010}.data', f'{name}_mon_mean.{i:010}.meta']]},
+            'ecco_cfg_loc': 'config.yaml',
+            'ecco_grid_loc': 'grid',
+            'dynamic_metadata': {
+                'name': name,
+                'dimension': '2D',
+                'time_coverage_start': f'1992-0{i+1}-01T00:00:00',
+                'summary': f'{name} summary'}}
+        for name in ('SSH', 'OBP') for i in range(3)]
+
+
+@pytest.mark.parametrize('format', ['json', 'jsonl'])
+def test_tasklist_round_trip(tmp_path, format):
+    """Test tasks are recovered unchanged from either format."""
+    tasks = make_tasks()
+    tasklist = str(tmp_path/f'tasks.{format}')
+    assert ecco_dataset_production.ecco_tasklist.write_tasklist(tasks, tasklist) == len(tasks)
+    assert list(ecco_dataset_production.ecco_tasklist.read_tasklist(tasklist)) == tasks
+
+
+def test_json_tasklist_compatibility(tmp_path, monkeypatch):
+    """Test json format output is identical to json.dump, and that existing
+    array tasklists are read incrementally."""
+    tasks = make_tasks()
+    tasklist = tmp_path/'tasks.json'
+    ecco_dataset_production.ecco_tasklist.write_tasklist(tasks, str(tasklist))
+    assert tasklist.read_text() == json.dumps(tasks, indent=4)
+    monkeypatch.setattr(ecco_dataset_production.ecco_tasklist, '_READ_CHUNK_SIZE', 16)
+    assert list(ecco_dataset_production.ecco_tasklist.read_tasklist(str(tasklist))) == tasks
+
+
+def test_jsonl_tasklist_deduplicates_shared_fields(tmp_path):
+    """Test shared fields are written once per job."""
+    tasklist = tmp_path/'tasks.jsonl'
+    ecco_dataset_production.ecco_tasklist.write_tasklist(make_tasks(), str(tasklist))
+    lines = tasklist.read_text().splitlines()
+    assert len(lines) == 1 + 2 + 6     # header, two defaults records, six tasks
+    assert sum('config.yaml' in line for line in lines) == 2
+
+
+def test_json_tasklist_spanning_read_chunks(tmp_path, monkeypatch):
+    """Test that large array tasklists, with elements spanning read chunk
+    boundaries, are decoded completely and in order, and that truncated ones
+    are rejected."""
+    tasks = [dict(task, granule=f'{i:06}_{task["granule"]}')
+        for i in range(500) for task in make_tasks()]
+    tasklist = tmp_path/'tasks.json'
+    tasklist.write_text(json.dumps(tasks, indent=4))
+    monkeypatch.setattr(ecco_dataset_production.ecco_tasklist, '_READ_CHUNK_SIZE', 4093)
+    assert tasklist.stat().st_size > 100*4093
+    assert list(ecco_dataset_production.ecco_tasklist.read_tasklist(str(tasklist))) == tasks
+
+    truncated = tmp_path/'truncated.json'
+    truncated.write_text(tasklist.read_text()[:-100])
+    with pytest.raises(json.JSONDecodeError):
+        list(ecco_dataset_production.ecco_tasklist.read_tasklist(str(truncated)))
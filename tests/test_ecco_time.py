@@ -45,3 +45,37 @@ def test_make_time_bounds_metadata_last_interval():
         np.datetime64('2017-12-31T12:00:00.000000')
     ]
     assert center_time == np.datetime64('2017-12-31T06:00:00.000000')
+
+
+def test_make_time_bounds_metadata_batch_matches_scalar():
+    """Test vectorized time bounds against scalar results, including first
+    and last intervals."""
+    for averaging_period, granule_times in (
+        ('AVG_DAY', ['0000000018', '0000000042', '0000001314', '0000227904']),
+        ('AVG_MON', [732, 1428, 1452, 2184, 227904]),
+        ('AVG_YEAR', [8772, 17556])):
+        tb, center_time = ecco_dataset_production.ecco_time.make_time_bounds_metadata_batch(
+            granule_times=granule_times,
+            model_start_time=cfg['model_start_time'],
+            model_end_time=cfg['model_end_time'],
+            model_timestep=cfg['model_timestep'],
+            model_timestep_units=cfg['model_timestep_units'],
+            averaging_period=averaging_period)
+        assert tb.shape == (len(granule_times), 2)
+        for i, granule_time in enumerate(granule_times):
+            tb_i, center_time_i = ecco_dataset_production.ecco_time.make_time_bounds_metadata(
+                granule_time=granule_time,
+                model_start_time=cfg['model_start_time'],
+                model_end_time=cfg['model_end_time'],
+                model_timestep=cfg['model_timestep'],
+                model_timestep_units=cfg['model_timestep_units'],
+                averaging_period=averaging_period)
+            assert list(tb[i]) == list(tb_i)
+            assert center_time[i] == center_time_i
+
+
+def test_isoformat():
+    """Test vectorized ISO Date Time formatting."""
+    assert list(ecco_dataset_production.ecco_time.isoformat(
+        np.array(['1992-01-01T21:00:00.000000', '2017-12-31T06:00:00'], dtype='datetime64[us]'))) == [
+        '1992-01-01T21:00:00', '2017-12-31T06:00:00']
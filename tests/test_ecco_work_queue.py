@@ -0,0 +1,87 @@
+import time
+
+import pytest
+
+import ecco_dataset_production
+
+
+TASKS = [{'granule': f'granule_{i}.nc'} for i in range(3)]
+
+
+def test_lease_ack():
+    """Test tasks are leased in order, once each, and acknowledged."""
+    queue = ecco_dataset_production.ecco_work_queue.open_work_queue(':memory:')
+    assert queue.put(TASKS) == 3
+    leases = [queue.lease(worker_id='test') for _ in TASKS]
+    assert [lease.task for lease in leases] == TASKS
+    assert queue.lease(worker_id='test') is None
+    assert queue.status()['leased'] == 3
+    for lease in leases:
+        assert queue.ack(lease)
+    assert queue.status() == {'pending': 0, 'leased': 0, 'done': 3, 'failed': 0}
+    assert queue.is_drained()
+
+
+def test_expired_lease_released():
+    """Test tasks of dead (non-heartbeating) workers are re-leased, and that
+    the original lease is invalidated."""
+    queue = ecco_dataset_production.ecco_work_queue.open_work_queue(
+        ':memory:', visibility_timeout=0.05, max_attempts=2)
+    queue.put(TASKS[:1])
+    dead = queue.lease(worker_id='dead')
+    time.sleep(0.1)
+    alive = queue.lease(worker_id='alive')
+    assert alive.task == dead.task and alive.attempt == 2
+    assert not queue.heartbeat(dead)
+    assert not queue.ack(dead)
+    time.sleep(0.1)
+    # max_attempts reached:
+    assert queue.lease(worker_id='another') is None
+    assert queue.status()['failed'] == 1
+    assert queue.requeue_failed() == 1
+
+
+def test_work():
+    """Test worker loop processes all tasks, retrying failures."""
+    queue = ecco_dataset_production.ecco_work_queue.open_work_queue(':memory:', max_attempts=2)
+    queue.put(TASKS)
+    calls = []
+    def process(task):
+        calls.append(task['granule'])
+        # fail first attempt of one task:
+        return not (task['granule'] == 'granule_1.nc' and calls.count('granule_1.nc') == 1)
+    num_done, num_failed = ecco_dataset_production.ecco_work_queue.work(
+        queue, process, worker_id='test', poll_interval=0.01)
+    assert (num_done, num_failed) == (3, 1)
+    assert queue.status()['done'] == 3
+
+
+def test_work_lost_lease_not_acknowledged():
+    """Test that a task whose lease was lost while in progress (and has since
+    been re-leased) is neither acknowledged nor failed by the original
+    worker."""
+    ecco_work_queue = ecco_dataset_production.ecco_work_queue
+    queue = ecco_work_queue.open_work_queue(':memory:', visibility_timeout=0.05)
+    queue.put(TASKS[:1])
+    def process(task):
+        time.sleep(0.1)
+        other = queue.lease(worker_id='other')
+        assert other.attempt == 2
+        assert queue.ack(other)
+        time.sleep(0.2)
+        return True
+    assert ecco_work_queue.work(queue, process, worker_id='test',
+        heartbeat_interval=0.15, poll_interval=0.01) == (0, 0)
+    assert queue.status() == {'pending': 0, 'leased': 0, 'done': 1, 'failed': 0}
+
+
+def test_backend_interface_is_abstract():
+    """Test that backends must implement the full queue interface."""
+    ecco_work_queue = ecco_dataset_production.ecco_work_queue
+    with pytest.raises(TypeError):
+        ecco_work_queue.ECCOWorkQueue()
+    class PartialQueue(ecco_work_queue.ECCOWorkQueue):
+        def put( self, tasks):
+            return 0
+    with pytest.raises(TypeError, match='lease'):
+        PartialQueue()
@@ -0,0 +1,42 @@
+import json
+
+import ecco_dataset_production
+
+GRANULE_FILE = 'SEA_SURFACE_HEIGHT_day_mean_1992-01-{0:02d}_ECCO_V4r4_latlon_0p50deg.nc'
+
+
+def test_find_missing_granules(tmp_path):
+    """Test missing, empty and undersized granule detection, and redo
+    tasklists."""
+    (tmp_path/'output').mkdir()
+    tasks = []
+    for day in range(1, 7):
+        granule = tmp_path/'output'/GRANULE_FILE.format(day)
+        tasks.append({
+            'granule': str(granule),
+            'variables': {'SSH': [['SSH_day_mean.data', 'SSH_day_mean.meta']]},
+            'dynamic_metadata': {'dimension': '2D'}})
+        if day == 2:
+            granule.write_text('')              # empty
+        elif day == 3:
+            granule.write_text('x'*10)          # undersized
+        elif day != 4:                          # (4 missing)
+            granule.write_text('x'*100)
+    with open(tmp_path/'tasks.json', 'w') as f:
+        json.dump(tasks + tasks[:1], f)         # (with one duplicate)
+
+    redo_tasks, counts = \
+        ecco_dataset_production.apps.find_missing_granules.find_missing_granules(
+            input_paths=[str(tmp_path/'tasks.json')],
+            output_base=str(tmp_path/'redo'/'tasks'), num_partitions=2,
+            min_size_fraction=0.5, report=str(tmp_path/'report.jsonl'))
+
+    assert [task['granule'] for task in redo_tasks] == [task['granule'] for task in tasks[1:4]]
+    assert counts == {'ok':3, 'missing':1, 'undersized':2, 'duplicate':1}
+    redo = [task
+        for p in (1, 2)
+        for task in ecco_dataset_production.ecco_tasklist.load_tasklist(
+            str(tmp_path/'redo'/f'tasks_{p:03}.json'))]
+    assert sorted(task['granule'] for task in redo) == sorted(task['granule'] for task in redo_tasks)
+    with open(tmp_path/'report.jsonl') as f:
+        assert [json.loads(line)['status'] for line in f] == ['undersized', 'undersized', 'missing']
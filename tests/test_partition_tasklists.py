@@ -0,0 +1,94 @@
+import types
+
+import pytest
+
+import ecco_dataset_production
+
+
+def make_task(granule, dimension='2D', num_components=1):
+    """Minimal task descriptor with a single (possibly vector) variable."""
+    return {
+        'granule': granule,
+        'variables': {'VAR': [['VAR.data', 'VAR.meta']]*num_components},
+        'dynamic_metadata': {'dimension': dimension}}
+
+
+def test_task_cost_ordering():
+    """Test relative cost estimates by grid type, dimension and components."""
+    estimate = ecco_dataset_production.apps.partition_tasklists.estimate_task_cost
+    native_2d = estimate(make_task('SSH_mon_mean_1992-01_ECCO_V4r4_native_llc0090.nc'))
+    latlon_2d = estimate(make_task('SSH_mon_mean_1992-01_ECCO_V4r4_latlon_0p50deg.nc'))
+    latlon_3d = estimate(make_task('THETA_mon_mean_1992-01_ECCO_V4r4_latlon_0p50deg.nc', '3D'))
+    latlon_3d_vector = estimate(make_task(
+        'VEL_mon_mean_1992-01_ECCO_V4r4_latlon_0p50deg.nc', '3D', num_components=2))
+    assert native_2d < latlon_2d < latlon_3d < latlon_3d_vector
+
+
+def test_input_size_costs_share_one_basis():
+    """Test that, given input sizes, vector variable costs scale with input
+    size alone (which already reflects the number of components), and that
+    tasks whose inputs cannot be sized are assigned their class's median
+    size, rather than a count-based cost."""
+    partition_tasklists = ecco_dataset_production.apps.partition_tasklists
+    megabyte = partition_tasklists.MEGABYTE
+    sizes = {'VAR.data': megabyte, 'VAR.meta': 0, 'BIG.data': 3*megabyte, 'BIG.meta': 0}
+    inventory = types.SimpleNamespace(
+        stat=lambda path: {'size': sizes[path]} if path in sizes else None)
+    def task(name, num_components=1):
+        task = make_task('VEL_mon_mean_1992-01_ECCO_V4r4_latlon_0p50deg.nc', '3D', num_components)
+        task['variables']['VAR'] = [[f'{name}.data', f'{name}.meta']]*num_components
+        return task
+    tasks = [task('VAR'), task('VAR', 2), task('BIG'), task('MISSING')]
+    costs = partition_tasklists.estimate_task_costs(tasks, inventory=inventory)
+    assert costs[1] == pytest.approx(2*costs[0])
+    assert costs[2] == pytest.approx(3*costs[0])
+    # (median of 1 MB and 3 MB single-component sizes:)
+    assert costs[3] == pytest.approx(2*costs[0])
+
+    # calibration is on the same basis:
+    timings = {tasks[0]['granule']: 10.}
+    costs = partition_tasklists.estimate_task_costs(tasks[:1], timings, inventory=inventory)
+    assert costs == [pytest.approx(10.)]
+
+    # without sizes, vector components are costed by count:
+    costs = partition_tasklists.estimate_task_costs(tasks)
+    assert costs[1] == pytest.approx(2*costs[0])
+    assert costs[0] == costs[2] == costs[3]
+
+
+def test_calibration():
+    """Test calibrated estimates reproduce recorded timings for each class."""
+    partition_tasklists = ecco_dataset_production.apps.partition_tasklists
+    tasks = [
+        make_task('SSH_mon_mean_1992-01_ECCO_V4r4_latlon_0p50deg.nc'),
+        make_task('THETA_mon_mean_1992-01_ECCO_V4r4_latlon_0p50deg.nc', '3D')]
+    timings = {
+        'SSH_mon_mean_1992-01_ECCO_V4r4_latlon_0p50deg.nc': 10.,
+        'THETA_mon_mean_1992-01_ECCO_V4r4_latlon_0p50deg.nc': 100.}
+    factors = partition_tasklists.calibrate(tasks, timings)
+    assert partition_tasklists.estimate_task_cost(tasks[0], factors) == pytest.approx(10.)
+    assert partition_tasklists.estimate_task_cost(tasks[1], factors) == pytest.approx(100.)
+
+
+def test_lpt_partition_balance():
+    """Test LPT assignment of all items, and resulting partition balance."""
+    costs = [50, 1, 1, 1, 1, 10, 10, 10, 10, 10, 5, 5, 5, 5, 5, 5, 5, 5, 5, 5]
+    partitions, loads = ecco_dataset_production.apps.partition_tasklists.lpt_partition(costs, 4)
+    assert sorted(i for p in partitions for i in p) == list(range(len(costs)))
+    assert loads == [sum(costs[i] for i in p) for p in partitions]
+    # the 50-cost item is alone in its partition; the rest are spread evenly:
+    assert [0] in partitions
+    other_loads = [l for l, p in zip(loads, partitions) if p != [0]]
+    assert max(other_loads) - min(other_loads) <= 1
+
+
+@pytest.mark.parametrize('num_partitions', [0, -1, None])
+def test_invalid_num_partitions(tmp_path, num_partitions):
+    """Test that fewer than one partition is rejected."""
+    partition_tasklists = ecco_dataset_production.apps.partition_tasklists
+    with pytest.raises(ValueError, match='at least 1'):
+        partition_tasklists.lpt_partition([1., 2.], num_partitions)
+    with pytest.raises(ValueError, match='at least 1'):
+        partition_tasklists.partition_tasklists(
+            input_paths=[str(tmp_path)], num_partitions=num_partitions,
+            output_base=str(tmp_path/'part'))
@@ -1,10 +1,12 @@
 #!/usr/bin/env python3
 
 import argparse
-import glob
-import json
+import math
 import os
 
+from ecco_dataset_production import ecco_tasklist
+from ecco_dataset_production.apps import partition_tasklists
+
 
 def create_parser():
     """Set up list of command-line arguments to split_tasks.
@@ -15,10 +17,12 @@ def create_parser():
     """
     parser = argparse.ArgumentParser()
     parser.add_argument('--N', type=int, default=100, help="""
-        Split task list(s) into lists of N elements (or fewer) each (default:
-        %(default)s).""")
+        Split task list(s) into lists of N elements each, on average, of
+        approximately equal estimated processing cost (see
+        edp_partition_tasklists; default: %(default)s).""")
     parser.add_argument('--tasklist', required=True, help="""
-        Single tasklist file (json) or directory of similar tasklist files.""")
+        Single tasklist file (json, or compact jsonl) or directory of similar
+        tasklist files.""")
     parser.add_argument('--output_dir', default='.', help="""
         Directory to which resulting task lists are to be saved (default:
         '%(default)s').""")
@@ -39,22 +43,23 @@ def main():
         all_tasklists = [
             os.path.join(args.tasklist,file)
             for file in os.listdir(args.tasklist)
-            if os.path.splitext(file)[1] == '.json']
+            if os.path.splitext(file)[1] in ('.json','.jsonl')]
 
     if not os.path.isdir(args.output_dir):
         os.mkdir(args.output_dir)
 
     for tasklist in all_tasklists:
-        n = 0
-        t = json.load(open(tasklist))
-        t_basename,t_ext = os.path.splitext(os.path.basename(tasklist))
-        while n*args.N < len(t):
-            json.dump(
-                t[n*args.N:(n+1)*args.N],
-                open(os.path.join(args.output_dir,f'{t_basename}_{n}{t_ext}'),'w'),
-                indent=4)
-            n = n+1
-
+        # cost-balanced partitions of (on average) N tasks:
+        tasks = ecco_tasklist.load_tasklist(tasklist)
+        if not tasks:
+            continue
+        costs = partition_tasklists.estimate_task_costs(tasks)
+        partitions, loads = partition_tasklists.lpt_partition(
+            costs, math.ceil(len(tasks)/args.N))
+        t_basename = os.path.splitext(os.path.basename(tasklist))[0]
+        partition_tasklists.write_partitions(
+            tasks, partitions, loads, os.path.join(args.output_dir,t_basename),
+            ecco_tasklist.tasklist_format(tasklist))
 
 if __name__ == '__main__':
     main()
@@ -2,10 +2,10 @@ import argparse
 import json
 import glob
 import os
-import random
-import math
 from pprint import pprint
 
+from ecco_dataset_production.apps import partition_tasklists
+
 def load_all_json_entries(input_dir):
     combined = []
     json_files = glob.glob(os.path.join(input_dir, "*.json"))
@@ -29,29 +29,21 @@ def load_all_json_entries(input_dir):
     return combined
 
 def split_and_save_chunks(data, n_chunks, output_dir):
-    random.shuffle(data)
-
-    all_chunks_saved = 0
-    num_chunk_files = 0
-
-    chunk_size = math.ceil(len(data) / n_chunks)
-    for i in range(n_chunks):
-        chunk = data[i * chunk_size : (i + 1) * chunk_size]
-
-        if len(chunk) > 0:
-            out_path = os.path.join(output_dir, f"chunk_{i+1}.json")
-            with open(out_path, 'w') as f:
-                json.dump(chunk, f, indent=2)
-            print(f"Wrote {len(chunk)} entries to {out_path}")
-            all_chunks_saved += len(chunk)
-            num_chunk_files += 1
-        else:
-            print(f"Skipped chunk {i} because zero length")
+    # cost-balanced assignment (see edp_partition_tasklists, which should be
+    # used directly if cost calibration or input sizes are required), rather
+    # than a shuffle and equal-count split:
+    n_chunks = min(n_chunks, len(data))
+    costs = partition_tasklists.estimate_task_costs(data)
+    partitions, loads = partition_tasklists.lpt_partition(costs, n_chunks)
+    output_files = partition_tasklists.write_partitions(
+        data, partitions, loads, os.path.join(output_dir, "chunk"))
+    for out_path, partition in zip(output_files, partitions):
+        print(f"Wrote {len(partition)} entries to {out_path}")
 
-    print(f"Saved a total of {all_chunks_saved} across {num_chunk_files} files")
+    print(f"Saved a total of {len(data)} across {len(output_files)} files")
 
 def main():
-    parser = argparse.ArgumentParser(description="Combine, shuffle, and split JSON entries.")
+    parser = argparse.ArgumentParser(description="Combine JSON entries, and split them into chunks of approximately equal estimated processing cost.")
     parser.add_argument("--input_dir", required=True, help="Directory containing input JSON files")
     parser.add_argument("--output_dir", required=True, help="Directory to write output chunks")
     parser.add_argument("--n_chunks", required=True, type=int, help="Number of output chunks to create")